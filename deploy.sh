@@ -104,6 +104,8 @@ chmod 755 logs
 
 python manage.py collectstatic --settings=yasalog.production_settings --noinput
 python manage.py migrate --settings=yasalog.production_settings
+# Dashboard özet tablolarını mevcut kayıtlarla doldur
+python manage.py update_log_rollups --settings=yasalog.production_settings
 
 # 9. Nginx Yapılandırması
 log "Nginx yapılandırılıyor..."
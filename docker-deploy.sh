@@ -130,7 +130,8 @@ echo ""
 echo "Deployment için şu komutları çalıştırın:"
 echo "1. docker-compose up -d"
 echo "2. docker-compose exec web python manage.py migrate"
-echo "3. docker-compose exec web python manage.py createsuperuser"
+echo "3. docker-compose exec web python manage.py update_log_rollups"
+echo "4. docker-compose exec web python manage.py createsuperuser"
 echo ""
 echo "Uygulama http://213.194.98.98 adresinde çalışacak!"
 EOF 
\ No newline at end of file
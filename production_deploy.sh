@@ -58,6 +58,8 @@ pip3 install -r ../requirements.txt
 # 4. Veritabanı Migrasyonu
 log "Veritabanı migrasyonu yapılıyor..."
 python3 manage.py migrate
+# Dashboard özet tablolarını mevcut kayıtlarla doldur
+python3 manage.py update_log_rollups
 
 # 5. Static Dosyaları Topla
 log "Static dosyalar toplanıyor..."
@@ -0,0 +1,80 @@
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+from log_kayit.pagination import keyset_paginate, InvalidCursor
+
+
+class LogCursorPagination(BasePagination):
+    """Log listesi için (giris_zamani, id) keyset sayfalama
+
+    COUNT(*) ve OFFSET kullanılmaz; toplam sayı view.get_approximate_count()
+    varsa özet tablolarından yaklaşık olarak döner.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+    def get_page_size(self, request):
+        page_size = api_settings.PAGE_SIZE or 20
+        try:
+            requested = int(request.query_params.get(self.page_size_query_param, page_size))
+        except (TypeError, ValueError):
+            return page_size
+        return max(1, min(requested, self.max_page_size))
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        approximate_count = None
+        if view is not None and hasattr(view, 'get_approximate_count'):
+            approximate_count = view.get_approximate_count()
+
+        try:
+            self.page = keyset_paginate(
+                queryset,
+                request.query_params.get(self.cursor_query_param),
+                self.get_page_size(request),
+                approximate_count,
+            )
+        except InvalidCursor:
+            raise NotFound('Geçersiz cursor.')
+        return list(self.page)
+
+    def _link(self, cursor):
+        if cursor is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def get_next_link(self):
+        return self._link(self.page.next_cursor)
+
+    def get_previous_link(self):
+        if not self.page.has_previous():
+            return None
+        cursor = self.page.previous_cursor
+        if cursor is None:
+            # Boş sayfadan geri dönüş: ilk sayfa
+            return remove_query_param(self.request.build_absolute_uri(), self.cursor_query_param)
+        return self._link(cursor)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'approximate_count': self.page.approximate_count,
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'approximate_count': {'type': 'integer', 'nullable': True},
+                'results': schema,
+            },
+        }
@@ -1,9 +1,12 @@
 from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from django.db import transaction
 from django.shortcuts import get_object_or_404
 from log_kayit.models import Company, LogKayit, CompanyUser
+from log_kayit.rollups import CompanyRollups, set_suspicious
 from .serializers import CompanySerializer, LogKayitSerializer, CompanyUserSerializer
+from .pagination import LogCursorPagination
 from django.utils import timezone
 
 class CompanyViewSet(viewsets.ReadOnlyModelViewSet):
@@ -18,26 +21,69 @@ class CompanyViewSet(viewsets.ReadOnlyModelViewSet):
 class LogKayitViewSet(viewsets.ModelViewSet):
     serializer_class = LogKayitSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = LogCursorPagination
     
     def get_queryset(self):
         company_slug = self.kwargs.get('company_slug')
         if company_slug:
             company = get_object_or_404(Company, slug=company_slug)
             if self.request.user.is_superuser or CompanyUser.objects.filter(user=self.request.user, company=company).exists():
-                return LogKayit.objects.filter(company=company)
+                self.company = company
+                logs = LogKayit.objects.filter(company=company).select_related('company')
+                # Şifreli alanlarda tam eşleşme araması (kör indeks)
+                params = self.request.query_params
+                if params.get('tc_no'):
+                    logs = logs.by_tc_no(params['tc_no'].strip())
+                if params.get('ip_adresi'):
+                    logs = logs.by_ip_adresi(params['ip_adresi'].strip())
+                if params.get('mac_adresi'):
+                    logs = logs.by_mac_adresi(params['mac_adresi'].strip())
+                return logs
         return LogKayit.objects.none()
     
+    def perform_update(self, serializer):
+        """is_suspicious özet sayaçlarıyla birlikte set_suspicious() üzerinden değişir"""
+        suspicious = serializer.validated_data.pop('is_suspicious', None)
+        with transaction.atomic():
+            log = serializer.save()
+            if suspicious is not None:
+                set_suspicious(LogKayit.objects.filter(pk=log.pk), suspicious)
+                log.is_suspicious = suspicious
+    
+    def get_approximate_count(self):
+        """Filtresiz firma listesi için özet tablolarından toplam kayıt sayısı"""
+        company = getattr(self, 'company', None)  # get_queryset yetki kontrolünden sonra atar
+        params = self.request.query_params
+        if company is None or any(params.get(name) for name in ('tc_no', 'ip_adresi', 'mac_adresi')):
+            return None
+        return CompanyRollups(company).totals()['total']
+    
     @action(detail=False, methods=['get'])
     def statistics(self, request, company_slug=None):
         """Şirket için istatistikler"""
         company = get_object_or_404(Company, slug=company_slug)
         logs = self.get_queryset()
         
+        if any(self.request.query_params.get(name) for name in ('tc_no', 'ip_adresi', 'mac_adresi')):
+            # Filtreli istatistikler özet tablolarından hesaplanamaz
+            stats = {
+                'total_logs': logs.count(),
+                'today_logs': logs.in_date_range(timezone.localdate(), timezone.localdate()).count(),
+                'suspicious_logs': logs.filter(is_suspicious=True).count(),
+                'unique_users': logs.values('ad_soyad').distinct().count(),
+            }
+            return Response(stats)
+        
+        if not (request.user.is_superuser or CompanyUser.objects.filter(user=request.user, company=company).exists()):
+            return Response({'total_logs': 0, 'today_logs': 0, 'suspicious_logs': 0, 'unique_users': 0})
+        
+        rollups = CompanyRollups(company)
+        totals = rollups.totals()
         stats = {
-            'total_logs': logs.count(),
-            'today_logs': logs.filter(giris_zamani__date=timezone.now().date()).count(),
-            'suspicious_logs': logs.filter(is_suspicious=True).count(),
-            'unique_users': logs.values('ad_soyad').distinct().count(),
+            'total_logs': totals['total'],
+            'today_logs': rollups.totals(start_date=timezone.localdate())['total'],
+            'suspicious_logs': totals['suspicious'],
+            'unique_users': len(rollups.user_totals()),
         }
         return Response(stats)
 
@@ -110,9 +110,9 @@ def log_logkayit_create_update(sender, instance, created, **kwargs):
         description=description,
         details={
             'tc_no': instance.tc_no,
-            'mac_address': instance.mac_address,
-            'ip_address': instance.ip_address,
-            'suspicious': instance.suspicious,
+            'mac_address': instance.mac_adresi,
+            'ip_address': instance.ip_adresi,
+            'suspicious': instance.is_suspicious,
         },
         severity='MEDIUM'
     )
@@ -131,8 +131,8 @@ def log_logkayit_delete(sender, instance, **kwargs):
         description=f"Log kaydı silindi: {instance.tc_no}",
         details={
             'tc_no': instance.tc_no,
-            'mac_address': instance.mac_address,
-            'ip_address': instance.ip_address,
+            'mac_address': instance.mac_adresi,
+            'ip_address': instance.ip_adresi,
         },
         severity='HIGH'
     )
@@ -155,7 +155,7 @@ def log_company_create_update(sender, instance, created, **kwargs):
         details={
             'name': instance.name,
             'slug': instance.slug,
-            'is_active': instance.is_active,
+            'allow_foreigners': instance.allow_foreigners,
         },
         severity='HIGH'
     )
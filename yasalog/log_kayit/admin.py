@@ -4,6 +4,7 @@ from django.urls import reverse
 from django.utils import timezone
 from datetime import timedelta
 from .models import LogKayit, Company, CompanyUser
+from .rollups import set_suspicious
 
 @admin.register(LogKayit)
 class LogKayitAdmin(admin.ModelAdmin):
@@ -35,7 +36,8 @@ class LogKayitAdmin(admin.ModelAdmin):
     actions = ['mark_as_suspicious', 'export_to_csv']
     
     def mark_as_suspicious(self, request, queryset):
-        updated = queryset.update(is_suspicious=True)
+        # Dashboard özetleri de düzeltilir (bkz. rollups.set_suspicious)
+        updated = set_suspicious(queryset)
         self.message_user(request, f'{updated} kayıt şüpheli olarak işaretlendi.')
     mark_as_suspicious.short_description = 'Seçili kayıtları şüpheli olarak işaretle'
     
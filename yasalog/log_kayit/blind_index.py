@@ -0,0 +1,91 @@
+"""
+Şifreli alanlar için aranabilir kör indeks (blind index)
+5651 Log Sistemi - TC kimlik no, IP ve MAC adresi eşitlik aramaları
+
+Fernet şifrelemesi rastgele IV kullandığından aynı değer her seferinde
+farklı şifrelenir; şifreli sütunda eşitlik araması yapılamaz. Bu yüzden
+değerin normalize edilmiş hali anahtarlı HMAC-SHA256 ile ayrı bir sütuna
+yazılır ve bu sütun indekslenir. Anahtarı bilmeyen biri indeks değerinden
+orijinal veriyi çıkaramaz; anahtar sahibi ise tam eşleşme aramasını
+B-tree indeks üzerinden O(log n) sürede yapar.
+
+Her alan türü HMAC girdisine ayrı bir önekle girer; aynı değerin TC ve
+MAC indeksleri birbiriyle eşleştirilemez.
+"""
+
+import hashlib
+import hmac
+import ipaddress
+from django.conf import settings
+
+# Kesilmiş HMAC uzunluğu (hex karakter): 128 bit çakışma direnci
+BLIND_INDEX_LENGTH = 32
+
+FIELD_TC_NO = 'tc_no'
+FIELD_IP_ADRESI = 'ip_adresi'
+FIELD_MAC_ADRESI = 'mac_adresi'
+
+
+def _get_key():
+    """Kör indeks anahtarı; tanımlı değilse SECRET_KEY'den türetilir"""
+    key = getattr(settings, 'BLIND_INDEX_KEY', None)
+    if key:
+        return key.encode('utf-8') if isinstance(key, str) else key
+    return hmac.new(
+        settings.SECRET_KEY.encode('utf-8'), b'yasalog-blind-index', hashlib.sha256
+    ).digest()
+
+
+def normalize_tc_no(value):
+    return ''.join(char for char in str(value) if char.isdigit())
+
+
+def normalize_ip_address(value):
+    value = str(value).strip()
+    try:
+        return ipaddress.ip_address(value).compressed
+    except ValueError:
+        return value.lower()
+
+
+def normalize_mac_address(value):
+    """AA-BB-CC-DD-EE-FF / aabb.ccdd.eeff / aa:bb:... biçimlerini eşitler"""
+    value = str(value).strip()
+    hex_digits = ''.join(char for char in value if char not in ':-.').lower()
+    if len(hex_digits) == 12 and all(char in '0123456789abcdef' for char in hex_digits):
+        return ':'.join(hex_digits[i:i + 2] for i in range(0, 12, 2))
+    # MAC yerine cihaz tanımlayıcısı (ör. User-Agent) saklanıyor olabilir
+    return value
+
+
+NORMALIZERS = {
+    FIELD_TC_NO: normalize_tc_no,
+    FIELD_IP_ADRESI: normalize_ip_address,
+    FIELD_MAC_ADRESI: normalize_mac_address,
+}
+
+
+def blind_index(field, value):
+    """Alan türü ve açık değer için kör indeks değerini döndürür"""
+    if not value:
+        return ''
+    normalized = NORMALIZERS[field](value)
+    if not normalized:
+        return ''
+    digest = hmac.new(_get_key(), f"{field}:{normalized}".encode('utf-8'), hashlib.sha256)
+    return digest.hexdigest()[:BLIND_INDEX_LENGTH]
+
+
+def tc_no_index(tc_no):
+    """TC kimlik numarası kör indeksi"""
+    return blind_index(FIELD_TC_NO, tc_no)
+
+
+def ip_address_index(ip_address):
+    """IP adresi kör indeksi"""
+    return blind_index(FIELD_IP_ADRESI, ip_address)
+
+
+def mac_address_index(mac_address):
+    """MAC adresi kör indeksi"""
+    return blind_index(FIELD_MAC_ADRESI, mac_address)
@@ -0,0 +1,66 @@
+"""
+Commit sırası güvenli imleç sınırı
+5651 Log Sistemi - Özet tabloları, zaman damgası ve log defteri imleçleri
+
+LogKayit ID'leri INSERT sırasıyla verilir, commit sırası ise farklı olabilir:
+uzun süren bir içe aktarma transaction'ının düşük ID'leri, sonra başlayıp
+önce commit edilen bir portal girişinden sonra görünür hale gelir. ID
+imleci o girişi geçmişse içe aktarılan kayıtlar hiç işlenmez. giris_zamani
+bu sırayı göstermez: içe aktarılan kayıtlar geçmiş, saati bozuk cihazdan
+gelen kayıtlar gelecek tarihli olabilir.
+
+`commit_horizon()` ID dizisinde ilk boşluğa kadar ilerleyen tek bir sınır
+tutar; sınırın altındaki her ID ya görünürdür ya da kalıcı olarak yoktur.
+Boşluk commit edilmemiş bir transaction'dan ya da geri alınmış/silinmiş bir
+kayıttan gelir; LOG_COMMIT_GAP_SECONDS boyunca dolmazsa kalıcı sayılır ve
+atlanır. Artımlı işler yalnızca sınıra kadar okur.
+"""
+
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Min
+from django.utils import timezone
+import logging
+
+from .models import JobCheckpoint, LogKayit
+
+logger = logging.getLogger(__name__)
+
+HORIZON_JOB = 'commit_horizon'
+
+
+def commit_horizon(scan_size=10000):
+    """Altındaki tüm ID'lerin commit edildiği (ya da kalıcı olarak olmadığı) en büyük log ID'si"""
+    timeout = timedelta(seconds=getattr(settings, 'LOG_COMMIT_GAP_SECONDS', 600))
+    if not JobCheckpoint.objects.filter(job=HORIZON_JOB, company=None).exists():
+        # Saklama süresiyle silinmiş ilk ID'ler boşluk sayılmaz
+        first_id = LogKayit.objects.aggregate(first_id=Min('id'))['first_id'] or 1
+        JobCheckpoint.objects.get_or_create(job=HORIZON_JOB, company=None, defaults={'last_id': first_id - 1})
+
+    with transaction.atomic():
+        checkpoint = JobCheckpoint.objects.select_for_update().get(job=HORIZON_JOB, company=None)
+        horizon = checkpoint.last_id
+        now = timezone.now()
+        waiting = False
+        while not waiting:
+            ids = list(
+                LogKayit.objects.filter(id__gt=horizon).order_by('id').values_list('id', flat=True)[:scan_size]
+            )
+            for log_id in ids:
+                if log_id != horizon + 1:
+                    if checkpoint.gap_id != horizon + 1 or checkpoint.gap_seen_at is None:
+                        checkpoint.gap_id, checkpoint.gap_seen_at = horizon + 1, now
+                    if now - checkpoint.gap_seen_at < timeout:
+                        waiting = True
+                        break
+                    logger.warning(f"Log ID boşluğu {horizon + 1}-{log_id - 1} dolmadı, kalıcı sayılıyor")
+                horizon = log_id
+            if len(ids) < scan_size:
+                break
+
+        if not waiting:
+            checkpoint.gap_id, checkpoint.gap_seen_at = 0, None
+        checkpoint.last_id = horizon
+        checkpoint.save(update_fields=['last_id', 'gap_id', 'gap_seen_at', 'updated_at'])
+    return horizon
@@ -7,8 +7,8 @@ from django.utils import timezone
 from datetime import timedelta
 from django.core.mail import send_mail
 from django.conf import settings
-from .models import LogKayit, Company
-from .management.commands.cleanup_old_logs import Command as CleanupCommand
+from .models import LogKayit, Company, DeviceSession
+from django.core.management import call_command
 
 logger = logging.getLogger(__name__)
 
@@ -20,9 +20,8 @@ def cleanup_old_logs():
     try:
         logger.info("Otomatik log temizleme işlemi başlatıldı")
         
-        # Cleanup command'ı çalıştır
-        cleanup_cmd = CleanupCommand()
-        cleanup_cmd.handle()
+        # Cleanup command'ı çalıştır (varsayılan seçeneklerle)
+        call_command('cleanup_old_logs')
         
         logger.info("Otomatik log temizleme işlemi tamamlandı")
         
@@ -34,6 +33,52 @@ def cleanup_old_logs():
         # Hata durumunda admin'lere uyarı e-postası gönder
         send_error_notification("Log Temizleme Hatası", str(e))
 
+def ensure_log_partitions():
+    """
+    Her gün önümüzdeki aylar için log bölümlerini oluşturur
+    (yalnızca PostgreSQL'de bölümlenmiş tablolar için)
+    """
+    try:
+        from .partitions import ensure_partitions
+        created = ensure_partitions()
+        if created:
+            logger.info(f"Log bölümleri oluşturuldu: {', '.join(created)}")
+    except Exception as e:
+        logger.error(f"Log bölümü oluşturma hatası: {str(e)}")
+
+def cleanup_device_sessions():
+    """
+    Her saat süresi dolmuş "cihazı hatırla" oturumlarını siler
+    (expires_at indeksi üzerinden; log kayıtlarına dokunmaz)
+    """
+    try:
+        deleted, _ = DeviceSession.objects.expired().delete()
+        logger.info(f"Süresi dolmuş cihaz oturumları silindi: {deleted}")
+    except Exception as e:
+        logger.error(f"Cihaz oturumu temizleme hatası: {str(e)}")
+
+def update_log_rollups():
+    """
+    Her 5 dakikada yeni log kayıtlarını dashboard özet tablolarına ekler
+    """
+    try:
+        from .rollups import update_rollups
+        processed = update_rollups()
+        logger.info(f"Log özetleri güncellendi: {processed} kayıt")
+    except Exception as e:
+        logger.error(f"Log özeti güncelleme hatası: {str(e)}")
+
+def cleanup_export_jobs():
+    """
+    Her saat saklama süresi dolan dışa aktarma işlerini ve dosyalarını siler
+    """
+    try:
+        from .export_jobs import cleanup_export_jobs as cleanup
+        deleted = cleanup()
+        logger.info(f"Süresi dolmuş dışa aktarma işleri silindi: {deleted}")
+    except Exception as e:
+        logger.error(f"Dışa aktarma işi temizleme hatası: {str(e)}")
+
 def generate_retention_report():
     """
     Her hafta Pazar günü 03:00'de veri saklama raporu oluşturur
@@ -231,3 +276,13 @@ def get_admin_emails():
     except Exception as e:
         logger.error(f"Admin e-postaları alınamadı: {str(e)}")
         return [getattr(settings, 'ADMIN_EMAIL', 'admin@example.com')]
+
+def update_log_ledger():
+    """
+    Her 5 dakikada yeni log kayıtlarını firma hash zincirlerine ekler ve
+    süresi gelen zincir başlarını TSA'ya damgalatır
+    """
+    try:
+        call_command('update_ledger')
+    except Exception as e:
+        logger.error(f"Log zinciri güncelleme hatası: {str(e)}")
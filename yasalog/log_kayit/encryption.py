@@ -1,90 +1,216 @@
 """
 Veri şifreleme sistemi - Encryption at Rest
 5651 Log Sistemi için hassas verilerin şifrelenmesi
+
+Anahtar rotasyonu: ENCRYPTION_KEYS listesinde ilk anahtar yeni yazmalarda
+kullanılır, okumalarda anahtarlar sırayla denenir (MultiFernet). Yeni
+anahtar listenin başına eklenir, `manage.py rotate_encryption_key` eski
+kayıtları yeni anahtarla yeniden şifreler, bittiğinde eski anahtar
+listeden çıkarılır.
 """
 
 import os
 import base64
-from cryptography.fernet import Fernet
+import binascii
+import hashlib
+from cryptography.fernet import Fernet, InvalidToken, MultiFernet
 from cryptography.hazmat.primitives import hashes
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
 from django.conf import settings
 from django.core.exceptions import ImproperlyConfigured
+from concurrent.futures import ThreadPoolExecutor
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+# Fernet token'larının öneki (0x80 sürüm baytı ve zaman damgasının sıfır
+# üst baytları). Yeni veriler token olarak doğrudan saklanır.
+TOKEN_PREFIX = 'gAAAAA'
+# Eski biçim: token ikinci kez base64 ile kodlanmıştı ("gAAAAA" -> "Z0FBQUFB")
+LEGACY_PREFIX = 'Z0FBQUFB'
+
+# encrypt_many/decrypt_many bu boyuttan küçük listeleri tek thread'de işler
+PARALLEL_THRESHOLD = 10000
+PARALLEL_CHUNK_SIZE = 5000
 
 
 class EncryptionManager:
     """Veri şifreleme yöneticisi"""
     
-    def __init__(self):
+    def __init__(self, key=None, keys=None):
         self._fernet = None
-        self._key = None
+        self._primary_fernet = None
+        self._keys = list(keys) if keys else ([key] if key else None)
     
-    def _get_encryption_key(self):
-        """Şifreleme anahtarını al veya oluştur"""
-        if self._key:
-            return self._key
+    def _get_encryption_keys(self):
+        """Şifreleme anahtarlarını al (ilk anahtar birincil) veya oluştur"""
+        if self._keys:
+            return self._keys
         
-        # Environment'dan anahtar al
-        key = getattr(settings, 'ENCRYPTION_KEY', None)
+        # Environment'dan anahtarlar: ENCRYPTION_KEYS (yeniden eskiye) veya ENCRYPTION_KEY
+        keys = getattr(settings, 'ENCRYPTION_KEYS', None)
+        if isinstance(keys, str):
+            keys = [key.strip() for key in keys.split(',')]
+        keys = [key for key in (keys or []) if key]
+        if not keys and getattr(settings, 'ENCRYPTION_KEY', None):
+            keys = [settings.ENCRYPTION_KEY]
         
-        if not key:
+        if not keys:
             # Anahtar yoksa oluştur
             key = Fernet.generate_key()
             # Production'da bu anahtarı güvenli bir yerde saklamalısınız
             print(f"⚠️  YENİ ENCRYPTION KEY OLUŞTURULDU: {key.decode()}")
             print("⚠️  Bu anahtarı ENCRYPTION_KEY environment variable'ına ekleyin!")
+            keys = [key]
         
-        self._key = key
-        return key
+        self._keys = keys
+        return keys
+    
+    def _get_encryption_key(self):
+        """Birincil (yeni yazmalarda kullanılan) anahtar"""
+        return self._get_encryption_keys()[0]
+    
+    def key_fingerprint(self):
+        """Birincil anahtarı açığa çıkarmadan tanımlayan kısa özet"""
+        key = self._get_encryption_key()
+        if isinstance(key, str):
+            key = key.encode('ascii')
+        return hashlib.sha256(key).hexdigest()[:16]
     
     def _get_fernet(self):
-        """Fernet şifreleme objesi al"""
+        """Fernet şifreleme objesi al (birden fazla anahtarda MultiFernet)"""
         if self._fernet:
             return self._fernet
         
-        key = self._get_encryption_key()
-        self._fernet = Fernet(key)
+        fernets = [Fernet(key) for key in self._get_encryption_keys()]
+        self._primary_fernet = fernets[0]
+        self._fernet = MultiFernet(fernets) if len(fernets) > 1 else fernets[0]
         return self._fernet
     
-    def encrypt(self, data):
-        """Veriyi şifrele"""
+    @staticmethod
+    def _encrypt_value(fernet, data):
         if not data:
             return data
-        
         try:
-            # String'i bytes'a çevir
             if isinstance(data, str):
                 data = data.encode('utf-8')
-            
-            fernet = self._get_fernet()
-            encrypted_data = fernet.encrypt(data)
-            
-            # Base64 encode et (database'de saklamak için)
-            return base64.b64encode(encrypted_data).decode('utf-8')
-        
-        except Exception as e:
-            print(f"Encryption error: {e}")
-            return data
+            elif not isinstance(data, bytes):
+                raise TypeError(f"Şifrelenecek değer str veya bytes olmalı: {type(data).__name__}")
+        except (TypeError, ValueError) as e:
+            logger.error(f"Şifreleme girdi hatası: {str(e)}")
+            raise
+        # Şifreleme hatası yükseltilir; açık metin asla şifreli diye saklanmaz.
+        # Fernet token'ı zaten URL-safe base64; tekrar kodlanmaz
+        return fernet.encrypt(data).decode('ascii')
     
-    def decrypt(self, encrypted_data):
-        """Şifrelenmiş veriyi çöz"""
-        if not encrypted_data:
+    @staticmethod
+    def _decrypt_value(fernet, encrypted_data):
+        if not encrypted_data or not isinstance(encrypted_data, str):
             return encrypted_data
-        
         try:
-            # Base64 decode et
-            encrypted_bytes = base64.b64decode(encrypted_data.encode('utf-8'))
-            
-            fernet = self._get_fernet()
-            decrypted_data = fernet.decrypt(encrypted_bytes)
-            
-            # Bytes'ı string'e çevir
-            return decrypted_data.decode('utf-8')
-        
-        except Exception as e:
-            print(f"Decryption error: {e}")
+            if encrypted_data.startswith(TOKEN_PREFIX):
+                token = encrypted_data.encode('ascii')
+            elif encrypted_data.startswith(LEGACY_PREFIX):
+                token = base64.b64decode(encrypted_data.encode('ascii'))
+            else:
+                # Şifrelenmemiş değer (eski kayıt veya şifreleme kapalı)
+                return encrypted_data
+            return fernet.decrypt(token).decode('utf-8')
+        except (InvalidToken, binascii.Error, UnicodeDecodeError) as e:
+            logger.error(f"Şifre çözme hatası: {e.__class__.__name__} {str(e)}")
             return encrypted_data
     
+    def encrypt(self, data):
+        """Veriyi şifrele"""
+        return self._encrypt_value(self._get_fernet(), data)
+    
+    def decrypt(self, encrypted_data):
+        """Şifrelenmiş veriyi çöz (yeni ve eski çift base64 biçimini okur)"""
+        return self._decrypt_value(self._get_fernet(), encrypted_data)
+    
+    def encrypt_many(self, values, workers=None):
+        """Değer listesini tek Fernet nesnesiyle şifreler, sırayı korur"""
+        return self._map(self._encrypt_value, values, workers)
+    
+    def decrypt_many(self, values, workers=None):
+        """Şifreli değer listesini çözer, sırayı korur"""
+        return self._map(self._decrypt_value, values, workers)
+    
+    def _map(self, func, values, workers):
+        """Listeyi parçalara bölüp gerekirse thread pool'da işler
+
+        cryptography AES/HMAC işlemlerinde GIL'i bıraktığından büyük
+        listelerde thread'ler gerçek paralellik sağlar.
+        """
+        values = list(values)
+        fernet = self._get_fernet()
+        
+        if workers is None:
+            workers = getattr(settings, 'ENCRYPTION_WORKERS', None) or min(4, os.cpu_count() or 1)
+        if workers <= 1 or len(values) < PARALLEL_THRESHOLD:
+            return [func(fernet, value) for value in values]
+        
+        chunks = [
+            values[i:i + PARALLEL_CHUNK_SIZE] for i in range(0, len(values), PARALLEL_CHUNK_SIZE)
+        ]
+        
+        def _process(chunk):
+            return [func(fernet, value) for value in chunk]
+        
+        results = []
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for chunk_result in executor.map(_process, chunks):
+                results.extend(chunk_result)
+        return results
+    
+    def is_encrypted(self, data):
+        """Değer bu yönetici tarafından şifrelenmiş görünüyor mu"""
+        return isinstance(data, str) and (
+            data.startswith(TOKEN_PREFIX) or data.startswith(LEGACY_PREFIX)
+        )
+    
+    def needs_rotation(self, data):
+        """Şifreli değer birincil anahtarla yazılmamışsa (veya eski biçimdeyse) True"""
+        if not self.is_encrypted(data):
+            return False
+        if data.startswith(LEGACY_PREFIX):
+            return True
+        self._get_fernet()
+        try:
+            # Yalnızca HMAC doğrulanır, içerik çözülmez
+            self._primary_fernet.extract_timestamp(data.encode('ascii'))
+            return False
+        except InvalidToken:
+            return True
+    
+    def rotate(self, data):
+        """Değeri birincil anahtarla yeniden şifreler
+
+        Birincil anahtarla yazılmış veya şifrelenmemiş değerler aynen döner;
+        hiçbir anahtarla çözülemeyen değer loglanır ve değiştirilmez.
+        """
+        if not self.needs_rotation(data):
+            return data
+        fernet = self._get_fernet()
+        try:
+            if data.startswith(LEGACY_PREFIX):
+                # Eski çift base64 biçimi token biçimine çevrilir
+                plain = fernet.decrypt(base64.b64decode(data.encode('ascii')))
+                return fernet.encrypt(plain).decode('ascii')
+            if isinstance(fernet, MultiFernet):
+                # Orijinal zaman damgası korunur
+                return fernet.rotate(data.encode('ascii')).decode('ascii')
+            logger.error("Anahtar rotasyonu hatası: değer birincil anahtarla çözülemedi")
+            return data
+        except (InvalidToken, ValueError):
+            logger.error("Anahtar rotasyonu hatası: değer hiçbir anahtarla çözülemedi")
+            return data
+    
+    def rotate_many(self, values):
+        """Değer listesini birincil anahtara taşır, sırayı korur"""
+        return [self.rotate(value) for value in values]
+    
     def encrypt_field(self, field_value):
         """Model field'ı için şifreleme"""
         return self.encrypt(field_value)
@@ -123,8 +249,8 @@ class FieldEncryption:
 class SensitiveDataEncryption:
     """Hassas veri şifreleme sınıfı"""
     
-    def __init__(self):
-        self.encryption_manager = EncryptionManager()
+    def __init__(self, encryption_manager=None):
+        self.encryption_manager = encryption_manager or EncryptionManager()
     
     def encrypt_tc_no(self, tc_no):
         """TC kimlik numarası şifreleme"""
@@ -177,7 +303,7 @@ class SensitiveDataEncryption:
 
 # Global encryption manager instance
 encryption_manager = EncryptionManager()
-sensitive_encryption = SensitiveDataEncryption()
+sensitive_encryption = SensitiveDataEncryption(encryption_manager)
 
 
 def encrypt_data(data):
@@ -190,6 +316,21 @@ def decrypt_data(encrypted_data):
     return encryption_manager.decrypt(encrypted_data)
 
 
+def encrypt_many(values, workers=None):
+    """Toplu şifreleme helper function"""
+    return encryption_manager.encrypt_many(values, workers=workers)
+
+
+def decrypt_many(values, workers=None):
+    """Toplu şifre çözme helper function"""
+    return encryption_manager.decrypt_many(values, workers=workers)
+
+
+def is_encrypted(data):
+    """Değerin şifreli olup olmadığını kontrol eden helper"""
+    return encryption_manager.is_encrypted(data)
+
+
 def encrypt_tc_no(tc_no):
     """TC kimlik numarası şifreleme helper"""
     return sensitive_encryption.encrypt_tc_no(tc_no)
@@ -0,0 +1,214 @@
+"""
+Arka plan dışa aktarma kuyruğu
+5651 Log Sistemi - Büyük dışa aktarmaların istek dışında çalıştırılması
+
+Dışa aktarmalar gunicorn sync worker'larını (timeout 30 sn) captive portal
+trafiğinden almasın diye büyük istekler ExportJob kaydı olarak sıraya alınır:
+
+- Kuyruk veritabanıdır; ayrı bir broker gerekmez. run_export_worker komutu
+  bekleyen işi koşullu UPDATE ile sahiplenir, birden fazla worker güvenle
+  çalışabilir.
+- Firma başına aynı anda en fazla EXPORT_MAX_CONCURRENT_PER_COMPANY iş
+  çalışır, en fazla EXPORT_MAX_QUEUED_PER_COMPANY iş bekler.
+- Worker ilerlemeyi her parçada yazar; EXPORT_JOB_STALE_SECONDS boyunca
+  ilerleme yazmayan (ölmüş worker) iş yeniden sıraya alınır.
+- Dosyalar EXPORT_ROOT altında tutulur, EXPORT_JOB_RETENTION_HOURS sonra
+  cron ile silinir.
+"""
+
+import os
+import socket
+import tempfile
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.utils import timezone
+from .models import Company, ExportJob, LogKayit
+from .blind_index import tc_no_index, ip_address_index, mac_address_index
+from .exports import EXPORT_FORMATS, write_export
+import logging
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATUSES = (ExportJob.STATUS_PENDING, ExportJob.STATUS_RUNNING)
+
+
+class ExportQueueFull(Exception):
+    """Firmanın bekleyen/çalışan iş sınırı dolu"""
+
+
+def _max_running():
+    return getattr(settings, 'EXPORT_MAX_CONCURRENT_PER_COMPANY', 1)
+
+
+def _max_queued():
+    return getattr(settings, 'EXPORT_MAX_QUEUED_PER_COMPANY', 5)
+
+
+def stored_filters(params):
+    """Panel filtrelerini saklanacak biçime çevirir
+
+    TC/IP/MAC açık değer olarak veritabanına yazılmaz, kör indeksi saklanır.
+    Geçersiz değerin indeksi boştur ve boş olarak saklanır; apply_filters bunu
+    panelde olduğu gibi "eşleşme yok" olarak uygular.
+    """
+    params = dict(params)
+    for field, index_func in (
+        ('tc_no', tc_no_index), ('ip_adresi', ip_address_index), ('mac_adresi', mac_address_index)
+    ):
+        if params.get(field):
+            params[f'{field}_bidx'] = index_func(params.pop(field))
+    return params
+
+
+def job_queryset(job):
+    return LogKayit.objects.filter(company_id=job.company_id).apply_filters(job.filters)
+
+
+def enqueue_export(company, user, export_format, params):
+    """Dışa aktarma işini sıraya alır; sınır doluysa ExportQueueFull"""
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"Bilinmeyen biçim: {export_format}")
+
+    with transaction.atomic():
+        # Aynı firma için eşzamanlı istekler sıraya girer (PostgreSQL satır kilidi)
+        Company.objects.select_for_update().filter(pk=company.pk).first()
+        active = ExportJob.objects.filter(company=company, status__in=ACTIVE_STATUSES).count()
+        if active >= _max_queued():
+            raise ExportQueueFull(company.pk)
+        return ExportJob.objects.create(
+            company=company,
+            requested_by=user if user and user.is_authenticated else None,
+            export_format=export_format,
+            filters=stored_filters(params),
+        )
+
+
+def requeue_stale_jobs():
+    """İlerleme yazmayı bırakmış çalışan işleri yeniden sıraya alır"""
+    cutoff = timezone.now() - timedelta(seconds=getattr(settings, 'EXPORT_JOB_STALE_SECONDS', 600))
+    count = ExportJob.objects.filter(status=ExportJob.STATUS_RUNNING, updated_at__lt=cutoff).update(
+        status=ExportJob.STATUS_PENDING, worker='', processed_rows=0, progress=0, updated_at=timezone.now()
+    )
+    if count:
+        logger.warning(f"Takılan {count} dışa aktarma işi yeniden sıraya alındı")
+    return count
+
+
+def claim_next_job(worker_name):
+    """Firma sınırını aşmayan en eski bekleyen işi sahiplenir
+
+    Sahiplenme koşullu UPDATE (status='pending') ile yapılır; aynı işi iki
+    worker alamaz. Firma satırı kilitlenerek çalışan iş sayısı kontrol edilir.
+    """
+    full_companies = set()
+    pending = ExportJob.objects.filter(status=ExportJob.STATUS_PENDING).order_by('created_at')
+    for job_id, company_id in pending.values_list('id', 'company_id')[:100]:
+        if company_id in full_companies:
+            continue
+        with transaction.atomic():
+            Company.objects.select_for_update().filter(pk=company_id).first()
+            running = ExportJob.objects.filter(company_id=company_id, status=ExportJob.STATUS_RUNNING).count()
+            if running >= _max_running():
+                full_companies.add(company_id)
+                continue
+            now = timezone.now()
+            claimed = ExportJob.objects.filter(id=job_id, status=ExportJob.STATUS_PENDING).update(
+                status=ExportJob.STATUS_RUNNING, worker=worker_name, started_at=now, updated_at=now
+            )
+        if claimed:
+            return ExportJob.objects.select_related('company').get(id=job_id)
+    return None
+
+
+def run_job(job):
+    """İşi çalıştırır, dosyayı EXPORT_ROOT altına kaydeder
+
+    Sonuç yalnızca iş hâlâ bu worker'a aitse yazılır; takıldığı için yeniden
+    sıraya alınmış bir işin eski çalıştırması sonucu ezmez.
+    """
+    owned = ExportJob.objects.filter(pk=job.pk, status=ExportJob.STATUS_RUNNING, worker=job.worker)
+    queryset = job_queryset(job)
+    passes = EXPORT_FORMATS[job.export_format][2]
+    total = queryset.count() * passes
+    owned.update(total_rows=total, updated_at=timezone.now())
+
+    def progress(count):
+        percent = min(99, count * 100 // total) if total else 99
+        owned.update(processed_rows=count, progress=percent, updated_at=timezone.now())
+
+    try:
+        with tempfile.TemporaryFile() as output:
+            error = write_export(queryset, job.export_format, output, progress)
+            if error:
+                raise RuntimeError(error)
+            output.seek(0)
+            extension = EXPORT_FORMATS[job.export_format][1]
+            name = job.file.field.generate_filename(
+                job, f'loglar_{job.company.slug}_{job.pk}_{timezone.now():%Y%m%d_%H%M%S}.{extension}'
+            )
+            name = job.file.storage.save(name, File(output))
+
+        finished = owned.update(
+            status=ExportJob.STATUS_DONE, file=name, processed_rows=total, progress=100,
+            finished_at=timezone.now(), updated_at=timezone.now(),
+        )
+        if not finished:
+            job.file.storage.delete(name)
+            logger.warning(f"Dışa aktarma işi {job.pk} başka worker'a geçmiş, sonuç atıldı")
+            return False
+        return True
+    except KeyboardInterrupt:
+        # Worker durduruluyor: iş baştan çalışmak üzere sıraya döner
+        owned.update(status=ExportJob.STATUS_PENDING, worker='', processed_rows=0, progress=0)
+        raise
+    except Exception as e:
+        logger.error(f"Dışa aktarma işi hatası (#{job.pk}): {str(e)}")
+        owned.update(
+            status=ExportJob.STATUS_FAILED, error=str(e), finished_at=timezone.now(), updated_at=timezone.now()
+        )
+        return False
+
+
+def run_worker(poll_interval=None, once=False, max_jobs=None, stdout=None):
+    """Kuyruktaki işleri sırayla çalıştırır; once=True ise kuyruk boşalınca döner"""
+    if poll_interval is None:
+        poll_interval = getattr(settings, 'EXPORT_WORKER_POLL_SECONDS', 2)
+    worker_name = f'{socket.gethostname()}:{os.getpid()}'
+    done = 0
+
+    while max_jobs is None or done < max_jobs:
+        requeue_stale_jobs()
+        job = claim_next_job(worker_name)
+        if job is None:
+            if once:
+                break
+            time.sleep(poll_interval)
+            continue
+
+        started = time.monotonic()
+        if stdout:
+            stdout.write(f'İş #{job.pk}: {job.company.name} ({job.export_format}) başladı')
+        ok = run_job(job)
+        done += 1
+        if stdout:
+            state = 'tamamlandı' if ok else 'başarısız'
+            stdout.write(f'İş #{job.pk}: {state} ({time.monotonic() - started:.1f} sn)')
+    return done
+
+
+def cleanup_export_jobs():
+    """Saklama süresi dolan biten işleri ve dosyalarını siler"""
+    cutoff = timezone.now() - timedelta(hours=getattr(settings, 'EXPORT_JOB_RETENTION_HOURS', 24))
+    expired = ExportJob.objects.filter(
+        status__in=(ExportJob.STATUS_DONE, ExportJob.STATUS_FAILED), finished_at__lt=cutoff
+    )
+    count = 0
+    for job in expired.iterator():
+        if job.file:
+            job.file.delete(save=False)
+        job.delete()
+        count += 1
+    return count
@@ -1,5 +1,23 @@
-import datetime
-from django.http import HttpResponse
+"""
+Log dışa aktarma
+5651 Log Sistemi - Excel, PDF, CSV ve ZIP çıktıları
+
+Kayıtlar values_list(...).iterator(chunk_size=EXPORT_CHUNK_SIZE) ile
+parça parça okunur, model nesnesi ve tüm sonuç kümesi bellekte tutulmaz:
+
+- Excel openpyxl write-only modunda, PDF sayfa sıkıştırmalı olarak geçici
+  dosyaya yazılır; yanıt dosyadan parça parça gönderilir.
+- CSV ve ZIP üretildikçe gönderilir (StreamingHttpResponse). ZIP arşivi
+  aranamayan bir akışa yazılır, her üye dosya eklendikçe bayt aktarılır.
+- write_export() aynı çıktıları dosyaya yazar; çok büyük tarih aralıkları
+  istek dışında (export_logs komutu) üretilir.
+"""
+
+import csv
+import io
+import tempfile
+import zipfile
+from django.conf import settings
 try:
     import openpyxl
 except ImportError:
@@ -8,50 +26,209 @@ try:
     from reportlab.pdfgen import canvas
 except ImportError:
     canvas = None
-import zipfile
-import io
 
-def export_as_excel(queryset):
-    if not openpyxl:
-        return None, "openpyxl yüklü değil!"
+EXPORT_HEADERS = ["TC No", "Ad Soyad", "IP", "MAC", "Giriş Zamanı", "SHA256 Hash"]
+EXPORT_FIELDS = ('tc_no', 'ad_soyad', 'ip_adresi', 'mac_adresi', 'giris_zamani', 'sha256_hash')
+
+# Biçim: (içerik türü, dosya uzantısı, sorgu üzerinden geçiş sayısı)
+EXPORT_FORMATS = {
+    'excel': ('application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', 'xlsx', 1),
+    'pdf': ('application/pdf', 'pdf', 1),
+    'csv': ('text/csv; charset=utf-8', 'csv', 1),
+    'zip': ('application/zip', 'zip', 2),
+}
+
+# Geçici dosyadan okuma/ZIP'e kopyalama parça boyutu
+COPY_BLOCK_SIZE = 64 * 1024
+
+
+def _chunk_size():
+    return getattr(settings, 'EXPORT_CHUNK_SIZE', 2000)
+
+
+def iter_export_rows(queryset, progress=None):
+    """Dışa aktarılacak satırları veritabanından parça parça üretir
+
+    progress: verilirse her parçadan sonra o ana kadar okunan satır sayısıyla çağrılır.
+    """
+    chunk_size = _chunk_size()
+    count = 0
+    for row in queryset.values_list(*EXPORT_FIELDS).iterator(chunk_size=chunk_size):
+        row = list(row)
+        row[4] = row[4].strftime('%Y-%m-%d %H:%M:%S')
+        yield row
+        count += 1
+        if progress and count % chunk_size == 0:
+            progress(count)
+    if progress and (count % chunk_size or not count):
+        progress(count)
+
+
+def write_excel(rows, fileobj):
+    """Satırları write-only çalışma kitabı olarak dosyaya yazar"""
     from openpyxl import Workbook
-    output = io.BytesIO()
-    wb = Workbook()
-    ws = wb.active
-    ws.append(["TC No", "Ad Soyad", "IP", "MAC", "Giriş Zamanı", "SHA256 Hash"])
-    for obj in queryset:
-        ws.append([obj.tc_no, obj.ad_soyad, obj.ip_adresi, obj.mac_adresi, obj.giris_zamani.strftime('%Y-%m-%d %H:%M:%S'), obj.sha256_hash])
-    wb.save(output)
-    output.seek(0)
-    return output, None
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet('Loglar')
+    ws.append(EXPORT_HEADERS)
+    for row in rows:
+        ws.append(row)
+    wb.save(fileobj)
 
-def export_as_pdf(queryset):
-    if not canvas:
-        return None, "reportlab yüklü değil!"
-    output = io.BytesIO()
-    p = canvas.Canvas(output)
+
+def write_pdf(rows, fileobj):
+    """Satırları PDF olarak dosyaya yazar"""
+    p = canvas.Canvas(fileobj, pageCompression=1)
     y = 800
     p.setFont("Helvetica", 10)
-    p.drawString(30, y, "TC No | Ad Soyad | IP | MAC | Giriş Zamanı | SHA256 Hash")
+    p.drawString(30, y, " | ".join(EXPORT_HEADERS))
     y -= 20
-    for obj in queryset:
-        line = f"{obj.tc_no} | {obj.ad_soyad} | {obj.ip_adresi} | {obj.mac_adresi} | {obj.giris_zamani.strftime('%Y-%m-%d %H:%M:%S')} | {obj.sha256_hash}"
-        p.drawString(30, y, line)
+    for row in rows:
+        p.drawString(30, y, " | ".join(str(value) for value in row))
         y -= 18
         if y < 40:
             p.showPage()
+            p.setFont("Helvetica", 10)
             y = 800
     p.save()
+
+
+def _to_tempfile(writer, queryset, progress=None):
+    output = tempfile.TemporaryFile()
+    writer(iter_export_rows(queryset, progress), output)
     output.seek(0)
-    return output, None
+    return output
+
+
+def export_as_excel(queryset, progress=None):
+    """Excel çıktısını geçici dosyaya yazar; (dosya, hata) döndürür"""
+    if not openpyxl:
+        return None, "openpyxl yüklü değil!"
+    return _to_tempfile(write_excel, queryset, progress), None
+
+
+def export_as_pdf(queryset, progress=None):
+    """PDF çıktısını geçici dosyaya yazar; (dosya, hata) döndürür"""
+    if not canvas:
+        return None, "reportlab yüklü değil!"
+    return _to_tempfile(write_pdf, queryset, progress), None
+
+
+class _Echo:
+    """csv.writer için yazılanı geri döndüren sahte dosya"""
+
+    def write(self, value):
+        return value
+
+
+def iter_csv(queryset, progress=None):
+    """CSV içeriğini parça parça üretir (Excel için UTF-8 BOM ile)"""
+    writer = csv.writer(_Echo())
+    chunk_size = _chunk_size()
+    lines = ['\ufeff' + writer.writerow(EXPORT_HEADERS)]
+    for row in iter_export_rows(queryset, progress):
+        lines.append(writer.writerow(row))
+        if len(lines) >= chunk_size:
+            yield ''.join(lines).encode('utf-8')
+            lines = []
+    if lines:
+        yield ''.join(lines).encode('utf-8')
+
+
+class _ZipStream(io.RawIOBase):
+    """ZipFile'ın yazdığı baytları toplayan, aranamayan akış
+
+    ZipFile aranamayan akışta yerel başlıklardan sonra veri tanımlayıcı
+    yazar; böylece arşiv üretilirken baştan sona gönderilebilir.
+    """
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def iter_zip(queryset, password=None, progress=None):
+    """Excel ve PDF'i içeren ZIP arşivini parça parça üretir
+
+    Üyeler sırayla geçici dosyada oluşturulur ve arşive kopyalanırken
+    gönderilir. Şifreli zip için ek kütüphane gerekir (ör: pyzipper);
+    password şimdilik kullanılmaz.
+    """
+    members = []
+    if openpyxl:
+        members.append(('loglar.xlsx', write_excel))
+    if canvas:
+        members.append(('loglar.pdf', write_pdf))
+
+    stream = _ZipStream()
+    counts = {'done': 0, 'member': 0}
+
+    def member_progress(count):
+        counts['member'] = count
+        if progress:
+            progress(counts['done'] + count)
+
+    with zipfile.ZipFile(stream, 'w', zipfile.ZIP_DEFLATED, allowZip64=True) as zip_file:
+        for name, writer in members:
+            output = _to_tempfile(writer, queryset, member_progress)
+            try:
+                with zip_file.open(name, 'w', force_zip64=True) as entry:
+                    for block in iter(lambda: output.read(COPY_BLOCK_SIZE), b''):
+                        entry.write(block)
+                        data = stream.drain()
+                        if data:
+                            yield data
+            finally:
+                output.close()
+            counts['done'] += counts['member']
+    yield stream.drain()
+
 
 def export_as_zip(queryset, password=None):
-    excel_output, _ = export_as_excel(queryset)
-    pdf_output, _ = export_as_pdf(queryset)
-    zip_buffer = io.BytesIO()
-    with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-        zip_file.writestr('loglar.xlsx', excel_output.getvalue())
-        zip_file.writestr('loglar.pdf', pdf_output.getvalue())
-    # Şifreli zip için ek kütüphane gerekebilir (ör: pyzipper), burada temel zip örneği var.
-    zip_buffer.seek(0)
-    return zip_buffer 
\ No newline at end of file
+    """ZIP çıktısını geçici dosyaya yazar; (dosya, hata) döndürür"""
+    output = tempfile.TemporaryFile()
+    for data in iter_zip(queryset, password):
+        output.write(data)
+    output.seek(0)
+    return output, None
+
+
+def write_export(queryset, export_format, fileobj, progress=None):
+    """Seçilen biçimdeki çıktıyı açık dosyaya yazar (istek dışı dışa aktarma)
+
+    progress(işlenen satır) ZIP için her iki üyenin satırlarını toplar;
+    yüzde için toplam satır sayısı EXPORT_FORMATS geçiş sayısıyla çarpılmalıdır.
+    Dönüş: hata mesajı veya None.
+    """
+    if export_format == 'excel':
+        if not openpyxl:
+            return "openpyxl yüklü değil!"
+        write_excel(iter_export_rows(queryset, progress), fileobj)
+    elif export_format == 'pdf':
+        if not canvas:
+            return "reportlab yüklü değil!"
+        write_pdf(iter_export_rows(queryset, progress), fileobj)
+    elif export_format == 'csv':
+        for data in iter_csv(queryset, progress):
+            fileobj.write(data)
+    elif export_format == 'zip':
+        for data in iter_zip(queryset, progress=progress):
+            fileobj.write(data)
+    else:
+        return f"Bilinmeyen biçim: {export_format}"
+    return None
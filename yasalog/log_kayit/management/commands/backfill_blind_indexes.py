@@ -0,0 +1,111 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+from log_kayit.models import Company, LogKayit
+from log_kayit.encryption import decrypt_many, is_encrypted
+from log_kayit.blind_index import tc_no_index, ip_address_index, mac_address_index
+
+INDEXED_FIELDS = (
+    ('tc_no', 'tc_no_bidx', tc_no_index),
+    ('ip_adresi', 'ip_adresi_bidx', ip_address_index),
+    ('mac_adresi', 'mac_adresi_bidx', mac_address_index),
+)
+
+
+class Command(BaseCommand):
+    help = 'Mevcut log kayıtları için TC/IP/MAC kör indekslerini doldurur'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Toplu işlem boyutu (default: 1000)',
+        )
+        parser.add_argument(
+            '--company',
+            help='Sadece bu firma (slug) için çalıştır',
+        )
+        parser.add_argument(
+            '--rebuild',
+            action='store_true',
+            help='Dolu indeksleri de yeniden hesapla (BLIND_INDEX_KEY değiştiyse)',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Sadece say, değişiklik yapma',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = max(1, options['batch_size'])
+        dry_run = options['dry_run']
+
+        logs = LogKayit.objects.all()
+        if options['company']:
+            try:
+                company = Company.objects.get(slug=options['company'])
+            except Company.DoesNotExist:
+                raise CommandError(f"Firma bulunamadı: {options['company']}")
+            logs = logs.filter(company=company)
+
+        if not options['rebuild']:
+            # Yalnızca değeri olup indeksi boş olan kayıtlar
+            missing = Q()
+            for field, index_field, _ in INDEXED_FIELDS:
+                missing |= Q(**{index_field: ''}) & ~Q(**{field: ''})
+            logs = logs.filter(missing)
+
+        fields = ['id'] + [name for item in INDEXED_FIELDS for name in item[:2]]
+        logs = logs.order_by('id').only(*fields)
+
+        self.stdout.write('Kör indeks doldurma işlemi başlatılıyor...')
+        if dry_run:
+            self.stdout.write(self.style.WARNING('DRY RUN MODU - Hiçbir değişiklik yapılmayacak'))
+
+        started = time.monotonic()
+        processed = updated = failed = 0
+        last_id = 0
+
+        while True:
+            # Keyset sayfalama: OFFSET yerine son id'den devam edilir
+            batch = list(logs.filter(id__gt=last_id)[:batch_size])
+            if not batch:
+                break
+            last_id = batch[-1].id
+
+            changed = set()
+            for field, index_field, index_func in INDEXED_FIELDS:
+                # Alan başına tek decrypt_many çağrısı
+                plain_values = decrypt_many([getattr(log, field) for log in batch])
+                for log, value in zip(batch, plain_values):
+                    if not value:
+                        continue
+                    if is_encrypted(value):
+                        # Çözülemedi (yanlış anahtar); indeks yazılmaz
+                        failed += 1
+                        continue
+                    index = index_func(value)
+                    if getattr(log, index_field) != index:
+                        setattr(log, index_field, index)
+                        changed.add(log.id)
+            changed = [log for log in batch if log.id in changed]
+
+            if changed and not dry_run:
+                LogKayit.objects.bulk_update(changed, [item[1] for item in INDEXED_FIELDS])
+            updated += len(changed)
+            processed += len(batch)
+
+            elapsed = time.monotonic() - started
+            self.stdout.write(
+                f'İşlenen: {processed} (güncellenen {updated}, {processed / elapsed:,.0f} kayıt/sn)'
+            )
+
+        elapsed = time.monotonic() - started
+        rate = processed / elapsed if elapsed else 0
+        if failed:
+            self.stdout.write(self.style.WARNING(f'{failed} alan çözülemedi, ENCRYPTION_KEY kontrol edin'))
+        self.stdout.write(self.style.SUCCESS(
+            f'Tamamlandı: {processed} kayıt işlendi, {updated} kayıt güncellendi '
+            f'({elapsed:.1f} sn, {rate:,.0f} kayıt/sn)'
+        ))
@@ -0,0 +1,94 @@
+import base64
+import os
+import time
+from django.core.management.base import BaseCommand
+from log_kayit.encryption import EncryptionManager
+
+
+class Command(BaseCommand):
+    help = 'Tekil ve toplu (encrypt_many/decrypt_many) şifreleme hızını karşılaştırır'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--count',
+            type=int,
+            default=1000000,
+            help='Şifrelenecek değer sayısı (default: 1000000)',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=min(4, os.cpu_count() or 1),
+            help='Paralel toplu işlem için thread sayısı',
+        )
+
+    def handle(self, *args, **options):
+        count = max(1, options['count'])
+        workers = max(1, options['workers'])
+        manager = EncryptionManager()
+        fernet = manager._get_fernet()
+
+        # Gerçekçi veri: TC no, IP ve MAC karışımı
+        values = []
+        for i in range(count):
+            kind = i % 3
+            if kind == 0:
+                values.append(f'{10000000000 + i:011d}')
+            elif kind == 1:
+                values.append(f'10.{(i >> 16) & 255}.{(i >> 8) & 255}.{i & 255}')
+            else:
+                values.append(':'.join(f'{(i >> shift) & 255:02x}' for shift in (40, 32, 24, 16, 8, 0)))
+
+        self.stdout.write(f'{count:,} değer, {workers} thread\n')
+        self.stdout.write(f"{'Yöntem':<34} {'Şifreleme/sn':>14} {'Çözme/sn':>14}")
+        self.stdout.write('-' * 64)
+
+        # Eski yol: değer başına çağrı ve çift base64
+        started = time.perf_counter()
+        legacy = [base64.b64encode(fernet.encrypt(value.encode('utf-8'))).decode('utf-8') for value in values]
+        legacy_encrypt = time.perf_counter() - started
+        started = time.perf_counter()
+        for value in legacy:
+            fernet.decrypt(base64.b64decode(value.encode('utf-8'))).decode('utf-8')
+        legacy_decrypt = time.perf_counter() - started
+        self._row('Tekil (eski, çift base64)', count, legacy_encrypt, legacy_decrypt)
+
+        started = time.perf_counter()
+        tokens = manager.encrypt_many(values, workers=1)
+        batch_encrypt = time.perf_counter() - started
+        started = time.perf_counter()
+        decrypted = manager.decrypt_many(tokens, workers=1)
+        batch_decrypt = time.perf_counter() - started
+        self._row('encrypt_many / decrypt_many', count, batch_encrypt, batch_decrypt)
+
+        started = time.perf_counter()
+        tokens = manager.encrypt_many(values, workers=workers)
+        parallel_encrypt = time.perf_counter() - started
+        started = time.perf_counter()
+        parallel_decrypted = manager.decrypt_many(tokens, workers=workers)
+        parallel_decrypt = time.perf_counter() - started
+        self._row(f'encrypt_many ({workers} thread)', count, parallel_encrypt, parallel_decrypt)
+
+        # Eski biçim okunabilmeli
+        started = time.perf_counter()
+        legacy_decrypted = manager.decrypt_many(legacy, workers=workers)
+        legacy_batch_decrypt = time.perf_counter() - started
+        self.stdout.write(
+            f"{'decrypt_many (eski biçim)':<34} {'-':>14} {count / legacy_batch_decrypt:>14,.0f}"
+        )
+
+        if decrypted != values or parallel_decrypted != values or legacy_decrypted != values:
+            self.stdout.write(self.style.ERROR('Çözülen değerler orijinalle eşleşmiyor!'))
+            return
+
+        self.stdout.write('-' * 64)
+        self.stdout.write(self.style.SUCCESS(
+            f'Doğrulama başarılı. Hızlanma: şifreleme {legacy_encrypt / parallel_encrypt:.2f}x, '
+            f'çözme {legacy_decrypt / parallel_decrypt:.2f}x; '
+            f'ortalama boyut {sum(map(len, legacy)) / count:.0f} -> {sum(map(len, tokens)) / count:.0f} byte'
+        ))
+
+    def _row(self, label, count, encrypt_seconds, decrypt_seconds):
+        self.stdout.write(
+            f'{label:<34} {count / encrypt_seconds:>14,.0f} {count / decrypt_seconds:>14,.0f}'
+        )
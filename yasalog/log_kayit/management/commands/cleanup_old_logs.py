@@ -1,8 +1,10 @@
+from django.apps import apps
 from django.core.management.base import BaseCommand
 from django.utils import timezone
 from datetime import timedelta
 from log_kayit.models import LogKayit
-from django.db import transaction
+from log_kayit.partitions import drop_partitions_before, purge_before
+from log_kayit.rollups import prune_rollups
 import logging
 
 logger = logging.getLogger(__name__)
@@ -22,30 +24,43 @@ class Command(BaseCommand):
             default=730,  # 2 yıl = 730 gün
             help='Kaç günden eski kayıtların silineceği (varsayılan: 730 gün)',
         )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Bölüm dışında kalan kayıtlar için tek transaction\'da silinecek kayıt sayısı',
+        )
+        parser.add_argument(
+            '--pause',
+            type=float,
+            default=0,
+            help='Parçalar arasında beklenecek süre (saniye)',
+        )
 
     def handle(self, *args, **options):
         dry_run = options['dry_run']
         days = options['days']
-        
+
         # 2 yıl önceki tarihi hesapla
         cutoff_date = timezone.now() - timedelta(days=days)
-        
+
         # Eski kayıtları bul
         old_logs = LogKayit.objects.filter(
             giris_zamani__lt=cutoff_date
         )
-        
-        count = old_logs.count()
-        
-        if count == 0:
-            self.stdout.write(
-                self.style.SUCCESS(
-                    f'{days} günden eski log kaydı bulunamadı.'
-                )
-            )
-            return
-        
+
         if dry_run:
+            partitions = drop_partitions_before(cutoff_date, dry_run=True)
+            for table, name, rows in partitions:
+                self.stdout.write(f'Kaldırılacak bölüm: {name} (~{rows} kayıt)')
+            count = old_logs.count()
+            if count == 0:
+                self.stdout.write(
+                    self.style.SUCCESS(
+                        f'{days} günden eski log kaydı bulunamadı.'
+                    )
+                )
+                return
             self.stdout.write(
                 self.style.WARNING(
                     f'DRY RUN: {count} adet {days} günden eski log kaydı silinecek.'
@@ -58,24 +73,47 @@ class Command(BaseCommand):
                 f'En yeni kayıt tarihi: {old_logs.latest("giris_zamani").giris_zamani}'
             )
             return
-        
-        # Gerçek silme işlemi
+
+        # Gerçek silme işlemi: tam aylar bölüm olarak, kalanlar parça parça
         try:
-            with transaction.atomic():
-                deleted_count = old_logs.delete()[0]
-                
+            if apps.is_installed('timestamp_signing'):
+                # Log zincirinin silinecek öneki çapalanmadan kayıt silinmez
+                from timestamp_signing.ledger import anchor_expired_prefix
+                anchor_expired_prefix(cutoff_date)
+
+            result = purge_before(
+                cutoff_date,
+                batch_size=options['batch_size'],
+                pause=options['pause'],
+                stdout=self.stdout if options.get('verbosity', 1) > 1 else None,
+            )
+            # Dashboard özetleri de aynı saklama süresine uyar
+            prune_rollups(cutoff_date)
+
+            partition_rows = sum(rows for _, _, rows in result['partitions'])
+            deleted_count = result['deleted'] + partition_rows
+            if not deleted_count and not result['partitions']:
                 self.stdout.write(
                     self.style.SUCCESS(
-                        f'Başarıyla {deleted_count} adet eski log kaydı silindi.'
+                        f'{days} günden eski log kaydı bulunamadı.'
                     )
                 )
-                
-                # Log kaydı
-                logger.info(
-                    f'5651 kanunu gereği {deleted_count} adet eski log kaydı temizlendi. '
-                    f'Kesim tarihi: {cutoff_date}'
+                return
+
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f'Başarıyla {deleted_count} adet eski log kaydı silindi '
+                    f'({len(result["partitions"])} bölüm kaldırıldı).'
                 )
-                
+            )
+
+            # Log kaydı
+            logger.info(
+                f'5651 kanunu gereği {deleted_count} adet eski log kaydı temizlendi. '
+                f'Kesim tarihi: {cutoff_date}'
+            )
+            self.audit(cutoff_date, result, deleted_count)
+
         except Exception as e:
             self.stdout.write(
                 self.style.ERROR(
@@ -84,3 +122,23 @@ class Command(BaseCommand):
             )
             logger.error(f'Log temizleme hatası: {str(e)}')
             raise
+
+    def audit(self, cutoff_date, result, deleted_count):
+        """Toplu silme sinyal tetiklemez; kayıt başına yerine tek denetim kaydı yazılır"""
+        if not apps.is_installed('audit_logging'):
+            return
+        from audit_logging.signals import create_audit_log
+        create_audit_log(
+            user=None,  # Sistem tarafından silindi
+            company=None,
+            action='DELETE',
+            resource_type='LogKayit',
+            resource_name='Saklama süresi',
+            description=f'Saklama süresi dolan {deleted_count} log kaydı silindi',
+            details={
+                'cutoff': cutoff_date.isoformat(),
+                'deleted': deleted_count,
+                'partitions': [name for _, name, _ in result['partitions']],
+            },
+            severity='HIGH'
+        )
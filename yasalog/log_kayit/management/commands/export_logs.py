@@ -0,0 +1,75 @@
+import os
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from log_kayit.models import Company, LogKayit
+from log_kayit.exports import EXPORT_FORMATS, write_export
+
+
+class Command(BaseCommand):
+    help = (
+        'Firma loglarını istek dışında dosyaya aktarır (çok büyük tarih aralıkları için); '
+        'çıktı EXPORT_ROOT altına yazılır'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--company', required=True, help='Firma slug')
+        parser.add_argument(
+            '--format',
+            choices=sorted(EXPORT_FORMATS),
+            default='zip',
+            help='Çıktı biçimi (default: zip)',
+        )
+        parser.add_argument('--start', help='Başlangıç tarihi (YYYY-MM-DD)')
+        parser.add_argument('--end', help='Bitiş tarihi (YYYY-MM-DD)')
+        parser.add_argument('--output', help='Çıktı dosyası yolu')
+
+    def handle(self, *args, **options):
+        try:
+            company = Company.objects.get(slug=options['company'])
+        except Company.DoesNotExist:
+            raise CommandError(f"Firma bulunamadı: {options['company']}")
+
+        logs = LogKayit.objects.filter(company=company)
+        dates = {}
+        for option in ('start', 'end'):
+            if options[option]:
+                try:
+                    dates[option] = parse_date(options[option])
+                except ValueError:
+                    dates[option] = None
+                if dates[option] is None:
+                    raise CommandError(f"Geçersiz tarih: {options[option]}")
+        logs = logs.in_date_range(dates.get('start'), dates.get('end'))
+
+        export_format = options['format']
+        extension = EXPORT_FORMATS[export_format][1]
+        path = options['output'] or os.path.join(
+            getattr(settings, 'EXPORT_ROOT', settings.BASE_DIR / 'exports'),
+            f'loglar_{company.slug}_{timezone.now():%Y%m%d_%H%M%S}.{extension}'
+        )
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+        started = time.monotonic()
+        self.stdout.write(f'Dışa aktarma başlıyor: {company.name} ({export_format}) -> {path}')
+
+        def progress(count):
+            self.stdout.write(f'  {count} satır')
+
+        # Yarım dosya indirilmesin diye geçici adla yazılır
+        partial = f'{path}.part'
+        try:
+            with open(partial, 'wb') as output:
+                error = write_export(logs, export_format, output, progress)
+            if error:
+                raise CommandError(error)
+            os.replace(partial, path)
+        finally:
+            if os.path.exists(partial):
+                os.remove(partial)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Tamamlandı: {path} ({os.path.getsize(path):,} bayt, {time.monotonic() - started:.1f} sn)'
+        ))
@@ -0,0 +1,62 @@
+from django.core.management.base import BaseCommand, CommandError
+from log_kayit.partitions import (
+    supports_partitioning, partitioned_models, is_partitioned, list_partitions,
+    ensure_partitions, convert_to_partitioned,
+)
+
+
+class Command(BaseCommand):
+    help = 'Log ve zaman damgası tablolarının aylık bölümlerini yönetir (PostgreSQL)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--convert',
+            action='store_true',
+            help='Tabloları aylık bölümlü tabloya dönüştür (bakım penceresinde, migrate sonrası)',
+        )
+        parser.add_argument(
+            '--ensure',
+            action='store_true',
+            help='Önümüzdeki aylar için eksik bölümleri oluştur',
+        )
+        parser.add_argument(
+            '--months-ahead',
+            type=int,
+            help='Önceden oluşturulacak ay sayısı (varsayılan: PARTITION_MONTHS_AHEAD)',
+        )
+
+    def handle(self, *args, **options):
+        if not supports_partitioning():
+            if options['convert'] or options['ensure']:
+                raise CommandError(
+                    'Bölümleme yalnızca PostgreSQL üzerinde desteklenir; '
+                    'diğer veritabanlarında cleanup_old_logs parça parça siler.'
+                )
+            self.stdout.write('Veritabanı bölümlemeyi desteklemiyor (yalnızca PostgreSQL).')
+            return
+
+        months_ahead = options['months_ahead']
+        if options['convert']:
+            for model, column in partitioned_models():
+                if convert_to_partitioned(model, column, months_ahead=months_ahead, stdout=self.stdout):
+                    self.stdout.write(self.style.SUCCESS(f'{model._meta.db_table} bölümlü tabloya dönüştürüldü'))
+                else:
+                    self.stdout.write(f'{model._meta.db_table} zaten bölümlü')
+
+        if options['ensure']:
+            created = ensure_partitions(months_ahead=months_ahead)
+            self.stdout.write(self.style.SUCCESS(f'{len(created)} bölüm oluşturuldu'))
+
+        for model, column in partitioned_models():
+            table = model._meta.db_table
+            if not is_partitioned(table):
+                self.stdout.write(f'{table}: bölümlü değil')
+                continue
+            partitions = list_partitions(table)
+            if partitions:
+                self.stdout.write(
+                    f'{table} ({column}): {len(partitions)} bölüm, '
+                    f'{partitions[0][0]:%Y-%m} - {partitions[-1][0]:%Y-%m}'
+                )
+            else:
+                self.stdout.write(f'{table} ({column}): aylık bölüm yok')
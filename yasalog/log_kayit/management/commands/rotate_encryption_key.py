@@ -0,0 +1,234 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+from log_kayit.models import Company, LogKayit, JobCheckpoint
+from log_kayit.encryption import encryption_manager
+
+ROTATED_FIELDS = ('tc_no', 'ip_adresi', 'mac_adresi')
+
+
+def rotation_job_name(manager=None):
+    """Kontrol noktası iş adı; birincil anahtar değişince yeni iş başlar"""
+    manager = manager or encryption_manager
+    return f'rotate_key_{manager.key_fingerprint()}'
+
+
+class Command(BaseCommand):
+    help = (
+        'Log kayıtlarını ENCRYPTION_KEYS içindeki birincil (ilk) anahtarla yeniden şifreler; '
+        'firma bazında ilerler, hız sınırlıdır ve kesintiden sonra devam eder'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Toplu işlem boyutu (default: 500)',
+        )
+        parser.add_argument(
+            '--rate',
+            type=int,
+            default=None,
+            help='Hedef en fazla kayıt/sn (default: ENCRYPTION_ROTATION_RATE, 0 = sınırsız)',
+        )
+        parser.add_argument(
+            '--company',
+            help='Sadece bu firma (slug) için çalıştır',
+        )
+        parser.add_argument(
+            '--restart',
+            action='store_true',
+            help='Kontrol noktalarını sıfırla ve baştan başla',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Sadece say, değişiklik yapma',
+        )
+        parser.add_argument(
+            '--status',
+            action='store_true',
+            help='Firma bazında rotasyon durumunu göster ve çık',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = max(1, options['batch_size'])
+        rate = options['rate']
+        if rate is None:
+            rate = getattr(settings, 'ENCRYPTION_ROTATION_RATE', 2000)
+        dry_run = options['dry_run']
+
+        keys = encryption_manager._get_encryption_keys()
+        job = rotation_job_name()
+
+        companies = Company.objects.order_by('id')
+        if options['company']:
+            companies = companies.filter(slug=options['company'])
+            if not companies.exists():
+                raise CommandError(f"Firma bulunamadı: {options['company']}")
+
+        if options['status']:
+            self._print_status(job, companies)
+            return
+
+        if len(keys) < 2:
+            self.stdout.write(self.style.WARNING(
+                'Tek anahtar tanımlı; yalnızca eski biçimli kayıtlar dönüştürülecek. '
+                'Rotasyon için yeni anahtarı ENCRYPTION_KEYS listesinin başına ekleyin.'
+            ))
+
+        self.stdout.write(
+            f'Anahtar rotasyonu başlatılıyor: birincil anahtar {encryption_manager.key_fingerprint()}, '
+            f'{len(keys)} anahtar, hız sınırı {f"{rate} kayıt/sn" if rate else "yok"}'
+        )
+        if dry_run:
+            self.stdout.write(self.style.WARNING('DRY RUN MODU - Hiçbir değişiklik yapılmayacak'))
+
+        total_processed = total_updated = 0
+        started = time.monotonic()
+        try:
+            for company in companies:
+                processed, updated = self._rotate_company(
+                    job, company, batch_size, rate, options['restart'], dry_run
+                )
+                total_processed += processed
+                total_updated += updated
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.WARNING(
+                'Durduruldu. Tekrar çalıştırınca firmalar kaldığı yerden devam eder.'
+            ))
+            return
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Rotasyon tamamlandı: {total_processed} kayıt işlendi, {total_updated} kayıt '
+            f'yeniden şifrelendi ({elapsed:.1f} sn).'
+        ))
+        if not dry_run and len(keys) > 1 and not options['company']:
+            self.stdout.write(
+                'Tüm firmalar tamamlandıysa (--status) eski anahtarlar ENCRYPTION_KEYS listesinden çıkarılabilir.'
+            )
+
+    def _rotate_company(self, job, company, batch_size, rate, restart, dry_run):
+        checkpoint = self._get_checkpoint(job, company, restart, dry_run)
+        if checkpoint.completed_at:
+            self.stdout.write(f'{company.name}: tamamlanmış, atlanıyor')
+            return 0, 0
+
+        rows_query = LogKayit.objects.filter(company=company).order_by('id').values_list(
+            'id', *ROTATED_FIELDS
+        )
+        started = time.monotonic()
+        processed = updated = 0
+
+        while True:
+            # Keyset sayfalama; her parça kısa bir transaction'da yazılır
+            rows = list(rows_query.filter(id__gt=checkpoint.last_id)[:batch_size])
+            if not rows:
+                break
+
+            changes = self._rotate_rows(rows)
+            changed_rows = len({row_id for _, row_id, _, _ in changes})
+            checkpoint.last_id = rows[-1][0]
+            checkpoint.processed += len(rows)
+            checkpoint.updated += changed_rows
+            if not dry_run:
+                with transaction.atomic():
+                    self._write_changes(changes)
+                    checkpoint.save(update_fields=['last_id', 'processed', 'updated', 'updated_at'])
+
+            processed += len(rows)
+            updated += changed_rows
+
+            # Hız sınırı: ingest yazmalarına veritabanında yer bırakılır
+            elapsed = time.monotonic() - started
+            if rate:
+                delay = processed / rate - elapsed
+                if delay > 0:
+                    time.sleep(delay)
+                    elapsed += delay
+
+            self.stdout.write(
+                f'{company.name}: ID {checkpoint.last_id} - işlenen {checkpoint.processed}, '
+                f'yeniden şifrelenen {checkpoint.updated}, {processed / elapsed:,.0f} kayıt/sn'
+            )
+
+        if not dry_run:
+            checkpoint.completed_at = timezone.now()
+            checkpoint.save(update_fields=['completed_at', 'updated_at'])
+        self.stdout.write(self.style.SUCCESS(
+            f'{company.name}: tamamlandı ({checkpoint.processed} kayıt, {checkpoint.updated} güncellendi)'
+        ))
+        return processed, updated
+
+    def _rotate_rows(self, rows):
+        """[(alan, id, eski değer, yeni değer), ...] döndürür"""
+        changes = []
+        for row in rows:
+            row_id = row[0]
+            for field, value in zip(ROTATED_FIELDS, row[1:]):
+                rotated = encryption_manager.rotate(value)
+                if rotated != value:
+                    changes.append((field, row_id, value, rotated))
+        return changes
+
+    def _write_changes(self, changes):
+        """Alan başına tek hazırlanmış UPDATE
+
+        Eski değer WHERE koşulunda olduğundan bu arada değişen satır ezilmez;
+        --restart ile yapılan doğrulama turunda tekrar ele alınır.
+        """
+        quote = connection.ops.quote_name
+        table = quote(LogKayit._meta.db_table)
+        with connection.cursor() as cursor:
+            for field in ROTATED_FIELDS:
+                params = [
+                    (new, row_id, old) for name, row_id, old, new in changes if name == field
+                ]
+                if params:
+                    cursor.executemany(
+                        f'UPDATE {table} SET {quote(field)} = %s '
+                        f'WHERE {quote("id")} = %s AND {quote(field)} = %s',
+                        params,
+                    )
+
+    def _get_checkpoint(self, job, company, restart, dry_run):
+        if dry_run:
+            # Dry run kontrol noktasını ilerletmez
+            return JobCheckpoint(job=job, company=company)
+
+        checkpoint, created = JobCheckpoint.objects.get_or_create(job=job, company=company)
+        if restart and not created:
+            checkpoint.last_id = checkpoint.processed = checkpoint.updated = 0
+            checkpoint.completed_at = None
+            checkpoint.save()
+        return checkpoint
+
+    def _print_status(self, job, companies):
+        checkpoints = {
+            checkpoint.company_id: checkpoint
+            for checkpoint in JobCheckpoint.objects.filter(job=job, company__in=companies)
+        }
+        self.stdout.write(f'Birincil anahtar: {encryption_manager.key_fingerprint()}')
+        pending = 0
+        for company in companies:
+            checkpoint = checkpoints.get(company.id)
+            if checkpoint is None:
+                state = 'başlamadı'
+            elif checkpoint.completed_at:
+                state = f'tamamlandı ({checkpoint.completed_at:%Y-%m-%d %H:%M})'
+            else:
+                state = f'devam ediyor (ID {checkpoint.last_id})'
+            if checkpoint is None or not checkpoint.completed_at:
+                pending += 1
+            processed = checkpoint.processed if checkpoint else 0
+            updated = checkpoint.updated if checkpoint else 0
+            self.stdout.write(f'{company.name}: {state} - işlenen {processed}, güncellenen {updated}')
+
+        if pending:
+            self.stdout.write(self.style.WARNING(f'{pending} firma bekliyor; eski anahtarları çıkarmayın.'))
+        else:
+            self.stdout.write(self.style.SUCCESS('Tüm firmalar birincil anahtara taşındı.'))
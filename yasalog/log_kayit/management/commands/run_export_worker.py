@@ -0,0 +1,46 @@
+import signal
+from django.core.management.base import BaseCommand
+from log_kayit.export_jobs import run_worker
+
+
+def _stop(signum, frame):
+    raise KeyboardInterrupt
+
+
+class Command(BaseCommand):
+    help = 'Sıradaki dışa aktarma işlerini çalıştırır (supervisor ile sürekli çalıştırılır)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Kuyruk boşalınca çık',
+        )
+        parser.add_argument(
+            '--max-jobs',
+            type=int,
+            default=None,
+            help='Bu kadar işten sonra çık (bellek sızıntılarına karşı yeniden başlatma için)',
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=None,
+            help='Kuyruk boşken bekleme süresi, sn (default: EXPORT_WORKER_POLL_SECONDS)',
+        )
+
+    def handle(self, *args, **options):
+        # supervisor stop: çalışan iş sıraya geri bırakılır
+        signal.signal(signal.SIGTERM, _stop)
+        self.stdout.write('Dışa aktarma worker başladı')
+        try:
+            done = run_worker(
+                poll_interval=options['poll_interval'],
+                once=options['once'],
+                max_jobs=options['max_jobs'],
+                stdout=self.stdout,
+            )
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.WARNING('Durduruldu; yarım kalan iş yeniden sıraya alındı.'))
+            return
+        self.stdout.write(self.style.SUCCESS(f'{done} iş çalıştırıldı'))
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+from log_kayit.rollups import update_rollups, rebuild_rollups, rollup_watermark
+
+
+class Command(BaseCommand):
+    help = 'Dashboard özet (rollup) tablolarını yeni log kayıtlarıyla günceller'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Toplu işlem boyutu (default: 5000)',
+        )
+        parser.add_argument(
+            '--rebuild',
+            action='store_true',
+            help='Özet tablolarını silip tüm kayıtlardan yeniden oluştur',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = max(1, options['batch_size'])
+
+        if options['rebuild']:
+            self.stdout.write(self.style.WARNING('Özet tabloları yeniden oluşturuluyor...'))
+            processed = rebuild_rollups(batch_size=batch_size, stdout=self.stdout)
+        else:
+            self.stdout.write(f'Özet güncelleme başlatılıyor (son ID: {rollup_watermark()})')
+            processed = update_rollups(batch_size=batch_size, stdout=self.stdout)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Tamamlandı: {processed} kayıt özetlendi, son ID {rollup_watermark()}'
+        ))
@@ -0,0 +1,40 @@
+# Generated by Django 4.2.30 on 2026-10-17 22:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('log_kayit', '0013_logkayit_cihaz_adi_logkayit_lokasyon_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='logkayit',
+            name='ip_adresi_bidx',
+            field=models.CharField(blank=True, default='', editable=False, max_length=32, verbose_name='IP Adresi İndeksi'),
+        ),
+        migrations.AddField(
+            model_name='logkayit',
+            name='mac_adresi_bidx',
+            field=models.CharField(blank=True, default='', editable=False, max_length=32, verbose_name='MAC Adresi İndeksi'),
+        ),
+        migrations.AddField(
+            model_name='logkayit',
+            name='tc_no_bidx',
+            field=models.CharField(blank=True, default='', editable=False, max_length=32, verbose_name='T.C. Kimlik No İndeksi'),
+        ),
+        migrations.AddIndex(
+            model_name='logkayit',
+            index=models.Index(fields=['tc_no_bidx', 'giris_zamani'], name='logkayit_tc_bidx_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='logkayit',
+            index=models.Index(fields=['ip_adresi_bidx', 'giris_zamani'], name='logkayit_ip_bidx_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='logkayit',
+            index=models.Index(fields=['company', 'mac_adresi_bidx', 'giris_zamani'], name='logkayit_mac_bidx_idx'),
+        ),
+    ]
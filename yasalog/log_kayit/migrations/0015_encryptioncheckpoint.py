@@ -0,0 +1,33 @@
+# Generated by Django 4.2.30 on 2026-10-17 22:56
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('log_kayit', '0014_logkayit_blind_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EncryptionCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('job', models.CharField(max_length=50, verbose_name='İş')),
+                ('last_id', models.BigIntegerField(default=0, verbose_name='Son İşlenen ID')),
+                ('processed', models.BigIntegerField(default=0, verbose_name='İşlenen Kayıt')),
+                ('updated', models.BigIntegerField(default=0, verbose_name='Güncellenen Kayıt')),
+                ('started_at', models.DateTimeField(auto_now_add=True, verbose_name='Başlangıç')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Son Güncelleme')),
+                ('completed_at', models.DateTimeField(blank=True, null=True, verbose_name='Tamamlanma')),
+                ('company', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='log_kayit.company', verbose_name='Firma')),
+            ],
+            options={
+                'verbose_name': 'Şifreleme Kontrol Noktası',
+                'verbose_name_plural': 'Şifreleme Kontrol Noktaları',
+                'unique_together': {('job', 'company')},
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 4.2.30 on 2026-10-17 23:04
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('log_kayit', '0015_encryptioncheckpoint'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='logkayit',
+            name='giris_zamani',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False, verbose_name='Giriş Zamanı'),
+        ),
+    ]
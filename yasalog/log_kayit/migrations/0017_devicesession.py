@@ -0,0 +1,56 @@
+# Generated by Django 4.2.30 on 2026-10-17 23:08
+
+from datetime import timedelta
+from django.db import migrations, models
+from django.utils import timezone
+import django.db.models.deletion
+
+
+def backfill_device_sessions(apps, schema_editor):
+    """Son 24 saatte giriş yapmış cihazlar hatırlanmaya devam etsin"""
+    LogKayit = apps.get_model('log_kayit', 'LogKayit')
+    DeviceSession = apps.get_model('log_kayit', 'DeviceSession')
+
+    latest = {}
+    recent_logs = LogKayit.objects.filter(
+        giris_zamani__gte=timezone.now() - timedelta(hours=24), is_suspicious=False
+    ).exclude(mac_adresi_bidx='').order_by('giris_zamani').values_list(
+        'id', 'company_id', 'mac_adresi_bidx', 'giris_zamani'
+    )
+    for log_id, company_id, fingerprint, giris_zamani in recent_logs.iterator():
+        latest[(company_id, fingerprint)] = (log_id, giris_zamani)
+
+    DeviceSession.objects.bulk_create([
+        DeviceSession(
+            company_id=company_id, device_fingerprint=fingerprint, log_id=log_id,
+            expires_at=giris_zamani + timedelta(hours=24),
+        )
+        for (company_id, fingerprint), (log_id, giris_zamani) in latest.items()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('log_kayit', '0016_logkayit_giris_zamani_default'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeviceSession',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('device_fingerprint', models.CharField(max_length=32, verbose_name='Cihaz Parmak İzi')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Oluşturulma')),
+                ('expires_at', models.DateTimeField(db_index=True, verbose_name='Geçerlilik Sonu')),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='device_sessions', to='log_kayit.company', verbose_name='Firma')),
+                ('log', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='log_kayit.logkayit', verbose_name='Son Giriş Kaydı')),
+            ],
+            options={
+                'verbose_name': 'Cihaz Oturumu',
+                'verbose_name_plural': 'Cihaz Oturumları',
+                'unique_together': {('company', 'device_fingerprint')},
+            },
+        ),
+        migrations.RunPython(backfill_device_sessions, migrations.RunPython.noop),
+    ]
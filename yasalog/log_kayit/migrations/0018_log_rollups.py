@@ -0,0 +1,68 @@
+# Generated by Django 4.2.30 on 2026-10-17 23:11
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('log_kayit', '0017_devicesession'),
+    ]
+
+    operations = [
+        migrations.RenameModel(
+            old_name='EncryptionCheckpoint',
+            new_name='JobCheckpoint',
+        ),
+        migrations.AlterModelOptions(
+            name='jobcheckpoint',
+            options={'verbose_name': 'İş Kontrol Noktası', 'verbose_name_plural': 'İş Kontrol Noktaları'},
+        ),
+        migrations.CreateModel(
+            name='LogKayitUserDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Tarih')),
+                ('ad_soyad', models.CharField(max_length=100, verbose_name='Ad Soyad')),
+                ('total', models.PositiveIntegerField(default=0, verbose_name='Toplam Giriş')),
+                ('suspicious', models.PositiveIntegerField(default=0, verbose_name='Şüpheli Giriş')),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='log_kayit.company', verbose_name='Firma')),
+            ],
+            options={
+                'verbose_name': 'Kullanıcı Günlük Log Özeti',
+                'verbose_name_plural': 'Kullanıcı Günlük Log Özetleri',
+                'unique_together': {('company', 'date', 'ad_soyad')},
+            },
+        ),
+        migrations.CreateModel(
+            name='LogKayitHourlyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hour', models.DateTimeField(verbose_name='Saat')),
+                ('total', models.PositiveIntegerField(default=0, verbose_name='Toplam Giriş')),
+                ('suspicious', models.PositiveIntegerField(default=0, verbose_name='Şüpheli Giriş')),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='log_kayit.company', verbose_name='Firma')),
+            ],
+            options={
+                'verbose_name': 'Saatlik Log Özeti',
+                'verbose_name_plural': 'Saatlik Log Özetleri',
+                'unique_together': {('company', 'hour')},
+            },
+        ),
+        migrations.CreateModel(
+            name='LogKayitDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Tarih')),
+                ('total', models.PositiveIntegerField(default=0, verbose_name='Toplam Giriş')),
+                ('suspicious', models.PositiveIntegerField(default=0, verbose_name='Şüpheli Giriş')),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='log_kayit.company', verbose_name='Firma')),
+            ],
+            options={
+                'verbose_name': 'Günlük Log Özeti',
+                'verbose_name_plural': 'Günlük Log Özetleri',
+                'unique_together': {('company', 'date')},
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-17 23:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('log_kayit', '0018_log_rollups'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='logkayit',
+            index=models.Index(fields=['company', 'giris_zamani', 'id'], name='logkayit_company_time_idx'),
+        ),
+    ]
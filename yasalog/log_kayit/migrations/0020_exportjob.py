@@ -0,0 +1,44 @@
+# Generated by Django 4.2.30 on 2026-10-17 23:24
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import log_kayit.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('log_kayit', '0019_logkayit_company_time_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExportJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('export_format', models.CharField(choices=[('excel', 'Excel'), ('pdf', 'PDF'), ('csv', 'CSV'), ('zip', 'ZIP')], max_length=10, verbose_name='Biçim')),
+                ('filters', models.JSONField(blank=True, default=dict, verbose_name='Filtreler')),
+                ('status', models.CharField(choices=[('pending', 'Sırada'), ('running', 'Çalışıyor'), ('done', 'Tamamlandı'), ('failed', 'Başarısız')], default='pending', max_length=10, verbose_name='Durum')),
+                ('total_rows', models.BigIntegerField(default=0, verbose_name='Toplam Satır')),
+                ('processed_rows', models.BigIntegerField(default=0, verbose_name='İşlenen Satır')),
+                ('progress', models.PositiveSmallIntegerField(default=0, verbose_name='İlerleme (%)')),
+                ('file', models.FileField(blank=True, storage=log_kayit.models.export_storage, upload_to='%Y/%m/', verbose_name='Dosya')),
+                ('error', models.TextField(blank=True, verbose_name='Hata')),
+                ('worker', models.CharField(blank=True, max_length=100, verbose_name='Worker')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Oluşturulma')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='Başlangıç')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Son Güncelleme')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Bitiş')),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='export_jobs', to='log_kayit.company', verbose_name='Firma')),
+                ('requested_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL, verbose_name='İsteyen')),
+            ],
+            options={
+                'verbose_name': 'Dışa Aktarma İşi',
+                'verbose_name_plural': 'Dışa Aktarma İşleri',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'created_at'], name='exportjob_status_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 4.2.30 on 2026-10-17 23:31
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('log_kayit', '0020_exportjob'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='devicesession',
+            name='log',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='log_kayit.logkayit', verbose_name='Son Giriş Kaydı'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-17 23:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('log_kayit', '0021_devicesession_log_no_constraint'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='logkayit',
+            index=models.Index(fields=['company', 'id'], name='logkayit_company_id_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.30 on 2026-10-18 10:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('log_kayit', '0022_logkayit_logkayit_company_id_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='jobcheckpoint',
+            name='gap_id',
+            field=models.BigIntegerField(default=0, verbose_name='Beklenen ID Boşluğu'),
+        ),
+        migrations.AddField(
+            model_name='jobcheckpoint',
+            name='gap_seen_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Boşluğun Görüldüğü Zaman'),
+        ),
+    ]
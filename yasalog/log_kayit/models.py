@@ -2,9 +2,15 @@ from django.db import models
 from django.contrib.auth.models import User
 from django.utils.translation import gettext_lazy as _
 from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_date
 from django.core.validators import RegexValidator
+from django.core.files.storage import FileSystemStorage
+import os
 import uuid
-from .encryption import encrypt_tc_no, decrypt_tc_no, encrypt_ip_address, decrypt_ip_address, encrypt_mac_address, decrypt_mac_address
+from datetime import datetime, time, timedelta
+from .encryption import encrypt_tc_no, decrypt_tc_no, encrypt_ip_address, decrypt_ip_address, encrypt_mac_address, decrypt_mac_address, is_encrypted
+from .blind_index import tc_no_index, ip_address_index, mac_address_index
 
 
 class Company(models.Model):
@@ -34,6 +40,88 @@ class Company(models.Model):
             self.slug = self.name.lower().replace(' ', '-').replace('ı', 'i').replace('ğ', 'g').replace('ü', 'u').replace('ş', 's').replace('ö', 'o').replace('ç', 'c')
         super().save(*args, **kwargs)
 
+        # Captive portal önbelleğindeki firma kaydı ve form ayarları geçersizleşir
+        from .portal_cache import invalidate_company
+        invalidate_company(self)
+
+    def delete(self, *args, **kwargs):
+        from .portal_cache import invalidate_company
+        invalidate_company(self)
+        return super().delete(*args, **kwargs)
+
+
+def _parse_day(value):
+    """Tarih veya YYYY-MM-DD metni; geçersiz değer filtre uygulanmadan atlanır"""
+    if not value or not isinstance(value, str):
+        return value or None
+    try:
+        return parse_date(value)
+    except ValueError:
+        return None
+
+
+def _local_day_start(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+class LogKayitQuerySet(models.QuerySet):
+    """Şifreli alanlarda kör indeks üzerinden tam eşleşme araması"""
+
+    def by_index(self, index_field, index):
+        """Boş indeks (ör. rakam içermeyen TC) hiçbir kayıtla eşleşmez
+
+        Boş kör indeks pasaportlu ve indeksi henüz doldurulmamış kayıtlarda
+        saklanır; filtreye girerse ilgisiz kişilerin kayıtları döner.
+        """
+        if not index:
+            return self.none()
+        return self.filter(**{index_field: index})
+
+    def by_tc_no(self, tc_no):
+        return self.by_index('tc_no_bidx', tc_no_index(tc_no))
+
+    def by_ip_adresi(self, ip_adresi):
+        return self.by_index('ip_adresi_bidx', ip_address_index(ip_adresi))
+
+    def by_mac_adresi(self, mac_adresi):
+        return self.by_index('mac_adresi_bidx', mac_address_index(mac_adresi))
+
+    # Panel filtreleri (bkz. views.dashboard.get_filter_params)
+    FILTER_FIELDS = ('tc_no', 'ip_adresi', 'mac_adresi', 'ad_soyad', 'date_start', 'date_end')
+
+    def apply_filters(self, params):
+        """Panel filtrelerini uygular; TC/IP/MAC açık değer veya *_bidx (kör indeks) olabilir"""
+        logs = self
+        if params.get('tc_no'):
+            logs = logs.by_tc_no(params['tc_no'])
+        if params.get('ip_adresi'):
+            logs = logs.by_ip_adresi(params['ip_adresi'])
+        if params.get('mac_adresi'):
+            logs = logs.by_mac_adresi(params['mac_adresi'])
+        for index_field in ('tc_no_bidx', 'ip_adresi_bidx', 'mac_adresi_bidx'):
+            # Saklanan boş indeks geçersiz bir arama değeridir; filtre atlanmaz
+            if index_field in params:
+                logs = logs.by_index(index_field, params[index_field])
+        if params.get('ad_soyad'):
+            logs = logs.filter(ad_soyad__icontains=params['ad_soyad'])
+        if params.get('date_start') or params.get('date_end'):
+            logs = logs.in_date_range(params.get('date_start'), params.get('date_end'))
+        return logs
+
+    def in_date_range(self, start=None, end=None):
+        """Yerel tarih aralığı (iki uç dahil, tarih veya YYYY-MM-DD)
+
+        giris_zamani__date yerine giris_zamani üzerinde aralık koşulu kurulur;
+        böylece indeks ve aylık bölümlerde (partition pruning) kullanılabilir.
+        """
+        logs = self
+        start, end = _parse_day(start), _parse_day(end)
+        if start:
+            logs = logs.filter(giris_zamani__gte=_local_day_start(start))
+        if end:
+            logs = logs.filter(giris_zamani__lt=_local_day_start(end + timedelta(days=1)))
+        return logs
+
 
 class LogKayit(models.Model):
     KIMLIK_TURU_CHOICES = [
@@ -60,15 +148,35 @@ class LogKayit(models.Model):
     lokasyon = models.CharField(_("Lokasyon"), max_length=200, blank=True, help_text=_("Fiziksel konum bilgisi"))
     cihaz_adi = models.CharField(_("Cihaz Adı"), max_length=100, blank=True, help_text=_("Erişim yapılan cihaz"))
     
-    giris_zamani = models.DateTimeField(_("Giriş Zamanı"), auto_now_add=True)
+    # Zaman damgası Python'da atanır; hash INSERT'ten önce hesaplanabilsin diye
+    # auto_now_add yerine default kullanılır (bkz. services/log_writer.py)
+    giris_zamani = models.DateTimeField(_("Giriş Zamanı"), default=timezone.now, editable=False)
     sha256_hash = models.CharField(_("SHA256 Hash"), max_length=64, blank=True)
     is_suspicious = models.BooleanField(_("Şüpheli"), default=False)
     pasaport_ulkesi = models.CharField(_("Pasaport Ülkesi"), max_length=50, blank=True, default="")
 
+    # Şifreli alanlar için kör indeksler (anahtarlı HMAC, bkz. blind_index.py)
+    tc_no_bidx = models.CharField(_("T.C. Kimlik No İndeksi"), max_length=32, blank=True, default="", editable=False)
+    ip_adresi_bidx = models.CharField(_("IP Adresi İndeksi"), max_length=32, blank=True, default="", editable=False)
+    mac_adresi_bidx = models.CharField(_("MAC Adresi İndeksi"), max_length=32, blank=True, default="", editable=False)
+
+    objects = LogKayitQuerySet.as_manager()
+
     class Meta:
         verbose_name = _("Log Kayıt")
         verbose_name_plural = _("Log Kayıtları")
         ordering = ["-giris_zamani"]
+        indexes = [
+            # TC/IP aramaları firmalar arası da yapılabilir (adli talepler)
+            models.Index(fields=['tc_no_bidx', 'giris_zamani'], name='logkayit_tc_bidx_idx'),
+            models.Index(fields=['ip_adresi_bidx', 'giris_zamani'], name='logkayit_ip_bidx_idx'),
+            # Cihaz tanıma: firma + cihaz + son 24 saat
+            models.Index(fields=['company', 'mac_adresi_bidx', 'giris_zamani'], name='logkayit_mac_bidx_idx'),
+            # Panel/API keyset sayfalama: firma + (giris_zamani, id) sırası
+            models.Index(fields=['company', 'giris_zamani', 'id'], name='logkayit_company_time_idx'),
+            # Artımlı işler (zaman damgası imleci): firma + id aralık taraması
+            models.Index(fields=['company', 'id'], name='logkayit_company_id_idx'),
+        ]
 
     def __str__(self):
         return f"{self.tc_no or self.pasaport_no} - {self.ad_soyad} - {self.giris_zamani}"
@@ -104,18 +212,39 @@ class LogKayit(models.Model):
         except:
             return self.mac_adresi  # Şifreli değilse olduğu gibi döndür
     
+    def update_blind_indexes(self):
+        """Kör indeksleri açık değerlerden hesaplar
+
+        Alan zaten şifreliyse ve indeksi varsa dokunulmaz; indeksi eksikse
+        (eski kayıt) değer çözülerek hesaplanır.
+        """
+        for field, index_field, index_func, decrypt_func in (
+            ('tc_no', 'tc_no_bidx', tc_no_index, decrypt_tc_no),
+            ('ip_adresi', 'ip_adresi_bidx', ip_address_index, decrypt_ip_address),
+            ('mac_adresi', 'mac_adresi_bidx', mac_address_index, decrypt_mac_address),
+        ):
+            value = getattr(self, field)
+            if not value:
+                setattr(self, index_field, '')
+            elif not is_encrypted(value):
+                setattr(self, index_field, index_func(value))
+            elif not getattr(self, index_field):
+                setattr(self, index_field, index_func(decrypt_func(value)))
+
     def save(self, *args, **kwargs):
-        """Kaydetmeden önce hassas verileri şifrele"""
-        # TC kimlik numarasını şifrele
-        if self.tc_no and getattr(settings, 'ENCRYPT_TC_NUMBERS', True):
+        """Kaydetmeden önce kör indeksleri hesapla ve hassas verileri şifrele"""
+        self.update_blind_indexes()
+
+        # TC kimlik numarasını şifrele (zaten şifreliyse tekrar şifrelenmez)
+        if self.tc_no and getattr(settings, 'ENCRYPT_TC_NUMBERS', True) and not is_encrypted(self.tc_no):
             self.tc_no = encrypt_tc_no(self.tc_no)
         
         # IP adresini şifrele
-        if self.ip_adresi and getattr(settings, 'ENCRYPT_IP_ADDRESSES', True):
+        if self.ip_adresi and getattr(settings, 'ENCRYPT_IP_ADDRESSES', True) and not is_encrypted(self.ip_adresi):
             self.ip_adresi = encrypt_ip_address(self.ip_adresi)
         
         # MAC adresini şifrele
-        if self.mac_adresi and getattr(settings, 'ENCRYPT_MAC_ADDRESSES', True):
+        if self.mac_adresi and getattr(settings, 'ENCRYPT_MAC_ADDRESSES', True) and not is_encrypted(self.mac_adresi):
             self.mac_adresi = encrypt_mac_address(self.mac_adresi)
         
         super().save(*args, **kwargs)
@@ -261,4 +390,219 @@ class CompanySettings(models.Model):
         verbose_name_plural = _("Şirket Ayarları")
     
     def __str__(self):
-        return f"{self.company.name} Ayarları"
\ No newline at end of file
+        return f"{self.company.name} Ayarları"
+
+
+class JobCheckpoint(models.Model):
+    """Toplu işlerin (şifreleme, rotasyon, rollup) kaldığı yer (kesintiden sonra devam için)"""
+    job = models.CharField(_("İş"), max_length=50)
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, null=True, blank=True, verbose_name=_("Firma"))
+    last_id = models.BigIntegerField(_("Son İşlenen ID"), default=0)
+    processed = models.BigIntegerField(_("İşlenen Kayıt"), default=0)
+    updated = models.BigIntegerField(_("Güncellenen Kayıt"), default=0)
+    started_at = models.DateTimeField(_("Başlangıç"), auto_now_add=True)
+    updated_at = models.DateTimeField(_("Son Güncelleme"), auto_now=True)
+    completed_at = models.DateTimeField(_("Tamamlanma"), null=True, blank=True)
+    # ID dizisinde dolması beklenen boşluk (bkz. commit_horizon.py)
+    gap_id = models.BigIntegerField(_("Beklenen ID Boşluğu"), default=0)
+    gap_seen_at = models.DateTimeField(_("Boşluğun Görüldüğü Zaman"), null=True, blank=True)
+
+    class Meta:
+        verbose_name = _("İş Kontrol Noktası")
+        verbose_name_plural = _("İş Kontrol Noktaları")
+        unique_together = ['job', 'company']
+
+    def __str__(self):
+        scope = self.company.name if self.company_id else _("Tüm firmalar")
+        return f"{self.job} - {scope} (ID {self.last_id})"
+
+
+class ExportStorage(FileSystemStorage):
+    """Dışa aktarma dosyaları MEDIA_ROOT dışında tutulur (MEDIA herkese açık sunulur)
+
+    Konum her kullanımda EXPORT_ROOT ayarından okunur.
+    """
+
+    @property
+    def base_location(self):
+        return str(getattr(settings, 'EXPORT_ROOT', settings.BASE_DIR / 'exports'))
+
+    @property
+    def location(self):
+        return os.path.abspath(self.base_location)
+
+
+def export_storage():
+    return ExportStorage()
+
+
+class ExportJob(models.Model):
+    """Arka planda çalışan dışa aktarma işi (bkz. export_jobs.py)"""
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, _('Sırada')),
+        (STATUS_RUNNING, _('Çalışıyor')),
+        (STATUS_DONE, _('Tamamlandı')),
+        (STATUS_FAILED, _('Başarısız')),
+    ]
+    FORMAT_CHOICES = [
+        ('excel', 'Excel'),
+        ('pdf', 'PDF'),
+        ('csv', 'CSV'),
+        ('zip', 'ZIP'),
+    ]
+
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, verbose_name=_("Firma"), related_name='export_jobs')
+    requested_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, verbose_name=_("İsteyen"))
+    export_format = models.CharField(_("Biçim"), max_length=10, choices=FORMAT_CHOICES)
+    # Panel filtreleri; TC/IP/MAC açık değer yerine kör indeks olarak saklanır
+    filters = models.JSONField(_("Filtreler"), default=dict, blank=True)
+    status = models.CharField(_("Durum"), max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    total_rows = models.BigIntegerField(_("Toplam Satır"), default=0)
+    processed_rows = models.BigIntegerField(_("İşlenen Satır"), default=0)
+    progress = models.PositiveSmallIntegerField(_("İlerleme (%)"), default=0)
+    file = models.FileField(_("Dosya"), upload_to='%Y/%m/', storage=export_storage, blank=True)
+    error = models.TextField(_("Hata"), blank=True)
+    worker = models.CharField(_("Worker"), max_length=100, blank=True)
+    created_at = models.DateTimeField(_("Oluşturulma"), auto_now_add=True)
+    started_at = models.DateTimeField(_("Başlangıç"), null=True, blank=True)
+    # Worker ilerleme yazdıkça güncellenir; takılan işler bundan tespit edilir
+    updated_at = models.DateTimeField(_("Son Güncelleme"), auto_now=True)
+    finished_at = models.DateTimeField(_("Bitiş"), null=True, blank=True)
+
+    class Meta:
+        verbose_name = _("Dışa Aktarma İşi")
+        verbose_name_plural = _("Dışa Aktarma İşleri")
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='exportjob_status_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.company.name} - {self.export_format} ({self.get_status_display()}, %{self.progress})"
+
+    @property
+    def is_finished(self):
+        return self.status in (self.STATUS_DONE, self.STATUS_FAILED)
+
+
+class DeviceSessionQuerySet(models.QuerySet):
+    def active(self):
+        return self.filter(expires_at__gt=timezone.now())
+
+    def expired(self):
+        return self.filter(expires_at__lte=timezone.now())
+
+
+class DeviceSession(models.Model):
+    """Captive portal "cihazı hatırla" oturumu
+
+    Cihaz tanıma için log tablosu taranmaz; firma + cihaz parmak izi ile tek
+    satır tutulur ve tekrar oynatılacak kimliğin log kaydına işaret eder.
+    "Cihazı unut" yalnızca bu satırı siler, 5651 kapsamındaki log kayıtları
+    saklama süresince korunur.
+    """
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, verbose_name=_("Firma"), related_name='device_sessions')
+    # Cihaz tanımlayıcısının kör indeksi: denetleyici MAC'i ya da imzalı çerez (bkz. views.visitor.get_device_id)
+    device_fingerprint = models.CharField(_("Cihaz Parmak İzi"), max_length=32)
+    log = models.ForeignKey(LogKayit, on_delete=models.CASCADE, verbose_name=_("Son Giriş Kaydı"), related_name='+',
+                            db_constraint=False)
+    created_at = models.DateTimeField(_("Oluşturulma"), auto_now_add=True)
+    expires_at = models.DateTimeField(_("Geçerlilik Sonu"), db_index=True)
+
+    objects = DeviceSessionQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = _("Cihaz Oturumu")
+        verbose_name_plural = _("Cihaz Oturumları")
+        unique_together = ['company', 'device_fingerprint']
+
+    def __str__(self):
+        return f"{self.company.name} - {self.device_fingerprint[:8]} ({self.expires_at})"
+
+    @staticmethod
+    def ttl():
+        return timedelta(hours=getattr(settings, 'DEVICE_SESSION_TTL_HOURS', 24))
+
+    @classmethod
+    def lookup(cls, company, device_id):
+        """Cihazın geçerli oturumunu tek indeksli sorguyla döndürür"""
+        fingerprint = mac_address_index(device_id)
+        if not fingerprint:
+            return None
+        return cls.objects.active().select_related('log').filter(
+            company=company, device_fingerprint=fingerprint
+        ).first()
+
+    @classmethod
+    def remember(cls, company, device_id, log):
+        """Cihaz için oturumu oluşturur veya yeni log kaydıyla uzatır"""
+        fingerprint = mac_address_index(device_id)
+        if not fingerprint:
+            return None
+        session, created = cls.objects.update_or_create(
+            company=company,
+            device_fingerprint=fingerprint,
+            defaults={'log': log, 'expires_at': log.giris_zamani + cls.ttl()},
+        )
+        return session
+
+    @classmethod
+    def forget(cls, company, device_id):
+        """Cihaz oturumunu siler; log kayıtlarına dokunmaz"""
+        fingerprint = mac_address_index(device_id)
+        if not fingerprint:
+            return 0
+        return cls.objects.filter(company=company, device_fingerprint=fingerprint).delete()[0]
+
+
+class LogKayitHourlyRollup(models.Model):
+    """Firma bazında saatlik giriş sayıları (bkz. rollups.py)"""
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, verbose_name=_("Firma"), related_name='+')
+    hour = models.DateTimeField(_("Saat"))
+    total = models.PositiveIntegerField(_("Toplam Giriş"), default=0)
+    suspicious = models.PositiveIntegerField(_("Şüpheli Giriş"), default=0)
+
+    class Meta:
+        verbose_name = _("Saatlik Log Özeti")
+        verbose_name_plural = _("Saatlik Log Özetleri")
+        unique_together = ['company', 'hour']
+
+    def __str__(self):
+        return f"{self.company_id} - {self.hour:%Y-%m-%d %H:00}: {self.total}"
+
+
+class LogKayitDailyRollup(models.Model):
+    """Firma bazında günlük giriş sayıları (bkz. rollups.py)"""
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, verbose_name=_("Firma"), related_name='+')
+    date = models.DateField(_("Tarih"))
+    total = models.PositiveIntegerField(_("Toplam Giriş"), default=0)
+    suspicious = models.PositiveIntegerField(_("Şüpheli Giriş"), default=0)
+
+    class Meta:
+        verbose_name = _("Günlük Log Özeti")
+        verbose_name_plural = _("Günlük Log Özetleri")
+        unique_together = ['company', 'date']
+
+    def __str__(self):
+        return f"{self.company_id} - {self.date}: {self.total}"
+
+
+class LogKayitUserDailyRollup(models.Model):
+    """Firma, gün ve ad soyad bazında giriş sayıları (en aktif kullanıcılar için)"""
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, verbose_name=_("Firma"), related_name='+')
+    date = models.DateField(_("Tarih"))
+    ad_soyad = models.CharField(_("Ad Soyad"), max_length=100)
+    total = models.PositiveIntegerField(_("Toplam Giriş"), default=0)
+    suspicious = models.PositiveIntegerField(_("Şüpheli Giriş"), default=0)
+
+    class Meta:
+        verbose_name = _("Kullanıcı Günlük Log Özeti")
+        verbose_name_plural = _("Kullanıcı Günlük Log Özetleri")
+        unique_together = ['company', 'date', 'ad_soyad']
+
+    def __str__(self):
+        return f"{self.company_id} - {self.date} - {self.ad_soyad}: {self.total}"
@@ -0,0 +1,121 @@
+"""
+Log listeleri için keyset (cursor) sayfalama
+5651 Log Sistemi - Panel ve API log listeleri
+
+Paginator her istekte filtrelenmiş sorgu üzerinde COUNT(*) çalıştırır ve
+derin sayfalarda OFFSET kadar satırı okuyup atar. Burada sayfa konumu son
+görülen kaydın (giris_zamani, id) değeriyle tutulur; her sayfa
+(company, giris_zamani, id) indeksinde tek aralık taramasıdır ve N. sayfa
+1. sayfa ile aynı maliyettedir. Toplam sayı gerekiyorsa özet tablolarından
+yaklaşık olarak alınır.
+
+Cursor değeri "<yön><mikrosaniye>.<id>" biçiminde, base64 ile kodlanır.
+Yön 'n' (sonraki, daha eski kayıtlar) veya 'p' (önceki, daha yeni kayıtlar).
+"""
+
+import base64
+import binascii
+from datetime import datetime, timedelta, timezone as dt_timezone
+from django.db.models import Q
+
+ORDERING = ('-giris_zamani', '-id')
+_EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+class InvalidCursor(ValueError):
+    """Çözülemeyen cursor değeri"""
+
+
+def encode_cursor(log, direction='n'):
+    """Kayıt konumunu URL'de taşınabilir cursor değerine çevirir"""
+    delta = log.giris_zamani - _EPOCH
+    micros = (delta.days * 86400 + delta.seconds) * 1000000 + delta.microseconds
+    raw = f'{direction}{micros}.{log.pk}'
+    return base64.urlsafe_b64encode(raw.encode('ascii')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Cursor değerini (yön, giris_zamani, id) olarak çözer"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode('ascii')).decode('ascii')
+        direction, position = raw[0], raw[1:]
+        micros, pk = position.split('.')
+        if direction not in ('n', 'p'):
+            raise ValueError(direction)
+        pk = int(pk)
+        # BigAutoField sınırı dışındaki id veritabanı sorgusunda taşar
+        if not 0 < pk < 2 ** 63:
+            raise ValueError(pk)
+        return direction, _EPOCH + timedelta(microseconds=int(micros)), pk
+    except (ValueError, OverflowError, UnicodeError, binascii.Error, IndexError):
+        raise InvalidCursor(cursor)
+
+
+class KeysetPage:
+    """Tek sayfa; şablonlarda Page nesnesine benzer şekilde kullanılır"""
+
+    def __init__(self, object_list, has_next, has_previous, approximate_count=None):
+        self.object_list = object_list
+        self._has_next = has_next
+        self._has_previous = has_previous
+        self.approximate_count = approximate_count
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+    @property
+    def next_cursor(self):
+        if self._has_next and self.object_list:
+            return encode_cursor(self.object_list[-1], 'n')
+        return None
+
+    @property
+    def previous_cursor(self):
+        if self._has_previous and self.object_list:
+            return encode_cursor(self.object_list[0], 'p')
+        return None
+
+
+def keyset_paginate(queryset, cursor=None, per_page=25, approximate_count=None):
+    """Sorguyu (giris_zamani, id) azalan sırayla sayfalar
+
+    cursor: önceki sayfanın next_cursor/previous_cursor değeri; geçersizse
+    InvalidCursor. Sayfa başına tek sorgu çalışır (per_page + 1 satır).
+    """
+    if not cursor:
+        rows = list(queryset.order_by(*ORDERING)[:per_page + 1])
+        return KeysetPage(rows[:per_page], len(rows) > per_page, False, approximate_count)
+
+    direction, giris_zamani, pk = decode_cursor(cursor)
+    if direction == 'n':
+        # Eşitlikte id ile ayrılır; giris_zamani__lte indeks aralığını sınırlar
+        rows = list(
+            queryset.filter(giris_zamani__lte=giris_zamani)
+            .filter(Q(giris_zamani__lt=giris_zamani) | Q(id__lt=pk))
+            .order_by(*ORDERING)[:per_page + 1]
+        )
+        return KeysetPage(rows[:per_page], len(rows) > per_page, True, approximate_count)
+
+    # Önceki sayfa ters sırayla okunur, sonra çevrilir
+    rows = list(
+        queryset.filter(giris_zamani__gte=giris_zamani)
+        .filter(Q(giris_zamani__gt=giris_zamani) | Q(id__gt=pk))
+        .order_by('giris_zamani', 'id')[:per_page + 1]
+    )
+    has_previous = len(rows) > per_page
+    rows = rows[:per_page]
+    rows.reverse()
+    return KeysetPage(rows, True, has_previous, approximate_count)
@@ -0,0 +1,316 @@
+"""
+Aylık bölümleme ve saklama süresi
+5651 Log Sistemi - Log ve zaman damgası tablolarının ay bazında bölümlenmesi
+
+PostgreSQL'de LogKayit (giris_zamani) ve TimestampSignature (created_at)
+aylık RANGE bölümlü (declarative partitioning) tablolara dönüştürülür:
+
+- Bölümler "<tablo>_pYYYYMM" adıyla UTC ay sınırlarında oluşturulur;
+  aralık dışı kayıtlar "<tablo>_default" bölümüne düşer. Önümüzdeki
+  PARTITION_MONTHS_AHEAD ay cron ile önceden açılır.
+- Saklama süresi dolan aylar DETACH + DROP ile satır sayısından bağımsız
+  kaldırılır; sınırdaki ayın eski kayıtları küçük parçalarla silinir.
+- giris_zamani aralığı içeren sorgular (LogKayitQuerySet.in_date_range)
+  yalnızca ilgili bölümleri tarar.
+- Bölümlü tabloda birincil anahtar (id, bölüm sütunu) olur; id tek başına
+  benzersiz indekslenemediğinden bu tablolara işaret eden FK'ler
+  veritabanında kısıtsızdır (db_constraint=False), silme burada yapılır.
+
+SQLite ve MySQL'de ORM'e şeffaf ay tabloları kurulamadığından (görünüm +
+trigger ile INSERT ... RETURNING çalışmaz) tablo tek kalır; saklama süresi
+aynı parça parça silme ile uygulanır: Django'nun delete collector'ı
+kullanılmaz, satırlar belleğe alınmaz ve tablo kısa transaction'larla kilitlenir.
+"""
+
+import re
+import time
+from datetime import datetime, timezone as dt_timezone
+from django.apps import apps
+from django.conf import settings
+from django.db import connection, models, transaction
+from django.db.models.deletion import get_candidate_relations_to_delete
+from django.utils import timezone
+import logging
+
+logger = logging.getLogger(__name__)
+
+# (uygulama, model, bölüm sütunu)
+PARTITIONED_MODELS = (
+    ('log_kayit', 'LogKayit', 'giris_zamani'),
+    ('timestamp_signing', 'TimestampSignature', 'created_at'),
+)
+
+
+def supports_partitioning():
+    return connection.vendor == 'postgresql'
+
+
+def month_start(value):
+    """Değerin içinde bulunduğu UTC ayın başlangıcı"""
+    if timezone.is_aware(value):
+        value = value.astimezone(dt_timezone.utc)
+    return datetime(value.year, value.month, 1, tzinfo=dt_timezone.utc)
+
+
+def next_month(start):
+    if start.month == 12:
+        return start.replace(year=start.year + 1, month=1)
+    return start.replace(month=start.month + 1)
+
+
+def partition_name(table, start):
+    return f'{table}_p{start:%Y%m}'
+
+
+def partitioned_models():
+    """[(model, bölüm sütunu), ...]; kurulu olmayan uygulamalar atlanır"""
+    result = []
+    for app_label, model_name, column in PARTITIONED_MODELS:
+        try:
+            result.append((apps.get_model(app_label, model_name), column))
+        except LookupError:
+            continue
+    return result
+
+
+def is_partitioned(table):
+    if not supports_partitioning():
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s)', [table])
+        return cursor.fetchone() is not None
+
+
+def list_partitions(table):
+    """Aylık bölümler: [(ay başlangıcı, bölüm adı), ...] (varsayılan bölüm hariç)"""
+    if not supports_partitioning():
+        return []
+    pattern = re.compile(rf'^{re.escape(table)}_p(\d{{4}})(\d{{2}})$')
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid '
+            'WHERE i.inhparent = to_regclass(%s)',
+            [table],
+        )
+        names = [row[0] for row in cursor.fetchall()]
+    partitions = []
+    for name in names:
+        match = pattern.match(name)
+        if match:
+            start = datetime(int(match.group(1)), int(match.group(2)), 1, tzinfo=dt_timezone.utc)
+            partitions.append((start, name))
+    return sorted(partitions)
+
+
+def _create_partition(cursor, table, start):
+    quote = connection.ops.quote_name
+    # Sınırlar bizim ürettiğimiz değerler; DDL'de parametre kullanılamaz
+    cursor.execute(
+        f'CREATE TABLE IF NOT EXISTS {quote(partition_name(table, start))} '
+        f'PARTITION OF {quote(table)} '
+        f"FOR VALUES FROM ('{start.isoformat()}') TO ('{next_month(start).isoformat()}')"
+    )
+
+
+def ensure_partitions(months_ahead=None, now=None):
+    """Bu ay ve önümüzdeki aylar için bölümleri oluşturur; oluşturulan adları döndürür"""
+    if months_ahead is None:
+        months_ahead = getattr(settings, 'PARTITION_MONTHS_AHEAD', 3)
+    created = []
+    for model, column in partitioned_models():
+        table = model._meta.db_table
+        if not is_partitioned(table):
+            continue
+        existing = {name for _, name in list_partitions(table)}
+        start = month_start(now or timezone.now())
+        with connection.cursor() as cursor:
+            for _ in range(months_ahead + 1):
+                if partition_name(table, start) not in existing:
+                    _create_partition(cursor, table, start)
+                    created.append(partition_name(table, start))
+                start = next_month(start)
+    return created
+
+
+def _delete_related(model, queryset):
+    """queryset kayıtlarına bağlı satırları on_delete kuralına göre işler"""
+    for relation in get_candidate_relations_to_delete(model._meta):
+        field = relation.field
+        children = relation.related_model._base_manager.filter(**{f'{field.name}__in': queryset.values('pk')})
+        if relation.on_delete is models.CASCADE:
+            delete_queryset(children)
+        elif relation.on_delete is models.SET_NULL:
+            children.update(**{field.name: None})
+        elif relation.on_delete is not models.DO_NOTHING:
+            raise RuntimeError(
+                f"{relation.related_model.__name__}.{field.name} ilişkisi "
+                f"({relation.on_delete.__name__}) toplu silmede desteklenmiyor"
+            )
+
+
+def delete_queryset(queryset):
+    """Kayıtları ve CASCADE bağlı kayıtları collector kullanmadan siler
+
+    Bağlı tablolar alt sorguyla silinir (SET_NULL güncellenir); satırlar
+    Python'a alınmaz ve post_delete sinyalleri tetiklenmez.
+    """
+    _delete_related(queryset.model, queryset)
+    return queryset._raw_delete(queryset.db)
+
+
+def drop_partitions_before(cutoff, dry_run=False):
+    """Tamamı cutoff'tan eski aylık bölümleri kaldırır
+
+    Bölümlü tablolara işaret eden FK'ler veritabanında kısıtsız olduğundan
+    bağlı satırlar önce burada işlenir. Zaman damgası imzaları loglardan
+    sonra oluştuğu için eski imza bölümleri önce kaldırılır.
+    Dönüş: [(tablo, bölüm, yaklaşık satır sayısı), ...]
+    """
+    quote = connection.ops.quote_name
+    dropped = []
+    for model, column in reversed(partitioned_models()):
+        table = model._meta.db_table
+        if not is_partitioned(table):
+            continue
+        for start, name in list_partitions(table):
+            if next_month(start) > cutoff:
+                continue
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(%s)', [name])
+                rows = max(0, cursor.fetchone()[0])
+                if not dry_run:
+                    month = model._base_manager.filter(
+                        **{f'{column}__gte': start, f'{column}__lt': next_month(start)}
+                    )
+                    _delete_related(model, month)
+                    cursor.execute(f'ALTER TABLE {quote(table)} DETACH PARTITION {quote(name)}')
+                    cursor.execute(f'DROP TABLE {quote(name)}')
+                    logger.info(f"Bölüm kaldırıldı: {name} (~{rows} kayıt)")
+            dropped.append((table, name, rows))
+    return dropped
+
+
+def delete_logs_before(cutoff, batch_size=5000, pause=0, stdout=None):
+    """cutoff'tan eski logları id sırasıyla parça parça siler
+
+    Her parça kendi kısa transaction'ındadır; parça id aralığıyla seçildiği
+    için büyük IN listeleri oluşmaz.
+    """
+    from .models import LogKayit
+
+    expired = LogKayit.objects.filter(giris_zamani__lt=cutoff).order_by()
+    deleted = 0
+    last_id = 0
+    while True:
+        upper = list(
+            expired.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[batch_size - 1:batch_size]
+        )
+        if upper:
+            batch = expired.filter(id__gt=last_id, id__lte=upper[0])
+        else:
+            batch = expired.filter(id__gt=last_id)
+        with transaction.atomic():
+            count = delete_queryset(batch)
+        deleted += count
+        if stdout and count:
+            stdout.write(f'  {deleted} kayıt silindi')
+        if not upper:
+            break
+        last_id = upper[0]
+        if pause:
+            time.sleep(pause)
+    return deleted
+
+
+def purge_before(cutoff, batch_size=5000, pause=0, stdout=None):
+    """Saklama süresi dolan kayıtları kaldırır: önce tam aylar, sonra kalanlar
+
+    Dönüş: {'partitions': [...], 'deleted': parça parça silinen kayıt sayısı}
+    """
+    dropped = drop_partitions_before(cutoff)
+    deleted = delete_logs_before(cutoff, batch_size=batch_size, pause=pause, stdout=stdout)
+    return {'partitions': dropped, 'deleted': deleted}
+
+
+def convert_to_partitioned(model, column, months_ahead=None, stdout=None):
+    """Mevcut tabloyu aylık bölümlü tabloya dönüştürür (yalnızca PostgreSQL)
+
+    Tek transaction'da çalışır ve kopyalama süresince tabloyu kilitler;
+    bakım penceresinde, migrate sonrasında çalıştırılmalıdır. İndeksler ve
+    tablodan çıkan FK'ler yeniden oluşturulur; bölümlü tablolara işaret eden
+    FK'ler (db_constraint=False) yeniden oluşturulmaz.
+    """
+    if not supports_partitioning():
+        raise RuntimeError('Bölümleme yalnızca PostgreSQL üzerinde desteklenir')
+
+    quote = connection.ops.quote_name
+    table = model._meta.db_table
+    if is_partitioned(table):
+        return False
+    if months_ahead is None:
+        months_ahead = getattr(settings, 'PARTITION_MONTHS_AHEAD', 3)
+    partitioned_tables = [m._meta.db_table for m, _ in partitioned_models()]
+    old = f'{table}_unpartitioned'
+    pk = model._meta.pk.column
+    sequence = f'{table}_{pk}_pseq'
+
+    def write(message):
+        if stdout:
+            stdout.write(message)
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f'LOCK TABLE {quote(table)} IN ACCESS EXCLUSIVE MODE')
+        cursor.execute(
+            'SELECT indexdef FROM pg_indexes WHERE schemaname = current_schema() AND tablename = %s '
+            'AND indexname NOT IN (SELECT conname FROM pg_constraint WHERE conrelid = to_regclass(%s))',
+            [table, table],
+        )
+        index_defs = [row[0] for row in cursor.fetchall()]
+        cursor.execute(
+            "SELECT conname, pg_get_constraintdef(oid), confrelid::regclass::text FROM pg_constraint "
+            "WHERE conrelid = to_regclass(%s) AND contype = 'f'",
+            [table],
+        )
+        foreign_keys = [
+            (name, definition) for name, definition, target in cursor.fetchall()
+            if target.strip('"') not in partitioned_tables
+        ]
+        cursor.execute(f'SELECT MIN({quote(column)}), MAX({quote(column)}), MAX({quote(pk)}) FROM {quote(table)}')
+        first, last, max_id = cursor.fetchone()
+
+        cursor.execute(f'ALTER TABLE {quote(table)} RENAME TO {quote(old)}')
+        cursor.execute(
+            f'CREATE TABLE {quote(table)} (LIKE {quote(old)} INCLUDING DEFAULTS) '
+            f'PARTITION BY RANGE ({quote(column)})'
+        )
+        # Identity sütunları bölümlü tabloda kullanılamaz; id ayrı sequence'tan gelir
+        cursor.execute(f'CREATE SEQUENCE {quote(sequence)} OWNED BY {quote(table)}.{quote(pk)}')
+        if max_id:
+            cursor.execute('SELECT setval(%s, %s)', [sequence, max_id])
+        cursor.execute(
+            f"ALTER TABLE {quote(table)} ALTER COLUMN {quote(pk)} SET DEFAULT nextval('{sequence}')"
+        )
+        cursor.execute(f'ALTER TABLE {quote(table)} ADD PRIMARY KEY ({quote(pk)}, {quote(column)})')
+
+        start = month_start(first or timezone.now())
+        end = month_start(max(last or timezone.now(), timezone.now()))
+        for _ in range(months_ahead):
+            end = next_month(end)
+        count = 0
+        while start <= end:
+            _create_partition(cursor, table, start)
+            start = next_month(start)
+            count += 1
+        cursor.execute(f'CREATE TABLE {quote(table + "_default")} PARTITION OF {quote(table)} DEFAULT')
+        write(f'{table}: {count} aylık bölüm oluşturuldu, kayıtlar kopyalanıyor...')
+
+        cursor.execute(f'INSERT INTO {quote(table)} SELECT * FROM {quote(old)}')
+        write(f'{table}: {cursor.rowcount} kayıt kopyalandı')
+        # Bu tabloya işaret eden FK kısıtları da kaldırılır
+        cursor.execute(f'DROP TABLE {quote(old)} CASCADE')
+
+        for definition in index_defs:
+            cursor.execute(definition)
+        for name, definition in foreign_keys:
+            cursor.execute(f'ALTER TABLE {quote(table)} ADD CONSTRAINT {quote(name)} {definition}')
+    return True
@@ -0,0 +1,160 @@
+"""
+Captive portal önbelleği
+5651 Log Sistemi - Ziyaretçi giriş sayfası için firma ve sayfa önbelleği
+
+Vardiya değişimlerinde yüzlerce cihaz aynı firma adresine saniyeler içinde
+gelir. Her istekte Company sorgusu, form oluşturma ve şablon render etmek
+yerine:
+
+- Firma kaydı ve form ayarları firma ID'si ile önbelleğe alınır, slug
+  yalnızca ID'ye işaret eder. Company.save()/delete() kaydı siler.
+- Render edilmiş sayfa firma sürümü (updated_at) ve dil ile anahtarlanır;
+  firma güncellenince eski sayfalar kendiliğinden erişilmez olur.
+- Sayfa CSRF token yerine yer tutucu ile saklanır, her yanıtta isteğin
+  token'ı yerleştirilir.
+- Sayfa içeriğinin özeti ETag olarak gönderilir; CSRF çerezi olan tarayıcı
+  If-None-Match ile geldiğinde gövdesiz 304 döner.
+
+LocMemCache süreç başına olduğundan silme yalnızca aynı süreçte etkilidir;
+çok süreçli kurulumda güncellemeler en geç PORTAL_CACHE_TIMEOUT saniye
+içinde yansır (paylaşılan önbellek kullanılmalı).
+"""
+
+import hashlib
+from django.conf import settings
+from django.core.cache import cache
+from django.http import Http404, HttpResponse
+from django.middleware.csrf import get_token
+from django.template.loader import render_to_string
+from django.utils import translation
+from django.utils.cache import get_conditional_response, patch_cache_control
+import logging
+
+logger = logging.getLogger(__name__)
+
+PORTAL_TEMPLATE = 'log_kayit/giris.html'
+LANDING_TEMPLATE = 'log_kayit/giris_landing.html'
+
+# Önbellekteki sayfada CSRF token yerine geçen değer
+CSRF_PLACEHOLDER = '__portal_csrf_token__'
+
+
+def _company_key(company_id):
+    return f'portal:company:{company_id}'
+
+
+def _slug_key(slug):
+    return f'portal:slug:{slug}'
+
+
+def _company_timeout():
+    return getattr(settings, 'PORTAL_CACHE_TIMEOUT', 60)
+
+
+def _page_timeout():
+    return getattr(settings, 'PORTAL_PAGE_CACHE_TIMEOUT', 3600)
+
+
+def _build_entry(company):
+    return {
+        'company': company,
+        # updated_at her kayıtta değişir; sayfa anahtarlarının sürümü
+        'version': company.updated_at.strftime('%Y%m%d%H%M%S%f') if company.updated_at else '0',
+        'form_config': {
+            'theme_color': company.theme_color,
+            'kvkk_text': company.kvkk_text,
+            'login_info_text': company.login_info_text,
+            'allow_foreigners': company.allow_foreigners,
+        },
+    }
+
+
+def get_portal_company(company_slug=None, company_id=None):
+    """Firmayı ve form ayarlarını önbellekten döndürür, yoksa veritabanından yükler
+
+    Dönüş: {'company', 'version', 'form_config'}; firma yoksa Http404.
+    """
+    from .models import Company
+
+    if company_slug:
+        company_id = cache.get(_slug_key(company_slug))
+        if company_id is not None:
+            entry = cache.get(_company_key(company_id))
+            # Slug değiştiyse eski slug başka kayda işaret edebilir
+            if entry is not None and entry['company'].slug == company_slug:
+                return entry
+        lookup = {'slug': company_slug}
+    else:
+        entry = cache.get(_company_key(company_id))
+        if entry is not None:
+            return entry
+        lookup = {'id': company_id}
+
+    try:
+        company = Company.objects.get(**lookup)
+    except (Company.DoesNotExist, ValueError):
+        raise Http404("Firma bulunamadı")
+
+    entry = _build_entry(company)
+    timeout = _company_timeout()
+    cache.set_many({
+        _company_key(company.pk): entry,
+        _slug_key(company.slug): company.pk,
+    }, timeout)
+    return entry
+
+
+def invalidate_company(company):
+    """Firma kaydını önbellekten siler (Company.save/delete çağırır)
+
+    Sayfalar sürümlü anahtarla saklandığından ayrıca silinmez.
+    """
+    try:
+        cache.delete(_company_key(company.pk))
+    except Exception as e:
+        logger.error(f"Portal önbellek temizleme hatası: {str(e)}")
+
+
+def _get_page(request, key, template, context_factory):
+    """(html, etag) döndürür; yoksa render edip önbelleğe alır"""
+    page = cache.get(key)
+    if page is None:
+        context = dict(context_factory())
+        context['csrf_token'] = CSRF_PLACEHOLDER
+        html = render_to_string(template, context, request=request)
+        etag = '"%s"' % hashlib.md5(html.encode('utf-8')).hexdigest()
+        page = (html, etag)
+        cache.set(key, page, _page_timeout())
+    return page
+
+
+def _page_response(request, page):
+    html, etag = page
+
+    # Tarayıcıdaki sayfanın token'ı ancak CSRF çerezi hâlâ varsa geçerlidir
+    if settings.CSRF_COOKIE_NAME in request.COOKIES:
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            patch_cache_control(not_modified, private=True, no_cache=True)
+            return not_modified
+
+    response = HttpResponse(html.replace(CSRF_PLACEHOLDER, get_token(request)))
+    response['ETag'] = etag
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def portal_page_response(request, entry, context_factory):
+    """Firmanın boş giriş formu sayfasını önbellekten döndürür
+
+    context_factory yalnızca önbellekte sayfa yoksa çağrılır.
+    """
+    company = entry['company']
+    key = f"portal:page:{company.pk}:{entry['version']}:{translation.get_language()}"
+    return _page_response(request, _get_page(request, key, PORTAL_TEMPLATE, context_factory))
+
+
+def landing_page_response(request):
+    """Firma belirtilmeden gelen istekler için bilgilendirme sayfası"""
+    key = f'portal:landing:{translation.get_language()}'
+    return _page_response(request, _get_page(request, key, LANDING_TEMPLATE, dict))
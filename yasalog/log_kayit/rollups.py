@@ -0,0 +1,406 @@
+"""
+Log özet (rollup) tabloları
+5651 Log Sistemi - Dashboard, analitik ve API istatistikleri
+
+Dashboard sayıları her istekte LogKayit üzerinde COUNT çalıştırmak yerine
+saatlik, günlük ve kullanıcı-günlük özet tablolarından okunur.
+
+Özetler `update_rollups()` ile artımlı güncellenir (cron veya
+`manage.py update_log_rollups`): son işlenen log ID'sinden (JobCheckpoint)
+sonraki kayıtlar okunur, sayaçlar F() benzeri artırımla yazılır. Henüz
+commit edilmemiş düşük ID'li kayıtları atlamamak için yalnızca commit
+sınırına (commit_horizon.py) kadar okunur; kaydın giris_zamani'si (geçmiş
+ya da gelecek tarihli olabilir) imleci durdurmaz.
+
+Okumalar (CompanyRollups) özet satırlarına watermark'tan sonraki kayıtları
+(tail) veritabanında gruplayarak ekler; sonuç tam sayıdır. Özetler hiç
+güncellenmemişse tail firmanın tüm geçmişidir ve okuma doğrudan LogKayit
+üzerindeki COUNT'lara eşdeğer olur; kurulumda `update_log_rollups`
+çalıştırılmalıdır.
+
+Özetlenmiş kayıtların is_suspicious değeri yalnızca `set_suspicious()` ile
+değiştirilmelidir; özet sayaçları aynı transaction'da düzeltilir. Başka
+yoldan yapılan toplu güncellemelerden sonra `rebuild_rollups()` gerekir.
+"""
+
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncDate, TruncHour
+from django.utils import timezone
+import logging
+
+from .commit_horizon import commit_horizon
+from .models import (
+    JobCheckpoint, LogKayit, LogKayitHourlyRollup, LogKayitDailyRollup, LogKayitUserDailyRollup
+)
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_JOB = 'log_rollups'
+
+
+def _bucket(giris_zamani):
+    """Kaydın (saat, gün) kovası; yerel saat dilimine göre"""
+    local = timezone.localtime(giris_zamani)
+    return local.replace(minute=0, second=0, microsecond=0), local.date()
+
+
+def rollup_watermark():
+    """Özetlere işlenmiş son log ID'si"""
+    return JobCheckpoint.objects.filter(job=ROLLUP_JOB, company=None).values_list(
+        'last_id', flat=True
+    ).first() or 0
+
+
+# ----------------------------------------------------------------------
+# Yazma
+# ----------------------------------------------------------------------
+
+def _apply_increments(model, time_field, counts, create=True):
+    """{(company_id, zaman[, ad_soyad]): [toplam, şüpheli]} sayaçlarını yazar
+
+    Var olan satırlar tek hazırlanmış UPDATE ile (executemany) artırılır,
+    yeni satırlar bulk_create ile eklenir (create=False ise atlanır). Çağıran
+    transaction içinde ve checkpoint satırı kilitliyken çalışır; eşzamanlı
+    yazıcı yoktur.
+    """
+    if not counts:
+        return
+
+    key_fields = ['company_id', time_field]
+    if model is LogKayitUserDailyRollup:
+        key_fields.append('ad_soyad')
+
+    existing = {
+        tuple(row[:-1]): row[-1]
+        for row in model.objects.filter(
+            company_id__in={key[0] for key in counts},
+            **{f'{time_field}__in': {key[1] for key in counts}},
+        ).values_list(*key_fields, 'id')
+    }
+
+    updates = []
+    creates = []
+    for key, (total, suspicious) in counts.items():
+        row_id = existing.get(key)
+        if row_id is not None:
+            updates.append((total, suspicious, row_id))
+        else:
+            creates.append(model(
+                total=total, suspicious=suspicious, **dict(zip(key_fields, key))
+            ))
+
+    if updates:
+        quote = connection.ops.quote_name
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'UPDATE {quote(model._meta.db_table)} '
+                f'SET {quote("total")} = {quote("total")} + %s, '
+                f'{quote("suspicious")} = {quote("suspicious")} + %s '
+                f'WHERE {quote("id")} = %s',
+                updates,
+            )
+    if creates and create:
+        model.objects.bulk_create(creates, batch_size=1000)
+
+
+def update_rollups(batch_size=5000, stdout=None):
+    """Watermark'tan commit sınırına kadarki log kayıtlarını özet tablolarına ekler
+
+    Dönüş: işlenen kayıt sayısı.
+    """
+    JobCheckpoint.objects.get_or_create(job=ROLLUP_JOB, company=None)
+    horizon = commit_horizon()
+    processed = 0
+    started = time.monotonic()
+
+    while True:
+        with transaction.atomic():
+            # Kilit: aynı anda çalışan iki iş aynı kayıtları iki kez saymaz
+            checkpoint = JobCheckpoint.objects.select_for_update().get(job=ROLLUP_JOB, company=None)
+            rows = list(
+                LogKayit.objects.filter(id__gt=checkpoint.last_id, id__lte=horizon).order_by('id').values_list(
+                    'id', 'company_id', 'giris_zamani', 'is_suspicious', 'ad_soyad'
+                )[:batch_size]
+            )
+
+            hourly = defaultdict(lambda: [0, 0])
+            daily = defaultdict(lambda: [0, 0])
+            users = defaultdict(lambda: [0, 0])
+            last_id = checkpoint.last_id
+            count = 0
+            for row_id, company_id, giris_zamani, is_suspicious, ad_soyad in rows:
+                hour, date = _bucket(giris_zamani)
+                suspicious = 1 if is_suspicious else 0
+                for counter in (
+                    hourly[(company_id, hour)],
+                    daily[(company_id, date)],
+                    users[(company_id, date, ad_soyad or '')],
+                ):
+                    counter[0] += 1
+                    counter[1] += suspicious
+                last_id = row_id
+                count += 1
+
+            if count:
+                _apply_increments(LogKayitHourlyRollup, 'hour', hourly)
+                _apply_increments(LogKayitDailyRollup, 'date', daily)
+                _apply_increments(LogKayitUserDailyRollup, 'date', users)
+                checkpoint.last_id = last_id
+                checkpoint.processed += count
+                checkpoint.updated += count
+                checkpoint.save(update_fields=['last_id', 'processed', 'updated', 'updated_at'])
+
+        processed += count
+        if stdout is not None and count:
+            elapsed = time.monotonic() - started
+            stdout.write(f'ID {last_id} - işlenen {processed}, {processed / elapsed:,.0f} kayıt/sn')
+        if count < batch_size:
+            break
+
+    return processed
+
+
+def set_suspicious(queryset, suspicious=True):
+    """Kayıtların şüpheli işaretini değiştirir ve özet sayaçlarını düzeltir
+
+    Yalnızca işareti değişen ve watermark'a kadar özetlenmiş kayıtlar için
+    şüpheli sayaçları artırılır/azaltılır; sonrakiler özetlenirken güncel
+    değerle sayılır. Dönüş: güncellenen kayıt sayısı.
+    """
+    changing = queryset.exclude(is_suspicious=suspicious)
+    delta = 1 if suspicious else -1
+
+    with transaction.atomic():
+        # update_rollups ile aynı kilit: watermark bu arada ilerlemez
+        checkpoint = JobCheckpoint.objects.select_for_update().filter(job=ROLLUP_JOB, company=None).first()
+        watermark = checkpoint.last_id if checkpoint else 0
+        rows = list(
+            changing.filter(id__lte=watermark).select_for_update().order_by().values_list(
+                'company_id', 'giris_zamani', 'ad_soyad'
+            )
+        )
+        updated = changing.update(is_suspicious=suspicious)
+
+        hourly = defaultdict(lambda: [0, 0])
+        daily = defaultdict(lambda: [0, 0])
+        users = defaultdict(lambda: [0, 0])
+        for company_id, giris_zamani, ad_soyad in rows:
+            hour, date = _bucket(giris_zamani)
+            hourly[(company_id, hour)][1] += delta
+            daily[(company_id, date)][1] += delta
+            users[(company_id, date, ad_soyad or '')][1] += delta
+        # Saklama süresiyle silinmiş özet satırı yeniden oluşturulmaz
+        _apply_increments(LogKayitHourlyRollup, 'hour', hourly, create=False)
+        _apply_increments(LogKayitDailyRollup, 'date', daily, create=False)
+        _apply_increments(LogKayitUserDailyRollup, 'date', users, create=False)
+    return updated
+
+
+def rebuild_rollups(batch_size=5000, stdout=None):
+    """Özet tablolarını silip tüm log kayıtlarından yeniden oluşturur"""
+    with transaction.atomic():
+        LogKayitHourlyRollup.objects.all().delete()
+        LogKayitDailyRollup.objects.all().delete()
+        LogKayitUserDailyRollup.objects.all().delete()
+        JobCheckpoint.objects.update_or_create(
+            job=ROLLUP_JOB, company=None,
+            defaults={'last_id': 0, 'processed': 0, 'updated': 0, 'completed_at': None},
+        )
+    return update_rollups(batch_size=batch_size, stdout=stdout)
+
+
+def prune_rollups(before):
+    """Saklama süresi dolan günlerin özetlerini siler (cleanup_old_logs ile)"""
+    before_date = timezone.localtime(before).date() if isinstance(before, datetime) else before
+    before_hour = timezone.make_aware(datetime.combine(before_date, datetime.min.time()))
+    LogKayitHourlyRollup.objects.filter(hour__lt=before_hour).delete()
+    LogKayitDailyRollup.objects.filter(date__lt=before_date).delete()
+    LogKayitUserDailyRollup.objects.filter(date__lt=before_date).delete()
+
+
+# ----------------------------------------------------------------------
+# Okuma
+# ----------------------------------------------------------------------
+
+def _day_start(date):
+    """Yerel günün başlangıç anı"""
+    return timezone.make_aware(datetime.combine(date, datetime.min.time()))
+
+
+_COUNTS = {'total': Count('id'), 'suspicious': Count('id', filter=Q(is_suspicious=True))}
+
+
+class CompanyRollups:
+    """Bir firmanın özet okumaları
+
+    Watermark sonrası kayıtlar (tail) her sorguda veritabanında gruplanarak
+    eklenir; Python'a kayıt değil yalnızca grup sayaçları gelir. Sayılar
+    {'total': ..., 'suspicious': ...} biçimindedir.
+    """
+
+    def __init__(self, company):
+        self.company = company
+        self.watermark = rollup_watermark()
+        self._tail_count = None
+
+    def _tail(self, start_date=None, end_date=None):
+        """Henüz özetlenmemiş kayıtlar (yerel gün aralığıyla süzülmüş)"""
+        rows = LogKayit.objects.filter(company=self.company, id__gt=self.watermark)
+        if start_date:
+            rows = rows.filter(giris_zamani__gte=_day_start(start_date))
+        if end_date:
+            rows = rows.filter(giris_zamani__lt=_day_start(end_date + timedelta(days=1)))
+        return rows.order_by()
+
+    @property
+    def tail_count(self):
+        """Özetlenmemiş kayıt sayısı; büyükse sıralamalar doğrudan LogKayit'tan hesaplanır"""
+        if self._tail_count is None:
+            self._tail_count = self._tail().count()
+        return self._tail_count
+
+    @staticmethod
+    def _counts(total=0, suspicious=0):
+        return {'total': total or 0, 'suspicious': suspicious or 0}
+
+    def totals(self, start_date=None, end_date=None):
+        """Tarih aralığındaki (varsayılan: tüm zamanlar) toplam ve şüpheli giriş"""
+        rows = LogKayitDailyRollup.objects.filter(company=self.company)
+        if start_date:
+            rows = rows.filter(date__gte=start_date)
+        if end_date:
+            rows = rows.filter(date__lte=end_date)
+        result = self._counts(**rows.aggregate(total=Sum('total'), suspicious=Sum('suspicious')))
+
+        tail = self._tail(start_date, end_date).aggregate(**_COUNTS)
+        result['total'] += tail['total']
+        result['suspicious'] += tail['suspicious']
+        return result
+
+    def daily(self, start_date, end_date=None):
+        """{gün: sayılar}; kaydı olmayan günler dahil edilmez"""
+        end_date = end_date or timezone.localdate()
+        result = defaultdict(self._counts)
+        for date, total, suspicious in LogKayitDailyRollup.objects.filter(
+            company=self.company, date__range=(start_date, end_date)
+        ).values_list('date', 'total', 'suspicious'):
+            result[date]['total'] += total
+            result[date]['suspicious'] += suspicious
+
+        tail = self._tail(start_date, end_date).annotate(
+            day=TruncDate('giris_zamani', tzinfo=timezone.get_current_timezone())
+        ).values('day').annotate(**_COUNTS).values_list('day', 'total', 'suspicious')
+        for date, total, suspicious in tail:
+            result[date]['total'] += total
+            result[date]['suspicious'] += suspicious
+        return dict(result)
+
+    def hourly(self, since):
+        """{saat başı: sayılar}; since saat başına yuvarlanır"""
+        since = _bucket(since)[0]
+        result = defaultdict(self._counts)
+        for hour, total, suspicious in LogKayitHourlyRollup.objects.filter(
+            company=self.company, hour__gte=since
+        ).values_list('hour', 'total', 'suspicious'):
+            hour = timezone.localtime(hour)
+            result[hour]['total'] += total
+            result[hour]['suspicious'] += suspicious
+
+        tail = self._tail().filter(giris_zamani__gte=since).annotate(
+            hour=TruncHour('giris_zamani', tzinfo=timezone.get_current_timezone())
+        ).values('hour').annotate(**_COUNTS).values_list('hour', 'total', 'suspicious')
+        for hour, total, suspicious in tail:
+            hour = timezone.localtime(hour)
+            result[hour]['total'] += total
+            result[hour]['suspicious'] += suspicious
+        return dict(result)
+
+    def _tail_users(self, start_date):
+        """Özetlenmemiş kayıtların kullanıcı bazında sayaçları"""
+        return self._tail(start_date).values('ad_soyad').annotate(**_COUNTS).values_list(
+            'ad_soyad', 'total', 'suspicious'
+        )
+
+    def user_totals(self, start_date=None):
+        """{ad_soyad: sayılar}; tüm kullanıcılar (segmentasyon, tekil sayım için)"""
+        rows = LogKayitUserDailyRollup.objects.filter(company=self.company)
+        if start_date:
+            rows = rows.filter(date__gte=start_date)
+        result = defaultdict(self._counts)
+        for ad_soyad, total, suspicious in rows.values('ad_soyad').annotate(
+            sum_total=Sum('total'), sum_suspicious=Sum('suspicious')
+        ).values_list('ad_soyad', 'sum_total', 'sum_suspicious'):
+            result[ad_soyad]['total'] += total
+            result[ad_soyad]['suspicious'] += suspicious
+
+        for ad_soyad, total, suspicious in self._tail_users(start_date):
+            result[ad_soyad or '']['total'] += total
+            result[ad_soyad or '']['suspicious'] += suspicious
+        return dict(result)
+
+    def top_users(self, limit=5, start_date=None, exclude_suspicious=False):
+        """En çok giriş yapan kullanıcılar: [{'ad_soyad', 'count'}, ...]
+
+        Veritabanından yalnızca ilk (limit + tail kullanıcı sayısı) satır ve
+        tail'deki kullanıcıların özetleri okunur; birleştirilmiş sıralama
+        tam sonuçla aynıdır. Tail ROLLUP_TAIL_LIMIT'i aşarsa (özetler
+        güncellenmiyorsa) sıralama doğrudan LogKayit üzerinde yapılır.
+        """
+        if self.tail_count > getattr(settings, 'ROLLUP_TAIL_LIMIT', 10000):
+            return self._top_users_from_logs(limit, start_date, exclude_suspicious)
+
+        tail_users = defaultdict(self._counts)
+        for ad_soyad, total, suspicious in self._tail_users(start_date):
+            tail_users[ad_soyad or '']['total'] += total
+            tail_users[ad_soyad or '']['suspicious'] += suspicious
+
+        rows = LogKayitUserDailyRollup.objects.filter(company=self.company)
+        if start_date:
+            rows = rows.filter(date__gte=start_date)
+        grouped = rows.values('ad_soyad').annotate(
+            sum_total=Sum('total'), sum_suspicious=Sum('suspicious')
+        )
+        order = 'sum_valid' if exclude_suspicious else 'sum_total'
+        if exclude_suspicious:
+            grouped = grouped.annotate(sum_valid=F('sum_total') - F('sum_suspicious'))
+
+        result = defaultdict(self._counts)
+        candidates = list(grouped.order_by(f'-{order}', 'ad_soyad')[:limit + len(tail_users)])
+        if tail_users:
+            candidates += list(grouped.filter(ad_soyad__in=tail_users))
+        seen = set()
+        for row in candidates:
+            if row['ad_soyad'] in seen:
+                continue
+            seen.add(row['ad_soyad'])
+            result[row['ad_soyad']]['total'] += row['sum_total']
+            result[row['ad_soyad']]['suspicious'] += row['sum_suspicious']
+        for ad_soyad, counts in tail_users.items():
+            result[ad_soyad]['total'] += counts['total']
+            result[ad_soyad]['suspicious'] += counts['suspicious']
+
+        def _value(counts):
+            return counts['total'] - counts['suspicious'] if exclude_suspicious else counts['total']
+
+        ranked = sorted(result.items(), key=lambda item: (-_value(item[1]), item[0]))
+        return [
+            {'ad_soyad': ad_soyad, 'count': _value(counts)}
+            for ad_soyad, counts in ranked[:limit] if _value(counts) > 0
+        ]
+
+    def _top_users_from_logs(self, limit, start_date, exclude_suspicious):
+        """Özet tabloları geride kaldığında sıralama tek GROUP BY sorgusuyla"""
+        rows = LogKayit.objects.filter(company=self.company)
+        if start_date:
+            rows = rows.filter(giris_zamani__gte=_day_start(start_date))
+        if exclude_suspicious:
+            rows = rows.filter(is_suspicious=False)
+        grouped = rows.order_by().values('ad_soyad').annotate(count=Count('id')).order_by('-count', 'ad_soyad')
+        return [
+            {'ad_soyad': row['ad_soyad'] or '', 'count': row['count']} for row in grouped[:limit]
+        ]
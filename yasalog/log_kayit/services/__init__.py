@@ -1,6 +1,7 @@
 # Services package
 from .utils import generate_log_hash, write_log_to_csv, check_tc_kimlik_no
 from .analytics import AnalyticsService
+from .log_writer import create_log, bulk_create_logs
 
 # Alias for validate_tc_kimlik_no
 def validate_tc_kimlik_no(tc):
@@ -11,5 +12,7 @@ __all__ = [
     'write_log_to_csv', 
     'check_tc_kimlik_no',
     'validate_tc_kimlik_no',
-    'AnalyticsService'
+    'AnalyticsService',
+    'create_log',
+    'bulk_create_logs',
 ]
@@ -1,7 +1,9 @@
 from django.db.models import Count, Q, Avg
 from django.utils import timezone
 from datetime import timedelta, datetime
+from collections import defaultdict
 from ..models import LogKayit, Company
+from ..rollups import CompanyRollups
 import json
 
 class AnalyticsService:
@@ -9,78 +11,69 @@ class AnalyticsService:
     
     @staticmethod
     def get_company_overview(company, days=30):
-        """Şirket genel bakış raporu"""
-        end_date = timezone.now()
+        """Şirket genel bakış raporu (özet tablolarından)"""
+        end_date = timezone.localdate()
         start_date = end_date - timedelta(days=days)
-        
-        logs = LogKayit.objects.filter(
-            company=company,
-            giris_zamani__range=(start_date, end_date)
-        )
+        rollups = CompanyRollups(company)
         
         # Günlük giriş sayıları
-        daily_stats = logs.extra(
-            select={'day': 'date(giris_zamani)'}
-        ).values('day').annotate(count=Count('id')).order_by('day')
+        daily = rollups.daily(start_date, end_date)
+        daily_stats = [
+            {'day': day.isoformat(), 'count': daily[day]['total']} for day in sorted(daily)
+        ]
         
         # En aktif kullanıcılar
-        top_users = logs.values('ad_soyad').annotate(
-            count=Count('id')
-        ).order_by('-count')[:10]
+        top_users = rollups.top_users(limit=10, start_date=start_date)
         
         # Şüpheli giriş analizi
-        suspicious_stats = logs.filter(is_suspicious=True).aggregate(
-            total=Count('id'),
-            percentage=Count('id') * 100.0 / logs.count() if logs.count() > 0 else 0
-        )
+        totals = rollups.totals(start_date, end_date)
+        suspicious_stats = {
+            'total': totals['suspicious'],
+            'percentage': totals['suspicious'] * 100.0 / totals['total'] if totals['total'] > 0 else 0,
+        }
         
-        # Saatlik dağılım
-        hourly_stats = logs.extra(
-            select={'hour': 'extract(hour from giris_zamani)'}
-        ).values('hour').annotate(count=Count('id')).order_by('hour')
+        # Saatlik dağılım (günün saatine göre)
+        hour_counts = defaultdict(int)
+        since = timezone.make_aware(datetime.combine(start_date, datetime.min.time()))
+        for hour, counts in rollups.hourly(since).items():
+            hour_counts[hour.hour] += counts['total']
+        hourly_stats = [{'hour': hour, 'count': hour_counts[hour]} for hour in sorted(hour_counts)]
         
         return {
             'period': f'{days} gün',
-            'total_logs': logs.count(),
-            'daily_stats': list(daily_stats),
-            'top_users': list(top_users),
+            'total_logs': totals['total'],
+            'daily_stats': daily_stats,
+            'top_users': top_users,
             'suspicious_stats': suspicious_stats,
-            'hourly_stats': list(hourly_stats),
-            'avg_daily_logs': logs.count() / days if days > 0 else 0,
+            'hourly_stats': hourly_stats,
+            'avg_daily_logs': totals['total'] / days if days > 0 else 0,
         }
     
     @staticmethod
     def detect_anomalies(company, days=7):
-        """Anormal giriş tespiti"""
-        end_date = timezone.now()
+        """Anormal giriş tespiti (özet tablolarından)"""
+        end_date = timezone.localdate()
         start_date = end_date - timedelta(days=days)
         
-        logs = LogKayit.objects.filter(
-            company=company,
-            giris_zamani__range=(start_date, end_date)
-        )
+        daily_counts = CompanyRollups(company).daily(start_date, end_date)
         
         # Günlük ortalama giriş sayısı
-        daily_avg = logs.count() / days if days > 0 else 0
-        
-        # Günlük giriş sayıları
-        daily_counts = logs.extra(
-            select={'day': 'date(giris_zamani)'}
-        ).values('day').annotate(count=Count('id'))
+        total = sum(counts['total'] for counts in daily_counts.values())
+        daily_avg = total / days if days > 0 else 0
         
         anomalies = []
-        for day_data in daily_counts:
-            count = day_data['count']
+        for day in sorted(daily_counts):
+            count = daily_counts[day]['total']
             if count > daily_avg * 2:  # 2x ortalama üzeri
                 anomalies.append({
-                    'date': day_data['day'],
+                    'date': day.isoformat(),
                     'count': count,
                     'expected': round(daily_avg, 1),
                     'type': 'high_traffic'
                 })
             elif count < daily_avg * 0.3:  # %30 altı
                 anomalies.append({
-                    'date': day_data['day'],
+                    'date': day.isoformat(),
                     'count': count,
                     'expected': round(daily_avg, 1),
                     'type': 'low_traffic'
@@ -95,48 +88,29 @@ class AnalyticsService:
     
     @staticmethod
     def get_user_behavior_patterns(company, days=30):
-        """Kullanıcı davranış analizi"""
-        end_date = timezone.now()
-        start_date = end_date - timedelta(days=days)
-        
-        logs = LogKayit.objects.filter(
-            company=company,
-            giris_zamani__range=(start_date, end_date)
-        )
-        
-        # Tek seferlik kullanıcılar
-        one_time_users = logs.values('ad_soyad').annotate(
-            count=Count('id')
-        ).filter(count=1).count()
-        
-        # Düzenli kullanıcılar (haftada 3+ giriş)
-        regular_users = logs.values('ad_soyad').annotate(
-            count=Count('id')
-        ).filter(count__gte=3).count()
+        """Kullanıcı davranış analizi (kullanıcı-günlük özetlerinden)"""
+        start_date = timezone.localdate() - timedelta(days=days)
+        rollups = CompanyRollups(company)
         
-        # En sık giriş yapan kullanıcılar
-        frequent_users = logs.values('ad_soyad').annotate(
-            count=Count('id')
-        ).order_by('-count')[:5]
+        # Kullanıcı başına giriş sayıları tek gruplu sorguyla
+        counts = [user['total'] for user in rollups.user_totals(start_date).values() if user['total']]
+        total_logs = sum(counts)
         
         # Kullanıcı segmentasyonu
         user_segments = {
-            'one_time': one_time_users,
-            'occasional': logs.values('ad_soyad').annotate(
-                count=Count('id')
-            ).filter(count__range=(2, 5)).count(),
-            'regular': regular_users,
-            'frequent': logs.values('ad_soyad').annotate(
-                count=Count('id')
-            ).filter(count__gt=5).count(),
+            'one_time': sum(1 for count in counts if count == 1),
+            'occasional': sum(1 for count in counts if 2 <= count <= 5),
+            # Düzenli kullanıcılar (3+ giriş)
+            'regular': sum(1 for count in counts if count >= 3),
+            'frequent': sum(1 for count in counts if count > 5),
         }
         
         return {
             'period': f'{days} gün',
-            'total_unique_users': logs.values('ad_soyad').distinct().count(),
+            'total_unique_users': len(counts),
             'user_segments': user_segments,
-            'frequent_users': list(frequent_users),
-            'avg_logs_per_user': logs.count() / logs.values('ad_soyad').distinct().count() if logs.values('ad_soyad').distinct().count() > 0 else 0,
+            'frequent_users': rollups.top_users(limit=5, start_date=start_date),
+            'avg_logs_per_user': total_logs / len(counts) if counts else 0,
         }
     
     @staticmethod
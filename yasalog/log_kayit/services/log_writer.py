@@ -0,0 +1,83 @@
+"""
+Log kaydı oluşturma servisi
+Zaman damgası Python'da atanır; kör indeksler, SHA256 hash ve şifreleme
+INSERT'ten önce bir kez hesaplanır ve kayıt tek sorguyla yazılır.
+"""
+
+from django.conf import settings
+from ..models import LogKayit
+from ..encryption import encryption_manager, is_encrypted
+from ..blind_index import tc_no_index, ip_address_index, mac_address_index
+from .utils import generate_log_hash
+
+# (alan, kör indeks alanı, indeks fonksiyonu, ayar)
+ENCRYPTED_FIELDS = (
+    ('tc_no', 'tc_no_bidx', tc_no_index, 'ENCRYPT_TC_NUMBERS'),
+    ('ip_adresi', 'ip_adresi_bidx', ip_address_index, 'ENCRYPT_IP_ADDRESSES'),
+    ('mac_adresi', 'mac_adresi_bidx', mac_address_index, 'ENCRYPT_MAC_ADDRESSES'),
+)
+
+
+def prepare_logs(logs, timestamp=None):
+    """Kaydedilmemiş log nesnelerini INSERT için hazırlar
+
+    Alanlar açık değer veya başka bir kayıttan kopyalanmış şifreli değer
+    olabilir. Hash ve kör indeksler açık değerden hesaplanır, yalnızca açık
+    değerler şifrelenir (alan başına tek encrypt_many çağrısı).
+    """
+    logs = list(logs)
+    if timestamp is not None:
+        for log in logs:
+            log.giris_zamani = timestamp
+
+    plain = {}
+    for field, index_field, index_func, setting in ENCRYPTED_FIELDS:
+        values = [getattr(log, field) or '' for log in logs]
+
+        # Kopyalanan şifreli değerler hash için çözülür, yeniden şifrelenmez
+        encrypted = [i for i, value in enumerate(values) if is_encrypted(value)]
+        plain_values = list(values)
+        if encrypted:
+            decrypted = encryption_manager.decrypt_many([values[i] for i in encrypted])
+            for i, value in zip(encrypted, decrypted):
+                plain_values[i] = value
+        plain[field] = plain_values
+
+        for log, value in zip(logs, plain_values):
+            setattr(log, index_field, index_func(value))
+
+        if getattr(settings, setting, True):
+            pending = [i for i, value in enumerate(values) if value and not is_encrypted(value)]
+            tokens = encryption_manager.encrypt_many([values[i] for i in pending])
+            for i, token in zip(pending, tokens):
+                setattr(logs[i], field, token)
+
+    for i, log in enumerate(logs):
+        log.sha256_hash = generate_log_hash(
+            plain['tc_no'][i], log.ad_soyad, log.telefon,
+            plain['ip_adresi'][i], plain['mac_adresi'][i], log.giris_zamani
+        )
+    return logs
+
+
+def create_log(log=None, timestamp=None, **fields):
+    """Tek INSERT ile log kaydı oluşturur
+
+    log: kaydedilmemiş LogKayit (ör. form.save(commit=False)); verilmezse
+    fields ile oluşturulur.
+    """
+    if log is None:
+        log = LogKayit(**fields)
+    prepare_logs([log], timestamp)
+    # Alanlar hazır olduğundan LogKayit.save() tekrar şifreleme yapmaz
+    log.save(force_insert=True)
+    return log
+
+
+def bulk_create_logs(logs, batch_size=1000, timestamp=None):
+    """İçe aktarma araçları için toplu log oluşturma
+
+    bulk_create sinyalleri (audit) tetiklemez ve LogKayit.save() çağırmaz.
+    """
+    logs = prepare_logs(logs, timestamp)
+    return LogKayit.objects.bulk_create(logs, batch_size=batch_size)
@@ -1,6 +1,12 @@
-from django.test import TestCase
+from unittest import mock
+import base64
+from django.test import SimpleTestCase, TestCase
+from . import encryption
+from .encryption import EncryptionManager
 from .services import generate_log_hash
-from datetime import datetime
+from .models import Company, LogKayit
+from .blind_index import tc_no_index, ip_address_index, mac_address_index
+from datetime import datetime, timedelta
 import hashlib
 
 # Create your tests here.
@@ -31,3 +37,554 @@ class ServicesTestCase(TestCase):
         expected_hash = hashlib.sha256(expected_input_str.encode('utf-8')).hexdigest()
 
         self.assertEqual(generated_hash, expected_hash)
+
+
+class BlindIndexTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.company = Company.objects.create(name='Test', slug='test')
+
+    def test_normalized_values_share_index(self):
+        """Farklı yazımlardaki aynı MAC/IP aynı indeksi üretmeli"""
+        self.assertEqual(mac_address_index('AA-BB-CC-DD-EE-FF'), mac_address_index('aabb.ccdd.eeff'))
+        self.assertEqual(ip_address_index('2001:db8:0::1'), ip_address_index('2001:DB8::1'))
+        self.assertNotEqual(tc_no_index('12345678901'), mac_address_index('12345678901'))
+
+    def test_lookup_by_encrypted_fields(self):
+        """Şifreli kayıt kör indeks üzerinden bulunmalı, tekrar kaydetmek şifreyi bozmamalı"""
+        log = LogKayit.objects.create(
+            company=self.company, tc_no='10000000146', ad_soyad='Test Kullanıcı',
+            ip_adresi='10.0.0.5', mac_adresi='00:1A:2B:3C:4D:5E',
+        )
+        encrypted_tc = log.tc_no
+        log.save()
+
+        self.assertEqual(log.tc_no, encrypted_tc)
+        self.assertEqual(log.tc_no_decrypted, '10000000146')
+        self.assertEqual(LogKayit.objects.by_tc_no('10000000146').get(), log)
+        self.assertEqual(LogKayit.objects.by_ip_adresi('10.0.0.5').get(), log)
+        self.assertEqual(LogKayit.objects.by_mac_adresi('00-1a-2b-3c-4d-5e').get(), log)
+        self.assertFalse(LogKayit.objects.by_tc_no('10000000147').exists())
+
+    def test_invalid_search_value_matches_nothing(self):
+        """Boş indekse normalize olan arama pasaportlu/indekssiz kayıtları döndürmemeli"""
+        LogKayit.objects.create(
+            company=self.company, kimlik_turu='pasaport', pasaport_no='P123', ad_soyad='Yabancı',
+            ip_adresi='10.0.0.6',
+        )
+        LogKayit.objects.filter(pk=LogKayit.objects.create(
+            company=self.company, tc_no='10000000146', ad_soyad='Eski Kayıt', ip_adresi='10.0.0.7',
+        ).pk).update(tc_no_bidx='', ip_adresi_bidx='')
+
+        self.assertFalse(LogKayit.objects.by_tc_no('abc').exists())
+        self.assertFalse(LogKayit.objects.by_tc_no('   ').exists())
+        self.assertFalse(LogKayit.objects.by_ip_adresi('not-an-ip').exists())
+        self.assertFalse(LogKayit.objects.apply_filters({'tc_no': 'abc'}).exists())
+
+
+class BatchEncryptionTestCase(SimpleTestCase):
+    def test_encrypt_many_round_trip(self):
+        """Toplu şifreleme sırayı korumalı; boş, açık ve eski biçimli değerler okunmalı"""
+        manager = EncryptionManager()
+        values = ['12345678901', '', '10.0.0.1', None, 'AA:BB:CC:DD:EE:FF']
+
+        tokens = manager.encrypt_many(values)
+        self.assertTrue(tokens[0].startswith(encryption.TOKEN_PREFIX))
+        self.assertEqual(tokens[1:2], [''])
+        self.assertIsNone(tokens[3])
+
+        legacy = base64.b64encode(manager._get_fernet().encrypt(b'legacy')).decode('utf-8')
+        self.assertEqual(
+            manager.decrypt_many(tokens + [legacy, 'plain-text']),
+            values + ['legacy', 'plain-text']
+        )
+
+    def test_encrypt_failure_does_not_store_plaintext(self):
+        """Şifreleme hatası yükseltilmeli, bozuk token açık metne dönmeden okunmalı"""
+        manager = EncryptionManager()
+        with mock.patch.object(manager._get_fernet(), 'encrypt', side_effect=RuntimeError('cipher')):
+            with self.assertRaises(RuntimeError):
+                manager.encrypt_many(['12345678901'])
+        with self.assertRaises(TypeError):
+            manager.encrypt(12345)
+        broken = encryption.TOKEN_PREFIX + '!!!'
+        self.assertEqual(manager.decrypt(broken), broken)
+
+    def test_parallel_path_preserves_order(self):
+        """Thread pool ile işlenen parçalar orijinal sırada birleşmeli"""
+        manager = EncryptionManager()
+        values = [str(i) for i in range(50)]
+        with mock.patch.object(encryption, 'PARALLEL_THRESHOLD', 10), \
+                mock.patch.object(encryption, 'PARALLEL_CHUNK_SIZE', 7):
+            tokens = manager.encrypt_many(values, workers=3)
+            self.assertEqual(manager.decrypt_many(tokens, workers=3), values)
+
+    def test_encrypt_rows_skips_encrypted_values(self):
+        """encrypt_existing_data yalnızca açık değerleri şifreleyip indekslemeli"""
+        from .management.commands.encrypt_existing_data import encrypt_rows
+
+        manager = EncryptionManager()
+        token = manager.encrypt('10000000146')
+        rows = [
+            (1, {'tc_no': '10000000146', 'ip_adresi': '', 'mac_adresi': 'aa:bb:cc:dd:ee:ff'}),
+            (2, {'tc_no': token, 'ip_adresi': '', 'mac_adresi': ''}),
+        ]
+
+        changes = encrypt_rows(rows, ['tc_no', 'ip_adresi', 'mac_adresi'], manager=manager)
+        self.assertEqual([row_id for row_id, _ in changes], [1])
+        values = changes[0][1]
+        self.assertEqual(manager.decrypt(values['tc_no']), '10000000146')
+        self.assertEqual(values['tc_no_bidx'], tc_no_index('10000000146'))
+        self.assertEqual(values['mac_adresi_bidx'], mac_address_index('AA-BB-CC-DD-EE-FF'))
+        self.assertNotIn('ip_adresi', values)
+
+    def test_key_rotation_reads_old_and_writes_new(self):
+        """Yeni anahtar başa eklenince eski değerler okunmalı ve rotate ile taşınmalı"""
+        from cryptography.fernet import Fernet
+
+        old_key, new_key = Fernet.generate_key(), Fernet.generate_key()
+        old_manager = EncryptionManager(key=old_key)
+        token = old_manager.encrypt('10000000146')
+        legacy = base64.b64encode(old_manager._get_fernet().encrypt(b'10.0.0.1')).decode('utf-8')
+
+        manager = EncryptionManager(keys=[new_key, old_key])
+        self.assertEqual(manager.decrypt(token), '10000000146')
+        self.assertTrue(manager.needs_rotation(token))
+        self.assertTrue(manager.needs_rotation(legacy))
+        self.assertFalse(manager.needs_rotation(manager.encrypt('x')))
+        self.assertFalse(manager.needs_rotation('plain-text'))
+
+        rotated = manager.rotate_many([token, legacy, 'plain-text', ''])
+        self.assertEqual(rotated[2:], ['plain-text', ''])
+        new_only = EncryptionManager(key=new_key)
+        self.assertEqual(new_only.decrypt_many(rotated[:2]), ['10000000146', '10.0.0.1'])
+        self.assertFalse(manager.needs_rotation(rotated[0]))
+
+
+class LogWriterTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.company = Company.objects.create(name='Test', slug='test')
+
+    def test_create_log_single_insert(self):
+        """Kayıt tek INSERT ile yazılmalı, hash açık değerlerden hesaplanmalı"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from .services import create_log
+
+        with CaptureQueriesContext(connection) as queries:
+            log = create_log(
+                company=self.company, tc_no='10000000146', ad_soyad='Test Kullanıcı',
+                telefon='5551234567', ip_adresi='10.0.0.5', mac_adresi='00:1A:2B:3C:4D:5E',
+            )
+        table = LogKayit._meta.db_table
+        statements = [query['sql'] for query in queries.captured_queries if table in query['sql']]
+        self.assertEqual(len(statements), 1)
+        self.assertTrue(statements[0].startswith('INSERT'))
+
+        stored = LogKayit.objects.get(pk=log.pk)
+        self.assertEqual(stored.giris_zamani, log.giris_zamani)
+        self.assertEqual(stored.tc_no_decrypted, '10000000146')
+        self.assertEqual(stored.sha256_hash, generate_log_hash(
+            '10000000146', 'Test Kullanıcı', '5551234567', '10.0.0.5', '00:1A:2B:3C:4D:5E',
+            stored.giris_zamani
+        ))
+
+        # Başka kayıttan kopyalanan şifreli değer yeniden şifrelenmez
+        copy = create_log(company=self.company, tc_no=stored.tc_no, ad_soyad='Test Kullanıcı',
+                          ip_adresi='10.0.0.6')
+        self.assertEqual(copy.tc_no, stored.tc_no)
+        self.assertEqual(copy.tc_no_bidx, stored.tc_no_bidx)
+
+    def test_bulk_create_logs(self):
+        """Toplu oluşturma indeksleri, hash'i ve şifrelemeyi doldurmalı"""
+        from .services import bulk_create_logs
+
+        bulk_create_logs([
+            LogKayit(company=self.company, tc_no=f'1000000014{i}', ad_soyad=f'Kişi {i}',
+                     ip_adresi=f'10.0.0.{i}')
+            for i in range(5)
+        ])
+        self.assertEqual(LogKayit.objects.by_ip_adresi('10.0.0.3').get().tc_no_decrypted, '10000000143')
+        self.assertFalse(LogKayit.objects.filter(sha256_hash='').exists())
+
+
+class PortalCacheTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.company = Company.objects.create(name='Test', slug='test', theme_color='#112233')
+
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.url = '/giris/test/'
+
+    def test_portal_page_cached_and_invalidated(self):
+        """İkinci istek firma sorgusu yapmamalı; firma kaydı sayfayı yenilemeli"""
+        from django.conf import settings
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        first = self.client.get(self.url)
+        self.assertContains(first, '#112233')
+        self.assertNotIn('__portal_csrf_token__', first.content.decode())
+
+        with CaptureQueriesContext(connection) as queries:
+            second = self.client.get(self.url)
+        self.assertEqual(second.status_code, 200)
+        self.assertFalse(any('log_kayit_company' in q['sql'] for q in queries.captured_queries))
+        self.assertEqual(second['ETag'], first['ETag'])
+
+        self.assertIn(settings.CSRF_COOKIE_NAME, self.client.cookies)
+        not_modified = self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(not_modified.status_code, 304)
+
+        company = Company.objects.get(pk=self.company.pk)
+        company.theme_color = '#445566'
+        company.save()
+
+        changed = self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(changed.status_code, 200)
+        self.assertContains(changed, '#445566')
+
+
+class DeviceSessionTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.company = Company.objects.create(name='Test', slug='test')
+
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+
+    def test_remember_and_forget_device(self):
+        """Tanınan cihaz tek kayıtla çözülmeli; unutmak log kaydını silmemeli"""
+        from .models import DeviceSession
+        from .services import create_log
+
+        log = create_log(company=self.company, tc_no='10000000146', ad_soyad='Test Kullanıcı',
+                         ip_adresi='10.0.0.5', mac_adresi='aa:bb:cc:dd:ee:01')
+        DeviceSession.remember(self.company, 'aa:bb:cc:dd:ee:01', log)
+
+        response = self.client.get('/giris/test/?mac=AA-BB-CC-DD-EE-01', HTTP_USER_AGENT='Test-UA')
+        self.assertTemplateUsed(response, 'log_kayit/tesekkur.html')
+        self.assertEqual(LogKayit.objects.count(), 2)
+        session = DeviceSession.lookup(self.company, 'aa:bb:cc:dd:ee:01')
+        self.assertNotEqual(session.log_id, log.pk)
+        self.assertEqual(session.log.tc_no_decrypted, '10000000146')
+        self.assertIsNone(DeviceSession.lookup(self.company, 'aa:bb:cc:dd:ee:02'))
+
+        self.client.get('/giris/cikis/test/?mac=aa:bb:cc:dd:ee:01')
+        self.assertIsNone(DeviceSession.lookup(self.company, 'aa:bb:cc:dd:ee:01'))
+        self.assertEqual(LogKayit.objects.count(), 2)
+
+    def test_same_user_agent_does_not_share_identity(self):
+        """Aynı User-Agent'lı iki cihaz birbirinin kimliğiyle kayda geçmemeli"""
+        from django.test import Client
+        from .models import DeviceSession
+
+        first, second = Client(HTTP_USER_AGENT='Ortak-UA'), Client(HTTP_USER_AGENT='Ortak-UA')
+        response = first.post('/giris/test/', {
+            'kimlik_turu': 'tc', 'tc_no': '10000000146', 'ad_soyad': 'İlk Ziyaretçi', 'telefon': '5550000000',
+        })
+        self.assertTemplateUsed(response, 'log_kayit/tesekkur.html')
+        self.assertEqual(DeviceSession.objects.count(), 1)
+
+        # Çerezi olmayan cihaz (aynı UA, MAC yok ya da yer tutucu MAC) formu görür
+        for url in ('/giris/test/', '/giris/test/?mac=00:00:00:00:00:00'):
+            self.assertTemplateNotUsed(second.get(url), 'log_kayit/tesekkur.html')
+        self.assertEqual(LogKayit.objects.count(), 1)
+
+        # İmzalı çerezi taşıyan ilk cihaz tanınır; değiştirilmiş çerez kabul edilmez
+        self.assertTemplateUsed(first.get('/giris/test/'), 'log_kayit/tesekkur.html')
+        self.assertEqual(LogKayit.objects.count(), 2)
+        second.cookies['yasalog_device'] = first.cookies['yasalog_device'].value + 'x'
+        self.assertTemplateNotUsed(second.get('/giris/test/'), 'log_kayit/tesekkur.html')
+        self.assertEqual(LogKayit.objects.count(), 2)
+
+
+class LogRollupTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.company = Company.objects.create(name='Test', slug='test')
+
+    def _create_logs(self, names, suspicious=False, hours_ago=2):
+        from django.utils import timezone
+        from .services import bulk_create_logs
+
+        timestamp = timezone.now() - timedelta(hours=hours_ago)
+        bulk_create_logs([
+            LogKayit(company=self.company, ad_soyad=name, ip_adresi='10.0.0.1', is_suspicious=suspicious)
+            for name in names
+        ], timestamp=timestamp)
+
+    def test_rollups_match_raw_counts(self):
+        """Özet + tail okumaları ham sayımla aynı olmalı; güncelleme artımlı olmalı"""
+        from django.utils import timezone
+        from .commit_horizon import HORIZON_JOB
+        from .models import JobCheckpoint
+        from .rollups import CompanyRollups, update_rollups
+
+        self._create_logs(['Ali', 'Ali', 'Ayşe'])
+        self._create_logs(['Mehmet'], suspicious=True)
+        self.assertEqual(update_rollups(), 4)
+
+        # Gelecek tarihli kayıt imleci durdurmaz; ID boşluğu (commit edilmemiş kayıt) beklenir
+        self._create_logs(['Ayşe'], hours_ago=-5)
+        self._create_logs(['Boşluk'])
+        self._create_logs(['Ayşe'])
+        LogKayit.objects.filter(ad_soyad='Boşluk').delete()
+        self.assertEqual(update_rollups(), 1)
+        self.assertEqual(update_rollups(), 0)
+        JobCheckpoint.objects.filter(job=HORIZON_JOB).update(gap_seen_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(update_rollups(), 1)
+
+        # Watermark sonrası kayıtlar (tail)
+        self._create_logs(['Ali'], hours_ago=0)
+
+        rollups = CompanyRollups(self.company)
+        logs = LogKayit.objects.filter(company=self.company)
+        self.assertEqual(rollups.totals(), {'total': logs.count(), 'suspicious': 1})
+        self.assertEqual(sum(counts['total'] for counts in rollups.daily(
+            timezone.localdate() - timedelta(days=1), timezone.localdate() + timedelta(days=1)
+        ).values()), logs.count())
+        self.assertEqual(sum(counts['total'] for counts in rollups.hourly(
+            timezone.now() - timedelta(hours=3)
+        ).values()), logs.count())
+        top_users = [{'ad_soyad': 'Ali', 'count': 3}, {'ad_soyad': 'Ayşe', 'count': 3}]
+        self.assertEqual(rollups.top_users(limit=2), top_users)
+        # Özetler geride kalmışsa sıralama doğrudan log tablosundan
+        with self.settings(ROLLUP_TAIL_LIMIT=0):
+            self.assertEqual(CompanyRollups(self.company).top_users(limit=2), top_users)
+        self.assertEqual(rollups.top_users(limit=1, exclude_suspicious=True)[0]['count'], 3)
+        self.assertEqual(len(rollups.user_totals()), 3)
+
+        # Tekrar çalıştırmak sayıları değiştirmemeli
+        update_rollups()
+        self.assertEqual(CompanyRollups(self.company).totals()['total'], logs.count())
+
+    def test_admin_suspicious_flag_updates_rollups(self):
+        """Özetlenmiş kayıt admin'den şüpheli işaretlenince özetler ham sayımla aynı kalmalı"""
+        from django.contrib.admin.sites import site
+        from django.test import RequestFactory
+        from .rollups import CompanyRollups, set_suspicious, update_rollups
+
+        self._create_logs(['Ali', 'Ali', 'Ayşe'])
+        self.assertEqual(update_rollups(), 3)
+        self._create_logs(['Ayşe'])  # henüz özetlenmemiş (tail)
+
+        admin = site._registry[LogKayit]
+        admin.message_user = lambda *args, **kwargs: None
+        ali = LogKayit.objects.filter(ad_soyad='Ali')
+        admin.mark_as_suspicious(RequestFactory().get('/'), LogKayit.objects.filter(pk__in=[
+            ali.first().pk, LogKayit.objects.filter(ad_soyad='Ayşe').last().pk
+        ]))
+
+        def check():
+            rollups = CompanyRollups(self.company)
+            self.assertEqual(rollups.totals(), {'total': 4, 'suspicious': LogKayit.objects.filter(is_suspicious=True).count()})
+            self.assertEqual(rollups.top_users(exclude_suspicious=True), [
+                {'ad_soyad': name, 'count': LogKayit.objects.filter(ad_soyad=name, is_suspicious=False).count()}
+                for name in ('Ali', 'Ayşe')
+            ])
+
+        check()
+        update_rollups()
+        check()
+        self.assertEqual(set_suspicious(ali, suspicious=False), 1)
+        check()
+
+        # API üzerinden PATCH de özet sayaçlarını düzeltir
+        from django.contrib.auth.models import User
+        from rest_framework.test import APIRequestFactory, force_authenticate
+        from api.views import LogKayitViewSet
+        request = APIRequestFactory().patch('/', {'is_suspicious': True}, format='json')
+        force_authenticate(request, user=User.objects.create_superuser('admin', 'admin@example.com', 'x'))
+        response = LogKayitViewSet.as_view({'patch': 'partial_update'})(
+            request, company_slug='test', pk=ali.first().pk
+        )
+        self.assertEqual((response.status_code, response.data['is_suspicious']), (200, True))
+        check()
+
+
+class KeysetPaginationTestCase(TestCase):
+    def test_pages_cover_ties_and_go_back(self):
+        """Aynı giris_zamani'lı kayıtlar atlanmamalı, geri sayfa aynı kayıtları vermeli"""
+        from django.utils import timezone
+        from .services import bulk_create_logs
+        import base64
+        from .pagination import keyset_paginate, decode_cursor, InvalidCursor
+
+        company = Company.objects.create(name='Test', slug='test')
+        now = timezone.now()
+        for minutes in (3, 2, 1):
+            bulk_create_logs([
+                LogKayit(company=company, ad_soyad=f'Kişi {minutes}-{i}', ip_adresi='10.0.0.1')
+                for i in range(4)
+            ], timestamp=now - timedelta(minutes=minutes))
+
+        logs = LogKayit.objects.filter(company=company)
+        expected = list(logs.order_by('-giris_zamani', '-id').values_list('id', flat=True))
+
+        pages, page = [], keyset_paginate(logs, per_page=5)
+        while True:
+            pages.append(page)
+            if not page.has_next():
+                break
+            page = keyset_paginate(logs, page.next_cursor, per_page=5)
+
+        self.assertEqual([log.id for page in pages for log in page], expected)
+        self.assertEqual([len(page) for page in pages], [5, 5, 2])
+
+        previous = keyset_paginate(logs, pages[-1].previous_cursor, per_page=5)
+        self.assertEqual([log.id for log in previous], [log.id for log in pages[1]])
+        self.assertTrue(previous.has_previous())
+
+        self.assertEqual(decode_cursor(pages[0].next_cursor)[1], pages[0].object_list[-1].giris_zamani)
+        # datetime aralığını veya id sınırını aşan sayılar da geçersiz cursor sayılmalı
+        overflow = base64.urlsafe_b64encode(b'n99999999999999999999.1').decode('ascii')
+        for cursor in (overflow, base64.urlsafe_b64encode(b'n1.99999999999999999999').decode('ascii'), 'bozuk'):
+            with self.assertRaises(InvalidCursor):
+                keyset_paginate(logs, cursor)
+
+        # Panel geçersiz cursor'da ilk sayfaya döner (API 404 verir)
+        from django.test import RequestFactory
+        from .views.dashboard import _get_page
+        request = RequestFactory().get('/', {'cursor': overflow})
+        self.assertEqual([log.id for log in _get_page(request, logs, 'cursor', 5, None)], expected[:5])
+
+
+class StreamingExportTestCase(TestCase):
+    def test_csv_and_zip_stream_all_rows(self):
+        """CSV ve ZIP parça parça üretilmeli, arşiv geçerli olmalı"""
+        import csv
+        import io
+        import zipfile
+        from .services import bulk_create_logs
+        from .exports import iter_csv, iter_zip, openpyxl, canvas
+
+        company = Company.objects.create(name='Test', slug='test')
+        bulk_create_logs([
+            LogKayit(company=company, ad_soyad=f'Kişi {i}', ip_adresi='10.0.0.1') for i in range(7)
+        ])
+        logs = LogKayit.objects.filter(company=company)
+
+        progress = []
+        with self.settings(EXPORT_CHUNK_SIZE=3):
+            chunks = list(iter_csv(logs, progress.append))
+        self.assertGreater(len(chunks), 1)
+        rows = list(csv.reader(io.StringIO(b''.join(chunks).decode('utf-8-sig'))))
+        self.assertEqual(len(rows), 8)
+        self.assertEqual({row[1] for row in rows[1:]}, {f'Kişi {i}' for i in range(7)})
+        self.assertEqual(progress[-1], 7)
+
+        archive = zipfile.ZipFile(io.BytesIO(b''.join(iter_zip(logs))))
+        self.assertIsNone(archive.testzip())
+        expected = [name for name, module in (('loglar.xlsx', openpyxl), ('loglar.pdf', canvas)) if module]
+        self.assertEqual(archive.namelist(), expected)
+
+
+class ExportJobTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.company_a = Company.objects.create(name='A', slug='a')
+        cls.company_b = Company.objects.create(name='B', slug='b')
+
+    def setUp(self):
+        import tempfile
+        self.export_root = tempfile.mkdtemp()
+
+    def tearDown(self):
+        import shutil
+        shutil.rmtree(self.export_root, ignore_errors=True)
+
+    def test_queue_caps_and_runs_jobs(self):
+        """Firma sınırı aşılmamalı, iş dosya üretip tamamlanmalı, TC açık saklanmamalı"""
+        from .models import ExportJob
+        from .export_jobs import (
+            enqueue_export, claim_next_job, run_job, stored_filters, ExportQueueFull, cleanup_export_jobs
+        )
+        from .services import bulk_create_logs
+
+        bulk_create_logs([
+            LogKayit(company=self.company_a, ad_soyad=f'Kişi {i}', ip_adresi='10.0.0.1') for i in range(5)
+        ])
+
+        with self.settings(EXPORT_ROOT=self.export_root, EXPORT_MAX_QUEUED_PER_COMPANY=2):
+            first = enqueue_export(self.company_a, None, 'csv', {'date_start': '2000-01-01'})
+            enqueue_export(self.company_a, None, 'excel', {})
+            with self.assertRaises(ExportQueueFull):
+                enqueue_export(self.company_a, None, 'pdf', {})
+            other = enqueue_export(self.company_b, None, 'csv', {})
+            self.assertEqual(stored_filters({'tc_no': '12345678901'}), {'tc_no_bidx': tc_no_index('12345678901')})
+
+            # A'nın ilk işi çalışırken ikinci işi beklemeli, sıradaki B olmalı
+            job = claim_next_job('test:1')
+            self.assertEqual(job.pk, first.pk)
+            self.assertEqual(claim_next_job('test:2').pk, other.pk)
+            self.assertIsNone(claim_next_job('test:3'))
+
+            self.assertTrue(run_job(job))
+            job.refresh_from_db()
+            self.assertEqual((job.status, job.progress, job.total_rows), (ExportJob.STATUS_DONE, 100, 5))
+            with job.file.open('rb') as output:
+                self.assertEqual(len(output.read().decode('utf-8-sig').splitlines()), 6)
+
+            ExportJob.objects.filter(pk=job.pk).update(finished_at=job.finished_at - timedelta(days=2))
+            path = job.file.path
+            self.assertEqual(cleanup_export_jobs(), 1)
+            import os
+            self.assertFalse(os.path.exists(path))
+
+    def test_queued_export_matches_dashboard_filter(self):
+        """Sıraya alınan iş panelle aynı kayıtları seçmeli; geçersiz TC tüm kayıtları döndürmemeli"""
+        from django.test import RequestFactory
+        from .export_jobs import enqueue_export, job_queryset
+        from .views.dashboard import get_filtered_logs, get_filter_params
+
+        LogKayit.objects.create(company=self.company_a, tc_no='10000000146', ad_soyad='TC', ip_adresi='10.0.0.1')
+        LogKayit.objects.create(
+            company=self.company_a, kimlik_turu='pasaport', pasaport_no='P1', ad_soyad='Pasaport', ip_adresi='10.0.0.2'
+        )
+
+        for query in ({'tc_no': 'abc'}, {'tc_no': '10000000146'}, {'ip_adresi': '10.0.0.2'}, {'mac_adresi': '-'}):
+            request = RequestFactory().get('/', query)
+            job = enqueue_export(self.company_a, None, 'csv', get_filter_params(request))
+            dashboard_ids = set(get_filtered_logs(request, self.company_a).values_list('id', flat=True))
+            self.assertEqual(set(job_queryset(job).values_list('id', flat=True)), dashboard_ids, query)
+            job.delete()
+        self.assertFalse(job_queryset(enqueue_export(self.company_a, None, 'csv', {'tc_no': 'abc'})).exists())
+
+
+class RetentionTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.company = Company.objects.create(name='Test', slug='test')
+
+    def test_cleanup_deletes_in_batches_with_dependents(self):
+        """Eski kayıtlar bağlı oturum/imzalarıyla silinmeli, tek denetim kaydı yazılmalı"""
+        from django.core.management import call_command
+        from django.utils import timezone
+        from audit_logging.models import AuditLog
+        from timestamp_signing.models import TimestampAuthority, TimestampSignature
+        from .models import DeviceSession
+        from .services import bulk_create_logs
+
+        bulk_create_logs([
+            LogKayit(company=self.company, ad_soyad=f'Kişi {i}', ip_adresi='10.0.0.1') for i in range(7)
+        ])
+        logs = list(LogKayit.objects.order_by('id'))
+        LogKayit.objects.filter(id__lte=logs[4].id).update(giris_zamani=timezone.now() - timedelta(days=800))
+        authority = TimestampAuthority.objects.create(name='Test', authority_type='CUSTOM')
+        TimestampSignature.objects.create(log_entry=logs[0], company=self.company, authority=authority)
+        TimestampSignature.objects.create(log_entry=logs[6], company=self.company, authority=authority)
+        DeviceSession.remember(self.company, 'Test-UA', logs[1])
+        AuditLog.objects.all().delete()
+
+        call_command('cleanup_old_logs', batch_size=2, verbosity=0)
+
+        self.assertEqual(list(LogKayit.objects.values_list('id', flat=True).order_by('id')), [logs[5].id, logs[6].id])
+        self.assertEqual(list(TimestampSignature.objects.values_list('log_entry_id', flat=True)), [logs[6].id])
+        self.assertFalse(DeviceSession.objects.exists())
+        audit = AuditLog.objects.get()
+        self.assertEqual(audit.details['deleted'], 5)
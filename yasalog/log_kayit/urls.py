@@ -50,6 +50,11 @@ urlpatterns = [
     path('export/excel/<int:company_id>/', views.dashboard_export_excel, name='dashboard_export_excel'),
     path('export/pdf/<int:company_id>/', views.dashboard_export_pdf, name='dashboard_export_pdf'),
     path('export/zip/<int:company_id>/', views.dashboard_export_zip, name='dashboard_export_zip'),
+    path('export/csv/<int:company_id>/', views.dashboard_export_csv, name='dashboard_export_csv'),
+    path('export/jobs/<slug:company_slug>/', views.export_job_list, name='export_job_list'),
+    path('export/jobs/<slug:company_slug>/create/', views.export_job_create, name='export_job_create'),
+    path('export/job/<int:job_id>/', views.export_job_status, name='export_job_status'),
+    path('export/job/<int:job_id>/download/', views.export_job_download, name='export_job_download'),
     
     # Gelişmiş Analitik URL'leri
     path('analytics/<slug:company_slug>/', views.advanced_analytics, name='advanced_analytics'),
@@ -2,54 +2,56 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.http import HttpResponseForbidden, JsonResponse
 from django.utils import timezone
+from django.utils.dateparse import parse_date
 from datetime import timedelta
-from django.db.models.functions import TruncHour
-from django.db.models import Count
-from django.core.paginator import Paginator
 from django.utils.translation import gettext as _
 from django.views.decorators.http import require_http_methods
 
-from ..models import LogKayit, Company, CompanyUser
+from ..models import LogKayit, LogKayitQuerySet, Company, CompanyUser
 from ..services.analytics import AnalyticsService
+from ..rollups import CompanyRollups
+from ..pagination import keyset_paginate, InvalidCursor
 
-def _get_dashboard_statistics(logs, company):
-    """Calculates basic statistics and card data for the dashboard."""
-    today = timezone.now().date()
-    toplam_giris = logs.count()
-    suspicious_logs = logs.filter(is_suspicious=True)
-    today_logs = logs.filter(giris_zamani__date=today)
-    most_active = logs.values('ad_soyad').annotate(count=Count('id')).order_by('-count').first()
+def _get_dashboard_statistics(logs, company, rollups):
+    """Calculates basic statistics and card data for the dashboard (from rollup tables)."""
+    totals = rollups.totals()
+    today = rollups.totals(start_date=timezone.localdate())
+    last_log = logs.select_related(None).only('ad_soyad', 'giris_zamani').first()
+    most_active = rollups.top_users(limit=1)
 
     return {
-        'toplam_giris': toplam_giris,
-        'son_giris': logs.first(),
+        'toplam_giris': totals['total'],
+        'son_giris': last_log,
         'toplam_kullanici': CompanyUser.objects.filter(company=company).count(),
         'toplam_aktif_kullanici': CompanyUser.objects.filter(company=company, user__is_active=True).count(),
-        'toplam_suspicious': suspicious_logs.count(),
-        'today_total': today_logs.count(),
-        'today_suspicious': today_logs.filter(is_suspicious=True).count(),
-        'last_log_user': logs.first().ad_soyad if logs.first() else None,
-        'last_log_time': logs.first().giris_zamani if logs.first() else None,
-        'most_active_user': most_active['ad_soyad'] if most_active else None,
-        'most_active_count': most_active['count'] if most_active else None,
+        'toplam_suspicious': totals['suspicious'],
+        'today_total': today['total'],
+        'today_suspicious': today['suspicious'],
+        'last_log_user': last_log.ad_soyad if last_log else None,
+        'last_log_time': last_log.giris_zamani if last_log else None,
+        'most_active_user': most_active[0]['ad_soyad'] if most_active else None,
+        'most_active_count': most_active[0]['count'] if most_active else None,
     }
 
-def _get_chart_data(logs):
-    """Prepares data for the dashboard charts."""
-    today = timezone.now().date()
+def _get_chart_data(rollups):
+    """Prepares data for the dashboard charts (valid logs, from rollup tables)."""
+    today = timezone.localdate()
     days = [today - timedelta(days=i) for i in range(29, -1, -1)]
-    daily_counts = [logs.filter(giris_zamani__date=day).count() for day in days]
+    daily_map = rollups.daily(days[0], today)
+    daily_counts = [
+        daily_map[day]['total'] - daily_map[day]['suspicious'] if day in daily_map else 0
+        for day in days
+    ]
 
-    now = timezone.now()
+    now = timezone.localtime()
     last_24_hours = [now.replace(minute=0, second=0, microsecond=0) - timedelta(hours=i) for i in range(23, -1, -1)]
-    hourly_qs = logs.filter(giris_zamani__gte=now - timedelta(hours=24))
-    hour_map = {
-        h['hour'].replace(tzinfo=None): h['count'] 
-        for h in hourly_qs.annotate(hour=TruncHour('giris_zamani')).values('hour').annotate(count=Count('id'))
-    }
-    hourly_counts = [hour_map.get(h.replace(tzinfo=None), 0) for h in last_24_hours]
-    
-    top_users = logs.values('ad_soyad').annotate(count=Count('id')).order_by('-count')[:5]
+    hour_map = rollups.hourly(last_24_hours[0])
+    hourly_counts = [
+        hour_map[hour]['total'] - hour_map[hour]['suspicious'] if hour in hour_map else 0
+        for hour in last_24_hours
+    ]
+
+    top_users = rollups.top_users(limit=5, exclude_suspicious=True)
 
     return {
         'days': [day.strftime('%d.%m') for day in days],
@@ -59,6 +61,26 @@ def _get_chart_data(logs):
         'top_users': top_users,
     }
 
+def _get_page(request, logs, param, per_page, approximate_count):
+    """Keyset sayfalama; geçersiz cursor ilk sayfaya döner (Paginator.get_page gibi)"""
+    try:
+        return keyset_paginate(logs, request.GET.get(param), per_page, approximate_count)
+    except InvalidCursor:
+        return keyset_paginate(logs, None, per_page, approximate_count)
+
+def _approximate_counts(request, rollups):
+    """Liste toplamları özet tablolarından; tarih dışında filtre varsa None"""
+    if any(request.GET.get(name, '').strip() for name in ('tc_no', 'ip_adresi', 'mac_adresi', 'ad_soyad')):
+        return None
+    try:
+        totals = rollups.totals(
+            start_date=parse_date(request.GET.get('date_start', '').strip()),
+            end_date=parse_date(request.GET.get('date_end', '').strip()),
+        )
+    except ValueError:
+        return None
+    return {'valid': totals['total'] - totals['suspicious'], 'suspicious': totals['suspicious']}
+
 @login_required
 def company_dashboard(request, company_id=None, company_slug=None):
     if company_slug:
@@ -77,11 +99,13 @@ def company_dashboard(request, company_id=None, company_slug=None):
     valid_logs = logs_to_filter.filter(is_suspicious=False)
     suspicious_logs = logs_to_filter.filter(is_suspicious=True)
 
-    paginator = Paginator(valid_logs.order_by('-giris_zamani'), 25)
-    page_obj = paginator.get_page(request.GET.get('page'))
-    
-    suspicious_paginator = Paginator(suspicious_logs.order_by('-giris_zamani'), 10)
-    suspicious_page_obj = suspicious_paginator.get_page(request.GET.get('suspicious_page'))
+    rollups = CompanyRollups(company)
+    counts = _approximate_counts(request, rollups)
+
+    page_obj = _get_page(request, valid_logs, 'cursor', 25, counts and counts['valid'])
+    suspicious_page_obj = _get_page(
+        request, suspicious_logs, 'suspicious_cursor', 10, counts and counts['suspicious']
+    )
 
     is_company_admin = CompanyUser.objects.filter(user=request.user, company=company, role='admin').exists() or request.user.is_superuser
     user_cu = CompanyUser.objects.filter(user=request.user, company=company).first()
@@ -99,32 +123,20 @@ def company_dashboard(request, company_id=None, company_slug=None):
         'theme_color': company.theme_color or "#0d6efd",
         'logo_url': company.logo.url if company.logo else None,
     }
-    context.update(_get_dashboard_statistics(all_logs, company))
-    context.update(_get_chart_data(all_logs.filter(is_suspicious=False)))
+    context.update(_get_dashboard_statistics(all_logs, company, rollups))
+    context.update(_get_chart_data(rollups))
 
     return render(request, 'log_kayit/dashboard.html', context)
 
 def get_filtered_logs(request, company, base_queryset=None):
     """Applies filters from the request to a queryset of logs."""
     logs = base_queryset if base_queryset is not None else LogKayit.objects.filter(company=company)
-    
-    filter_params = {
-        'tc_no': request.GET.get('tc_no', '').strip(),
-        'ad_soyad': request.GET.get('ad_soyad', '').strip(),
-        'date_start': request.GET.get('date_start', '').strip(),
-        'date_end': request.GET.get('date_end', '').strip(),
-    }
-    
-    if filter_params['tc_no']:
-        logs = logs.filter(tc_no__icontains=filter_params['tc_no'])
-    if filter_params['ad_soyad']:
-        logs = logs.filter(ad_soyad__icontains=filter_params['ad_soyad'])
-    if filter_params['date_start']:
-        logs = logs.filter(giris_zamani__date__gte=filter_params['date_start'])
-    if filter_params['date_end']:
-        logs = logs.filter(giris_zamani__date__lte=filter_params['date_end'])
-        
-    return logs
+    return logs.apply_filters(get_filter_params(request))
+
+def get_filter_params(request):
+    """Returns the dashboard filter values present in the request."""
+    params = {name: request.GET.get(name, '').strip() for name in LogKayitQuerySet.FILTER_FIELDS}
+    return {name: value for name, value in params.items() if value}
 
 @login_required
 @require_http_methods(["GET"])
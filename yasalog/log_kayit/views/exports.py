@@ -1,12 +1,73 @@
 from django.shortcuts import get_object_or_404
 from django.contrib.auth.decorators import login_required
-from django.http import HttpResponseForbidden, HttpResponse
+from django.conf import settings
+from django.http import HttpResponseForbidden, HttpResponse, FileResponse, StreamingHttpResponse, JsonResponse, Http404
+from django.urls import reverse
+from django.views.decorators.http import require_POST
 from django.utils import timezone
+from django.utils.http import content_disposition_header
 from django.utils.translation import gettext as _
 
-from ..models import Company, CompanyUser
-from ..exports import export_as_excel, export_as_pdf, export_as_zip
-from .dashboard import get_filtered_logs
+from ..models import Company, CompanyUser, ExportJob
+from ..exports import EXPORT_FORMATS, export_as_excel, export_as_pdf, iter_csv, iter_zip
+from ..export_jobs import enqueue_export, ExportQueueFull
+from .dashboard import get_filtered_logs, get_filter_params
+
+def _export_filename(company, export_format):
+    extension = EXPORT_FORMATS[export_format][1]
+    return f'loglar_{company.name}_{timezone.now().date()}.{extension}'
+
+def _file_response(output, company, export_format):
+    """Geçici dosyadaki çıktıyı parça parça gönderir; dosya yanıt bitince kapanır"""
+    return FileResponse(
+        output,
+        as_attachment=True,
+        filename=_export_filename(company, export_format),
+        content_type=EXPORT_FORMATS[export_format][0],
+    )
+
+def _streaming_response(chunks, company, export_format):
+    """Üretildikçe gönderilen çıktı (CSV, ZIP)"""
+    response = StreamingHttpResponse(chunks, content_type=EXPORT_FORMATS[export_format][0])
+    response['Content-Disposition'] = content_disposition_header(True, _export_filename(company, export_format))
+    return response
+
+def _job_json(job):
+    return {
+        'id': job.pk,
+        'format': job.export_format,
+        'status': job.status,
+        'status_display': str(job.get_status_display()),
+        'progress': job.progress,
+        'processed_rows': job.processed_rows,
+        'total_rows': job.total_rows,
+        'error': job.error,
+        'created_at': job.created_at.isoformat(),
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None,
+        'status_url': reverse('log_kayit:export_job_status', args=[job.pk]),
+        'download_url': reverse('log_kayit:export_job_download', args=[job.pk]) if job.status == ExportJob.STATUS_DONE else None,
+    }
+
+def _queue_export(request, company, export_format):
+    """İşi sıraya alır; 202 ve iş durumu veya sınır doluysa 429 döner"""
+    try:
+        job = enqueue_export(company, request.user, export_format, get_filter_params(request))
+    except ExportQueueFull:
+        return JsonResponse({'error': _("Too many exports are running for this company. Please try again later.")}, status=429)
+    return JsonResponse(_job_json(job), status=202)
+
+def _queue_if_large(request, company, logs, export_format):
+    """EXPORT_SYNC_MAX_ROWS üzerindeki dışa aktarmalar istek içinde çalışmaz, sıraya alınır
+
+    Sayım LIMIT'li alt sorguyla yapılır, tüm aralık sayılmaz.
+    """
+    limit = getattr(settings, 'EXPORT_SYNC_MAX_ROWS', 10000)
+    if logs.order_by()[:limit + 1].count() > limit:
+        return _queue_export(request, company, export_format)
+    return None
+
+def _can_access_company(user, company):
+    return user.is_superuser or CompanyUser.objects.filter(user=user, company=company).exists()
 
 @login_required
 def dashboard_export_excel(request, company_id=None, company_slug=None):
@@ -21,13 +82,14 @@ def dashboard_export_excel(request, company_id=None, company_slug=None):
         return HttpResponseForbidden()
         
     logs = get_filtered_logs(request, company)
+    queued = _queue_if_large(request, company, logs, 'excel')
+    if queued:
+        return queued
     output, error = export_as_excel(logs)
     if error:
         return HttpResponse(error, status=400)
         
-    response = HttpResponse(output.getvalue(), content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-    response['Content-Disposition'] = f'attachment; filename=loglar_{company.name}_{timezone.now().date()}.xlsx'
-    return response
+    return _file_response(output, company, 'excel')
 
 @login_required
 def dashboard_export_pdf(request, company_id=None, company_slug=None):
@@ -42,13 +104,14 @@ def dashboard_export_pdf(request, company_id=None, company_slug=None):
         return HttpResponseForbidden()
 
     logs = get_filtered_logs(request, company)
+    queued = _queue_if_large(request, company, logs, 'pdf')
+    if queued:
+        return queued
     output, error = export_as_pdf(logs)
     if error:
         return HttpResponse(error, status=400)
         
-    response = HttpResponse(output.getvalue(), content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename=loglar_{company.name}_{timezone.now().date()}.pdf'
-    return response
+    return _file_response(output, company, 'pdf')
 
 @login_required
 def dashboard_export_zip(request, company_id=None, company_slug=None):
@@ -63,10 +126,70 @@ def dashboard_export_zip(request, company_id=None, company_slug=None):
         return HttpResponseForbidden()
         
     logs = get_filtered_logs(request, company)
-    output, error = export_as_zip(logs)
-    if error:
-        return HttpResponse(error, status=400)
+    queued = _queue_if_large(request, company, logs, 'zip')
+    if queued:
+        return queued
+    return _streaming_response(iter_zip(logs), company, 'zip')
+
+@login_required
+def dashboard_export_csv(request, company_id=None, company_slug=None):
+    if company_slug:
+        company = get_object_or_404(Company, slug=company_slug)
+    elif company_id:
+        company = get_object_or_404(Company, id=company_id)
+    else:
+        return HttpResponseForbidden(_("Company not found."))
+    
+    if not (CompanyUser.objects.filter(user=request.user, company=company).exists() or request.user.is_superuser):
+        return HttpResponseForbidden()
         
-    response = HttpResponse(output.getvalue(), content_type='application/zip')
-    response['Content-Disposition'] = f'attachment; filename=loglar_{company.name}_{timezone.now().date()}.zip'
-    return response 
\ No newline at end of file
+    logs = get_filtered_logs(request, company)
+    queued = _queue_if_large(request, company, logs, 'csv')
+    if queued:
+        return queued
+    return _streaming_response(iter_csv(logs), company, 'csv')
+
+@login_required
+@require_POST
+def export_job_create(request, company_slug):
+    """Dışa aktarma işini sıraya alır (biçim POST'ta, filtreler sorgu dizgesinde)"""
+    company = get_object_or_404(Company, slug=company_slug)
+    if not _can_access_company(request.user, company):
+        return HttpResponseForbidden()
+
+    export_format = request.POST.get('format', 'zip')
+    if export_format not in EXPORT_FORMATS:
+        return JsonResponse({'error': _("Unknown export format.")}, status=400)
+    return _queue_export(request, company, export_format)
+
+@login_required
+def export_job_list(request, company_slug):
+    """Firmanın son dışa aktarma işleri"""
+    company = get_object_or_404(Company, slug=company_slug)
+    if not _can_access_company(request.user, company):
+        return HttpResponseForbidden()
+
+    jobs = ExportJob.objects.filter(company=company)[:20]
+    return JsonResponse({'jobs': [_job_json(job) for job in jobs]})
+
+@login_required
+def export_job_status(request, job_id):
+    """İş durumu ve ilerleme yüzdesi (panel periyodik olarak sorgular)"""
+    job = get_object_or_404(ExportJob.objects.select_related('company'), pk=job_id)
+    if not _can_access_company(request.user, job.company):
+        return HttpResponseForbidden()
+    return JsonResponse(_job_json(job))
+
+@login_required
+def export_job_download(request, job_id):
+    job = get_object_or_404(ExportJob.objects.select_related('company'), pk=job_id)
+    if not _can_access_company(request.user, job.company):
+        return HttpResponseForbidden()
+    if job.status != ExportJob.STATUS_DONE or not job.file:
+        raise Http404(_("Export is not ready."))
+
+    try:
+        output = job.file.open('rb')
+    except FileNotFoundError:
+        raise Http404(_("Export file has expired."))
+    return _file_response(output, job.company, job.export_format)
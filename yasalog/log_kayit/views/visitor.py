@@ -1,9 +1,13 @@
-from django.shortcuts import render, redirect, get_object_or_404
+import re
+import secrets
+from django.conf import settings
+from django.shortcuts import render, redirect
 from django.utils import timezone
-from datetime import timedelta
+from ..blind_index import normalize_mac_address
 from ..forms import GirisForm
-from ..models import LogKayit, Company
-from ..services import generate_log_hash
+from ..models import DeviceSession
+from ..services import create_log
+from ..portal_cache import get_portal_company, portal_page_response, landing_page_response
 from django.urls import reverse
 from django.http import HttpResponseRedirect
 
@@ -13,9 +17,45 @@ def get_mac_from_request(request):
     In a real-world scenario, this might be based on the user-agent or other headers,
     as getting a real MAC address is not feasible over HTTP.
     """
-    # In a real captive portal, the MAC is often passed as a query param
-    # e.g., request.GET.get('mac', 'unknown-mac')
-    return request.META.get('HTTP_USER_AGENT', '00:00:00:00:00:00')
+    # In a real captive portal, the MAC is passed as a query param by the controller
+    return _controller_mac(request) or request.META.get('HTTP_USER_AGENT', '00:00:00:00:00:00')
+
+MAC_PATTERN = re.compile(r'([0-9a-f]{2}:){5}[0-9a-f]{2}')
+DEVICE_COOKIE_SALT = 'yasalog-device'
+
+def _controller_mac(request):
+    """MAC address passed by the hotspot controller (?mac=...), None if missing or a placeholder"""
+    mac = normalize_mac_address(request.GET.get('mac', ''))
+    if MAC_PATTERN.fullmatch(mac) and mac != '00:00:00:00:00:00':
+        return mac
+    return None
+
+def get_device_id(request):
+    """
+    Identifies the device for the "remember device" feature.
+    Only the controller-supplied MAC or our own signed random cookie qualify;
+    User-Agent and the dummy MAC are shared by many devices and return None.
+    """
+    mac = _controller_mac(request)
+    if mac:
+        return mac
+    token = request.get_signed_cookie(
+        getattr(settings, 'DEVICE_COOKIE_NAME', 'yasalog_device'), default=None, salt=DEVICE_COOKIE_SALT
+    )
+    return f'cookie:{token}' if token else None
+
+def remember_device(request, response, company, log, device_id):
+    """Remembers the device; a device without an identifier gets a new signed cookie first"""
+    if device_id is None:
+        token = secrets.token_urlsafe(24)
+        device_id = f'cookie:{token}'
+        response.set_signed_cookie(
+            getattr(settings, 'DEVICE_COOKIE_NAME', 'yasalog_device'), token, salt=DEVICE_COOKIE_SALT,
+            max_age=int(DeviceSession.ttl().total_seconds()), httponly=True, samesite='Lax',
+            secure=request.is_secure(),
+        )
+    DeviceSession.remember(company, device_id, log)
+    return response
 
 def giris_view(request, company_id=None, company_slug=None):
     """
@@ -29,51 +69,41 @@ def giris_view(request, company_id=None, company_slug=None):
     # If no slug or id is specified, this is a generic access attempt.
     # Redirect the visitor to an informational page to use the specific link.
     if company_slug is None and company_id is None:
-        return render(request, 'log_kayit/giris_landing.html')
+        return landing_page_response(request)
 
-    # Find the company by either slug or ID
-    if company_slug:
-        company_instance = get_object_or_404(Company, slug=company_slug)
-    else: # company_id must be present
-        company_instance = get_object_or_404(Company, id=company_id)
+    # Find the company by either slug or ID (cached, invalidated on Company.save)
+    portal = get_portal_company(company_slug=company_slug, company_id=company_id)
+    company_instance = portal['company']
+    form_config = portal['form_config']
 
     # --- Start: Remember Device Feature ---
-    # Check for a recent, valid login from this device (identified by MAC/User-Agent)
+    # Check for a recent, valid login from this device (identified by controller MAC or device cookie)
     # The check is only performed for GET requests to avoid bypassing the form submission logic.
-    if request.method == 'GET':
+    device_id = get_device_id(request)
+    if request.method == 'GET' and device_id:
         mac_adresi = get_mac_from_request(request)
-        zaman_siniri = timezone.now() - timedelta(hours=24)
 
-        recent_log = LogKayit.objects.filter(
-            mac_adresi=mac_adresi,
-            company=company_instance,
-            giris_zamani__gte=zaman_siniri,
-            is_suspicious=False
-        ).order_by('-giris_zamani').first()
+        # Single indexed lookup on (company, device fingerprint) instead of scanning logs
+        device_session = DeviceSession.lookup(company_instance, device_id)
 
-        if recent_log:
+        if device_session:
+            recent_log = device_session.log
             # Device is recognized. Create a new log for this session to comply with 5651.
-            new_log_data = {
-                'company': company_instance,
-                'ip_adresi': request.META.get('REMOTE_ADDR', '0.0.0.0'),
-                'mac_adresi': mac_adresi,
-                'kimlik_turu': recent_log.kimlik_turu,
-                'tc_no': recent_log.tc_no,
-                'pasaport_no': recent_log.pasaport_no,
-                'pasaport_ulkesi': recent_log.pasaport_ulkesi,
-                'ad_soyad': recent_log.ad_soyad,
-                'telefon': recent_log.telefon,
-            }
-            new_log = LogKayit.objects.create(**new_log_data)
-
-            # Re-generate hash for the new log entry with the new timestamp
-            new_log.sha256_hash = generate_log_hash(
-                new_log.tc_no, new_log.ad_soyad, new_log.telefon, new_log.ip_adresi, new_log.mac_adresi, new_log.giris_zamani
+            # Hash is computed with the new timestamp before the single INSERT.
+            new_log = create_log(
+                company=company_instance,
+                ip_adresi=request.META.get('REMOTE_ADDR', '0.0.0.0'),
+                mac_adresi=mac_adresi,
+                kimlik_turu=recent_log.kimlik_turu,
+                tc_no=recent_log.tc_no,
+                pasaport_no=recent_log.pasaport_no,
+                pasaport_ulkesi=recent_log.pasaport_ulkesi,
+                ad_soyad=recent_log.ad_soyad,
+                telefon=recent_log.telefon,
             )
-            new_log.save()
             # Son giriş ve kalan süre hesapla
             last_login = recent_log.giris_zamani
-            expires_at = last_login + timedelta(hours=24)
+            expires_at = last_login + DeviceSession.ttl()
             remaining = expires_at - timezone.now()
             remaining_seconds = int(remaining.total_seconds())
             if remaining_seconds < 0:
@@ -85,8 +115,8 @@ def giris_view(request, company_id=None, company_slug=None):
             ip_adresi = request.META.get('REMOTE_ADDR', '0.0.0.0')
             user_agent = request.META.get('HTTP_USER_AGENT', 'Bilinmiyor')
             giris_turu = recent_log.kimlik_turu
-            mac_adresi = recent_log.mac_adresi
-            return render(request, 'log_kayit/tesekkur.html', {
+            mac_adresi = recent_log.mac_adresi_decrypted
+            response = render(request, 'log_kayit/tesekkur.html', {
                 'company': company_instance,
                 'last_login': last_login,
                 'remaining_str': remaining_str,
@@ -95,21 +125,15 @@ def giris_view(request, company_id=None, company_slug=None):
                 'giris_turu': giris_turu,
                 'mac_adresi': mac_adresi,
             })
+            return remember_device(request, response, company_instance, new_log, device_id)
     # --- End: Remember Device Feature ---
 
     def _prepare_context(form):
         """Prepares the context dictionary for rendering the template."""
-        theme_color = company_instance.theme_color if company_instance else "#0d6efd"
-        kvkk_text = company_instance.kvkk_text if company_instance else None
-        login_info_text = company_instance.login_info_text if company_instance else None
-        allow_foreigners = company_instance.allow_foreigners if company_instance else True
         return {
-            'form': form, 
-            'company': company_instance, 
-            'theme_color': theme_color, 
-            'kvkk_text': kvkk_text, 
-            'login_info_text': login_info_text, 
-            'allow_foreigners': allow_foreigners
+            'form': form,
+            'company': company_instance,
+            **form_config,
         }
 
     if request.method == 'POST':
@@ -119,18 +143,13 @@ def giris_view(request, company_id=None, company_slug=None):
             log.company = company_instance
             log.ip_adresi = request.META.get('REMOTE_ADDR', '0.0.0.0')
             log.mac_adresi = get_mac_from_request(request)
-            
-            # Save first to get the timestamp from the database
-            log.save()
+            mac_adresi = log.mac_adresi
 
-            # Now, generate the hash with the timestamp and save again
-            log.sha256_hash = generate_log_hash(
-                log.tc_no, log.ad_soyad, log.telefon, log.ip_adresi, log.mac_adresi, log.giris_zamani
-            )
-            log.save()
+            # Timestamp, hash and encryption are prepared in Python; single INSERT
+            create_log(log)
             # Son giriş ve kalan süre hesapla
             last_login = log.giris_zamani
-            expires_at = last_login + timedelta(hours=24)
+            expires_at = last_login + DeviceSession.ttl()
             remaining = expires_at - timezone.now()
             remaining_seconds = int(remaining.total_seconds())
             if remaining_seconds < 0:
@@ -142,8 +161,7 @@ def giris_view(request, company_id=None, company_slug=None):
             ip_adresi = request.META.get('REMOTE_ADDR', '0.0.0.0')
             user_agent = request.META.get('HTTP_USER_AGENT', 'Bilinmiyor')
             giris_turu = log.kimlik_turu
-            mac_adresi = log.mac_adresi
-            return render(request, 'log_kayit/tesekkur.html', {
+            response = render(request, 'log_kayit/tesekkur.html', {
                 'company': log.company,
                 'last_login': last_login,
                 'remaining_str': remaining_str,
@@ -152,10 +170,11 @@ def giris_view(request, company_id=None, company_slug=None):
                 'giris_turu': giris_turu,
                 'mac_adresi': mac_adresi,
             })
+            return remember_device(request, response, company_instance, log, device_id)
         else:
             # Create a log entry for suspicious attempts as well
             if hasattr(form, 'is_suspicious') and form.is_suspicious:
-                LogKayit.objects.create(
+                create_log(
                     company=company_instance,
                     tc_no=form.data.get('tc_no', ''),
                     pasaport_no=form.data.get('pasaport_no', ''),
@@ -168,27 +187,24 @@ def giris_view(request, company_id=None, company_slug=None):
                 )
             context = _prepare_context(form)
             return render(request, 'log_kayit/giris.html', context)
-    else:
-        form = GirisForm(user=request.user, company_instance=company_instance)
-    
-    context = _prepare_context(form)
-    return render(request, 'log_kayit/giris.html', context)
+
+    # Empty form page is rendered once per company version and language
+    return portal_page_response(
+        request, portal,
+        lambda: _prepare_context(GirisForm(user=request.user, company_instance=company_instance))
+    )
 
 def cikis_view(request, company_slug=None):
     """
-    Cihazı unut (son logları sil) ve giriş formuna yönlendir.
+    Cihazı unut (cihaz oturumunu sil) ve giriş formuna yönlendir.
+    Log kayıtları 5651 saklama süresi boyunca korunur.
     """
     if not company_slug:
-        return HttpResponseRedirect(reverse('giris_landing'))
-    company_instance = get_object_or_404(Company, slug=company_slug)
-    mac_adresi = get_mac_from_request(request)
-    zaman_siniri = timezone.now() - timedelta(hours=24)
-    # Son 24 saatlik logları sil
-    LogKayit.objects.filter(
-        mac_adresi=mac_adresi,
-        company=company_instance,
-        giris_zamani__gte=zaman_siniri,
-        is_suspicious=False
-    ).delete()
+        return HttpResponseRedirect(reverse('log_kayit:giris_default'))
+    company_instance = get_portal_company(company_slug=company_slug)['company']
+    # Yalnızca cihaz oturumu silinir; log kaydı silinmez
+    device_id = get_device_id(request)
+    if device_id:
+        DeviceSession.forget(company_instance, device_id)
     # Giriş formuna yönlendir
-    return HttpResponseRedirect(reverse('giris_slug', kwargs={'company_slug': company_slug})) 
\ No newline at end of file
+    return HttpResponseRedirect(reverse('log_kayit:giris_slug', kwargs={'company_slug': company_slug})) 
\ No newline at end of file
@@ -5,3 +5,6 @@ class SyslogServerConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'syslog_server'
     verbose_name = 'Syslog Server ve Merkezi Loglama'
+    
+    def ready(self):
+        import syslog_server.signals
@@ -0,0 +1,182 @@
+"""
+Syslog Client Registry
+Kaynak IP adresini SyslogClient kaydına süreç içi bellekten çözer.
+
+Gönderici kümesi küçük ve sabit olduğundan her mesajda veritabanına gitmek
+yerine (server_id, ip) -> client_id eşlemesi bellekte tutulur. Kayıtlar
+değiştiğinde aynı süreçteki sinyaller önbelleği anında günceller; başka bir
+süreçte (ör. web arayüzü) yapılan değişiklikler ise periyodik olarak kontrol
+edilen sürüm damgası (son güncelleme zamanı + kayıt sayısı) ile yakalanır.
+"""
+
+import threading
+import time
+from django.conf import settings
+from django.db.models import Count, Max
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class SyslogClientRegistry:
+    """(server_id, ip) anahtarlı süreç içi SyslogClient önbelleği"""
+
+    def __init__(self, check_interval=None):
+        self.check_interval = check_interval
+        self._clients = {}
+        self._versions = {}
+        self._checked_at = {}
+        self._lock = threading.Lock()
+
+        # Sayaçlar
+        self.hits = 0
+        self.misses = 0
+        self.reloads = 0
+
+    def _get_check_interval(self):
+        if self.check_interval is not None:
+            return self.check_interval
+        return getattr(settings, 'SYSLOG_CLIENT_CACHE_CHECK_SECONDS', 30)
+
+    # ------------------------------------------------------------------
+    # Yükleme ve sürüm kontrolü
+    # ------------------------------------------------------------------
+
+    def load(self, server):
+        """Sunucunun tüm client'larını tek sorguda önbelleğe alır"""
+        from .models import SyslogClient
+
+        server_id = server.pk
+        # Aynı IP için birden fazla kayıt varsa en küçük id (ilk oluşturulan) kazanır;
+        # azalan sırada okunduğundan sözlüğe en son o yazılır (_get_or_create_client ile aynı)
+        rows = SyslogClient.objects.filter(syslog_server_id=server_id).order_by('-id').values_list(
+            'id', 'ip_address'
+        )
+        version = self._get_version(server_id)
+
+        with self._lock:
+            for key in [key for key in self._clients if key[0] == server_id]:
+                del self._clients[key]
+            for client_id, ip_address in rows:
+                self._clients[(server_id, ip_address)] = client_id
+            self._versions[server_id] = version
+            self._checked_at[server_id] = time.monotonic()
+            self.reloads += 1
+
+        logger.debug(f"Syslog client önbelleği yüklendi: sunucu={server_id}, {len(rows)} client")
+
+    def _get_version(self, server_id):
+        """Sunucunun client tablosu için ucuz bir sürüm damgası"""
+        from .models import SyslogClient
+
+        version = SyslogClient.objects.filter(syslog_server_id=server_id).aggregate(
+            last_update=Max('updated_at'), total=Count('id')
+        )
+        return (version['last_update'], version['total'])
+
+    def _ensure_fresh(self, server):
+        """Yüklenmemişse yükler; kontrol aralığı dolduysa sürümü karşılaştırır"""
+        server_id = server.pk
+
+        if server_id not in self._versions:
+            self.load(server)
+            return
+
+        if time.monotonic() - self._checked_at.get(server_id, 0) < self._get_check_interval():
+            return
+
+        self._checked_at[server_id] = time.monotonic()
+        if self._get_version(server_id) != self._versions.get(server_id):
+            self.load(server)
+
+    # ------------------------------------------------------------------
+    # Çözümleme
+    # ------------------------------------------------------------------
+
+    def resolve(self, server, client_ip):
+        """Kaynak IP için client_id döndürür, kayıt yoksa None"""
+        self._ensure_fresh(server)
+
+        client_id = self._clients.get((server.pk, client_ip))
+        if client_id is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return client_id
+
+    def resolve_many(self, server, client_ips):
+        """IP kümesini client_id'lere çözer, bilinmeyen IP'ler için client oluşturur"""
+        from .models import SyslogClient
+
+        resolved = {}
+        for client_ip in client_ips:
+            client_id = self.resolve(server, client_ip)
+            if client_id is None:
+                client_id = self._get_or_create_client(server, client_ip)
+                self.register(server.pk, client_ip, client_id)
+            resolved[client_ip] = client_id
+
+        return resolved
+
+    def _get_or_create_client(self, server, client_ip):
+        """Client'ı bulur ya da oluşturur
+
+        Aynı portu dinleyen birden fazla worker süreci yeni bir IP için aynı
+        anda kayıt açabilir; tüm süreçler en küçük id'li kayıtta birleşir.
+        """
+        from .models import SyslogClient
+
+        clients = SyslogClient.objects.filter(
+            syslog_server_id=server.pk, ip_address=client_ip
+        ).order_by('pk')
+
+        client_id = clients.values_list('pk', flat=True).first()
+        if client_id is None:
+            SyslogClient.objects.create(
+                syslog_server=server,
+                company_id=server.company_id,
+                ip_address=client_ip,
+                name=f"Client-{client_ip}",
+                client_type='CUSTOM',
+                is_active=True
+            )
+            client_id = clients.values_list('pk', flat=True).first()
+        return client_id
+
+    # ------------------------------------------------------------------
+    # Geçersiz kılma
+    # ------------------------------------------------------------------
+
+    def register(self, server_id, client_ip, client_id):
+        """Yeni oluşturulan client'ı önbelleğe ekler"""
+        with self._lock:
+            self._clients[(server_id, client_ip)] = client_id
+
+    def invalidate(self, server_id=None):
+        """Bir sunucunun (ya da tüm sunucuların) önbelleğini düşürür"""
+        with self._lock:
+            if server_id is None:
+                self._clients.clear()
+                self._versions.clear()
+                self._checked_at.clear()
+                return
+
+            for key in [key for key in self._clients if key[0] == server_id]:
+                del self._clients[key]
+            self._versions.pop(server_id, None)
+            self._checked_at.pop(server_id, None)
+
+    def stats(self):
+        """Önbellek isabet sayaçlarını döndürür"""
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._clients),
+            'hits': self.hits,
+            'misses': self.misses,
+            'reloads': self.reloads,
+            'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+# Global client registry instance
+client_registry = SyslogClientRegistry()
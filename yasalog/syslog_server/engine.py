@@ -0,0 +1,351 @@
+"""
+Syslog Ingest Engine
+UDP/TCP/TLS dinleyicilerini tek bir asyncio event loop üzerinde çalıştırır.
+
+Bağlantı başına thread açmak yerine binlerce göndericiyi aynı loop'ta
+karşılar. Mesaj işleyici loop içinde çağrılır; bu yüzden veritabanına
+dokunmamalı, mesajı yalnızca write-behind kuyruğuna bırakmalıdır. Kuyruk
+dolduğunda pause_reading()/resume_reading() ile okuma durdurulur.
+"""
+
+import asyncio
+import socket
+import ssl
+import threading
+import time
+from django.conf import settings
+from .framing import SyslogFramer, DEFAULT_MAX_MESSAGE_SIZE
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class ServerCounters:
+    """Sunucu bazında bağlantı ve throughput sayaçları"""
+
+    def __init__(self):
+        self.started_at = time.monotonic()
+        self.active_connections = 0
+        self.total_connections = 0
+        self.rejected_connections = 0
+        self.read_pauses = 0
+        self.messages_received = 0
+        self.messages_dropped = 0
+        self.bytes_received = 0
+        self._last_snapshot_at = self.started_at
+        self._last_snapshot_messages = 0
+
+    def connection_opened(self):
+        self.active_connections += 1
+        self.total_connections += 1
+
+    def connection_closed(self):
+        self.active_connections -= 1
+
+    def connection_rejected(self):
+        self.rejected_connections += 1
+
+    def message_received(self, size):
+        self.messages_received += 1
+        self.bytes_received += size
+
+    def messages_framed(self, count, size):
+        self.messages_received += count
+        self.bytes_received += size
+
+    def message_dropped(self, count=1):
+        self.messages_dropped += count
+
+    def as_dict(self):
+        """Sayaçların anlık görüntüsünü döndürür"""
+        now = time.monotonic()
+        uptime = max(now - self.started_at, 1e-6)
+        interval = max(now - self._last_snapshot_at, 1e-6)
+        current_rate = (self.messages_received - self._last_snapshot_messages) / interval
+
+        self._last_snapshot_at = now
+        self._last_snapshot_messages = self.messages_received
+
+        return {
+            'uptime_seconds': round(uptime, 1),
+            'active_connections': self.active_connections,
+            'total_connections': self.total_connections,
+            'rejected_connections': self.rejected_connections,
+            'read_pauses': self.read_pauses,
+            'messages_received': self.messages_received,
+            'messages_dropped': self.messages_dropped,
+            'bytes_received': self.bytes_received,
+            'messages_per_second': round(self.messages_received / uptime, 1),
+            'current_messages_per_second': round(current_rate, 1),
+        }
+
+
+class SyslogDatagramProtocol(asyncio.DatagramProtocol):
+    """UDP syslog protokolü"""
+
+    def __init__(self, engine):
+        self.engine = engine
+
+    def datagram_received(self, data, addr):
+        self.engine.counters.message_received(len(data))
+        self.engine.dispatch(data.decode('utf-8', errors='ignore'), addr[0])
+
+    def error_received(self, exc):
+        logger.error(f"UDP listener hatası: {str(exc)}")
+
+
+class SyslogIngestEngine:
+    """Tek event loop üzerinde çalışan syslog dinleyicisi"""
+
+    READ_SIZE = 64 * 1024
+
+    def __init__(self, server_config, message_handler, reuse_port=False):
+        self.server_config = server_config
+        self.message_handler = message_handler
+        # Birden fazla süreç aynı portu dinleyecekse (SO_REUSEPORT) kernel
+        # gelen paketleri/bağlantıları süreçler arasında dağıtır
+        self.reuse_port = reuse_port
+        self.max_message_size = getattr(settings, 'SYSLOG_MAX_MESSAGE_SIZE', DEFAULT_MAX_MESSAGE_SIZE)
+        self.counters = ServerCounters()
+        self.loop = None
+        self.running = False
+        self.reading_paused = False
+
+        self._server = None
+        self._transport = None
+        self._writers = set()
+        self._stop_event = None
+        self._reading_resumed = None
+        self._thread = None
+
+    # ------------------------------------------------------------------
+    # Yaşam döngüsü
+    # ------------------------------------------------------------------
+
+    async def start(self):
+        """Protokole göre dinleyiciyi açar"""
+        self.loop = asyncio.get_running_loop()
+        self._stop_event = asyncio.Event()
+        self._reading_resumed = asyncio.Event()
+        self._reading_resumed.set()
+        protocol = self.server_config.protocol
+
+        if protocol == 'UDP':
+            self._transport, _ = await self.loop.create_datagram_endpoint(
+                lambda: SyslogDatagramProtocol(self),
+                local_addr=(self.server_config.host, self.server_config.port),
+                reuse_port=self.reuse_port or None,
+            )
+            self._tune_udp_socket(self._transport.get_extra_info('socket'))
+        elif protocol in ('TCP', 'TLS'):
+            ssl_context = self._build_ssl_context() if protocol == 'TLS' else None
+            self._server = await asyncio.start_server(
+                self._handle_stream,
+                host=self.server_config.host,
+                port=self.server_config.port,
+                ssl=ssl_context,
+                backlog=min(self.server_config.max_connections, 4096),
+                reuse_port=self.reuse_port or None,
+            )
+        else:
+            raise Exception(f"Desteklenmeyen protokol: {protocol}")
+
+        self.running = True
+        logger.info(f"Syslog ingest engine başlatıldı: {self.server_config.name}")
+
+    async def stop(self):
+        """Dinleyiciyi ve açık bağlantıları kapatır"""
+        self.running = False
+        if self._reading_resumed:
+            # Okuma durdurulmuşken bekleyen bağlantılar kapanabilsin
+            self._reading_resumed.set()
+
+        if self._transport:
+            self._transport.close()
+        if self._server:
+            self._server.close()
+
+        for writer in list(self._writers):
+            writer.close()
+
+        if self._server:
+            await self._server.wait_closed()
+
+        if self._stop_event:
+            self._stop_event.set()
+
+        logger.info(f"Syslog ingest engine durduruldu: {self.server_config.name}")
+
+    async def serve(self):
+        """Engine'i başlatır ve durdurulana kadar bekler"""
+        await self.start()
+        await self._stop_event.wait()
+
+    def run_forever(self):
+        """Çağıran thread'i bloklayarak engine'i çalıştırır"""
+        asyncio.run(self.serve())
+
+    def start_in_thread(self):
+        """Engine'i arka planda kendi event loop'u ile çalıştırır"""
+        started = threading.Event()
+        errors = []
+
+        def _runner():
+            async def _main():
+                try:
+                    await self.start()
+                except Exception as e:
+                    errors.append(e)
+                    return
+                finally:
+                    started.set()
+                await self._stop_event.wait()
+
+            asyncio.run(_main())
+
+        self._thread = threading.Thread(
+            target=_runner, name=f"syslog-engine-{self.server_config.pk}", daemon=True
+        )
+        self._thread.start()
+        started.wait()
+
+        if errors:
+            raise errors[0]
+
+    def stop_in_thread(self, timeout=5):
+        """start_in_thread ile başlatılmış engine'i durdurur"""
+        if self.loop and self.running:
+            future = asyncio.run_coroutine_threadsafe(self.stop(), self.loop)
+            future.result(timeout=timeout)
+        if self._thread:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+
+    def stats(self):
+        """Sunucu sayaçlarını döndürür"""
+        stats = self.counters.as_dict()
+        stats['server_id'] = self.server_config.pk
+        stats['protocol'] = self.server_config.protocol
+        stats['max_connections'] = self.server_config.max_connections
+        stats['reading_paused'] = self.reading_paused
+        return stats
+
+    # ------------------------------------------------------------------
+    # Akış kontrolü
+    # ------------------------------------------------------------------
+
+    def pause_reading(self):
+        """Tüm dinleyicilerde okumayı durdurur (herhangi bir thread'den çağrılabilir)"""
+        self._call_in_loop(self._set_reading, False)
+
+    def resume_reading(self):
+        """Durdurulan okumayı sürdürür (herhangi bir thread'den çağrılabilir)"""
+        self._call_in_loop(self._set_reading, True)
+
+    def _call_in_loop(self, callback, *args):
+        if self.loop is None or self.loop.is_closed():
+            return
+        try:
+            self.loop.call_soon_threadsafe(callback, *args)
+        except RuntimeError:
+            pass  # Loop kapanıyor
+
+    def _set_reading(self, reading):
+        if self.reading_paused != reading:
+            return
+        self.reading_paused = not reading
+        transports = [self._transport] if self._transport else []
+        transports += [writer.transport for writer in self._writers]
+
+        if reading:
+            self._reading_resumed.set()
+        else:
+            self._reading_resumed.clear()
+            self.counters.read_pauses += 1
+            logger.warning(f"Yazma kuyruğu dolu, okuma durduruldu: {self.server_config.name}")
+
+        for transport in transports:
+            if transport.is_closing():
+                continue
+            if reading:
+                transport.resume_reading()
+            else:
+                transport.pause_reading()
+
+    # ------------------------------------------------------------------
+    # Mesaj akışı
+    # ------------------------------------------------------------------
+
+    def dispatch(self, message, client_ip):
+        """Mesajı işleyiciye iletir"""
+        try:
+            self.message_handler(message, client_ip)
+        except Exception as e:
+            logger.error(f"Mesaj işleme hatası: {str(e)}")
+
+    async def _handle_stream(self, reader, writer):
+        """TCP/TLS bağlantısını işler"""
+        peer = writer.get_extra_info('peername')
+        client_ip = peer[0] if peer else ''
+
+        if self.counters.active_connections >= self.server_config.max_connections:
+            self.counters.connection_rejected()
+            logger.warning(
+                f"Maksimum bağlantı sayısına ulaşıldı ({self.server_config.max_connections}), "
+                f"bağlantı reddedildi: {client_ip}"
+            )
+            writer.close()
+            return
+
+        self.counters.connection_opened()
+        self._writers.add(writer)
+        if self.reading_paused:
+            writer.transport.pause_reading()
+        framer = SyslogFramer(max_message_size=self.max_message_size)
+        try:
+            while self.running:
+                # StreamReader tamponundaki veri de okuma sürdürülene kadar bekler
+                await self._reading_resumed.wait()
+                data = await reader.read(self.READ_SIZE)
+                if not data:
+                    break
+
+                # Tek okuma birden fazla mesaj içerebilir ya da yarım kalabilir
+                self._dispatch_frames(framer, framer.feed(data), len(data), client_ip)
+
+            self._dispatch_frames(framer, framer.flush(), 0, client_ip)
+        except (ConnectionError, ssl.SSLError) as e:
+            logger.debug(f"Bağlantı kapandı ({client_ip}): {str(e)}")
+        except Exception as e:
+            logger.error(f"{self.server_config.protocol} client işleme hatası: {str(e)}")
+        finally:
+            self._writers.discard(writer)
+            self.counters.connection_closed()
+            writer.close()
+
+    def _dispatch_frames(self, framer, frames, size, client_ip):
+        """Çerçevelenmiş mesajları sırayla işleyiciye gönderir"""
+        self.counters.messages_framed(len(frames), size)
+        if framer.dropped_messages:
+            self.counters.message_dropped(framer.dropped_messages)
+            framer.dropped_messages = 0
+        for frame in frames:
+            self.dispatch(frame.decode('utf-8', errors='ignore'), client_ip)
+
+    def _tune_udp_socket(self, sock):
+        """Ani trafik patlamalarında kernel'in paket düşürmemesi için alım buffer'ını büyütür"""
+        rcvbuf = getattr(settings, 'SYSLOG_UDP_RCVBUF', 8 * 1024 * 1024)
+        try:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, rcvbuf)
+        except OSError as e:
+            logger.warning(f"UDP alım buffer'ı ayarlanamadı: {str(e)}")
+
+    def _build_ssl_context(self):
+        """TLS context oluşturur"""
+        context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+        if self.server_config.certificate_path:
+            context.load_cert_chain(
+                self.server_config.certificate_path,
+                self.server_config.private_key_path or None
+            )
+        return context
@@ -0,0 +1,299 @@
+"""
+Syslog Filtre Motoru
+Bir şirketin aktif SyslogFilter kayıtlarını tek bir eşleştiriciye derler.
+
+- FACILITY / PRIORITY filtreleri facility ve severity'ye göre dağıtım
+  tablolarında tutulur; mesaj başına tek sözlük erişimi yeterlidir.
+- IP filtreleri tam adres için sözlükte, CIDR blokları için listede tutulur.
+- MESSAGE filtreleri (düz anahtar kelime) tek bir otomata derlenir:
+  pyahocorasick kuruluysa Aho-Corasick, değilse tek bir regex alternation.
+- HOSTNAME / PROGRAM / REGEX filtreleri önceden derlenir ve alan başına
+  birleşik bir ön-filtre regex'i ile korunur; çoğu mesaj hiçbir filtreye
+  uymadığından tek bir arama ile elenir.
+
+Derlenmiş filtre kümeleri şirket bazında önbelleğe alınır ve filtreler
+değiştiğinde (sinyal veya sürüm damgası ile) yeniden derlenir.
+"""
+
+import ipaddress
+import re
+import threading
+import time
+from collections import defaultdict
+from django.conf import settings
+from django.db.models import Count, Max
+import logging
+
+try:
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    AHOCORASICK_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+FACILITY_NAMES = {
+    'kern': 0, 'user': 1, 'mail': 2, 'daemon': 3, 'auth': 4, 'syslog': 5,
+    'lpr': 6, 'news': 7, 'uucp': 8, 'cron': 9, 'authpriv': 10, 'ftp': 11,
+    'ntp': 12, 'security': 13, 'console': 14, 'solaris-cron': 15,
+    'local0': 16, 'local1': 17, 'local2': 18, 'local3': 19,
+    'local4': 20, 'local5': 21, 'local6': 22, 'local7': 23,
+}
+
+SEVERITY_NAMES = {
+    'emerg': 0, 'emergency': 0, 'panic': 0,
+    'alert': 1,
+    'crit': 2, 'critical': 2,
+    'err': 3, 'error': 3,
+    'warning': 4, 'warn': 4,
+    'notice': 5,
+    'info': 6, 'informational': 6,
+    'debug': 7,
+}
+
+# Regex filtrelerinin uygulandığı SyslogMessage alanları
+REGEX_FIELDS = {
+    'HOSTNAME': 'hostname',
+    'PROGRAM': 'program',
+    'REGEX': 'message',
+}
+
+
+def _parse_codes(value, names):
+    """'local0,16' gibi bir değeri sayısal kod kümesine çevirir"""
+    codes = set()
+    for part in value.split(','):
+        part = part.strip().lower()
+        if not part:
+            continue
+        if part.isdigit():
+            codes.add(int(part))
+        elif part in names:
+            codes.add(names[part])
+        else:
+            raise ValueError(f"Tanınmayan değer: {part}")
+    return codes
+
+
+class _RegexGroup:
+    """Aynı alana uygulanan regex filtreleri ve birleşik ön-filtre"""
+
+    def __init__(self):
+        self.entries = []
+        self.prefilter = None
+
+    def add(self, pattern, compiled, filter_obj):
+        self.entries.append((pattern, compiled, filter_obj))
+
+    def finalize(self):
+        if not self.entries:
+            return
+        combined = '|'.join(f'(?:{pattern})' for pattern, _, _ in self.entries)
+        try:
+            self.prefilter = re.compile(combined)
+        except re.error:
+            # Geri referans/isimli grup çakışması; ön-filtresiz çalış
+            self.prefilter = None
+
+    def match(self, text, matched):
+        if not self.entries or not text:
+            return
+        if self.prefilter is not None and not self.prefilter.search(text):
+            return
+        for _, compiled, filter_obj in self.entries:
+            if compiled.search(text):
+                matched.append(filter_obj)
+
+
+class _KeywordMatcher:
+    """MESSAGE filtreleri için çoklu anahtar kelime eşleştiricisi"""
+
+    def __init__(self):
+        self.keywords = defaultdict(list)
+        self._automaton = None
+        self._pattern = None
+        self._covered = {}
+
+    def add(self, keyword, filter_obj):
+        self.keywords[keyword].append(filter_obj)
+
+    def finalize(self):
+        if not self.keywords:
+            return
+
+        if AHOCORASICK_AVAILABLE:
+            automaton = ahocorasick.Automaton()
+            for keyword in self.keywords:
+                automaton.add_word(keyword, keyword)
+            automaton.make_automaton()
+            self._automaton = automaton
+            return
+
+        # Uzun kelimeler önce: bir konumda en uzun eşleşme bulunur, o konumda
+        # eşleşen daha kısa kelimeler zaten onun önekidir
+        ordered = sorted(self.keywords, key=len, reverse=True)
+        self._pattern = re.compile('(?=(' + '|'.join(re.escape(k) for k in ordered) + '))')
+        for keyword in ordered:
+            self._covered[keyword] = [
+                other for other in ordered if keyword.startswith(other)
+            ]
+
+    def match(self, text, matched):
+        if not self.keywords or not text:
+            return
+
+        keywords = set()
+        if self._automaton is not None:
+            for _, keyword in self._automaton.iter(text):
+                keywords.add(keyword)
+        else:
+            for hit in self._pattern.finditer(text):
+                keywords.update(self._covered[hit.group(1)])
+
+        for keyword in keywords:
+            matched.extend(self.keywords[keyword])
+
+
+class CompiledFilterSet:
+    """Bir şirketin aktif filtrelerinin derlenmiş hali"""
+
+    def __init__(self, filters):
+        self.filter_count = 0
+        self.by_facility = defaultdict(list)
+        self.by_severity = defaultdict(list)
+        self.by_ip = defaultdict(list)
+        self.networks = []
+        self.regex_groups = {field: _RegexGroup() for field in REGEX_FIELDS.values()}
+        self.keywords = _KeywordMatcher()
+
+        for filter_obj in filters:
+            try:
+                self._add(filter_obj)
+                self.filter_count += 1
+            except (ValueError, re.error) as e:
+                logger.warning(f"Syslog filtresi derlenemedi ({filter_obj.name}): {str(e)}")
+
+        for group in self.regex_groups.values():
+            group.finalize()
+        self.keywords.finalize()
+
+    def _add(self, filter_obj):
+        filter_type = filter_obj.filter_type
+        value = filter_obj.filter_value
+
+        if filter_type == 'FACILITY':
+            for code in _parse_codes(value, FACILITY_NAMES):
+                self.by_facility[code].append(filter_obj)
+        elif filter_type == 'PRIORITY':
+            for code in _parse_codes(value, SEVERITY_NAMES):
+                self.by_severity[code].append(filter_obj)
+        elif filter_type == 'IP':
+            for part in value.split(','):
+                part = part.strip()
+                if '/' in part:
+                    self.networks.append((ipaddress.ip_network(part, strict=False), filter_obj))
+                elif part:
+                    self.by_ip[str(ipaddress.ip_address(part))].append(filter_obj)
+        elif filter_type == 'MESSAGE':
+            if not value:
+                raise ValueError("Boş anahtar kelime")
+            self.keywords.add(value, filter_obj)
+        elif filter_type in REGEX_FIELDS:
+            self.regex_groups[REGEX_FIELDS[filter_type]].add(value, re.compile(value), filter_obj)
+        else:
+            raise ValueError(f"Desteklenmeyen filtre tipi: {filter_type}")
+
+    def match(self, message):
+        """Mesaja uyan filtreleri öncelik sırasıyla döndürür"""
+        if not self.filter_count:
+            return []
+
+        matched = []
+        matched.extend(self.by_facility.get(message.facility, ()))
+        matched.extend(self.by_severity.get(message.severity, ()))
+
+        if message.source_ip:
+            matched.extend(self.by_ip.get(message.source_ip, ()))
+            if self.networks:
+                address = ipaddress.ip_address(message.source_ip)
+                matched.extend(f for network, f in self.networks if address in network)
+
+        self.keywords.match(message.message, matched)
+        for field, group in self.regex_groups.items():
+            group.match(getattr(message, field), matched)
+
+        if len(matched) > 1:
+            unique = {f.pk: f for f in matched}
+            matched = sorted(unique.values(), key=lambda f: (f.priority, f.name))
+        return matched
+
+
+class FilterEngineRegistry:
+    """Şirket bazında derlenmiş filtre kümeleri önbelleği"""
+
+    def __init__(self, check_interval=None):
+        self.check_interval = check_interval
+        self._compiled = {}
+        self._versions = {}
+        self._checked_at = {}
+        self._lock = threading.Lock()
+        self.compilations = 0
+
+    def _get_check_interval(self):
+        if self.check_interval is not None:
+            return self.check_interval
+        return getattr(settings, 'SYSLOG_FILTER_RELOAD_SECONDS', 30)
+
+    def _get_version(self, company_id):
+        from .models import SyslogFilter
+
+        version = SyslogFilter.objects.filter(company_id=company_id).aggregate(
+            last_update=Max('updated_at'), total=Count('id')
+        )
+        return (version['last_update'], version['total'])
+
+    def compile(self, company_id):
+        """Şirketin aktif filtrelerini yeniden derler"""
+        from .models import SyslogFilter
+
+        version = self._get_version(company_id)
+        filters = SyslogFilter.objects.filter(company_id=company_id, is_active=True)
+        compiled = CompiledFilterSet(filters)
+
+        with self._lock:
+            self._compiled[company_id] = compiled
+            self._versions[company_id] = version
+            self._checked_at[company_id] = time.monotonic()
+            self.compilations += 1
+
+        logger.debug(f"Syslog filtreleri derlendi: şirket={company_id}, {compiled.filter_count} filtre")
+        return compiled
+
+    def get(self, company_id):
+        """Derlenmiş filtre kümesini döndürür, değişiklik varsa yeniden derler"""
+        compiled = self._compiled.get(company_id)
+        if compiled is None:
+            return self.compile(company_id)
+
+        if time.monotonic() - self._checked_at.get(company_id, 0) >= self._get_check_interval():
+            self._checked_at[company_id] = time.monotonic()
+            if self._get_version(company_id) != self._versions.get(company_id):
+                return self.compile(company_id)
+
+        return compiled
+
+    def invalidate(self, company_id=None):
+        """Derlenmiş filtre kümesini düşürür; bir sonraki get() yeniden derler"""
+        with self._lock:
+            if company_id is None:
+                self._compiled.clear()
+                self._versions.clear()
+                self._checked_at.clear()
+            else:
+                self._compiled.pop(company_id, None)
+                self._versions.pop(company_id, None)
+                self._checked_at.pop(company_id, None)
+
+
+# Global filter registry instance
+filter_registry = FilterEngineRegistry()
@@ -0,0 +1,148 @@
+"""
+Syslog TCP/TLS Çerçeveleme (RFC 6587)
+Akış halindeki veriyi tek tek syslog mesajlarına ayırır.
+
+İki yöntem desteklenir:
+- Octet-counting: "MSG-LEN SP SYSLOG-MSG" (ör. "23 <13>Oct 11 22:14:15 ...")
+- Non-transparent framing: LF ile ayrılmış mesajlar
+"""
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_MESSAGE_SIZE = 64 * 1024
+
+# MSG-LEN en fazla bu kadar basamak olabilir (RFC 6587 pratikte sınırsız
+# bırakır, fakat 64 KB üstü zaten reddedildiği için 10 basamak yeterli)
+_MAX_LENGTH_DIGITS = 10
+
+_LF = 0x0A
+_SP = 0x20
+_CR = 0x0D
+
+
+class SyslogFramer:
+    """Bağlantı başına akış çerçeveleyici
+
+    feed() her çağrıldığında gelen veriyi dahili buffer'a ekler ve tamamlanmış
+    bütün mesajları tek geçişte döndürür. Yarım kalan mesaj bir sonraki okumaya
+    kadar buffer'da bekler; buffer yeniden oluşturulmaz, işlenen kısım yerinde
+    silinir.
+    """
+
+    def __init__(self, max_message_size=DEFAULT_MAX_MESSAGE_SIZE):
+        self.max_message_size = max_message_size
+        self.dropped_messages = 0
+        self._buffer = bytearray()
+        # Çok büyük bir octet-counted mesajın kalan byte'ları
+        self._skip_bytes = 0
+        # Çok büyük bir LF-framed mesajın satır sonuna kadar atlanması
+        self._skip_line = False
+
+    def feed(self, data):
+        """Okunan veriyi ekler ve tamamlanan mesajları (bytes) döndürür"""
+        buffer = self._buffer
+        buffer += data
+        messages = []
+        pos = 0
+        end = len(buffer)
+
+        while pos < end:
+            if self._skip_bytes:
+                consumed = min(self._skip_bytes, end - pos)
+                self._skip_bytes -= consumed
+                pos += consumed
+                continue
+
+            if self._skip_line:
+                newline = buffer.find(b'\n', pos)
+                if newline < 0:
+                    pos = end
+                    break
+                self._skip_line = False
+                pos = newline + 1
+                continue
+
+            first = buffer[pos]
+
+            # Çerçeveler arasındaki boşluk/satır sonlarını atla
+            if first in (_LF, _CR, _SP):
+                pos += 1
+                continue
+
+            if 0x31 <= first <= 0x39:  # NONZERO-DIGIT: octet-counting
+                space = buffer.find(b' ', pos, min(end, pos + _MAX_LENGTH_DIGITS + 1))
+                if space < 0 and end - pos <= _MAX_LENGTH_DIGITS:
+                    # MSG-LEN henüz tamamlanmadı
+                    break
+
+                length_field = buffer[pos:space] if space > 0 else b''
+                if length_field.isdigit():
+                    length = int(length_field)
+                    start = space + 1
+
+                    if length > self.max_message_size:
+                        self._drop(length)
+                        self._skip_bytes = length
+                        pos = start
+                        continue
+
+                    if end - start < length:
+                        break
+
+                    messages.append(bytes(buffer[start:start + length]))
+                    pos = start + length
+                    continue
+
+            # Non-transparent framing (ya da sayı ile başlayan PRI'sız mesaj)
+            next_pos = self._take_line(buffer, pos, end, messages)
+            if next_pos < 0:
+                if self._skip_line:
+                    pos = end
+                break
+            pos = next_pos
+
+        # İşlenen kısmı yerinde sil, buffer nesnesi yeniden kullanılır
+        del buffer[:pos]
+        return messages
+
+    def flush(self):
+        """Bağlantı kapanırken buffer'da kalan LF'siz son mesajı döndürür"""
+        remaining = bytes(self._buffer).strip(b'\r\n ')
+        self._buffer.clear()
+        self._skip_bytes = 0
+        skip_line = self._skip_line
+        self._skip_line = False
+
+        if not remaining or skip_line:
+            return []
+        if len(remaining) > self.max_message_size:
+            self._drop(len(remaining))
+            return []
+        return [remaining]
+
+    def _take_line(self, buffer, pos, end, messages):
+        """LF ile biten bir mesajı alır; tamamlanmadıysa -1 döndürür"""
+        newline = buffer.find(b'\n', pos)
+        if newline < 0:
+            if end - pos > self.max_message_size:
+                self._drop(end - pos)
+                self._skip_line = True
+            return -1
+
+        line_end = newline
+        if line_end > pos and buffer[line_end - 1] == _CR:
+            line_end -= 1
+
+        if line_end - pos > self.max_message_size:
+            self._drop(line_end - pos)
+        else:
+            messages.append(bytes(buffer[pos:line_end]))
+        return newline + 1
+
+    def _drop(self, size):
+        self.dropped_messages += 1
+        logger.warning(
+            f"Syslog mesajı maksimum boyutu aştı ({size} > {self.max_message_size} byte), atlandı"
+        )
@@ -0,0 +1,166 @@
+"""
+Syslog ayrıştırıcı mikro-benchmark'ı
+
+Tek geçişli ayrıştırıcıyı (syslog_server.parser) eski regex tabanlı
+ayrıştırıcı ile MikroTik, FortiGate ve Cisco ASA örnek mesajlarından oluşan
+bir korpus üzerinde karşılaştırır ve saniyedeki mesaj sayısını raporlar.
+"""
+
+import re
+import time
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from syslog_server.parser import parse_syslog_message
+
+CORPUS = {
+    'mikrotik': [
+        '<134>firewall,info forward: in:ether2 out:ether1, src-mac 00:0c:29:aa:bb:cc, '
+        'proto TCP (SYN), 192.168.88.10:51522->93.184.216.34:443, len 60',
+        '<30>dhcp,info dhcp1 assigned 192.168.88.254 to 00:0C:29:11:22:33',
+        '<38>system,info,account user admin logged in from 10.0.0.5 via winbox',
+        '<134>Oct 11 22:14:15 MikroTik firewall,info input: in:ether1 out:(unknown 0), '
+        'src-mac 4c:5e:0c:01:02:03, proto UDP, 10.0.0.2:5353->224.0.0.251:5353, len 120',
+    ],
+    'fortigate': [
+        '<189>date=2024-10-11 time=22:14:15 devname="FGT60F" devid="FGT60FTK1234" '
+        'eventtime=1728674055000000000 tz="+0300" logid="0000000013" type="traffic" '
+        'subtype="forward" level="notice" vd="root" srcip=192.168.1.10 srcport=51515 '
+        'srcintf="port2" dstip=8.8.8.8 dstport=53 dstintf="wan1" proto=17 action="accept" '
+        'policyid=1 service="DNS" duration=180 sentbyte=64 rcvdbyte=128',
+        '<185>date=2024-10-11 time=22:14:16 devname="FGT60F" devid="FGT60FTK1234" '
+        'tz="+0300" logid="0100032002" type="event" subtype="system" level="alert" '
+        'vd="root" logdesc="Admin login failed" user="admin" ui="https(10.0.0.9)" '
+        'action="login" status="failed" reason="passwd_invalid"',
+    ],
+    'cisco_asa': [
+        '<166>Oct 11 2024 22:14:15: %ASA-6-302013: Built inbound TCP connection 123456 '
+        'for outside:203.0.113.5/51234 (203.0.113.5/51234) to inside:10.1.1.20/443 '
+        '(198.51.100.20/443)',
+        '<164>Oct 11 2024 22:14:16 asa01 : %ASA-4-106023: Deny tcp src outside:198.51.100.7/4444 '
+        'dst inside:10.1.1.5/22 by access-group "OUTSIDE_IN" [0x0, 0x0]',
+        '<163>Oct 11 22:14:17 asa01 %ASA-3-710003: TCP access denied by ACL from '
+        '203.0.113.9/61000 to outside:198.51.100.1/22',
+    ],
+    'rfc5424': [
+        '<165>1 2024-10-11T22:14:15.003+03:00 mymachine.example.com evntslog - ID47 '
+        '[exampleSDID@32473 iut="3" eventSource="Application" eventID="1011"] '
+        '\ufeffAn application event log entry...',
+        '<34>1 2024-10-11T19:14:15Z srv01 sshd 2811 - - Failed password for root '
+        'from 203.0.113.50 port 51022 ssh2',
+    ],
+}
+
+
+def legacy_parse_syslog_message(message):
+    """Eski SyslogHandler._parse_syslog_message uygulaması (karşılaştırma için)"""
+    parsed = {
+        'facility': 0,
+        'severity': 0,
+        'timestamp': timezone.now(),
+        'hostname': '',
+        'tag': '',
+        'content': message,
+        'priority': 0
+    }
+
+    try:
+        priority_match = re.match(r'<(\d+)>', message)
+        if priority_match:
+            priority = int(priority_match.group(1))
+            parsed['priority'] = priority
+            parsed['facility'] = priority >> 3
+            parsed['severity'] = priority & 7
+            message = message[priority_match.end():]
+
+        timestamp_patterns = [
+            r'(\w{3}\s+\d{1,2}\s+\d{2}:\d{2}:\d{2})',
+            r'(\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2})',
+        ]
+
+        for pattern in timestamp_patterns:
+            match = re.search(pattern, message)
+            if match:
+                timestamp_str = match.group(1)
+                parsed['timestamp'] = timezone.now()
+                message = message.replace(timestamp_str, '', 1).strip()
+                break
+
+        hostname_match = re.match(r'(\S+)\s+', message)
+        if hostname_match:
+            parsed['hostname'] = hostname_match.group(1)
+            message = message[hostname_match.end():]
+
+        if ':' in message:
+            tag, content = message.split(':', 1)
+            parsed['tag'] = tag.strip()
+            parsed['content'] = content.strip()
+        else:
+            parsed['content'] = message.strip()
+    except Exception:
+        pass
+
+    return parsed
+
+
+class Command(BaseCommand):
+    help = 'Syslog ayrıştırıcısını eski regex ayrıştırıcı ile karşılaştırır (mesaj/saniye)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--iterations',
+            type=int,
+            default=20000,
+            help='Her korpus için ayrıştırılacak mesaj sayısı (varsayılan: 20000)'
+        )
+        parser.add_argument(
+            '--show',
+            action='store_true',
+            help='Her örnek mesajın ayrıştırma sonucunu göster'
+        )
+
+    def handle(self, *args, **options):
+        iterations = max(1, options['iterations'])
+        now = timezone.now()
+        default_tz = timezone.get_default_timezone()
+
+        if options['show']:
+            for vendor, messages in CORPUS.items():
+                self.stdout.write(self.style.MIGRATE_HEADING(vendor))
+                for message in messages:
+                    parsed = parse_syslog_message(message, now=now, default_tz=default_tz)
+                    self.stdout.write(
+                        f"  {parsed['timestamp'].isoformat()} ({parsed['timestamp_source']}) "
+                        f"host={parsed['hostname']!r} tag={parsed['tag']!r} "
+                        f"procid={parsed['procid']!r}"
+                    )
+
+        self.stdout.write(f"\n{'Korpus':<12} {'Eski (msg/s)':>14} {'Yeni (msg/s)':>14} {'Hızlanma':>10}")
+        self.stdout.write('-' * 54)
+
+        total_legacy = total_new = 0.0
+        for vendor, messages in CORPUS.items():
+            workload = (messages * (iterations // len(messages) + 1))[:iterations]
+
+            started = time.perf_counter()
+            for message in workload:
+                legacy_parse_syslog_message(message)
+            legacy_elapsed = time.perf_counter() - started
+
+            started = time.perf_counter()
+            for message in workload:
+                parse_syslog_message(message, now=now, default_tz=default_tz)
+            new_elapsed = time.perf_counter() - started
+
+            total_legacy += legacy_elapsed
+            total_new += new_elapsed
+            self.stdout.write(
+                f"{vendor:<12} {iterations / legacy_elapsed:>14,.0f} "
+                f"{iterations / new_elapsed:>14,.0f} {legacy_elapsed / new_elapsed:>9.2f}x"
+            )
+
+        count = iterations * len(CORPUS)
+        self.stdout.write('-' * 54)
+        self.stdout.write(self.style.SUCCESS(
+            f"{'Toplam':<12} {count / total_legacy:>14,.0f} "
+            f"{count / total_new:>14,.0f} {total_legacy / total_new:>9.2f}x"
+        ))
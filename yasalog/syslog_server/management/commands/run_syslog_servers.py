@@ -0,0 +1,68 @@
+from django.core.management.base import BaseCommand, CommandError
+from syslog_server.models import SyslogServer
+from syslog_server.supervisor import SyslogSupervisor, REUSEPORT_AVAILABLE
+
+
+class Command(BaseCommand):
+    help = 'Aktif syslog sunucularını çok süreçli (SO_REUSEPORT) olarak çalıştırır'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=None,
+            help='Sunucu başına worker süreci sayısı (varsayılan: SYSLOG_WORKERS veya CPU sayısı)'
+        )
+        parser.add_argument(
+            '--server',
+            type=int,
+            action='append',
+            dest='servers',
+            help='Yalnızca bu SyslogServer id\'sini çalıştır (birden fazla verilebilir)'
+        )
+        parser.add_argument(
+            '--check-interval',
+            type=float,
+            default=1.0,
+            help='Worker sağlık kontrolü aralığı (saniye)'
+        )
+        parser.add_argument(
+            '--reload-interval',
+            type=float,
+            default=30.0,
+            help='SyslogServer tablosunun yeniden okunma aralığı (saniye)'
+        )
+
+    def handle(self, *args, **options):
+        workers = options['workers']
+        if workers is not None and workers < 1:
+            raise CommandError('--workers en az 1 olmalı')
+
+        servers = SyslogServer.objects.filter(is_active=True)
+        if options['servers']:
+            servers = servers.filter(pk__in=options['servers'])
+        if not servers.exists():
+            raise CommandError('Çalıştırılacak aktif syslog sunucusu bulunamadı')
+
+        if not REUSEPORT_AVAILABLE:
+            self.stdout.write(self.style.WARNING(
+                'SO_REUSEPORT bu platformda yok, sunucu başına tek worker çalışacak'
+            ))
+
+        supervisor = SyslogSupervisor(
+            workers=workers,
+            server_ids=options['servers'],
+            check_interval=options['check_interval'],
+            reload_interval=options['reload_interval'],
+            stdout=self.stdout,
+        )
+
+        for server in servers:
+            self.stdout.write(f'{server.name}: {server.protocol} {server.host}:{server.port}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Syslog supervisor başlatıldı ({supervisor.workers} worker/sunucu). Durdurmak için Ctrl+C.'
+        ))
+
+        supervisor.run()
+
+        self.stdout.write(self.style.SUCCESS('Syslog supervisor durduruldu'))
@@ -0,0 +1,366 @@
+"""
+Syslog Mesaj Ayrıştırıcı
+RFC 3164 (BSD) ve RFC 5424 mesajlarını tek geçişte, regex kullanmadan ayrıştırır.
+
+Mesaj soldan sağa bir kez taranır: PRI, (varsa) VERSION, zaman damgası,
+hostname, app-name/tag, procid, msgid, structured data ve mesaj gövdesi.
+Zaman damgası gerçekten mesajdan okunur; 5651 kapsamında delil niteliği
+taşıdığından alınma zamanı ancak mesajda zaman bilgisi yoksa kullanılır.
+
+Desteklenen zaman biçimleri:
+- RFC 3339: 2024-10-11T22:14:15.003+03:00 / 2024-10-11T19:14:15Z
+- BSD: "Oct 11 22:14:15" (yıl, alınma zamanından çıkarılır)
+- Cisco: "Oct 11 2024 22:14:15" ve "Oct 11 2024 22:14:15.123:"
+- FortiGate key=value başlığı: date=2024-10-11 time=22:14:15 tz="+0300"
+"""
+
+from datetime import datetime, timedelta, timezone as dt_timezone
+from django.utils import timezone
+
+MONTHS = {
+    'Jan': 1, 'Feb': 2, 'Mar': 3, 'Apr': 4, 'May': 5, 'Jun': 6,
+    'Jul': 7, 'Aug': 8, 'Sep': 9, 'Oct': 10, 'Nov': 11, 'Dec': 12,
+}
+
+NILVALUE = '-'
+
+# Gelecekteki bir tarih bu kadar toleransla kabul edilir, daha ilerisi
+# önceki yıla ait sayılır (ör. Ocak'ta alınan "Dec 31" mesajı)
+_YEAR_INFERENCE_TOLERANCE = timedelta(days=1)
+
+
+def parse_syslog_message(message, now=None, default_tz=None):
+    """Syslog mesajını ayrıştırır ve alanları sözlük olarak döndürür
+
+    now: Alınma zamanı (yıl çıkarımı ve zaman damgası yoksa kullanılır)
+    default_tz: Saat dilimi içermeyen zaman damgaları için saat dilimi
+    """
+    if now is None:
+        now = timezone.now()
+    if default_tz is None:
+        default_tz = timezone.get_default_timezone()
+
+    parsed = {
+        'priority': 0,
+        'facility': 0,
+        'severity': 0,
+        'version': None,
+        'timestamp': now,
+        'timestamp_source': 'received',
+        'hostname': '',
+        'tag': '',
+        'procid': '',
+        'msgid': '',
+        'structured_data': {},
+        'content': message,
+    }
+
+    length = len(message)
+    pos = 0
+
+    # PRI: "<" 1*3DIGIT ">"
+    if length > 2 and message[0] == '<':
+        close = message.find('>', 1, 5)
+        if close > 1 and message[1:close].isdigit():
+            priority = int(message[1:close])
+            parsed['priority'] = priority
+            parsed['facility'] = priority >> 3
+            parsed['severity'] = priority & 7
+            pos = close + 1
+
+    # VERSION: RFC 5424 ise PRI'den hemen sonra "1 " gelir
+    if pos and pos + 1 < length and message[pos].isdigit() and message[pos + 1] == ' ':
+        parsed['version'] = int(message[pos])
+        _parse_rfc5424(message, pos + 2, parsed)
+    else:
+        _parse_rfc3164(message, pos, parsed, now, default_tz)
+
+    return parsed
+
+
+# ----------------------------------------------------------------------
+# RFC 5424
+# ----------------------------------------------------------------------
+
+def _next_field(message, pos):
+    """Boşlukla ayrılmış bir sonraki alanı ve sonraki konumu döndürür"""
+    space = message.find(' ', pos)
+    if space < 0:
+        return message[pos:], len(message)
+    return message[pos:space], space + 1
+
+
+def _parse_rfc5424(message, pos, parsed):
+    timestamp, pos = _next_field(message, pos)
+    if timestamp != NILVALUE:
+        parsed_ts = _parse_rfc3339(timestamp)
+        if parsed_ts is not None:
+            parsed['timestamp'] = parsed_ts
+            parsed['timestamp_source'] = 'message'
+
+    hostname, pos = _next_field(message, pos)
+    app_name, pos = _next_field(message, pos)
+    procid, pos = _next_field(message, pos)
+    msgid, pos = _next_field(message, pos)
+
+    parsed['hostname'] = '' if hostname == NILVALUE else hostname
+    parsed['tag'] = '' if app_name == NILVALUE else app_name
+    parsed['procid'] = '' if procid == NILVALUE else procid
+    parsed['msgid'] = '' if msgid == NILVALUE else msgid
+
+    if pos < len(message) and message[pos] == '[':
+        parsed['structured_data'], pos = _parse_structured_data(message, pos)
+        if pos < len(message) and message[pos] == ' ':
+            pos += 1
+    elif message.startswith(NILVALUE, pos):
+        pos += 2
+
+    content = message[pos:]
+    if content.startswith('\ufeff'):  # UTF-8 BOM
+        content = content[1:]
+    parsed['content'] = content
+
+
+def _parse_structured_data(message, pos):
+    """[id param="value" ...][id2 ...] bloklarını tek geçişte ayrıştırır"""
+    elements = {}
+    length = len(message)
+
+    while pos < length and message[pos] == '[':
+        pos += 1
+        end_id = pos
+        while end_id < length and message[end_id] not in ' ]':
+            end_id += 1
+        params = elements.setdefault(message[pos:end_id], {})
+        pos = end_id
+
+        while pos < length and message[pos] != ']':
+            if message[pos] == ' ':
+                pos += 1
+                continue
+
+            equals = message.find('=', pos)
+            if equals < 0 or equals + 1 >= length or message[equals + 1] != '"':
+                # Bozuk structured data: kalan kısmı mesaj say
+                return elements, pos
+            name = message[pos:equals]
+
+            # Tırnak içindeki değer; \" \\ ve \] kaçışları
+            pos = equals + 2
+            chunks = []
+            start = pos
+            while pos < length:
+                char = message[pos]
+                if char == '\\' and pos + 1 < length and message[pos + 1] in '"\\]':
+                    chunks.append(message[start:pos])
+                    start = pos + 1
+                    pos += 2
+                    continue
+                if char == '"':
+                    break
+                pos += 1
+            chunks.append(message[start:pos])
+            params[name] = ''.join(chunks)
+            pos += 1
+
+        pos += 1
+
+    return elements, pos
+
+
+def _parse_rfc3339(value):
+    """RFC 3339 zaman damgasını timezone-aware datetime'a çevirir
+
+    datetime.fromisoformat Python 3.11 öncesinde 'Z' sonekini ve 3/6 hane
+    dışındaki kesirleri kabul etmez; alanlar açıkça ayrıştırılır.
+    """
+    length = len(value)
+    if length < 19 or value[4] != '-' or value[7] != '-' or value[10] not in 'Tt' \
+            or value[13] != ':' or value[16] != ':':
+        return None
+    pos = 19
+    micros = 0
+    if pos < length and value[pos] == '.':
+        end = pos + 1
+        while end < length and value[end].isdigit():
+            end += 1
+        fraction = value[pos + 1:end]
+        if not fraction:
+            return None
+        # Mikrosaniyeye tamamlanır ya da kesilir (ör. 9 haneli nanosaniye)
+        micros = int(fraction[:6].ljust(6, '0'))
+        pos = end
+    offset = value[pos:]
+    try:
+        if offset in ('Z', 'z', ''):
+            tzinfo = dt_timezone.utc
+        elif len(offset) == 6 and offset[0] in '+-' and offset[3] == ':':
+            delta = timedelta(hours=int(offset[1:3]), minutes=int(offset[4:6]))
+            tzinfo = dt_timezone(-delta if offset[0] == '-' else delta)
+        else:
+            return None
+        return datetime(
+            int(value[0:4]), int(value[5:7]), int(value[8:10]),
+            int(value[11:13]), int(value[14:16]), int(value[17:19]), micros, tzinfo=tzinfo,
+        )
+    except ValueError:
+        return None
+
+
+# ----------------------------------------------------------------------
+# RFC 3164 ve üretici varyantları
+# ----------------------------------------------------------------------
+
+def _parse_rfc3164(message, pos, parsed, now, default_tz):
+    length = len(message)
+
+    if message.startswith('date=', pos):
+        _parse_fortigate(message, pos, parsed, default_tz)
+        return
+
+    timestamp, pos = _parse_header_timestamp(message, pos, now, default_tz)
+    if timestamp is not None:
+        parsed['timestamp'] = timestamp
+        parsed['timestamp_source'] = 'message'
+
+    # HOSTNAME: tag gibi görünmeyen ilk kelime (MikroTik/ASA hostname göndermeyebilir,
+    # MikroTik konu başlıkları "firewall,info" biçimindedir)
+    token_end = message.find(' ', pos)
+    if token_end > pos:
+        token = message[pos:token_end]
+        if token[-1] != ':' and token[0] != '%' and '[' not in token and ',' not in token:
+            parsed['hostname'] = token
+            pos = token_end + 1
+            # Cisco ASA: "asa01 : %ASA-6-..."
+            if message.startswith(': ', pos):
+                pos += 2
+
+    # TAG[PID]: mesaj
+    tag_end = pos
+    while tag_end < length and message[tag_end] not in ' :[':
+        tag_end += 1
+    if tag_end < length:
+        parsed['tag'] = message[pos:tag_end]
+        pos = tag_end
+        if message[pos] == '[':
+            close = message.find(']', pos)
+            if close > 0:
+                parsed['procid'] = message[pos + 1:close]
+                pos = close + 1
+        if pos < length and message[pos] == ':':
+            pos += 1
+        if pos < length and message[pos] == ' ':
+            pos += 1
+        parsed['content'] = message[pos:]
+    else:
+        parsed['content'] = message[pos:]
+
+
+def _parse_header_timestamp(message, pos, now, default_tz):
+    """BSD/Cisco/RFC 3339 zaman damgasını okur; (datetime, yeni konum) döndürür"""
+    length = len(message)
+
+    # RFC 3339 (rsyslog yüksek hassasiyet şablonu)
+    if pos + 19 <= length and message[pos:pos + 4].isdigit() and message[pos + 4] == '-':
+        value, next_pos = _next_field(message, pos)
+        timestamp = _parse_rfc3339(value)
+        if timestamp is not None:
+            return timestamp, next_pos
+        return None, pos
+
+    # "Mmm dd" + " hh:mm:ss" veya " yyyy hh:mm:ss"
+    month = MONTHS.get(message[pos:pos + 3])
+    if month is None or pos + 15 > length or message[pos + 3] != ' ':
+        return None, pos
+
+    cursor = pos + 4
+    if message[cursor] == ' ':  # tek haneli gün: "Oct  1"
+        cursor += 1
+    day_end = message.find(' ', cursor, cursor + 3)
+    if day_end < 0 or not message[cursor:day_end].isdigit():
+        return None, pos
+    day = int(message[cursor:day_end])
+    cursor = day_end + 1
+
+    year = None
+    if message[cursor:cursor + 4].isdigit() and message[cursor + 4:cursor + 5] == ' ':
+        year = int(message[cursor:cursor + 4])
+        cursor += 5
+
+    clock = message[cursor:cursor + 8]
+    if len(clock) != 8 or clock[2] != ':' or clock[5] != ':':
+        return None, pos
+    try:
+        hour, minute, second = int(clock[0:2]), int(clock[3:5]), int(clock[6:8])
+    except ValueError:
+        return None, pos
+    cursor += 8
+
+    microsecond = 0
+    if cursor < length and message[cursor] == '.':
+        frac_end = cursor + 1
+        while frac_end < length and message[frac_end].isdigit():
+            frac_end += 1
+        fraction = message[cursor + 1:frac_end][:6]
+        if fraction:
+            microsecond = int(fraction.ljust(6, '0'))
+        cursor = frac_end
+
+    # Cisco zaman damgasından sonra ":" koyar
+    if cursor < length and message[cursor] == ':':
+        cursor += 1
+    if cursor < length and message[cursor] == ' ':
+        cursor += 1
+
+    try:
+        if year is not None:
+            timestamp = datetime(year, month, day, hour, minute, second, microsecond, tzinfo=default_tz)
+        else:
+            timestamp = _infer_year(month, day, hour, minute, second, microsecond, now, default_tz)
+    except ValueError:
+        return None, pos
+
+    return timestamp, cursor
+
+
+def _infer_year(month, day, hour, minute, second, microsecond, now, default_tz):
+    """Yılsız BSD zaman damgasına alınma zamanına göre yıl atar"""
+    local_now = now.astimezone(default_tz)
+    timestamp = datetime(local_now.year, month, day, hour, minute, second, microsecond, tzinfo=default_tz)
+    if timestamp - local_now > _YEAR_INFERENCE_TOLERANCE:
+        timestamp = timestamp.replace(year=local_now.year - 1)
+    return timestamp
+
+
+def _parse_fortigate(message, pos, parsed, default_tz):
+    """FortiGate key=value başlığından zaman ve cihaz adını okur"""
+    fields = {'date': _kv_value(message, pos + len('date='))}
+    for key in ('time', 'devname', 'tz'):
+        start = message.find(f' {key}=', pos)
+        if start >= 0:
+            fields[key] = _kv_value(message, start + len(key) + 2)
+
+    if fields.get('date') and fields.get('time'):
+        tzinfo = default_tz
+        offset = fields.get('tz', '')
+        if len(offset) == 5 and offset[0] in '+-' and offset[1:].isdigit():
+            delta = timedelta(hours=int(offset[1:3]), minutes=int(offset[3:5]))
+            tzinfo = dt_timezone(delta if offset[0] == '+' else -delta)
+        try:
+            timestamp = datetime.fromisoformat(f"{fields['date']}T{fields['time']}")
+            parsed['timestamp'] = timestamp.replace(tzinfo=tzinfo)
+            parsed['timestamp_source'] = 'message'
+        except ValueError:
+            pass
+
+    parsed['hostname'] = fields.get('devname', '')
+    parsed['content'] = message[pos:]
+
+
+def _kv_value(message, start):
+    """key=value çiftinde start konumundaki (tırnaklı olabilir) değeri döndürür"""
+    if start < len(message) and message[start] == '"':
+        end = message.find('"', start + 1)
+        return message[start + 1:end if end > 0 else len(message)]
+    end = message.find(' ', start)
+    return message[start:end if end > 0 else len(message)]
@@ -0,0 +1,335 @@
+"""
+Syslog Write-Behind Pipeline
+Gelen mesajları sınırlı bir bellek kuyruğunda biriktirir ve arka plandaki
+flusher thread'i ile toplu (bulk) olarak veritabanına yazar.
+
+Kuyruk dolduğunda uygulanacak davranış (backpressure) seçilebilir:
+- drop_oldest: En eski mesaj atılır, yeni mesaj kuyruğa girer
+- block: Dinleyicilerin okuması durdurulur (transport pause_reading), kuyruk
+  yarıya inince devam edilir; TCP göndericileri yavaşlar, UDP paketleri
+  kernel buffer'ında bekler
+- spill: Taşan mesajlar diske yazılır, kuyruk boşaldıkça geri okunur
+
+put() ingest event loop'unda çağrılır; hiçbir politika burada beklemez veya
+disk I/O yapmaz. Taşma dosyası yalnızca flusher thread'inde, açık tutulan
+tek dosya tanıtıcısıyla yazılır.
+"""
+
+import json
+import os
+import threading
+import time
+from collections import deque
+import logging
+
+logger = logging.getLogger(__name__)
+
+BACKPRESSURE_DROP_OLDEST = 'drop_oldest'
+BACKPRESSURE_BLOCK = 'block'
+BACKPRESSURE_SPILL = 'spill'
+
+BACKPRESSURE_POLICIES = (
+    BACKPRESSURE_DROP_OLDEST,
+    BACKPRESSURE_BLOCK,
+    BACKPRESSURE_SPILL,
+)
+
+# block: durdurma isteğinden önce okunmuş mesajlar için max_bytes üzerine pay
+BLOCK_OVERFLOW_RATIO = 0.25
+
+
+class WriteBehindQueue:
+    """Sınırlı bellek kuyruğu ve toplu yazma yapan flusher thread'i
+
+    Kuyruğa (message, client_ip, received_at) demetleri girer. Kuyrukta
+    batch_size kadar mesaj biriktiğinde ya da flush_interval süresi
+    dolduğunda flush_callback, en fazla batch_size elemanlık bir liste ile
+    çağrılır.
+
+    block politikasında on_pause/on_resume (bkz. set_flow_control) okumayı
+    durdurup sürdürür; bağlanmamışsa pay da dolunca mesaj atılır.
+    """
+
+    def __init__(self, flush_callback, batch_size=1000, max_bytes=100 * 1024 * 1024,
+                 flush_interval=0.5, policy=BACKPRESSURE_DROP_OLDEST, spill_path=None,
+                 name='syslog'):
+        if policy not in BACKPRESSURE_POLICIES:
+            raise ValueError(f"Geçersiz backpressure politikası: {policy}")
+        if policy == BACKPRESSURE_SPILL and not spill_path:
+            raise ValueError("spill politikası için spill_path gerekli")
+
+        self.flush_callback = flush_callback
+        self.batch_size = max(1, batch_size)
+        self.max_bytes = max_bytes
+        self.flush_interval = flush_interval
+        self.policy = policy
+        self.spill_path = spill_path
+        self.name = name
+        self.on_pause = None
+        self.on_resume = None
+
+        self._queue = deque()
+        self._queued_bytes = 0
+        self._condition = threading.Condition()
+        self._paused = False
+        self._spill_buffer = []
+        self._spill_buffer_bytes = 0
+        self._spill_file = None
+        self._spilled_pending = False
+        self._running = False
+        self._thread = None
+
+        # Sayaçlar
+        self.enqueued = 0
+        self.dropped = 0
+        self.spilled = 0
+        self.pauses = 0
+        self.flushed = 0
+        self.flush_count = 0
+        self.flush_errors = 0
+        self.last_flush_ms = 0.0
+
+    # ------------------------------------------------------------------
+    # Yaşam döngüsü
+    # ------------------------------------------------------------------
+
+    def set_flow_control(self, on_pause, on_resume):
+        """block politikasında okumayı durduracak/sürdürecek çağrıları bağlar
+
+        on_pause put() içinden (event loop), on_resume flusher thread'inden
+        çağrılır; thread güvenli olmalıdır.
+        """
+        self.on_pause = on_pause
+        self.on_resume = on_resume
+
+    def start(self):
+        """Flusher thread'ini başlatır"""
+        if self._running:
+            return
+
+        if self.spill_path and (os.path.exists(self.spill_path)
+                                or os.path.exists(f"{self.spill_path}.replay")):
+            # Önceki çalışmadan kalan taşma dosyası sırayla geri okunacak
+            self._spilled_pending = True
+
+        self._running = True
+        self._thread = threading.Thread(
+            target=self._run, name=f"{self.name}-flusher", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout=30):
+        """Flusher'ı durdurur ve kuyrukta kalanları yazar"""
+        with self._condition:
+            self._running = False
+            self._condition.notify_all()
+
+        if self._thread:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+
+    # ------------------------------------------------------------------
+    # Üretici tarafı
+    # ------------------------------------------------------------------
+
+    def put(self, message, client_ip, received_at=None):
+        """Mesajı kuyruğa ekler; politika gereği atılırsa False döndürür
+
+        Hiçbir durumda beklemez: block politikası okumayı durdurma isteği
+        gönderir, spill politikası taşan mesajı flusher'ın yazacağı bellek
+        tamponuna bırakır.
+        """
+        item = (message, client_ip, received_at or time.time())
+        size = len(message)
+        pause = False
+
+        with self._condition:
+            if self._queued_bytes + size > self.max_bytes:
+                if self.policy == BACKPRESSURE_DROP_OLDEST:
+                    while self._queue and self._queued_bytes + size > self.max_bytes:
+                        dropped = self._queue.popleft()
+                        self._queued_bytes -= len(dropped[0])
+                        self.dropped += 1
+                elif self.policy == BACKPRESSURE_BLOCK:
+                    if not self._paused:
+                        self._paused = pause = True
+                        self.pauses += 1
+                    if self._queued_bytes + size > self.max_bytes * (1 + BLOCK_OVERFLOW_RATIO):
+                        self.dropped += 1
+                        item = None
+                elif self._spill_buffer_bytes + size > self.max_bytes:
+                    # Disk de yetişemiyor
+                    self.dropped += 1
+                    return False
+                else:
+                    self._spill_buffer.append(item)
+                    self._spill_buffer_bytes += size
+                    if len(self._spill_buffer) >= self.batch_size:
+                        self._condition.notify_all()
+                    return True
+
+            if item is not None:
+                self._queue.append(item)
+                self._queued_bytes += size
+                self.enqueued += 1
+
+                if len(self._queue) >= self.batch_size:
+                    self._condition.notify_all()
+
+        if pause:
+            self._call_flow_control(self.on_pause)
+        return item is not None
+
+    def stats(self):
+        """Kuyruk sayaçlarını döndürür"""
+        with self._condition:
+            queued = len(self._queue)
+            queued_bytes = self._queued_bytes
+            spill_buffered = len(self._spill_buffer)
+            paused = self._paused
+
+        return {
+            'policy': self.policy,
+            'queued': queued,
+            'queued_bytes': queued_bytes,
+            'paused': paused,
+            'pauses': self.pauses,
+            'enqueued': self.enqueued,
+            'dropped': self.dropped,
+            'spilled': self.spilled,
+            'spill_buffered': spill_buffered,
+            'flushed': self.flushed,
+            'flush_count': self.flush_count,
+            'flush_errors': self.flush_errors,
+            'last_flush_ms': round(self.last_flush_ms, 2),
+        }
+
+    # ------------------------------------------------------------------
+    # Flusher tarafı
+    # ------------------------------------------------------------------
+
+    def _run(self):
+        try:
+            while True:
+                with self._condition:
+                    if (self._running and len(self._queue) < self.batch_size
+                            and len(self._spill_buffer) < self.batch_size):
+                        self._condition.wait(self.flush_interval)
+
+                    batch = self._take_batch()
+                    spill = self._take_spill_buffer()
+                    # Kuyruk yarıya inince durdurulan okuma sürdürülür
+                    resume = self._paused and self._queued_bytes <= self.max_bytes // 2
+                    if resume:
+                        self._paused = False
+                    running = self._running
+
+                if resume:
+                    self._call_flow_control(self.on_resume)
+                if spill:
+                    self._spill(spill)
+                if batch:
+                    self._flush(batch)
+                elif self._spilled_pending and running:
+                    # Kapanışta geri okuma yapılmaz, dosya bir sonraki başlatmada işlenir
+                    self._replay_spill()
+                elif not running:
+                    break
+        finally:
+            self._close_spill_file()
+
+    def _take_batch(self):
+        """Kuyruktan en fazla batch_size eleman alır (lock altında çağrılır)"""
+        count = min(len(self._queue), self.batch_size)
+        if not count:
+            return []
+
+        batch = [self._queue.popleft() for _ in range(count)]
+        self._queued_bytes -= sum(len(item[0]) for item in batch)
+        return batch
+
+    def _take_spill_buffer(self):
+        """Diske yazılacak taşma tamponunu devralır (lock altında çağrılır)"""
+        spill, self._spill_buffer = self._spill_buffer, []
+        self._spill_buffer_bytes = 0
+        return spill
+
+    def _call_flow_control(self, callback):
+        if callback is None:
+            return
+        try:
+            callback()
+        except Exception as e:
+            logger.error(f"Syslog akış kontrolü hatası: {str(e)}")
+
+    def _flush(self, batch):
+        started = time.monotonic()
+        try:
+            self.flush_callback(batch)
+            self.flushed += len(batch)
+            self.flush_count += 1
+        except Exception as e:
+            self.flush_errors += 1
+            logger.error(f"Syslog toplu yazma hatası ({len(batch)} mesaj): {str(e)}")
+            if self.policy == BACKPRESSURE_SPILL:
+                # Veritabanı erişilemezse mesajlar kaybolmasın
+                self._spill(batch)
+            else:
+                self.dropped += len(batch)
+        finally:
+            self.last_flush_ms = (time.monotonic() - started) * 1000
+
+    # ------------------------------------------------------------------
+    # Diske taşma
+    # ------------------------------------------------------------------
+
+    def _spill(self, items):
+        """Mesajları taşma dosyasına ekler (yalnızca flusher thread'inde)"""
+        try:
+            if self._spill_file is None:
+                os.makedirs(os.path.dirname(self.spill_path), exist_ok=True)
+                self._spill_file = open(self.spill_path, 'a', encoding='utf-8')
+            self._spill_file.writelines(json.dumps(item) + '\n' for item in items)
+            self._spill_file.flush()
+            self.spilled += len(items)
+            self._spilled_pending = True
+        except OSError as e:
+            self.dropped += len(items)
+            logger.error(f"Syslog taşma dosyasına yazılamadı: {str(e)}")
+            self._close_spill_file()
+
+    def _close_spill_file(self):
+        if self._spill_file is not None:
+            try:
+                self._spill_file.close()
+            except OSError as e:
+                logger.error(f"Syslog taşma dosyası kapatılamadı: {str(e)}")
+            self._spill_file = None
+
+    def _replay_spill(self):
+        """Taşma dosyasını sırayla geri okur ve toplu olarak yazar"""
+        replay_path = f"{self.spill_path}.replay"
+
+        if not os.path.exists(replay_path):
+            if not os.path.exists(self.spill_path):
+                self._spilled_pending = False
+                return
+            # Sonraki taşmalar yeni dosyaya yazılır
+            self._close_spill_file()
+            os.replace(self.spill_path, replay_path)
+        self._spilled_pending = False
+
+        batch = []
+        with open(replay_path, 'r', encoding='utf-8') as replay_file:
+            for line in replay_file:
+                try:
+                    batch.append(tuple(json.loads(line)))
+                except ValueError:
+                    continue
+                if len(batch) >= self.batch_size:
+                    self._flush(batch)
+                    batch = []
+        if batch:
+            self._flush(batch)
+
+        os.remove(replay_path)
@@ -0,0 +1,37 @@
+"""
+Syslog Server Signals
+SyslogClient ve SyslogFilter değişikliklerinde süreç içi önbellekleri günceller
+"""
+
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import SyslogClient, SyslogFilter
+from .client_cache import client_registry
+from .filter_engine import filter_registry
+
+
+@receiver(post_save, sender=SyslogClient)
+def refresh_client_registry(sender, instance, created, **kwargs):
+    """Yeni client önbelleğe eklenir, güncellenen client'ın sunucusu yeniden yüklenir"""
+    if created:
+        # Aynı IP için önceden açılmış kayıt varsa en küçük id kazanır (_get_or_create_client ile aynı)
+        client_id = SyslogClient.objects.filter(
+            syslog_server_id=instance.syslog_server_id, ip_address=instance.ip_address
+        ).order_by('pk').values_list('pk', flat=True).first()
+        client_registry.register(instance.syslog_server_id, instance.ip_address, client_id or instance.pk)
+    else:
+        # IP adresi değişmiş olabilir, eski anahtar kalmasın
+        client_registry.invalidate(instance.syslog_server_id)
+
+
+@receiver(post_delete, sender=SyslogClient)
+def drop_client_from_registry(sender, instance, **kwargs):
+    """Silinen client'ın sunucu önbelleğini düşürür"""
+    client_registry.invalidate(instance.syslog_server_id)
+
+
+@receiver(post_save, sender=SyslogFilter)
+@receiver(post_delete, sender=SyslogFilter)
+def recompile_filters(sender, instance, **kwargs):
+    """Filtre değiştiğinde şirketin derlenmiş filtre kümesini düşürür"""
+    filter_registry.invalidate(instance.company_id)
@@ -0,0 +1,275 @@
+"""
+Syslog İstatistik Toplayıcı
+Mesaj sayaçlarını süreç içi bellekte biriktirir ve birkaç saniyede bir
+veritabanına tek seferde yazar.
+
+Her batch için SyslogStatistics satırını okuyup yeniden yazmak yerine:
+- Sayaçlar (sunucu, tarih, saat) anahtarıyla bellekte toplanır; severity,
+  facility ve hostname dağılımları Counter olarak tutulur.
+- Flush sırasında sayısal alanlar F() ifadeleriyle atomik olarak artırılır,
+  JSON dağılımları kilitlenen satır üzerinde birleştirilir. Böylece aynı
+  sunucuyu işleyen birden fazla thread/süreç birbirinin sayımını ezmez.
+- SyslogServer.total_logs_received / last_activity ve SyslogClient
+  total_messages_sent / last_message_at aynı flush'ta güncellenir; paket
+  başına veritabanına gidilmez.
+"""
+
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timezone as dt_timezone
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Coalesce, Greatest
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Severity 0-3 (Emergency..Error) hata olarak sayılır
+ERROR_SEVERITY_MAX = 3
+
+
+class _StatsBucket:
+    """Bir (sunucu, tarih, saat) anahtarı için birikmiş sayaçlar"""
+
+    __slots__ = ('total', 'errors', 'processing_ms', 'max_processing_ms',
+                 'by_facility', 'by_severity', 'by_hostname')
+
+    def __init__(self):
+        self.total = 0
+        self.errors = 0
+        self.processing_ms = 0.0
+        self.max_processing_ms = 0.0
+        self.by_facility = Counter()
+        self.by_severity = Counter()
+        self.by_hostname = Counter()
+
+
+class StatisticsAggregator:
+    """Süreç içi sayaç toplayıcı ve periyodik flush thread'i"""
+
+    def __init__(self, flush_interval=None, name='syslog'):
+        if flush_interval is None:
+            flush_interval = getattr(settings, 'SYSLOG_STATS_FLUSH_SECONDS', 5)
+        self.flush_interval = flush_interval
+        self.name = name
+
+        self._buckets = defaultdict(_StatsBucket)
+        self._servers = {}
+        self._clients = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+        # Sayaçlar
+        self.recorded = 0
+        self.flush_count = 0
+        self.flush_errors = 0
+        self.last_flush_ms = 0.0
+
+    # ------------------------------------------------------------------
+    # Yaşam döngüsü
+    # ------------------------------------------------------------------
+
+    def start(self):
+        """Periyodik flush thread'ini başlatır"""
+        if self._thread is not None:
+            return
+
+        self._stop_event.clear()
+        self._thread = threading.Thread(
+            target=self._run, name=f"{self.name}-stats", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout=30):
+        """Thread'i durdurur ve birikmiş sayaçları yazar"""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+        self.flush()
+
+    def _run(self):
+        while not self._stop_event.wait(self.flush_interval):
+            self.flush()
+
+    # ------------------------------------------------------------------
+    # Kayıt
+    # ------------------------------------------------------------------
+
+    def record(self, server, messages, client_ids=None, received_at=None, processing_ms=0.0):
+        """Kaydedilen bir batch'in sayaçlarını bellekte biriktirir
+
+        client_ids: client_id -> o client'tan gelen mesaj sayısı
+        received_at: batch'teki en son mesajın alınma zamanı (epoch)
+        processing_ms: batch'in toplam işlem süresi
+        """
+        if not messages and not client_ids:
+            return
+
+        received = datetime.fromtimestamp(received_at or time.time(), tz=dt_timezone.utc)
+        key = (server.pk, server.company_id, received.date(), received.hour)
+        count = len(messages)
+
+        with self._lock:
+            bucket = self._buckets[key]
+            bucket.total += count
+            bucket.processing_ms += processing_ms
+            if count:
+                bucket.max_processing_ms = max(bucket.max_processing_ms, processing_ms / count)
+            for message in messages:
+                bucket.by_facility[message.facility] += 1
+                bucket.by_severity[message.severity] += 1
+                bucket.by_hostname[message.hostname] += 1
+                if message.severity <= ERROR_SEVERITY_MAX:
+                    bucket.errors += 1
+
+            server_total, server_last = self._servers.get(server.pk, (0, None))
+            self._servers[server.pk] = (server_total + count, _latest(server_last, received))
+
+            for client_id, client_count in (client_ids or {}).items():
+                client_total, client_last = self._clients.get(client_id, (0, None))
+                self._clients[client_id] = (client_total + client_count, _latest(client_last, received))
+
+            self.recorded += count
+
+    def pending(self):
+        """Henüz yazılmamış mesaj sayısını döndürür"""
+        with self._lock:
+            return sum(bucket.total for bucket in self._buckets.values())
+
+    def stats(self):
+        """Toplayıcı sayaçlarını döndürür"""
+        return {
+            'recorded': self.recorded,
+            'pending': self.pending(),
+            'flush_count': self.flush_count,
+            'flush_errors': self.flush_errors,
+            'last_flush_ms': round(self.last_flush_ms, 2),
+        }
+
+    # ------------------------------------------------------------------
+    # Flush
+    # ------------------------------------------------------------------
+
+    def flush(self):
+        """Birikmiş sayaçları veritabanına yazar"""
+        with self._flush_lock:
+            with self._lock:
+                buckets, self._buckets = self._buckets, defaultdict(_StatsBucket)
+                servers, self._servers = self._servers, {}
+                clients, self._clients = self._clients, {}
+
+            if not (buckets or servers or clients):
+                return
+
+            started = time.monotonic()
+            try:
+                with transaction.atomic():
+                    for key, bucket in buckets.items():
+                        self._flush_bucket(key, bucket)
+                    self._flush_servers(servers)
+                    self._flush_clients(clients)
+                self.flush_count += 1
+            except Exception as e:
+                self.flush_errors += 1
+                logger.error(f"Syslog istatistik yazma hatası: {str(e)}")
+                # Sayımlar kaybolmasın, bir sonraki flush'ta tekrar denenir
+                self._restore(buckets, servers, clients)
+            finally:
+                self.last_flush_ms = (time.monotonic() - started) * 1000
+
+    def _flush_bucket(self, key, bucket):
+        from .models import SyslogStatistics
+
+        server_id, company_id, date, hour = key
+        lookup = {'company_id': company_id, 'server_id': server_id, 'date': date, 'hour': hour}
+
+        rows = SyslogStatistics.objects.select_for_update().filter(**lookup)
+        stats = rows.first()
+        if stats is None:
+            try:
+                with transaction.atomic():
+                    stats = SyslogStatistics.objects.create(**lookup)
+            except IntegrityError:
+                # Başka bir süreç aynı satırı aynı anda oluşturdu
+                stats = rows.get()
+
+        # Satır kilitli: ortalama ve JSON dağılımları güvenle birleştirilir
+        previous_total = stats.total_messages
+        new_total = previous_total + bucket.total
+        avg_processing = stats.avg_processing_time
+        if new_total:
+            avg_processing = (avg_processing * previous_total + bucket.processing_ms) / new_total
+
+        SyslogStatistics.objects.filter(pk=stats.pk).update(
+            total_messages=F('total_messages') + bucket.total,
+            error_count=F('error_count') + bucket.errors,
+            max_processing_time=Greatest(F('max_processing_time'), Value(bucket.max_processing_ms)),
+            avg_processing_time=avg_processing,
+            messages_by_facility=_merge_counts(stats.messages_by_facility, bucket.by_facility),
+            messages_by_priority=_merge_counts(stats.messages_by_priority, bucket.by_severity),
+            messages_by_hostname=_merge_counts(stats.messages_by_hostname, bucket.by_hostname),
+        )
+
+    def _flush_servers(self, servers):
+        from .models import SyslogServer
+
+        for server_id, (count, last_activity) in servers.items():
+            SyslogServer.objects.filter(pk=server_id).update(
+                total_logs_received=F('total_logs_received') + count,
+                last_activity=_greatest('last_activity', last_activity),
+            )
+
+    def _flush_clients(self, clients):
+        from .models import SyslogClient
+
+        for client_id, (count, last_message_at) in clients.items():
+            SyslogClient.objects.filter(pk=client_id).update(
+                total_messages_sent=F('total_messages_sent') + count,
+                last_message_at=_greatest('last_message_at', last_message_at),
+                last_seen=_greatest('last_seen', last_message_at),
+                is_online=True,
+            )
+
+    def _restore(self, buckets, servers, clients):
+        """Yazılamayan sayaçları yeni birikenlerle birleştirir"""
+        with self._lock:
+            for key, bucket in buckets.items():
+                current = self._buckets[key]
+                current.total += bucket.total
+                current.errors += bucket.errors
+                current.processing_ms += bucket.processing_ms
+                current.max_processing_ms = max(current.max_processing_ms, bucket.max_processing_ms)
+                current.by_facility.update(bucket.by_facility)
+                current.by_severity.update(bucket.by_severity)
+                current.by_hostname.update(bucket.by_hostname)
+
+            for target, pending in ((self._servers, servers), (self._clients, clients)):
+                for pk, (count, last) in pending.items():
+                    total, current_last = target.get(pk, (0, None))
+                    target[pk] = (total + count, _latest(current_last, last))
+
+
+def _latest(first, second):
+    if first is None:
+        return second
+    if second is None:
+        return first
+    return max(first, second)
+
+
+def _greatest(field, value):
+    """Alanı yalnızca daha yeni bir değerle günceller (NULL ise değeri yazar)"""
+    return Coalesce(Greatest(F(field), Value(value)), Value(value))
+
+
+def _merge_counts(existing, counts):
+    """JSON sayaç sözlüğüne yeni sayımları ekler"""
+    merged = dict(existing or {})
+    for key, count in counts.items():
+        merged[str(key)] = merged.get(str(key), 0) + count
+    return merged
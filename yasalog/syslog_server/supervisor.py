@@ -0,0 +1,259 @@
+"""
+Syslog Worker Supervisor
+Her aktif SyslogServer için N worker süreci başlatır ve ayakta tutar.
+
+GIL nedeniyle tek süreç tek çekirdekle sınırlı kalır. Worker'lar aynı
+host:port'u SO_REUSEPORT ile açar; kernel UDP paketlerini ve TCP
+bağlantılarını süreçler arasında dağıtır. Her worker kendi SyslogHandler'ını
+(write-behind kuyruğu, istatistik toplayıcı) çalıştırır.
+
+Supervisor:
+- Çöken worker'ları artan bekleme süresiyle yeniden başlatır
+- SyslogServer.is_running alanını en az bir worker ayaktayken True tutar
+- SyslogServer tablosunu periyodik olarak okuyup aktifleşen sunucuları
+  başlatır, pasifleşen/silinen sunucuların worker'larını durdurur
+"""
+
+import math
+import multiprocessing
+import os
+import signal
+import socket
+import time
+from django.conf import settings
+from django.db import close_old_connections, connections
+import logging
+
+logger = logging.getLogger(__name__)
+
+REUSEPORT_AVAILABLE = hasattr(socket, 'SO_REUSEPORT')
+
+# Yeniden başlatma beklemesi: 1, 2, 4 ... saniye, en fazla bu kadar
+MAX_RESTART_DELAY = 60
+# Bu kadar süre ayakta kalan worker'ın bekleme süresi sıfırlanır
+STABLE_AFTER = 60
+
+
+def run_worker(server_id, worker_id, worker_count):
+    """Worker süreci giriş noktası: sunucuyu dinler, SIGTERM ile durur"""
+    import django
+    django.setup()
+
+    from .models import SyslogServer
+    from .syslog_handler import SyslogHandler
+
+    stopping = []
+    signal.signal(signal.SIGTERM, lambda signum, frame: stopping.append(signum))
+    # Ctrl+C tüm süreç grubuna gider; kapanışı supervisor yönetir
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    server = SyslogServer.objects.get(pk=server_id)
+    # Bağlantı limiti worker'lar arasında paylaştırılır
+    server.max_connections = max(1, math.ceil(server.max_connections / worker_count))
+
+    handler = SyslogHandler(server, reuse_port=worker_count > 1, worker_id=worker_id)
+    handler.start()
+    try:
+        while not stopping:
+            time.sleep(0.5)
+    finally:
+        handler.stop()
+        connections.close_all()
+
+
+class _Worker:
+    """Tek bir worker sürecinin supervisor tarafındaki durumu"""
+
+    def __init__(self, server_id, worker_id):
+        self.server_id = server_id
+        self.worker_id = worker_id
+        self.process = None
+        self.started_at = 0.0
+        self.restarts = 0
+        self.restart_delay = 1
+        self.next_start = 0.0
+
+    @property
+    def name(self):
+        return f"syslog-{self.server_id}-w{self.worker_id}"
+
+    def is_alive(self):
+        return self.process is not None and self.process.is_alive()
+
+
+class SyslogSupervisor:
+    """Sunucu başına worker süreçlerini yöneten supervisor"""
+
+    def __init__(self, workers=None, server_ids=None, check_interval=1.0, reload_interval=30.0,
+                 stdout=None):
+        if workers is None:
+            workers = getattr(settings, 'SYSLOG_WORKERS', None) or os.cpu_count() or 1
+        if workers > 1 and not REUSEPORT_AVAILABLE:
+            logger.warning("SO_REUSEPORT desteklenmiyor, sunucu başına tek worker çalıştırılacak")
+            workers = 1
+
+        self.workers = workers
+        self.server_ids = set(server_ids) if server_ids else None
+        self.check_interval = check_interval
+        self.reload_interval = reload_interval
+        self.stdout = stdout
+
+        self._workers = {}
+        self._running_state = {}
+        self._stopping = False
+        self._last_reload = 0.0
+
+        method = 'fork' if 'fork' in multiprocessing.get_all_start_methods() else 'spawn'
+        self._context = multiprocessing.get_context(method)
+
+    # ------------------------------------------------------------------
+    # Yaşam döngüsü
+    # ------------------------------------------------------------------
+
+    def run(self):
+        """Durdurulana kadar worker'ları çalıştırır (SIGINT/SIGTERM ile durur)"""
+        previous = {
+            signum: signal.signal(signum, self._request_stop)
+            for signum in (signal.SIGINT, signal.SIGTERM)
+        }
+
+        try:
+            self._sync_servers()
+            while not self._stopping:
+                if time.monotonic() - self._last_reload >= self.reload_interval:
+                    self._sync_servers()
+                self._check_workers()
+                time.sleep(self.check_interval)
+        finally:
+            self.shutdown()
+            for signum, handler in previous.items():
+                signal.signal(signum, handler)
+
+    def _request_stop(self, signum, frame):
+        self._stopping = True
+
+    def shutdown(self, timeout=30):
+        """Tüm worker'lara SIGTERM gönderir ve kapanmalarını bekler"""
+        self._stopping = True
+        for server_id in list(self._workers):
+            self._stop_server(server_id, timeout=timeout)
+
+    # ------------------------------------------------------------------
+    # Sunucu kümesi
+    # ------------------------------------------------------------------
+
+    def _sync_servers(self):
+        """Aktif sunucuları okur; yenileri başlatır, pasifleşenleri durdurur"""
+        from .models import SyslogServer
+
+        self._last_reload = time.monotonic()
+        close_old_connections()
+
+        servers = SyslogServer.objects.filter(is_active=True)
+        if self.server_ids is not None:
+            servers = servers.filter(pk__in=self.server_ids)
+        active = dict(servers.values_list('pk', 'name'))
+
+        for server_id in list(self._workers):
+            if server_id not in active:
+                self._log(f"Sunucu pasif, worker'lar durduruluyor: {server_id}")
+                self._stop_server(server_id)
+
+        for server_id, name in active.items():
+            if server_id not in self._workers:
+                self._log(f"Sunucu başlatılıyor: {name} ({self.workers} worker)")
+                self._workers[server_id] = [_Worker(server_id, i) for i in range(self.workers)]
+
+    def _stop_server(self, server_id, timeout=30):
+        workers = self._workers.pop(server_id, [])
+        for worker in workers:
+            if worker.is_alive():
+                worker.process.terminate()
+
+        deadline = time.monotonic() + timeout
+        for worker in workers:
+            if worker.process is None:
+                continue
+            worker.process.join(max(0.1, deadline - time.monotonic()))
+            if worker.process.is_alive():
+                logger.warning(f"Worker kapanmadı, öldürülüyor: {worker.name}")
+                worker.process.kill()
+                worker.process.join()
+
+        self._set_running(server_id, False)
+
+    # ------------------------------------------------------------------
+    # Worker gözetimi
+    # ------------------------------------------------------------------
+
+    def _check_workers(self):
+        now = time.monotonic()
+
+        for server_id, workers in self._workers.items():
+            for worker in workers:
+                if worker.is_alive():
+                    if now - worker.started_at >= STABLE_AFTER:
+                        worker.restart_delay = 1
+                    continue
+
+                if worker.process is not None:
+                    # Çöken worker: artan bekleme ile yeniden başlatılacak
+                    logger.error(
+                        f"Syslog worker çöktü: {worker.name} (çıkış kodu {worker.process.exitcode})"
+                    )
+                    worker.process = None
+                    worker.restarts += 1
+                    worker.next_start = now + worker.restart_delay
+                    worker.restart_delay = min(worker.restart_delay * 2, MAX_RESTART_DELAY)
+
+                if now >= worker.next_start:
+                    self._start_worker(worker)
+
+            self._set_running(server_id, any(worker.is_alive() for worker in workers))
+
+    def _start_worker(self, worker):
+        # Fork edilen süreç ebeveynin veritabanı bağlantısını paylaşmamalı
+        connections.close_all()
+
+        worker.process = self._context.Process(
+            target=run_worker,
+            args=(worker.server_id, worker.worker_id, self.workers),
+            name=worker.name,
+            daemon=False,
+        )
+        worker.process.start()
+        worker.started_at = time.monotonic()
+        self._log(f"Worker başlatıldı: {worker.name} (pid {worker.process.pid})")
+
+    def _set_running(self, server_id, running):
+        """is_running alanını yalnızca durum değiştiğinde yazar"""
+        from .models import SyslogServer
+
+        if self._running_state.get(server_id) == running:
+            return
+        try:
+            SyslogServer.objects.filter(pk=server_id).update(is_running=running)
+            self._running_state[server_id] = running
+        except Exception as e:
+            logger.error(f"Syslog sunucu durumu güncellenemedi: {str(e)}")
+
+    def status(self):
+        """Sunucu başına worker durumlarını döndürür"""
+        return {
+            server_id: [
+                {
+                    'name': worker.name,
+                    'pid': worker.process.pid if worker.process else None,
+                    'alive': worker.is_alive(),
+                    'restarts': worker.restarts,
+                }
+                for worker in workers
+            ]
+            for server_id, workers in self._workers.items()
+        }
+
+    def _log(self, message):
+        if self.stdout is not None:
+            self.stdout.write(message)
+        else:
+            logger.info(message)
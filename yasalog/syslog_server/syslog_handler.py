@@ -3,16 +3,19 @@ Syslog Server Handler
 UDP/TCP/TLS protokolleri ile syslog mesajlarını işler
 """
 
-import socket
-import threading
-import ssl
-import json
-import re
+import os
 import time
-from datetime import datetime
+from collections import Counter
+from django.db import transaction
 from django.utils import timezone
 from django.conf import settings
-from .models import SyslogServer, SyslogMessage, SyslogClient, SyslogFilter, SyslogAlert
+from .models import SyslogServer, SyslogMessage
+from .engine import SyslogIngestEngine
+from .client_cache import client_registry
+from .filter_engine import filter_registry
+from .parser import parse_syslog_message
+from .statistics import StatisticsAggregator
+from .pipeline import WriteBehindQueue, BACKPRESSURE_DROP_OLDEST
 import logging
 
 logger = logging.getLogger(__name__)
@@ -21,368 +24,193 @@ logger = logging.getLogger(__name__)
 class SyslogHandler:
     """Syslog mesaj işleyici"""
     
-    def __init__(self, server_config):
+    def __init__(self, server_config, reuse_port=False, worker_id=None):
         self.server_config = server_config
+        self.reuse_port = reuse_port
+        self.worker_id = worker_id
         self.running = False
-        self.socket = None
-        self.threads = []
+        self.engine = None
+        self.write_queue = self._build_write_queue()
+        self.statistics = StatisticsAggregator(name=f"syslog-{server_config.pk}")
         
     def start(self):
         """Syslog server'ı başlatır"""
         try:
-            if self.server_config.protocol == 'UDP':
-                self._start_udp_server()
-            elif self.server_config.protocol == 'TCP':
-                self._start_tcp_server()
-            elif self.server_config.protocol == 'TLS':
-                self._start_tls_server()
-            else:
-                raise Exception(f"Desteklenmeyen protokol: {self.server_config.protocol}")
+            # Client eşlemesini başlangıçta tek sorguda belleğe al
+            client_registry.load(self.server_config)
+            self.statistics.start()
+            self.write_queue.start()
+            
+            # Ağ tarafı tek bir asyncio event loop'ta çalışır,
+            # mesajlar _process_message ile yazma kuyruğuna eklenir
+            self.engine = SyslogIngestEngine(
+                self.server_config, self._process_message, reuse_port=self.reuse_port
+            )
+            # block politikasında kuyruk dolunca dinleyiciler okumayı durdurur
+            self.write_queue.set_flow_control(self.engine.pause_reading, self.engine.resume_reading)
+            self.engine.start_in_thread()
             
             self.running = True
             logger.info(f"Syslog server başlatıldı: {self.server_config.name}")
             
         except Exception as e:
+            self.write_queue.stop()
+            self.statistics.stop()
             logger.error(f"Syslog server başlatma hatası: {str(e)}")
             raise
     
     def stop(self):
         """Syslog server'ı durdurur"""
         self.running = False
-        if self.socket:
-            self.socket.close()
+        if self.engine:
+            self.engine.stop_in_thread()
         
-        # Thread'leri bekle
-        for thread in self.threads:
-            thread.join(timeout=5)
+        # Kuyrukta kalan mesajları ve sayaçları yaz
+        self.write_queue.stop()
+        self.statistics.stop()
         
         logger.info(f"Syslog server durduruldu: {self.server_config.name}")
     
-    def _start_udp_server(self):
-        """UDP server başlatır"""
-        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-        self.socket.bind((self.server_config.host, self.server_config.port))
+    def get_stats(self):
+        """Bağlantı, throughput ve yazma kuyruğu sayaçlarını döndürür"""
+        stats = self.engine.stats() if self.engine else {}
+        stats['write_queue'] = self.write_queue.stats()
+        stats['client_cache'] = client_registry.stats()
+        stats['statistics'] = self.statistics.stats()
+        return stats
+    
+    def _build_write_queue(self):
+        """SyslogServer ayarlarına göre write-behind kuyruğunu oluşturur"""
+        spill_dir = getattr(settings, 'SYSLOG_SPILL_DIR', None) or os.path.join(
+            settings.BASE_DIR, 'logs', 'syslog_spill'
+        )
         
-        # UDP için tek thread yeterli
-        thread = threading.Thread(target=self._udp_listener)
-        thread.daemon = True
-        thread.start()
-        self.threads.append(thread)
-    
-    def _start_tcp_server(self):
-        """TCP server başlatır"""
-        self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-        self.socket.bind((self.server_config.host, self.server_config.port))
-        self.socket.listen(10)
+        # Her worker süreci kendi taşma dosyasını kullanır
+        suffix = f"_w{self.worker_id}" if self.worker_id is not None else ''
         
-        # TCP için ana thread
-        thread = threading.Thread(target=self._tcp_listener)
-        thread.daemon = True
-        thread.start()
-        self.threads.append(thread)
+        return WriteBehindQueue(
+            self._process_batch,
+            batch_size=self.server_config.batch_size,
+            max_bytes=self.server_config.buffer_size * 1024 * 1024,
+            flush_interval=getattr(settings, 'SYSLOG_FLUSH_INTERVAL_MS', 500) / 1000,
+            policy=getattr(settings, 'SYSLOG_BACKPRESSURE', BACKPRESSURE_DROP_OLDEST),
+            spill_path=os.path.join(spill_dir, f"server_{self.server_config.pk}{suffix}.spill"),
+            name=f"syslog-{self.server_config.pk}{suffix}",
+        )
     
-    def _start_tls_server(self):
-        """TLS server başlatır"""
-        # Önce TCP socket oluştur
-        tcp_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        tcp_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-        tcp_socket.bind((self.server_config.host, self.server_config.port))
-        tcp_socket.listen(10)
+    def _process_message(self, message, client_ip):
+        """Syslog mesajını yazma kuyruğuna ekler (veritabanına dokunmaz)"""
+        self.write_queue.put(message, client_ip)
+    
+    def _process_batch(self, batch):
+        """Kuyruktan gelen mesajları tek seferde kaydeder"""
+        started = time.monotonic()
+        clients = self._get_clients({client_ip for _, client_ip, _ in batch})
         
-        # TLS context oluştur
-        context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
-        if self.server_config.certificate_path:
-            context.load_cert_chain(
-                self.server_config.certificate_path,
-                self.server_config.private_key_path
-            )
+        # Zaman bilgisi olmayan mesajlar için batch'in alınma zamanı kullanılır
+        now = timezone.now()
+        default_tz = timezone.get_default_timezone()
         
-        self.socket = context.wrap_socket(tcp_socket, server_side=True)
+        records = []
+        for message, client_ip, received_at in batch:
+            parsed_message = self._parse_syslog_message(message, now=now, default_tz=default_tz)
+            records.append(self._build_message(message, parsed_message, client_ip, clients[client_ip]))
         
-        # TLS için ana thread
-        thread = threading.Thread(target=self._tls_listener)
-        thread.daemon = True
-        thread.start()
-        self.threads.append(thread)
-    
-    def _udp_listener(self):
-        """UDP mesaj dinleyicisi"""
-        while self.running:
-            try:
-                data, addr = self.socket.recvfrom(1024)
-                message = data.decode('utf-8', errors='ignore')
-                self._process_message(message, addr[0])
-            except Exception as e:
-                if self.running:
-                    logger.error(f"UDP listener hatası: {str(e)}")
-    
-    def _tcp_listener(self):
-        """TCP mesaj dinleyicisi"""
-        while self.running:
-            try:
-                client_socket, addr = self.socket.accept()
-                thread = threading.Thread(
-                    target=self._handle_tcp_client,
-                    args=(client_socket, addr[0])
-                )
-                thread.daemon = True
-                thread.start()
-                self.threads.append(thread)
-            except Exception as e:
-                if self.running:
-                    logger.error(f"TCP listener hatası: {str(e)}")
-    
-    def _tls_listener(self):
-        """TLS mesaj dinleyicisi"""
-        while self.running:
-            try:
-                client_socket, addr = self.socket.accept()
-                thread = threading.Thread(
-                    target=self._handle_tls_client,
-                    args=(client_socket, addr[0])
-                )
-                thread.daemon = True
-                thread.start()
-                self.threads.append(thread)
-            except Exception as e:
-                if self.running:
-                    logger.error(f"TLS listener hatası: {str(e)}")
-    
-    def _handle_tcp_client(self, client_socket, client_ip):
-        """TCP client'ı işler"""
-        try:
-            while self.running:
-                data = client_socket.recv(1024)
-                if not data:
-                    break
-                
-                message = data.decode('utf-8', errors='ignore')
-                self._process_message(message, client_ip)
-        except Exception as e:
-            logger.error(f"TCP client işleme hatası: {str(e)}")
-        finally:
-            client_socket.close()
-    
-    def _handle_tls_client(self, client_socket, client_ip):
-        """TLS client'ı işler"""
-        try:
-            while self.running:
-                data = client_socket.recv(1024)
-                if not data:
-                    break
-                
-                message = data.decode('utf-8', errors='ignore')
-                self._process_message(message, client_ip)
-        except Exception as e:
-            logger.error(f"TLS client işleme hatası: {str(e)}")
-        finally:
-            client_socket.close()
-    
-    def _process_message(self, message, client_ip):
-        """Syslog mesajını işler"""
-        try:
-            # Mesajı parse et
-            parsed_message = self._parse_syslog_message(message)
-            
-            # Client'ı bul veya oluştur
-            client, created = SyslogClient.objects.get_or_create(
-                server=self.server_config,
-                ip_address=client_ip,
-                defaults={
-                    'name': f"Client-{client_ip}",
-                    'is_active': True
-                }
-            )
-            
-            # Mesajı kaydet
-            syslog_message = SyslogMessage.objects.create(
-                server=self.server_config,
-                client=client,
-                raw_message=message,
-                parsed_message=parsed_message,
-                facility=parsed_message.get('facility', 0),
-                severity=parsed_message.get('severity', 0),
-                timestamp=parsed_message.get('timestamp', timezone.now()),
-                hostname=parsed_message.get('hostname', ''),
-                tag=parsed_message.get('tag', ''),
-                content=parsed_message.get('content', ''),
-                source_ip=client_ip
-            )
-            
-            # Filtreleri kontrol et
-            self._check_filters(syslog_message)
-            
-            # İstatistikleri güncelle
-            self._update_statistics(client)
-            
-        except Exception as e:
-            logger.error(f"Mesaj işleme hatası: {str(e)}")
-    
-    def _parse_syslog_message(self, message):
-        """Syslog mesajını parse eder"""
-        # RFC 3164 format: <priority>timestamp hostname tag: content
-        # RFC 5424 format: <priority>version timestamp hostname app-name procid msgid structured-data msg
+        # Filtreler INSERT'ten önce uygulanır; işaretler aynı yazımda kaydedilir
+        records = self._apply_filters(records)
         
-        parsed = {
-            'facility': 0,
-            'severity': 0,
-            'timestamp': timezone.now(),
-            'hostname': '',
-            'tag': '',
-            'content': message,
-            'priority': 0
+        with transaction.atomic():
+            SyslogMessage.objects.bulk_create(records)
+        
+        # İstatistikler bellekte toplanır, periyodik olarak yazılır
+        self.statistics.record(
+            self.server_config,
+            records,
+            client_ids=Counter(message.parsed_data['client_id'] for message in records),
+            received_at=max(received_at for _, _, received_at in batch),
+            processing_ms=(time.monotonic() - started) * 1000,
+        )
+    
+    def _get_clients(self, client_ips):
+        """Batch'teki kaynak IP'leri client_id'lere çözer (süreç içi önbellekten)"""
+        return client_registry.resolve_many(self.server_config, client_ips)
+    
+    def _build_message(self, raw_message, parsed_message, client_ip, client_id):
+        """Parse edilmiş mesajdan kaydedilmemiş SyslogMessage nesnesi oluşturur"""
+        procid = parsed_message.get('procid', '')
+        parsed_data = {
+            'priority': parsed_message.get('priority', 0),
+            'client_id': client_id,
+            'timestamp_source': parsed_message.get('timestamp_source', 'received'),
         }
+        for key in ('version', 'procid', 'msgid', 'structured_data'):
+            if parsed_message.get(key):
+                parsed_data[key] = parsed_message[key]
         
+        return SyslogMessage(
+            company_id=self.server_config.company_id,
+            server=self.server_config,
+            facility=parsed_message.get('facility', 0),
+            priority=parsed_message.get('severity', 0),
+            severity=parsed_message.get('severity', 0),
+            timestamp=parsed_message.get('timestamp') or timezone.now(),
+            hostname=parsed_message.get('hostname', '')[:255],
+            program=parsed_message.get('tag', '')[:100],
+            pid=int(procid) if procid.isdigit() else None,
+            message=parsed_message.get('content', ''),
+            source_ip=client_ip,
+            raw_message=raw_message,
+            is_parsed=True,
+            parsed_data=parsed_data
+        )
+    
+    def _parse_syslog_message(self, message, now=None, default_tz=None):
+        """Syslog mesajını parse eder (RFC 3164 / RFC 5424)"""
+        return parse_syslog_message(message, now=now, default_tz=default_tz)
+    
+    def _apply_filters(self, messages):
+        """Şirketin derlenmiş filtrelerini uygular, REJECT edilen mesajları çıkarır"""
         try:
-            # Priority kısmını parse et
-            priority_match = re.match(r'<(\d+)>', message)
-            if priority_match:
-                priority = int(priority_match.group(1))
-                parsed['priority'] = priority
-                parsed['facility'] = priority >> 3
-                parsed['severity'] = priority & 7
-                
-                # Priority kısmını çıkar
-                message = message[priority_match.end():]
-            
-            # Timestamp parse et (basit)
-            timestamp_patterns = [
-                r'(\w{3}\s+\d{1,2}\s+\d{2}:\d{2}:\d{2})',  # RFC 3164
-                r'(\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2})',  # RFC 5424
-            ]
-            
-            for pattern in timestamp_patterns:
-                match = re.search(pattern, message)
-                if match:
-                    try:
-                        timestamp_str = match.group(1)
-                        # Basit timestamp parse
-                        parsed['timestamp'] = timezone.now()
-                        message = message.replace(timestamp_str, '', 1).strip()
-                        break
-                    except:
-                        pass
-            
-            # Hostname parse et
-            hostname_match = re.match(r'(\S+)\s+', message)
-            if hostname_match:
-                parsed['hostname'] = hostname_match.group(1)
-                message = message[hostname_match.end():]
-            
-            # Tag ve content parse et
-            if ':' in message:
-                tag, content = message.split(':', 1)
-                parsed['tag'] = tag.strip()
-                parsed['content'] = content.strip()
-            else:
-                parsed['content'] = message.strip()
-            
+            compiled = filter_registry.get(self.server_config.company_id)
         except Exception as e:
-            logger.error(f"Syslog parse hatası: {str(e)}")
+            logger.error(f"Filter derleme hatası: {str(e)}")
+            return messages
         
-        return parsed
-    
-    def _check_filters(self, message):
-        """Aktif filtreleri kontrol eder"""
-        try:
-            filters = SyslogFilter.objects.filter(
-                server=self.server_config,
-                is_active=True
-            )
-            
-            for filter_obj in filters:
-                if self._matches_filter(message, filter_obj):
-                    self._trigger_alert(message, filter_obj)
-                    
-        except Exception as e:
-            logger.error(f"Filter kontrol hatası: {str(e)}")
+        if not compiled.filter_count:
+            return messages
+        
+        accepted = []
+        for message in messages:
+            matched = compiled.match(message)
+            if matched and not self._apply_filter_actions(message, matched):
+                continue
+            accepted.append(message)
+        
+        return accepted
     
-    def _matches_filter(self, message, filter_obj):
-        """Mesajın filtreye uyup uymadığını kontrol eder"""
-        try:
-            # Facility kontrolü
-            if filter_obj.facility and message.facility != filter_obj.facility:
-                return False
-            
-            # Severity kontrolü
-            if filter_obj.severity and message.severity != filter_obj.severity:
-                return False
-            
-            # Hostname kontrolü
-            if filter_obj.hostname_pattern and not re.search(
-                filter_obj.hostname_pattern, message.hostname
-            ):
-                return False
-            
-            # Tag kontrolü
-            if filter_obj.tag_pattern and not re.search(
-                filter_obj.tag_pattern, message.tag
-            ):
-                return False
-            
-            # Content kontrolü
-            if filter_obj.content_pattern and not re.search(
-                filter_obj.content_pattern, message.content
-            ):
+    def _apply_filter_actions(self, message, matched):
+        """Eşleşen filtrelerin aksiyonlarını uygular; mesaj saklanmayacaksa False"""
+        message.parsed_data['matched_filters'] = [filter_obj.pk for filter_obj in matched]
+        
+        # Filtreler öncelik sırasında; ilk ACCEPT/REJECT kararı verir
+        for filter_obj in matched:
+            if filter_obj.action == 'REJECT':
                 return False
-            
-            return True
-            
-        except Exception as e:
-            logger.error(f"Filter match hatası: {str(e)}")
-            return False
-    
-    def _trigger_alert(self, message, filter_obj):
-        """Uyarı tetikler"""
-        try:
-            SyslogAlert.objects.create(
-                server=self.server_config,
-                filter_obj=filter_obj,
-                message=message,
-                severity=filter_obj.alert_severity,
-                description=f"Filter match: {filter_obj.name}",
-                is_resolved=False
-            )
-            
-        except Exception as e:
-            logger.error(f"Alert tetikleme hatası: {str(e)}")
-    
-    def _update_statistics(self, client):
-        """İstatistikleri güncelle"""
-        try:
-            from .models import SyslogStatistics
-            
-            stats, created = SyslogStatistics.objects.get_or_create(
-                server=self.server_config,
-                client=client,
-                date=timezone.now().date(),
-                defaults={
-                    'message_count': 0,
-                    'error_count': 0,
-                    'warning_count': 0,
-                    'info_count': 0
-                }
-            )
-            
-            stats.message_count += 1
-            
-            # Son mesajın severity'sine göre sayacı artır
-            last_message = SyslogMessage.objects.filter(
-                server=self.server_config,
-                client=client
-            ).order_by('-timestamp').first()
-            
-            if last_message:
-                if last_message.severity <= 3:  # Error
-                    stats.error_count += 1
-                elif last_message.severity <= 4:  # Warning
-                    stats.warning_count += 1
-                else:  # Info
-                    stats.info_count += 1
-            
-            stats.save()
-            
-        except Exception as e:
-            logger.error(f"İstatistik güncelleme hatası: {str(e)}")
+            if filter_obj.action == 'ACCEPT':
+                break
+            if filter_obj.action == 'ALERT':
+                message.is_suspicious = True
+                message.threat_level = self._get_threat_level(message.severity)
+        
+        return True
+    
+    @staticmethod
+    def _get_threat_level(severity):
+        """Syslog severity'sinden tehdit seviyesi üretir"""
+        if severity <= 2:
+            return 'CRITICAL'
+        if severity == 3:
+            return 'HIGH'
+        if severity == 4:
+            return 'MEDIUM'
+        return 'LOW'
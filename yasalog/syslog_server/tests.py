@@ -0,0 +1,441 @@
+from datetime import datetime, timezone as dt_timezone
+from types import SimpleNamespace
+from django.test import SimpleTestCase, TestCase
+from .framing import SyslogFramer
+from .filter_engine import CompiledFilterSet
+from .engine import SyslogIngestEngine
+from .parser import parse_syslog_message
+from .pipeline import WriteBehindQueue, BACKPRESSURE_BLOCK, BACKPRESSURE_DROP_OLDEST, BACKPRESSURE_SPILL
+from .statistics import StatisticsAggregator
+
+
+class SyslogFramerTestCase(SimpleTestCase):
+    def test_octet_counting_across_reads(self):
+        """Octet-counted mesajlar okuma sınırlarından bağımsız olarak ayrılmalı"""
+        framer = SyslogFramer()
+        first = b'<13>Oct 11 22:14:15 host app: hello'
+        second = b'<14>Oct 11 22:14:16 host app: world'
+        stream = b'%d %s%d %s' % (len(first), first, len(second), second)
+
+        messages = framer.feed(stream[:10])
+        messages += framer.feed(stream[10:50])
+        messages += framer.feed(stream[50:])
+
+        self.assertEqual(messages, [first, second])
+
+    def test_newline_framing_multiple_messages_in_one_read(self):
+        """Tek okumadaki birden fazla LF-framed mesaj ayrı ayrı dönmeli"""
+        framer = SyslogFramer()
+        messages = framer.feed(b'<13>one\r\n<13>two\n<13>thr')
+        self.assertEqual(messages, [b'<13>one', b'<13>two'])
+        self.assertEqual(framer.feed(b'ee\n'), [b'<13>three'])
+
+    def test_oversized_message_is_dropped(self):
+        """Maksimum boyutu aşan mesaj atlanmalı, sonraki mesaj etkilenmemeli"""
+        framer = SyslogFramer(max_message_size=16)
+        big = b'<13>' + b'x' * 40
+        messages = framer.feed(b'%d %s' % (len(big), big[:20]))
+        messages += framer.feed(big[20:] + b'5 <13>a')
+
+        self.assertEqual(messages, [b'<13>a'])
+        self.assertEqual(framer.dropped_messages, 1)
+
+
+class WriteBehindQueueTestCase(SimpleTestCase):
+    def test_drop_oldest_keeps_newest_messages(self):
+        """Kuyruk dolduğunda drop_oldest en eski mesajları atmalı"""
+        flushed = []
+        queue = WriteBehindQueue(
+            flushed.extend, batch_size=10, max_bytes=30, policy=BACKPRESSURE_DROP_OLDEST
+        )
+        for i in range(5):
+            queue.put(f'message-{i}', '10.0.0.1')
+
+        queue.start()
+        queue.stop()
+
+        self.assertEqual([item[0] for item in flushed], ['message-2', 'message-3', 'message-4'])
+        self.assertEqual(queue.dropped, 2)
+
+    def test_block_pauses_reading_instead_of_waiting(self):
+        """block politikası put() içinde beklememeli; okumayı durdurup kuyruk boşalınca sürdürmeli"""
+        import threading
+        import time
+        flushed, events = [], []
+        flushing, release = threading.Event(), threading.Event()
+
+        def flush(batch):
+            flushing.set()
+            release.wait(5)
+            flushed.extend(batch)
+
+        queue = WriteBehindQueue(flush, batch_size=1, max_bytes=30, flush_interval=0.01, policy=BACKPRESSURE_BLOCK)
+        queue.set_flow_control(lambda: events.append('pause'), lambda: events.append('resume'))
+        queue.start()
+        queue.put('message-0', '10.0.0.1')
+        self.assertTrue(flushing.wait(5))
+
+        # Flusher yazmada takılıyken dolan kuyruk üreticiyi bekletmemeli
+        started = time.monotonic()
+        accepted = [queue.put(f'message-{i}', '10.0.0.1') for i in range(1, 6)]
+        self.assertLess(time.monotonic() - started, 0.5)
+        self.assertEqual(accepted, [True, True, True, True, False])
+        self.assertEqual((events, queue.dropped), (['pause'], 1))
+
+        release.set()
+        queue.stop()
+        self.assertEqual([item[0] for item in flushed], [f'message-{i}' for i in range(5)])
+        self.assertEqual(events, ['pause', 'resume'])
+
+    def test_spill_is_written_by_flusher_and_replayed(self):
+        """Taşan mesajlar put() içinde diske yazılmamalı; flusher yazıp sırayla geri okumalı"""
+        import os
+        import shutil
+        import tempfile
+        import time
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        spill_path = os.path.join(directory, 'spill', 'server.spill')
+        flushed = []
+
+        queue = WriteBehindQueue(
+            flushed.extend, batch_size=10, max_bytes=30, flush_interval=0.01,
+            policy=BACKPRESSURE_SPILL, spill_path=spill_path,
+        )
+        for i in range(5):
+            self.assertTrue(queue.put(f'message-{i}', '10.0.0.1'))
+        self.assertFalse(os.path.exists(spill_path))
+        self.assertEqual(queue.stats()['spill_buffered'], 2)
+
+        queue.start()
+        deadline = time.monotonic() + 5
+        while len(flushed) < 5 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        queue.stop()
+
+        self.assertEqual([item[0] for item in flushed], [f'message-{i}' for i in range(5)])
+        self.assertEqual((queue.spilled, queue.dropped), (2, 0))
+        self.assertIsNone(queue._spill_file)
+        self.assertEqual(os.listdir(os.path.dirname(spill_path)), [])
+
+
+class SyslogIngestEngineTestCase(SimpleTestCase):
+    def _start(self, protocol, max_connections=10):
+        import threading
+        received, arrived = [], threading.Condition()
+
+        def handle(message, client_ip):
+            with arrived:
+                received.append((message, client_ip))
+                arrived.notify_all()
+
+        config = SimpleNamespace(pk=1, name=f'Test {protocol}', protocol=protocol, host='127.0.0.1', port=0,
+                                 max_connections=max_connections, certificate_path='', private_key_path='')
+        engine = SyslogIngestEngine(config, handle)
+        engine.start_in_thread()
+        self.addCleanup(engine.stop_in_thread)
+        listener = engine._transport.get_extra_info('socket') if protocol == 'UDP' else engine._server.sockets[0]
+
+        def wait(count):
+            with arrived:
+                return arrived.wait_for(lambda: len(received) >= count, timeout=5)
+
+        return engine, listener.getsockname()[1], received, wait
+
+    def _until(self, predicate):
+        import time
+        deadline = time.monotonic() + 5
+        while not predicate() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        return predicate()
+
+    def test_udp_messages_are_dispatched_and_reading_pauses(self):
+        """UDP datagramları işleyiciye ulaşmalı; okuma durdurulunca bekletilmeli"""
+        import socket
+        import time
+        engine, port, received, wait = self._start('UDP')
+        client = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.addCleanup(client.close)
+        client.sendto(b'<13>bir', ('127.0.0.1', port))
+        client.sendto(b'<13>iki', ('127.0.0.1', port))
+        self.assertTrue(wait(2))
+        self.assertEqual(received, [('<13>bir', '127.0.0.1'), ('<13>iki', '127.0.0.1')])
+        self.assertEqual((engine.counters.messages_received, engine.counters.bytes_received), (2, 14))
+
+        engine.pause_reading()
+        self.assertTrue(self._until(lambda: engine.reading_paused))
+        client.sendto(b'<13>uc', ('127.0.0.1', port))
+        time.sleep(0.2)
+        self.assertEqual(len(received), 2)
+        engine.resume_reading()
+        self.assertTrue(wait(3))
+        self.assertEqual(engine.stats()['read_pauses'], 1)
+
+    def test_tcp_framing_connection_limit_and_pause(self):
+        """TCP akışı çerçevelenmeli, max_connections aşan bağlantı reddedilmeli"""
+        import socket
+        import time
+        engine, port, received, wait = self._start('TCP', max_connections=1)
+        client = socket.create_connection(('127.0.0.1', port), timeout=5)
+        self.addCleanup(client.close)
+        client.sendall(b'<13>bir\n<13>ik')
+        client.sendall(b'i\n')
+        self.assertTrue(wait(2))
+        self.assertEqual([message for message, _ in received], ['<13>bir', '<13>iki'])
+
+        # Limit doluyken açılan bağlantı sunucu tarafından kapatılır
+        rejected = socket.create_connection(('127.0.0.1', port), timeout=5)
+        self.addCleanup(rejected.close)
+        self.assertEqual(rejected.recv(1), b'')
+        self.assertEqual((engine.counters.total_connections, engine.counters.rejected_connections), (1, 1))
+
+        engine.pause_reading()
+        self.assertTrue(self._until(lambda: engine.reading_paused))
+        client.sendall(b'<13>uc\n')
+        time.sleep(0.2)
+        self.assertEqual(len(received), 2)
+        engine.resume_reading()
+        self.assertTrue(wait(3))
+
+        client.close()
+        self.assertTrue(self._until(lambda: engine.counters.active_connections == 0))
+        self.assertEqual(engine.counters.messages_received, 3)
+
+
+class SyslogClientRegistryTestCase(TestCase):
+    def test_hits_invalidation_and_version_stamp(self):
+        """Önbellek isabetleri, geçersiz kılma ve başka süreçteki değişikliğin sürüm damgasıyla yakalanması"""
+        from django.utils import timezone
+        from log_kayit.models import Company
+        from .client_cache import SyslogClientRegistry
+        from .models import SyslogClient, SyslogServer
+
+        company = Company.objects.create(name='Test', slug='test')
+        server = SyslogServer.objects.create(company=company, name='Test', host='127.0.0.1')
+        first, second = [
+            SyslogClient.objects.create(company=company, syslog_server=server, name=name,
+                                        client_type='CUSTOM', ip_address='10.0.0.1')
+            for name in ('İlk', 'Tekrar')
+        ]
+        registry = SyslogClientRegistry(check_interval=3600)
+
+        # Aynı IP'nin tekrar kaydı ilk oluşturulan client'a çözülür
+        self.assertEqual(registry.resolve(server, '10.0.0.1'), first.pk)
+        self.assertIsNone(registry.resolve(server, '10.0.0.9'))
+        self.assertEqual(registry.resolve(server, '10.0.0.1'), first.pk)
+        self.assertEqual(registry.stats(), {'size': 1, 'hits': 2, 'misses': 1, 'reloads': 1, 'hit_ratio': 0.6667})
+
+        # Sinyal tetiklemeyen (başka süreçteki) değişiklik kontrol aralığı dolunca yakalanır
+        SyslogClient.objects.filter(pk=second.pk).update(ip_address='10.0.0.2', updated_at=timezone.now())
+        self.assertIsNone(registry.resolve(server, '10.0.0.2'))
+        registry.check_interval = 0
+        self.assertEqual(registry.resolve(server, '10.0.0.2'), second.pk)
+        self.assertEqual(registry.stats()['reloads'], 2)
+        self.assertEqual(registry.resolve(server, '10.0.0.2'), second.pk)
+        self.assertEqual(registry.stats()['reloads'], 2)
+
+        registry.invalidate(server.pk)
+        self.assertEqual(registry.stats()['size'], 0)
+        self.assertEqual(registry.resolve(server, '10.0.0.1'), first.pk)
+        self.assertEqual(registry.stats()['reloads'], 3)
+
+        # Bilinmeyen IP için client açılır ve yeniden yükleme gerekmeden önbelleğe girer
+        created = registry.resolve_many(server, ['10.0.0.1', '10.0.0.3'])['10.0.0.3']
+        self.assertEqual(SyslogClient.objects.get(ip_address='10.0.0.3').pk, created)
+        registry.check_interval = 3600
+        with self.assertNumQueries(0):
+            self.assertEqual(registry.resolve(server, '10.0.0.3'), created)
+
+    def test_duplicate_client_signal_keeps_lowest_id(self):
+        """Aynı IP'nin tekrar kaydı sinyalle önbelleğe girerken ilk client'ı ezmemeli"""
+        from log_kayit.models import Company
+        from .client_cache import client_registry
+        from .models import SyslogClient, SyslogServer
+
+        company = Company.objects.create(name='Test', slug='test')
+        server = SyslogServer.objects.create(company=company, name='Test', host='127.0.0.1')
+        first = SyslogClient.objects.create(company=company, syslog_server=server, name='İlk',
+                                            client_type='CUSTOM', ip_address='10.0.0.1')
+        self.addCleanup(client_registry.invalidate, server.pk)
+        self.assertEqual(client_registry.resolve(server, '10.0.0.1'), first.pk)
+
+        SyslogClient.objects.create(company=company, syslog_server=server, name='Tekrar',
+                                    client_type='CUSTOM', ip_address='10.0.0.1')
+        self.assertEqual(client_registry.resolve(server, '10.0.0.1'), first.pk)
+
+
+class SyslogSupervisorTestCase(TestCase):
+    def test_crashed_worker_restarts_with_backoff(self):
+        """Çöken worker artan beklemeyle yeniden başlatılmalı, kararlı worker'ın beklemesi sıfırlanmalı"""
+        from unittest import mock
+        from log_kayit.models import Company
+        from . import supervisor as supervisor_module
+        from .models import SyslogServer
+
+        class FakeProcess:
+            def __init__(self, target, args, name, daemon):
+                self.args, self.name = args, name
+                self.pid = len(started) + 1000
+                self.exitcode = None
+                self.alive = False
+
+            def start(self):
+                self.alive = True
+                started.append(self)
+
+            def is_alive(self):
+                return self.alive
+
+            def crash(self):
+                self.alive, self.exitcode = False, 1
+
+            def terminate(self):
+                self.alive, self.exitcode = False, -15
+
+            def join(self, timeout=None):
+                pass
+
+        started, clock = [], [0.0]
+        company = Company.objects.create(name='Test', slug='test')
+        server = SyslogServer.objects.create(company=company, name='Test', host='127.0.0.1')
+        supervisor = supervisor_module.SyslogSupervisor(workers=1)
+        supervisor._context = SimpleNamespace(Process=FakeProcess)
+
+        def check(at):
+            clock[0] = at
+            supervisor._check_workers()
+            return SyslogServer.objects.get(pk=server.pk).is_running
+
+        with mock.patch.object(supervisor_module, 'time', SimpleNamespace(monotonic=lambda: clock[0])):
+            supervisor._sync_servers()
+            self.assertTrue(check(0))
+            self.assertEqual(started[0].args, (server.pk, 0, 1))
+
+            # Çökme: 1 sn beklenir, sonraki çökmede 2 sn
+            started[-1].crash()
+            self.assertFalse(check(10))
+            self.assertFalse(check(10.5))
+            self.assertTrue(check(11))
+            started[-1].crash()
+            self.assertFalse(check(12))
+            self.assertFalse(check(13.5))
+            self.assertTrue(check(14))
+            self.assertEqual(len(started), 3)
+            self.assertEqual(supervisor.status()[server.pk][0]['restarts'], 2)
+
+            # STABLE_AFTER boyunca ayakta kalan worker tekrar 1 sn ile başlar
+            self.assertTrue(check(14 + supervisor_module.STABLE_AFTER))
+            started[-1].crash()
+            self.assertFalse(check(100))
+            self.assertTrue(check(101))
+
+            supervisor.shutdown()
+        self.assertEqual([process.exitcode for process in started], [1, 1, 1, -15])
+        self.assertFalse(SyslogServer.objects.get(pk=server.pk).is_running)
+        self.assertEqual(supervisor.status(), {})
+
+
+class CompiledFilterSetTestCase(SimpleTestCase):
+    def _filter(self, pk, filter_type, filter_value, priority=1):
+        return SimpleNamespace(
+            pk=pk, name=f'filter-{pk}', filter_type=filter_type,
+            filter_value=filter_value, priority=priority
+        )
+
+    def _message(self, **kwargs):
+        fields = {'facility': 1, 'severity': 6, 'source_ip': '10.0.0.1',
+                  'hostname': 'fw1', 'program': 'app', 'message': ''}
+        fields.update(kwargs)
+        return SimpleNamespace(**fields)
+
+    def test_dispatch_tables_and_keywords(self):
+        """Facility/severity tabloları ve anahtar kelimeler doğru filtreleri döndürmeli"""
+        compiled = CompiledFilterSet([
+            self._filter(1, 'FACILITY', 'local0'),
+            self._filter(2, 'PRIORITY', 'err,crit', priority=0),
+            self._filter(3, 'MESSAGE', 'denied'),
+            self._filter(4, 'MESSAGE', 'deny'),
+            self._filter(5, 'IP', '192.168.0.0/16'),
+            self._filter(6, 'HOSTNAME', r'^core-sw\d+$'),
+            self._filter(7, 'REGEX', '(unclosed'),
+        ])
+
+        self.assertEqual(compiled.filter_count, 6)
+        matched = compiled.match(self._message(
+            facility=16, severity=3, source_ip='192.168.1.5',
+            hostname='core-sw01', message='login denied for admin'
+        ))
+        self.assertEqual([f.pk for f in matched], [2, 1, 3, 5, 6])
+        self.assertEqual([f.pk for f in compiled.match(self._message(message='deny all'))], [4])
+        self.assertEqual(compiled.match(self._message()), [])
+
+
+class StatisticsAggregatorTestCase(SimpleTestCase):
+    def test_batches_accumulate_in_memory(self):
+        """Aynı saatteki batch'ler tek sayaç kovasında toplanmalı"""
+        aggregator = StatisticsAggregator(flush_interval=60)
+        server = SimpleNamespace(pk=1, company_id=1)
+        received_at = datetime(2025, 1, 2, 10, 15, tzinfo=dt_timezone.utc).timestamp()
+        messages = [
+            SimpleNamespace(facility=16, severity=3, hostname='fw01'),
+            SimpleNamespace(facility=16, severity=6, hostname='fw02'),
+        ]
+
+        aggregator.record(server, messages, client_ids={7: 2}, received_at=received_at)
+        aggregator.record(server, messages[:1], client_ids={7: 1}, received_at=received_at + 60)
+
+        self.assertEqual(len(aggregator._buckets), 1)
+        bucket = next(iter(aggregator._buckets.values()))
+        self.assertEqual((bucket.total, bucket.errors), (3, 2))
+        self.assertEqual(bucket.by_hostname, {'fw01': 2, 'fw02': 1})
+        self.assertEqual(aggregator._servers[1][0], 3)
+        self.assertEqual(aggregator._clients[7][0], 3)
+        self.assertEqual(aggregator.pending(), 3)
+
+
+class SyslogParserTestCase(SimpleTestCase):
+    now = datetime(2025, 1, 2, 10, 0, tzinfo=dt_timezone.utc)
+
+    def parse(self, message):
+        return parse_syslog_message(message, now=self.now, default_tz=dt_timezone.utc)
+
+    def test_rfc5424_fields_and_structured_data(self):
+        """RFC 5424 başlığı, structured data ve zaman damgası okunmalı"""
+        parsed = self.parse(
+            '<165>1 2024-10-11T22:14:15.003+03:00 host01 app 42 ID47 '
+            '[sd@1 a="x\\]y" b="2"] hello'
+        )
+        self.assertEqual((parsed['facility'], parsed['severity']), (20, 5))
+        self.assertEqual((parsed['hostname'], parsed['tag'], parsed['procid']), ('host01', 'app', '42'))
+        self.assertEqual(parsed['structured_data'], {'sd@1': {'a': 'x]y', 'b': '2'}})
+        self.assertEqual(parsed['content'], 'hello')
+        self.assertEqual(parsed['timestamp'].utcoffset().total_seconds(), 3 * 3600)
+        self.assertEqual(parsed['timestamp_source'], 'message')
+
+        # 'Z' soneki ve 9 haneli kesir (Python 3.11 öncesi fromisoformat kabul etmez)
+        parsed = self.parse('<165>1 2003-10-11T22:14:15.123456789Z host01 app - - - hi')
+        self.assertEqual(parsed['timestamp'], datetime(2003, 10, 11, 22, 14, 15, 123456, tzinfo=dt_timezone.utc))
+        self.assertEqual(parsed['timestamp_source'], 'message')
+        parsed = self.parse('<165>1 2003-10-11T22:14:15.003-07:00 host01 app - - - hi')
+        self.assertEqual(parsed['timestamp'], datetime(2003, 10, 12, 5, 14, 15, 3000, tzinfo=dt_timezone.utc))
+
+    def test_bsd_timestamp_year_inference(self):
+        """Yılsız BSD zaman damgası alınma zamanından önceki yıla atanmalı"""
+        parsed = self.parse('<13>Dec 31 23:59:00 fw01 sshd[99]: login')
+        self.assertEqual(parsed['timestamp'], datetime(2024, 12, 31, 23, 59, tzinfo=dt_timezone.utc))
+        self.assertEqual((parsed['hostname'], parsed['tag'], parsed['procid']), ('fw01', 'sshd', '99'))
+        self.assertEqual(parsed['content'], 'login')
+
+    def test_vendor_formats(self):
+        """MikroTik, Cisco ASA ve FortiGate başlıkları doğru ayrıştırılmalı"""
+        mikrotik = self.parse('<134>firewall,info forward: in:ether2 out:ether1')
+        self.assertEqual((mikrotik['hostname'], mikrotik['tag']), ('', 'firewall,info'))
+        self.assertEqual(mikrotik['timestamp_source'], 'received')
+
+        asa = self.parse('<166>Oct 11 2024 22:14:15: %ASA-6-302013: Built inbound')
+        self.assertEqual(asa['tag'], '%ASA-6-302013')
+        self.assertEqual(asa['timestamp'], datetime(2024, 10, 11, 22, 14, 15, tzinfo=dt_timezone.utc))
+
+        forti = self.parse('<189>date=2024-10-11 time=22:14:15 devname="FGT60F" tz="+0300" type="traffic"')
+        self.assertEqual(forti['hostname'], 'FGT60F')
+        self.assertEqual(forti['timestamp'].isoformat(), '2024-10-11T22:14:15+03:00')
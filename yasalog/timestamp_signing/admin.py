@@ -1,5 +1,6 @@
 from django.contrib import admin
-from .models import TimestampAuthority, TimestampSignature, TimestampConfiguration, TimestampLog
+from .models import (TimestampAuthority, TimestampSignature, TimestampConfiguration, TimestampLog, TimestampRetry,
+                     LogLedgerCheckpoint)
 
 
 @admin.register(TimestampAuthority)
@@ -127,3 +128,29 @@ class TimestampLogAdmin(admin.ModelAdmin):
     
     def has_add_permission(self, request):
         return False  # Loglar otomatik oluşturulur
+
+
+@admin.register(TimestampRetry)
+class TimestampRetryAdmin(admin.ModelAdmin):
+    list_display = ['log_entry_id', 'company', 'attempts', 'next_attempt_at', 'created_at']
+    list_filter = ['company']
+    readonly_fields = ['log_entry', 'company', 'attempts', 'next_attempt_at', 'last_error', 'created_at']
+    
+    def has_add_permission(self, request):
+        return False  # Kuyruk otomatik imzalama tarafından yönetilir
+
+
+@admin.register(LogLedgerCheckpoint)
+class LogLedgerCheckpointAdmin(admin.ModelAdmin):
+    list_display = ['company', 'seq', 'is_anchor', 'authority', 'serial_number', 'created_at']
+    list_filter = ['company', 'authority', 'is_anchor']
+    readonly_fields = ['company', 'seq', 'chain_hash', 'is_anchor', 'authority', 'timestamp_token', 'serial_number', 'created_at']
+    
+    def has_add_permission(self, request):
+        return False  # Kontrol noktaları update_ledger tarafından oluşturulur
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+    
+    def has_delete_permission(self, request, obj=None):
+        return False
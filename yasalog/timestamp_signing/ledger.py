@@ -0,0 +1,528 @@
+"""
+Log defteri (hash zinciri)
+5651 Log Sistemi - Satır başına TSA isteği olmadan değişiklik tespiti
+
+LogKayit.sha256_hash anahtarsız bir özettir; veritabanına erişen biri satırı
+değiştirip özeti yeniden hesaplayabilir. Defter her firma için yalnızca
+eklenen bir zincir tutar:
+
+    record_hash = HMAC-SHA256(LEDGER_HMAC_KEY, kayıt alanları)
+    chain_hash  = SHA256(önceki chain_hash || seq || record_hash)
+
+- Kayıtlar ekleme yolundan bağımsız olarak (form, API, toplu içe aktarma)
+  `append_entries()` ile ID sırasında zincire eklenir (cron veya
+  `manage.py update_ledger`); kayıt başına maliyet bir HMAC, bir SHA256 ve
+  toplu INSERT'te bir satırdır. Rollup'larda olduğu gibi, INSERT'i henüz
+  commit edilmemiş düşük ID'li kaydı atlamamak için yalnızca commit sınırına
+  (`commit_horizon()`) kadar okunur; giris_zamani'na bakılmaz, gelecek
+  tarihli bir kayıt hiçbir firmanın zincirini bekletmez.
+- Zincir başı LEDGER_CHECKPOINT_MINUTES'te bir firmanın TSA'sına damgalatılır
+  (`checkpoint_heads()`); kontrol noktasından önceki hiçbir girdi fark
+  edilmeden silinemez veya yeniden sıralanamaz.
+- Saklama süresiyle silinecek zincir öneki önce çapalanır
+  (`anchor_expired_prefix()`): son silinen girdinin (seq, chain_hash) değeri
+  TSA damgalı, hiç silinmeyen bir çapa kontrol noktasında kalır. Zincir
+  seq 1'den veya bir çapanın hemen ardından başlamıyorsa baştan silinmiştir.
+- `verify_entries()` zinciri akış halinde doğrular ve ilk bozuk kaydı
+  (seq, log ID, neden) bildirir. Girdiler veritabanından
+  (`iter_company_entries`) veya `export_day()` ile yazılan günlük JSON Lines
+  dosyalarından (`read_files`) okunur.
+
+Kayıt özetine şifreli sütunlar yerine kör indeksler girer; şifreleme
+anahtarı rotasyonu zinciri bozmaz (BLIND_INDEX_KEY değişirse bozar).
+is_suspicious yönetici tarafından işaretlenebildiğinden özete girmez.
+Zincir adımı anahtarsızdır: anahtarı olmayan denetçi dosyadaki bağları ve
+TSA kontrol noktalarını doğrulayabilir, kayıt özetlerini doğrulamak için
+anahtar gerekir.
+"""
+
+import hashlib
+import hmac
+import json
+import os
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone as dt_timezone
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max, Min
+from django.utils import timezone
+from log_kayit.blind_index import tc_no_index, ip_address_index, mac_address_index
+from log_kayit.encryption import decrypt_tc_no, decrypt_ip_address, decrypt_mac_address, is_encrypted
+from log_kayit.commit_horizon import commit_horizon
+from log_kayit.models import JobCheckpoint, LogKayit
+from .models import LogLedgerCheckpoint, LogLedgerEntry, TimestampAuthority, TimestampConfiguration
+import logging
+
+logger = logging.getLogger(__name__)
+
+LEDGER_JOB = 'log_ledger'
+GENESIS_HASH = '0' * 64
+
+# Kayıt özetine giren alanlar (sırası values_list ile aynı)
+RECORD_FIELDS = (
+    'id', 'company_id', 'giris_zamani', 'kimlik_turu', 'ad_soyad', 'telefon', 'pasaport_no',
+    'pasaport_ulkesi', 'nat_ip_adresi', 'nat_port', 'sha256_hash',
+    'tc_no_bidx', 'ip_adresi_bidx', 'mac_adresi_bidx',
+)
+# Kör indeksi eksik eski kayıtlar için indeks şifreli değerden hesaplanır
+INDEX_SOURCES = (
+    ('tc_no_bidx', 'tc_no', tc_no_index, decrypt_tc_no),
+    ('ip_adresi_bidx', 'ip_adresi', ip_address_index, decrypt_ip_address),
+    ('mac_adresi_bidx', 'mac_adresi', mac_address_index, decrypt_mac_address),
+)
+ROW_FIELDS = RECORD_FIELDS + tuple(source for _, source, _, _ in INDEX_SOURCES)
+
+
+def _get_key():
+    """Defter anahtarı; tanımlı değilse SECRET_KEY'den türetilir"""
+    key = getattr(settings, 'LEDGER_HMAC_KEY', None)
+    if key:
+        return key.encode('utf-8') if isinstance(key, str) else key
+    return hmac.new(
+        settings.SECRET_KEY.encode('utf-8'), b'yasalog-log-ledger', hashlib.sha256
+    ).digest()
+
+
+def record_fields(row):
+    """values_list(*ROW_FIELDS) satırından özete girecek alanlar (JSON uyumlu)"""
+    values = dict(zip(ROW_FIELDS, row))
+    for index_field, source, index_func, decrypt_func in INDEX_SOURCES:
+        value = values.pop(source)
+        if not values[index_field] and value:
+            values[index_field] = index_func(decrypt_func(value) if is_encrypted(value) else value)
+    values['giris_zamani'] = values['giris_zamani'].astimezone(dt_timezone.utc).isoformat()
+    if values['nat_ip_adresi'] is not None:
+        values['nat_ip_adresi'] = str(values['nat_ip_adresi'])
+    return values
+
+
+def record_hash(fields, key=None):
+    payload = json.dumps(fields, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return hmac.new(key or _get_key(), payload.encode('utf-8'), hashlib.sha256).hexdigest()
+
+
+def chain_hash(previous, seq, record):
+    return hashlib.sha256(bytes.fromhex(previous) + seq.to_bytes(8, 'big') + bytes.fromhex(record)).hexdigest()
+
+
+def anchor_hash(seq, chain):
+    """Çapa kontrol noktası için TSA'ya damgalatılan özet
+
+    Olağan kontrol noktasından farklıdır; veritabanında is_anchor işaretlenerek
+    bir kontrol noktası çapaya dönüştürülemez.
+    """
+    return hashlib.sha256(b'yasalog-ledger-anchor' + seq.to_bytes(8, 'big') + bytes.fromhex(chain)).hexdigest()
+
+
+def ledger_watermark():
+    """Zincire eklenmiş son log ID'si"""
+    return JobCheckpoint.objects.filter(job=LEDGER_JOB, company=None).values_list(
+        'last_id', flat=True
+    ).first() or 0
+
+
+# ----------------------------------------------------------------------
+# Yazma
+# ----------------------------------------------------------------------
+
+def _head(company_id):
+    """Firmanın zincir başı: (seq, chain_hash)
+
+    Girdilerin tümü saklama süresiyle silinmişse zincir son çapadan devam eder.
+    """
+    return LogLedgerEntry.objects.filter(company_id=company_id).order_by('-seq').values_list(
+        'seq', 'chain_hash'
+    ).first() or LogLedgerCheckpoint.objects.filter(company_id=company_id, is_anchor=True).order_by(
+        '-seq'
+    ).values_list('seq', 'chain_hash').first() or (0, GENESIS_HASH)
+
+
+def append_entries(batch_size=5000, stdout=None):
+    """Watermark'tan commit sınırına kadar olan log kayıtlarını firma zincirlerine ekler
+
+    Dönüş: zincire eklenen kayıt sayısı.
+    """
+    JobCheckpoint.objects.get_or_create(job=LEDGER_JOB, company=None)
+    horizon = commit_horizon()
+    key = _get_key()
+    appended = 0
+    started = time.monotonic()
+
+    while True:
+        with transaction.atomic():
+            # Kilit: aynı anda çalışan iki iş aynı sırayı iki kez vermez
+            checkpoint = JobCheckpoint.objects.select_for_update().get(job=LEDGER_JOB, company=None)
+            rows = list(
+                LogKayit.objects.filter(id__gt=checkpoint.last_id, id__lte=horizon).order_by('id').values_list(
+                    *ROW_FIELDS
+                )[:batch_size]
+            )
+
+            heads = {}
+            entries = []
+            last_id = checkpoint.last_id
+            for row in rows:
+                fields = record_fields(row)
+                company_id = fields['company_id']
+                if company_id not in heads:
+                    heads[company_id] = _head(company_id)
+                seq, previous = heads[company_id]
+                seq += 1
+                digest = record_hash(fields, key)
+                link = chain_hash(previous, seq, digest)
+                entries.append(LogLedgerEntry(
+                    company_id=company_id, seq=seq, log_id=fields['id'], record_hash=digest, chain_hash=link
+                ))
+                heads[company_id] = (seq, link)
+                last_id = fields['id']
+
+            if entries:
+                LogLedgerEntry.objects.bulk_create(entries, batch_size=1000)
+                checkpoint.last_id = last_id
+                checkpoint.processed += len(entries)
+                checkpoint.save(update_fields=['last_id', 'processed', 'updated_at'])
+
+        appended += len(entries)
+        if stdout is not None and entries:
+            elapsed = time.monotonic() - started
+            stdout.write(f'ID {last_id} - zincire eklenen {appended}, {appended / elapsed:,.0f} kayıt/sn')
+        if len(entries) < batch_size:
+            break
+
+    return appended
+
+
+def checkpoint_heads(interval_minutes=None, force=False):
+    """Son kontrol noktasından beri ilerleyen zincir başlarını TSA'ya damgalatır
+
+    Yalnızca zaman damgası yapılandırması aktif firmalar için çalışır; TSA
+    hatası diğer firmaları durdurmaz. Dönüş: oluşturulan kontrol noktası sayısı.
+    """
+    from .services import TimestampService
+
+    if interval_minutes is None:
+        interval_minutes = getattr(settings, 'LEDGER_CHECKPOINT_MINUTES', 60)
+    due_before = timezone.now() - timedelta(minutes=interval_minutes)
+    created = 0
+
+    for config in TimestampConfiguration.objects.filter(is_active=True).select_related('company', 'authority'):
+        seq, head = _head(config.company_id)
+        if not seq:
+            continue
+        last = LogLedgerCheckpoint.objects.filter(company_id=config.company_id).order_by('-seq').first()
+        if last is not None and (last.seq >= seq or (not force and last.created_at > due_before)):
+            continue
+        try:
+            result = TimestampService(config.authority).sign_hash(head)
+        except Exception as e:
+            logger.error(f"Log zinciri kontrol noktası hatası ({config.company.name}): {str(e)}")
+            continue
+        LogLedgerCheckpoint.objects.create(
+            company_id=config.company_id, seq=seq, chain_hash=head, authority=config.authority,
+            timestamp_token=result['timestamp_token'], serial_number=result['serial_number'] or '',
+        )
+        created += 1
+    return created
+
+
+def _anchor_authority(company_id):
+    """Çapa için firmanın otoritesi; yapılandırma yoksa ilk aktif otorite"""
+    config = TimestampConfiguration.objects.filter(company_id=company_id).select_related('authority').first()
+    if config is not None:
+        return config.authority
+    return TimestampAuthority.objects.filter(is_active=True).order_by('pk').first()
+
+
+def anchor_expired_prefix(cutoff):
+    """Saklama süresiyle silinecek zincir öneklerini silinmeden önce çapalar
+
+    Her firma için logları cutoff'tan eski en uzun girdi öneki bulunur; önekin
+    son girdisi TSA'ya damgalatılıp çapa kontrol noktası olarak saklanır.
+    Önekten sonra sıra dışı kalan eski kayıtlar silinince zincirde boşluk
+    olarak raporlanır. Çapa oluşturulamazsa RuntimeError; loglar çapasız
+    silinmemelidir. Dönüş: oluşturulan çapa sayısı.
+    """
+    from .services import TimestampService
+
+    created = 0
+    expired = LogLedgerEntry.objects.filter(log__giris_zamani__lt=cutoff).order_by()
+    for company_id in expired.values_list('company_id', flat=True).distinct():
+        entries = LogLedgerEntry.objects.filter(company_id=company_id)
+        kept = entries.filter(log__giris_zamani__gte=cutoff).aggregate(seq=Min('seq'))['seq']
+        last_seq = kept - 1 if kept is not None else entries.aggregate(seq=Max('seq'))['seq']
+        head = entries.filter(seq=last_seq).values_list('chain_hash', flat=True).first()
+        if head is None:
+            continue  # Önek boş: ilk girdinin logu henüz silinmeyecek
+        if LogLedgerCheckpoint.objects.filter(company_id=company_id, seq=last_seq, is_anchor=True).exists():
+            continue
+
+        authority = _anchor_authority(company_id)
+        if authority is None:
+            raise RuntimeError(f'Log zinciri çapası için zaman damgası otoritesi yok (firma {company_id})')
+        try:
+            result = TimestampService(authority).sign_hash(anchor_hash(last_seq, head))
+        except Exception as e:
+            raise RuntimeError(f'Log zinciri çapası oluşturulamadı (firma {company_id}): {str(e)}')
+        LogLedgerCheckpoint.objects.create(
+            company_id=company_id, seq=last_seq, chain_hash=head, is_anchor=True, authority=authority,
+            timestamp_token=result['timestamp_token'], serial_number=result['serial_number'] or '',
+        )
+        created += 1
+    return created
+
+
+# ----------------------------------------------------------------------
+# Okuma ve doğrulama
+# ----------------------------------------------------------------------
+
+def _checkpoint_dict(checkpoint):
+    return {
+        'seq': checkpoint.seq,
+        'chain_hash': checkpoint.chain_hash,
+        'anchor': checkpoint.is_anchor,
+        'authority_id': checkpoint.authority_id,
+        'timestamp_token': checkpoint.timestamp_token,
+    }
+
+
+def company_checkpoints(company, first_seq=1):
+    return [
+        _checkpoint_dict(checkpoint)
+        for checkpoint in LogLedgerCheckpoint.objects.filter(company=company, seq__gte=first_seq).order_by('seq')
+    ]
+
+
+def iter_company_entries(company, first_seq=1, last_seq=None, chunk_size=2000):
+    """Veritabanındaki zinciri seq sırasıyla, log alanlarıyla birlikte üretir
+
+    Log kaydı yoksa 'fields' None olur.
+    """
+    entries = LogLedgerEntry.objects.filter(company=company).order_by('seq')
+    if last_seq is not None:
+        entries = entries.filter(seq__lte=last_seq)
+    cursor = first_seq - 1
+    while True:
+        chunk = list(entries.filter(seq__gt=cursor).values_list('seq', 'log_id', 'record_hash', 'chain_hash')[:chunk_size])
+        if not chunk:
+            break
+        rows = {
+            row[0]: row
+            for row in LogKayit.objects.filter(id__in=[log_id for _, log_id, _, _ in chunk]).order_by().values_list(*ROW_FIELDS)
+        }
+        for seq, log_id, digest, link in chunk:
+            row = rows.get(log_id)
+            yield {
+                'seq': seq, 'log_id': log_id, 'record_hash': digest, 'chain_hash': link,
+                'fields': record_fields(row) if row is not None else None,
+            }
+        cursor = chunk[-1][0]
+
+
+def _token_checker():
+    """Kontrol noktası token'larını otorite başına önbellekli doğrular"""
+    from .tsa_apis import TimestampVerifier
+    authorities = {}
+
+    def check(checkpoint):
+        authority_id = checkpoint.get('authority_id')
+        if authority_id not in authorities:
+            authorities[authority_id] = TimestampAuthority.objects.filter(pk=authority_id).first() if authority_id else None
+        verifier = TimestampVerifier(authorities[authority_id])
+        data_hash = checkpoint['chain_hash']
+        if checkpoint.get('anchor'):
+            data_hash = anchor_hash(checkpoint['seq'], data_hash)
+        return verifier.verify_timestamp_token(checkpoint['timestamp_token'], data_hash)
+    return check
+
+
+def _new_result():
+    return {'valid': True, 'checked': 0, 'checkpoints': 0, 'first_seq': None, 'last_seq': None,
+            'error': None, 'seq': None, 'log_id': None}
+
+
+def verify_entries(entries, checkpoints=(), check_records=True, anchor=None, token_check=None):
+    """Zinciri akış halinde doğrular; ilk bozuk girdide durur
+
+    entries: seq sırasında {'seq', 'log_id', 'record_hash', 'chain_hash', 'fields'}.
+    anchor: ilk girdiden önceki chain_hash; verilmezse seq 1 için başlangıç
+    hash'i, aksi halde (saklama süresiyle silinmiş baş) ilk girdi kabul edilir.
+    Dönüş: {'valid', 'checked', 'checkpoints', 'first_seq', 'last_seq',
+    'error', 'seq', 'log_id'}.
+    """
+    if token_check is None:
+        token_check = _token_checker()
+    key = _get_key() if check_records else None
+    pending = defaultdict(list)
+    for checkpoint in checkpoints:
+        pending[checkpoint['seq']].append(checkpoint)
+
+    result = _new_result()
+    previous = None
+    for entry in entries:
+        seq = entry['seq']
+        error = None
+        if previous is None:
+            result['first_seq'] = seq
+            start = anchor or (GENESIS_HASH if seq == 1 else None)
+            if start is not None and chain_hash(start, seq, entry['record_hash']) != entry['chain_hash']:
+                error = 'Zincir bağı kırık (girdi değiştirilmiş)'
+        elif seq != previous[0] + 1:
+            error = f'Zincirde {previous[0] + 1}-{seq - 1} arası girdiler eksik'
+        elif chain_hash(previous[1], seq, entry['record_hash']) != entry['chain_hash']:
+            error = 'Zincir bağı kırık (girdi değiştirilmiş)'
+
+        if error is None and check_records:
+            if entry.get('fields') is None:
+                error = 'Log kaydı silinmiş'
+            elif entry['fields'].get('id') != entry['log_id'] or record_hash(entry['fields'], key) != entry['record_hash']:
+                error = 'Log kaydı değiştirilmiş'
+
+        if error is None:
+            for checkpoint in pending.pop(seq, ()):
+                if checkpoint['chain_hash'] != entry['chain_hash']:
+                    error = 'Zincir başı TSA kontrol noktasıyla uyuşmuyor'
+                    break
+                token = token_check(checkpoint)
+                if not token['valid']:
+                    error = f"Kontrol noktası zaman damgası geçersiz: {token.get('error') or ''}".strip(': ')
+                    break
+                result['checkpoints'] += 1
+
+        if error is not None:
+            result.update(valid=False, error=error, seq=seq, log_id=entry['log_id'])
+            return result
+        previous = (seq, entry['chain_hash'])
+        result['checked'] += 1
+        result['last_seq'] = seq
+
+    # Kontrol noktası zincirin sonundan ilerideyse son girdiler silinmiştir
+    last_seq = previous[0] if previous else 0
+    beyond = [seq for seq in pending if seq > last_seq]
+    if beyond and previous is not None:
+        result.update(valid=False, error=f'Zincirin sonu silinmiş (kontrol noktası #{min(beyond)})',
+                      seq=last_seq + 1, log_id=None)
+    return result
+
+
+def verify_company(company, check_records=True, chunk_size=2000):
+    """Firmanın veritabanındaki zincirini doğrular
+
+    Zincir seq 1'den değilse seq - 1'deki çapadan başlamalıdır. Zincirin
+    kapsadığı ID aralığında zincire girmemiş kayıt (sonradan eklenmiş
+    olabilir) sayısı 'unchained' olarak döner.
+    """
+    token_check = _token_checker()
+    first_seq = LogLedgerEntry.objects.filter(company=company).order_by('seq').values_list('seq', flat=True).first()
+    if first_seq is None:
+        # Girdi kalmamışsa son kontrol noktası saklama çapası olmalı
+        last_checkpoint = LogLedgerCheckpoint.objects.filter(company=company).aggregate(seq=Max('seq'))['seq']
+        first_seq = (last_checkpoint or 0) + 1
+
+    anchor = None
+    if first_seq > 1:
+        checkpoint = LogLedgerCheckpoint.objects.filter(company=company, seq=first_seq - 1, is_anchor=True).first()
+        error = None
+        if checkpoint is None:
+            error = f'Zincirin başı silinmiş (#{first_seq - 1} için saklama çapası yok)'
+        else:
+            token = token_check(_checkpoint_dict(checkpoint))
+            if not token['valid']:
+                error = f"Saklama çapası zaman damgası geçersiz: {token.get('error') or ''}".strip(': ')
+        if error is not None:
+            result = _new_result()
+            result.update(valid=False, error=error, first_seq=first_seq, seq=first_seq - 1, unchained=0)
+            return result
+        anchor = checkpoint.chain_hash
+
+    result = verify_entries(
+        iter_company_entries(company, first_seq, chunk_size=chunk_size),
+        company_checkpoints(company, first_seq),
+        check_records=check_records,
+        anchor=anchor,
+        token_check=token_check,
+    )
+    watermark = ledger_watermark()
+    logs = LogKayit.objects.filter(company=company, id__lte=watermark).count()
+    chained = LogLedgerEntry.objects.filter(company=company).count()
+    result['unchained'] = max(0, logs - chained)
+    if result['valid'] and result['unchained']:
+        result.update(valid=False, error=f"Zincire alınmamış {result['unchained']} log kaydı var")
+    return result
+
+
+# ----------------------------------------------------------------------
+# Günlük dosyalar
+# ----------------------------------------------------------------------
+
+def export_day(company, day, directory):
+    """Firmanın `day` günü zincire eklenen girdilerini JSON Lines dosyasına yazar
+
+    İlk satır başlıktır (önceki chain_hash dahil); ardından girdiler (kayıt
+    alanlarıyla) ve bu aralıktaki kontrol noktaları gelir. Dosya yolu veya
+    girdi yoksa None döner.
+    """
+    start = timezone.make_aware(datetime.combine(day, datetime.min.time()))
+    seqs = LogLedgerEntry.objects.filter(
+        company=company, created_at__gte=start, created_at__lt=start + timedelta(days=1)
+    ).order_by('seq').values_list('seq', flat=True)
+    first_seq = seqs.first()
+    if first_seq is None:
+        return None
+    last_seq = seqs.reverse().first()
+    previous = LogLedgerEntry.objects.filter(company=company, seq=first_seq - 1).values_list('chain_hash', flat=True).first()
+    if previous is None:
+        previous = LogLedgerCheckpoint.objects.filter(
+            company=company, seq=first_seq - 1, is_anchor=True
+        ).values_list('chain_hash', flat=True).first()
+
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f'ledger_{company.slug}_{day.isoformat()}.jsonl')
+    with open(path, 'w', encoding='utf-8') as handle:
+        handle.write(json.dumps({
+            'type': 'header', 'company': company.slug, 'date': day.isoformat(),
+            'first_seq': first_seq, 'last_seq': last_seq,
+            'previous_chain_hash': previous or (GENESIS_HASH if first_seq == 1 else None),
+        }) + '\n')
+        for entry in iter_company_entries(company, first_seq, last_seq):
+            entry['type'] = 'entry'
+            handle.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        for checkpoint in LogLedgerCheckpoint.objects.filter(company=company, seq__gte=first_seq, seq__lte=last_seq):
+            record = _checkpoint_dict(checkpoint)
+            record['type'] = 'checkpoint'
+            handle.write(json.dumps(record) + '\n')
+    return path
+
+
+def read_files(paths):
+    """Günlük dosyaları seq sırasıyla okur: (girdiler üreteci, kontrol noktaları, ilk dosyanın önceki hash'i)
+
+    Kontrol noktaları dosya sonlarında olduğundan önce ayrı bir geçişte okunur.
+    """
+    headers = []
+    checkpoints = []
+    for path in paths:
+        with open(path, encoding='utf-8') as handle:
+            for line in handle:
+                record = json.loads(line)
+                if record['type'] == 'header':
+                    headers.append((record['first_seq'], path, record.get('previous_chain_hash')))
+                elif record['type'] == 'checkpoint':
+                    checkpoints.append(record)
+    headers.sort()
+
+    def entries():
+        for _, path, _ in headers:
+            with open(path, encoding='utf-8') as handle:
+                for line in handle:
+                    record = json.loads(line)
+                    if record['type'] == 'entry':
+                        yield record
+
+    anchor = headers[0][2] if headers else None
+    return entries(), checkpoints, anchor
+
+
+def verify_files(paths, check_records=True):
+    entries, checkpoints, anchor = read_files(paths)
+    return verify_entries(entries, checkpoints, check_records=check_records, anchor=anchor)
@@ -1,19 +1,38 @@
 """
 Otomatik Zaman Damgası İmzalama Komutu
-Belirlenen aralıklarla bekleyen log kayıtlarını otomatik olarak imzalar
+Belirlenen aralıklarla bekleyen log kayıtlarını otomatik olarak imzalar;
+--follow ile cron yerine sürekli çalışır ve kayıtları sınırlı gecikmeyle imzalar
+
+Firmalar iş parçacığı havuzunda (--workers) eşzamanlı işlenir; yavaş bir TSA
+veya büyük birikimi olan bir firma diğerlerini bekletmez. Her firma için süre
+bütçesi (--time-budget) dolunca kalan kayıtlar sonraki çalıştırmaya kalır.
+Firma başına süreli veritabanı kilidi (TimestampConfiguration.locked_until)
+iki cron çağrısının aynı firmayı aynı anda imzalamasını önler.
 """
 
+import os
+import signal
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
 from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connections
 from django.utils import timezone
-from django.db.models import Q
 from log_kayit.models import Company
-from timestamp_signing.models import TimestampConfiguration, TimestampLog
-from timestamp_signing.services import BatchTimestampService
+from timestamp_signing.models import TimestampLog
+from timestamp_signing.services import BatchTimestampService, acquire_company_lock, release_company_lock
+from timestamp_signing.tsa_pool import latency_summary, metrics_snapshot
 import logging
 
 logger = logging.getLogger(__name__)
 
 
+def _stop(signum, frame):
+    raise KeyboardInterrupt
+
+
 class Command(BaseCommand):
     help = 'Otomatik zaman damgası imzalama işlemini çalıştırır'
 
@@ -28,54 +47,80 @@ class Command(BaseCommand):
             action='store_true',
             help='Zorla çalıştır (aralık kontrolü yapma)',
         )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=None,
+            help='Eşzamanlı işlenecek firma sayısı (default: TIMESTAMP_WORKERS)',
+        )
+        parser.add_argument(
+            '--time-budget',
+            type=float,
+            default=None,
+            help='Firma başına en fazla imzalama süresi, sn (default: TIMESTAMP_COMPANY_TIME_BUDGET_SECONDS)',
+        )
+        parser.add_argument(
+            '--follow',
+            action='store_true',
+            help='Sürekli çalış: yeni kayıtları gecikme sınırı içinde imzala (supervisor ile)',
+        )
+        parser.add_argument(
+            '--max-latency',
+            type=float,
+            default=None,
+            help='--follow: girişten imzaya en fazla süre, sn (default: TIMESTAMP_MAX_LATENCY_SECONDS)',
+        )
 
     def handle(self, *args, **options):
         company_slug = options.get('company_slug')
         force = options.get('force', False)
+        self.workers = max(1, options.get('workers') or getattr(settings, 'TIMESTAMP_WORKERS', 8))
+        self.time_budget = options.get('time_budget') or getattr(settings, 'TIMESTAMP_COMPANY_TIME_BUDGET_SECONDS', 120)
         
         self.stdout.write(
             self.style.SUCCESS('Otomatik zaman damgası imzalama başlatılıyor...')
         )
         
-        # Şirketleri al
-        if company_slug:
-            try:
-                companies = [Company.objects.get(slug=company_slug)]
-            except Company.DoesNotExist:
-                self.stdout.write(
-                    self.style.ERROR(f'Şirket bulunamadı: {company_slug}')
-                )
-                return
-        else:
-            # Otomatik imzalama aktif olan şirketleri al
-            companies = Company.objects.filter(
-                timestamp_config__is_active=True,
-                timestamp_config__auto_sign=True
-            )
+        companies = self.get_companies(company_slug)
+        if companies is None:
+            return
         
-        total_processed = 0
-        total_success = 0
-        total_failure = 0
+        if options.get('follow'):
+            self.follow(company_slug, options.get('max_latency'))
+            return
         
-        for company in companies:
-            try:
-                result = self.process_company(company, force)
-                total_processed += result['processed']
-                total_success += result['success']
-                total_failure += result['failure']
-                
+        started = time.monotonic()
+        results = self.run_companies(companies, force=force)
+        elapsed = time.monotonic() - started
+        
+        total_processed = total_success = total_failure = 0
+        idle = locked = errors = 0
+        for company, result in results:
+            if 'error' in result:
+                errors += 1
                 self.stdout.write(
-                    self.style.SUCCESS(
-                        f'{company.name}: {result["success"]} başarılı, '
-                        f'{result["failure"]} başarısız'
-                    )
+                    self.style.ERROR(f'{company.name} işlenirken hata: {result["error"]}')
                 )
-                
-            except Exception as e:
+                continue
+            if result.get('locked'):
+                locked += 1
                 self.stdout.write(
-                    self.style.ERROR(f'{company.name} işlenirken hata: {str(e)}')
+                    self.style.WARNING(f'{company.name}: başka bir çalıştırma tarafından işleniyor, atlandı')
                 )
-                logger.error(f"Company {company.name} processing error: {str(e)}")
+                continue
+            if not result['processed']:
+                idle += 1
+                continue
+            total_processed += result['processed']
+            total_success += result['success']
+            total_failure += result['failure']
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f'{company.name}: {result["success"]} başarılı, '
+                    f'{result["failure"]} başarısız ({result["elapsed"]:.1f} sn'
+                    + (', süre bütçesi doldu' if result.get('budget_exhausted') else '') + ')'
+                )
+            )
         
         # Özet
         self.stdout.write(
@@ -84,26 +129,125 @@ class Command(BaseCommand):
                 f'{total_success} başarılı, {total_failure} başarısız'
             )
         )
+        self.stdout.write(
+            f'{len(results)} firma ({self.workers} eşzamanlı): {idle} bekleyen kayıt yok, '
+            f'{locked} kilitli, {errors} hata; {elapsed:.1f} sn, '
+            f'{total_processed / elapsed if elapsed else 0:,.0f} kayıt/sn'
+        )
+        latency = latency_summary()
+        if 'latency_p50_ms' in latency:
+            self.stdout.write(
+                f'TSA: {latency["requests"]} istek, gecikme p50 {latency["latency_p50_ms"]} ms, '
+                f'p95 {latency["latency_p95_ms"]} ms'
+            )
         
-        # İşlem logunu kaydet (her şirket için ayrı ayrı)
-        for company in companies:
-            if total_processed > 0:
-                TimestampLog.objects.create(
-                    company=company,
-                    log_type='BATCH_SIGN',
-                    message=f'Otomatik imzalama tamamlandı: {total_success} başarılı, {total_failure} başarısız',
-                    details={
-                        'total_processed': total_processed,
-                        'success_count': total_success,
-                        'failure_count': total_failure,
-                        'companies_processed': len(companies)
-                    },
-                    records_processed=total_processed,
-                    success_count=total_success,
-                    failure_count=total_failure
+        # Otorite başına TSA istek metrikleri
+        for name, metrics in metrics_snapshot().items():
+            self.stdout.write(
+                f'TSA {name}: {metrics["requests"]} istek, {metrics["failures"]} hata, '
+                f'{metrics["retries"]} yeniden deneme, devre {metrics["circuit"]}'
+                + (f', p95 {metrics["latency_p95_ms"]} ms' if 'latency_p95_ms' in metrics else '')
+            )
+
+    def get_companies(self, company_slug=None):
+        """İşlenecek şirketler; slug bulunamazsa None"""
+        companies = Company.objects.select_related('timestamp_config__authority')
+        if company_slug:
+            try:
+                return [companies.get(slug=company_slug)]
+            except Company.DoesNotExist:
+                self.stdout.write(
+                    self.style.ERROR(f'Şirket bulunamadı: {company_slug}')
                 )
+                return None
+        # Otomatik imzalama aktif olan şirketleri al
+        return list(companies.filter(
+            timestamp_config__is_active=True,
+            timestamp_config__auto_sign=True
+        ))
 
-    def process_company(self, company, force=False):
+    def run_companies(self, companies, force=False, max_wait=None):
+        """Firmaları havuzda işler; [(firma, sonuç)] döndürür
+        
+        Bir firmadaki hata diğerlerini etkilemez, sonucunda 'error' olarak döner.
+        """
+        def run(company):
+            try:
+                return company, self.run_company(company, force, max_wait)
+            except Exception as e:
+                logger.error(f"Company {company.name} processing error: {str(e)}")
+                return company, {'error': str(e)}
+        
+        if self.workers == 1 or len(companies) <= 1:
+            return [run(company) for company in companies]
+        
+        def run_in_thread(company):
+            try:
+                return run(company)
+            finally:
+                # İş parçacığının kendi veritabanı bağlantısı
+                connections.close_all()
+        
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='timestamp') as executor:
+            return list(executor.map(run_in_thread, companies))
+
+    def run_company(self, company, force=False, max_wait=None):
+        """Firma kilidini alıp süre bütçesi içinde imzalar"""
+        owner = f'{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}'
+        lease = self.time_budget + getattr(settings, 'TIMESTAMP_LOCK_GRACE_SECONDS', 300)
+        if not acquire_company_lock(company, owner, lease):
+            return {'locked': True}
+        started = time.monotonic()
+        try:
+            result = self.process_company(company, force, max_wait=max_wait)
+        finally:
+            release_company_lock(company, owner)
+        result['elapsed'] = time.monotonic() - started
+        return result
+
+    def follow(self, company_slug=None, max_latency=None):
+        """Sürekli imzalama döngüsü
+        
+        Toplu iş dolunca hemen, dolmazsa en eski kayıt max_wait süresini
+        aşınca imzalanır. max_wait, gecikme sınırından yoklama aralığı
+        düşülerek bulunur; böylece bir kaydın girişten imzaya
+        süresi (TSA yanıt süresi hariç) max_latency'yi geçmez.
+        """
+        poll_interval = getattr(settings, 'TIMESTAMP_FOLLOW_POLL_SECONDS', 5)
+        if max_latency is None:
+            max_latency = getattr(settings, 'TIMESTAMP_MAX_LATENCY_SECONDS', 60)
+        max_wait = max(0, max_latency - poll_interval)
+        
+        # supervisor stop: yarım kalan toplu iş transaction ile geri alınır
+        signal.signal(signal.SIGTERM, _stop)
+        self.stdout.write(
+            f'Sürekli imzalama: gecikme sınırı {max_latency:.0f} sn, yoklama {poll_interval} sn, '
+            f'{self.workers} eşzamanlı firma'
+        )
+        total_success = total_failure = 0
+        try:
+            while True:
+                close_old_connections()
+                busy = False
+                for company, result in self.run_companies(self.get_companies(company_slug) or [],
+                                                          force=True, max_wait=max_wait):
+                    if not result.get('processed'):
+                        continue
+                    total_success += result['success']
+                    total_failure += result['failure']
+                    self.stdout.write(
+                        f'{company.name}: {result["success"]} başarılı, {result["failure"]} başarısız'
+                    )
+                    # Süre bütçesi doldu: arkada bekleyen kayıt var, beklemeden devam et
+                    busy = busy or result.get('budget_exhausted', False)
+                if not busy:
+                    time.sleep(poll_interval)
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.WARNING(
+                f'Durduruldu: {total_success} başarılı, {total_failure} başarısız'
+            ))
+
+    def process_company(self, company, force=False, max_wait=None):
         """Tek bir şirket için imzalama işlemi"""
         try:
             config = company.timestamp_config
@@ -115,19 +259,25 @@ class Command(BaseCommand):
             if not force and not self.should_run_now(config):
                 return {'processed': 0, 'success': 0, 'failure': 0}
             
-            # Toplu imzalama servisini başlat
+            # Toplu imzalama servisini başlat; dolu toplu işlerde imleç yetişene
+            # veya firmanın süre bütçesi dolana kadar devam et
             batch_service = BatchTimestampService(company)
-            result = batch_service.sign_pending_logs()
-            
-            if result['success']:
-                return {
-                    'processed': result.get('success_count', 0) + result.get('failure_count', 0),
-                    'success': result.get('success_count', 0),
-                    'failure': result.get('failure_count', 0)
-                }
-            else:
-                logger.error(f"Batch signing failed for {company.name}: {result.get('error')}")
-                return {'processed': 0, 'success': 0, 'failure': 0}
+            totals = {'processed': 0, 'success': 0, 'failure': 0}
+            deadline = time.monotonic() + self.time_budget
+            while True:
+                result = batch_service.sign_pending_logs(max_wait=max_wait)
+                if not result['success']:
+                    logger.error(f"Batch signing failed for {company.name}: {result.get('error')}")
+                    break
+                totals['processed'] += result.get('count', 0)
+                totals['success'] += result.get('success_count', 0)
+                totals['failure'] += result.get('failure_count', 0)
+                if result.get('failure_count') or result.get('count', 0) < config.batch_size:
+                    break
+                if time.monotonic() >= deadline:
+                    totals['budget_exhausted'] = True
+                    break
+            return totals
                 
         except Exception as e:
             logger.error(f"Company processing error for {company.name}: {str(e)}")
@@ -0,0 +1,83 @@
+import hashlib
+import time
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+from timestamp_signing import tsa_pool
+from timestamp_signing.models import TimestampAuthority
+from timestamp_signing.tsa_apis import TSAFactory
+from timestamp_signing.tsa_stub import LocalTSAServer
+
+
+class Command(BaseCommand):
+    help = 'Yerel TSA sunucusuna karşı istek başına oturum ile havuzlu eşzamanlı istekleri karşılaştırır'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=200,
+            help='Gönderilecek istek sayısı (default: 200)',
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=8,
+            help='Havuzlu yöntemde eşzamanlı istek sayısı (default: 8)',
+        )
+        parser.add_argument(
+            '--latency',
+            type=float,
+            default=20,
+            help='Yerel TSA yanıt gecikmesi, milisaniye (default: 20)',
+        )
+        parser.add_argument(
+            '--authority-type',
+            choices=['CUSTOM', 'TUBITAK', 'TURKTRUST'],
+            default='TUBITAK',
+            help='Kullanılacak client tipi',
+        )
+
+    def handle(self, *args, **options):
+        count = max(1, options['requests'])
+        concurrency = max(1, options['concurrency'])
+        hashes = [hashlib.sha256(str(i).encode()).hexdigest() for i in range(count)]
+
+        self.stdout.write(f'{count} istek, gecikme {options["latency"]:.0f} ms, {concurrency} eşzamanlı\n')
+        self.stdout.write(f"{'Yöntem':<32} {'İstek/sn':>10} {'Bağlantı':>10} {'Hata':>6}")
+        self.stdout.write('-' * 62)
+
+        with LocalTSAServer(latency=options['latency'] / 1000) as server:
+            authority = TimestampAuthority(
+                name='Yerel TSA', authority_type=options['authority_type'], api_endpoint=server.url
+            )
+
+            # Eski yol: istek başına yeni client ve oturum, sıralı
+            started = time.perf_counter()
+            errors = 0
+            for data_hash in hashes:
+                try:
+                    TSAFactory.create_tsa_client(authority).request_timestamp(data_hash)
+                except Exception:
+                    errors += 1
+            self._row('İstek başına oturum (sıralı)', count, time.perf_counter() - started,
+                      server.connections, errors)
+
+            connections = server.connections
+            tsa_pool.reset_pools()
+            with override_settings(TSA_MAX_CONCURRENCY=concurrency):
+                started = time.perf_counter()
+                results = tsa_pool.request_many(authority, hashes)
+                elapsed = time.perf_counter() - started
+                metrics = tsa_pool.metrics_snapshot().get(authority.name, {})
+                tsa_pool.reset_pools()
+            errors = sum(1 for _, error in results if error)
+            self._row('Ortak oturum + havuz', count, elapsed, server.connections - connections, errors)
+
+        if metrics.get('latency_p50_ms') is not None:
+            self.stdout.write(
+                f'\nHavuz gecikmesi: ort {metrics["latency_avg_ms"]} ms, '
+                f'p50 {metrics["latency_p50_ms"]} ms, p95 {metrics["latency_p95_ms"]} ms'
+            )
+
+    def _row(self, name, count, elapsed, connections, errors):
+        self.stdout.write(f'{name:<32} {count / elapsed:>10,.0f} {connections:>10} {errors:>6}')
@@ -0,0 +1,50 @@
+from datetime import date, timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from log_kayit.models import Company
+from timestamp_signing.ledger import export_day
+
+
+class Command(BaseCommand):
+    help = 'Firma log zincirini günlük JSON Lines dosyalarına yazar (verify_ledger --file ile doğrulanır)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--company-slug',
+            type=str,
+            required=True,
+            help='Şirket',
+        )
+        parser.add_argument(
+            '--date',
+            type=date.fromisoformat,
+            default=None,
+            help='Gün (YYYY-AA-GG, default: dün)',
+        )
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=1,
+            help='--date gününden geriye kaç gün yazılacak (default: 1)',
+        )
+        parser.add_argument(
+            '--output-dir',
+            type=str,
+            required=True,
+            help='Dosyaların yazılacağı dizin',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            company = Company.objects.get(slug=options['company_slug'])
+        except Company.DoesNotExist:
+            raise CommandError(f"Şirket bulunamadı: {options['company_slug']}")
+
+        day = options['date'] or timezone.localdate() - timedelta(days=1)
+        written = 0
+        for offset in range(max(1, options['days'])):
+            path = export_day(company, day - timedelta(days=offset), options['output_dir'])
+            if path:
+                written += 1
+                self.stdout.write(path)
+        self.stdout.write(self.style.SUCCESS(f'{written} günlük zincir dosyası yazıldı'))
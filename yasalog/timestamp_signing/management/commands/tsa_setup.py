@@ -4,6 +4,7 @@ TSA Kurulum ve Test Komutu
 
 from django.core.management.base import BaseCommand, CommandError
 from django.conf import settings
+import hashlib
 import os
 import requests
 from timestamp_signing.tsa_config import TSA_CONFIGS, DEFAULT_TSA
@@ -81,8 +82,8 @@ class Command(BaseCommand):
                 # TSA Factory ile test
                 tsa = TSAFactory.create_tsa(name, config)
                 
-                # Basit bir test hash'i
-                test_hash = 'test_hash_123456789'
+                # Basit bir test hash'i (RFC 3161 isteği için SHA256 özeti)
+                test_hash = hashlib.sha256(b'5651 TSA test').hexdigest()
                 
                 # Timestamp request
                 response = tsa.request_timestamp(test_hash)
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+from timestamp_signing.ledger import append_entries, checkpoint_heads, ledger_watermark
+
+
+class Command(BaseCommand):
+    help = 'Yeni log kayıtlarını firma hash zincirlerine ekler ve zincir başlarını TSA ile damgalatır'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Toplu işlem boyutu (default: 5000)',
+        )
+        parser.add_argument(
+            '--checkpoint',
+            action='store_true',
+            help='Aralık dolmamış olsa da ilerleyen tüm zincir başlarını damgalat',
+        )
+        parser.add_argument(
+            '--no-checkpoint',
+            action='store_true',
+            help='Yalnızca zincire ekle, TSA isteği gönderme',
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'Log zinciri güncelleniyor (son ID: {ledger_watermark()})')
+        appended = append_entries(batch_size=max(1, options['batch_size']), stdout=self.stdout)
+        checkpoints = 0
+        if not options['no_checkpoint']:
+            checkpoints = checkpoint_heads(force=options['checkpoint'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Tamamlandı: {appended} kayıt zincire eklendi, {checkpoints} kontrol noktası damgalandı, '
+            f'son ID {ledger_watermark()}'
+        ))
@@ -0,0 +1,60 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+from log_kayit.models import Company
+from timestamp_signing.ledger import verify_company, verify_files
+from timestamp_signing.models import LogLedgerCheckpoint, LogLedgerEntry
+
+
+class Command(BaseCommand):
+    help = 'Firma log zincirlerini veritabanından veya dışa aktarılmış günlük dosyalardan doğrular'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--company-slug',
+            type=str,
+            help='Belirli bir şirket için çalıştır (opsiyonel)',
+        )
+        parser.add_argument(
+            '--file',
+            action='append',
+            default=[],
+            help='export_ledger ile yazılmış günlük dosya (birden fazla verilebilir)',
+        )
+        parser.add_argument(
+            '--skip-records',
+            action='store_true',
+            help='Kayıt özetlerini doğrulama (yalnızca zincir bağları ve kontrol noktaları)',
+        )
+
+    def handle(self, *args, **options):
+        check_records = not options['skip_records']
+        started = time.monotonic()
+        if options['file']:
+            results = [(', '.join(options['file']), verify_files(options['file'], check_records))]
+        else:
+            companies = Company.objects.filter(
+                Q(id__in=LogLedgerEntry.objects.values('company_id'))
+                | Q(id__in=LogLedgerCheckpoint.objects.values('company_id'))
+            )
+            if options['company_slug']:
+                companies = Company.objects.filter(slug=options['company_slug'])
+                if not companies.exists():
+                    raise CommandError(f"Şirket bulunamadı: {options['company_slug']}")
+            results = [(company.name, verify_company(company, check_records)) for company in companies]
+
+        failed = 0
+        for name, result in results:
+            summary = (f"{result['checked']} girdi, {result['checkpoints']} kontrol noktası"
+                       + (f" (#{result['first_seq']}-#{result['last_seq']})" if result['first_seq'] else ''))
+            if result['valid']:
+                self.stdout.write(self.style.SUCCESS(f'{name}: geçerli - {summary}'))
+                continue
+            failed += 1
+            location = f" - ilk bozuk girdi #{result['seq']}" if result['seq'] else ''
+            location += f" (log ID {result['log_id']})" if result['log_id'] else ''
+            self.stdout.write(self.style.ERROR(f"{name}: {result['error']}{location}; {summary}"))
+
+        self.stdout.write(f'{len(results)} zincir doğrulandı ({time.monotonic() - started:.1f} sn), {failed} bozuk')
+        if failed:
+            raise CommandError('Log zincirinde değişiklik tespit edildi')
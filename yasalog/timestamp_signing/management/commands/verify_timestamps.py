@@ -0,0 +1,89 @@
+import time
+from datetime import timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from log_kayit.models import Company
+from timestamp_signing.models import TimestampSignature
+from timestamp_signing.services import verify_signature_record
+
+
+class Command(BaseCommand):
+    help = 'İmzalanmış kayıtların zaman damgalarını RFC 3161 ve Merkle kanıtıyla toplu doğrular'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--company-slug',
+            type=str,
+            help='Belirli bir şirket için çalıştır (opsiyonel)',
+        )
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=365,
+            help='Son kaç günde imzalanan kayıtlar doğrulanacak (default: 365)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=2000,
+            help='Veritabanından tek seferde okunacak imza sayısı',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Sonuçları veritabanına yazma',
+        )
+
+    def handle(self, *args, **options):
+        signatures = TimestampSignature.objects.filter(
+            status__in=['SIGNED', 'VERIFIED'],
+            signed_at__gte=timezone.now() - timedelta(days=options['days']),
+        )
+        if options['company_slug']:
+            try:
+                signatures = signatures.filter(company=Company.objects.get(slug=options['company_slug']))
+            except Company.DoesNotExist:
+                raise CommandError(f"Şirket bulunamadı: {options['company_slug']}")
+
+        batch_size = max(1, options['batch_size'])
+        # Toplu imzalarda aynı kök token'ı yüzlerce kayıtta tekrarlanır; bir kez doğrulanır
+        token_cache = {}
+        valid = invalid = 0
+        started = time.monotonic()
+        queryset = signatures.select_related('log_entry', 'authority').order_by('id')
+        last_id = 0
+        while True:
+            chunk = list(queryset.filter(id__gt=last_id)[:batch_size])
+            if not chunk:
+                break
+            last_id = chunk[-1].id
+            verified_ids = []
+            failed = []
+            for signature in chunk:
+                result = verify_signature_record(signature, token_cache)
+                if result['valid']:
+                    verified_ids.append(signature.id)
+                else:
+                    signature.error_message = result.get('error', 'İmza doğrulanamadı')
+                    failed.append(signature)
+            valid += len(verified_ids)
+            invalid += len(failed)
+
+            if not options['dry_run']:
+                now = timezone.now()
+                TimestampSignature.objects.filter(id__in=verified_ids).update(
+                    status='VERIFIED', verified_at=now, error_message=''
+                )
+                TimestampSignature.objects.bulk_update(failed, ['error_message'])
+            if options.get('verbosity', 1) > 1:
+                self.stdout.write(f'  {valid + invalid} imza doğrulandı')
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'{valid + invalid} imza, {len(token_cache)} ayrı token doğrulandı '
+            f'({elapsed:.1f} sn): {valid} geçerli, {invalid} geçersiz'
+        ))
+        if invalid and not options['dry_run']:
+            self.stdout.write(self.style.WARNING(
+                'Geçersiz imzaların hata mesajları kaydedildi; durumları değiştirilmedi.'
+            ))
@@ -0,0 +1,81 @@
+"""
+Merkle ağacı
+Toplu zaman damgası için tek kök, kayıt başına kapsama kanıtı
+
+Her log kaydının kanonik JSON'u yaprak olarak hash'lenir, yapraklardan
+ağaç kurulur ve yalnızca kök TSA'ya damgalatılır. Kayıt başına saklanan
+kanıt (kardeş hash'leri) ile tek kayıt, diğer kayıtlar olmadan O(log n)
+adımda köke bağlanır.
+
+Hash'ler RFC 6962'deki gibi ön ekle ayrılır (yaprak 0x00, düğüm 0x01);
+iç düğüm yaprak yerine sunulamaz. Tek kalan düğüm kopyalanmadan bir üst
+seviyeye taşınır, böylece aynı kök farklı yaprak listeleriyle üretilemez.
+"""
+
+import hashlib
+
+LEAF_PREFIX = b'\x00'
+NODE_PREFIX = b'\x01'
+
+
+def leaf_hash(data):
+    """Yaprak hash'i (hex); data str ise UTF-8 olarak kodlanır"""
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    return hashlib.sha256(LEAF_PREFIX + data).hexdigest()
+
+
+def node_hash(left, right):
+    return hashlib.sha256(NODE_PREFIX + bytes.fromhex(left) + bytes.fromhex(right)).hexdigest()
+
+
+def build_levels(leaves):
+    """Yaprak hash'lerinden köke kadar tüm seviyeleri döndürür"""
+    if not leaves:
+        raise ValueError("Boş Merkle ağacı kurulamaz")
+    levels = [list(leaves)]
+    while len(levels[-1]) > 1:
+        level = levels[-1]
+        parent = [node_hash(level[i], level[i + 1]) for i in range(0, len(level) - 1, 2)]
+        if len(level) % 2:
+            parent.append(level[-1])
+        levels.append(parent)
+    return levels
+
+
+def merkle_root(leaves):
+    return build_levels(leaves)[-1][0]
+
+
+def inclusion_proof(levels, index):
+    """index numaralı yaprağın kanıtı: [['L' | 'R', kardeş hash'i], ...]
+
+    'L' kardeşin solda, 'R' sağda olduğunu belirtir.
+    """
+    proof = []
+    for level in levels[:-1]:
+        sibling = index ^ 1
+        if sibling < len(level):
+            proof.append(['L' if sibling < index else 'R', level[sibling]])
+        index //= 2
+    return proof
+
+
+def root_from_proof(leaf, proof):
+    """Yaprak ve kanıttan kökü hesaplar; kanıt bozuksa ValueError"""
+    current = leaf
+    for side, sibling in proof:
+        if side == 'L':
+            current = node_hash(sibling, current)
+        elif side == 'R':
+            current = node_hash(current, sibling)
+        else:
+            raise ValueError(f"Geçersiz kanıt yönü: {side}")
+    return current
+
+
+def verify_proof(leaf, proof, root):
+    try:
+        return root_from_proof(leaf, proof) == root
+    except (ValueError, TypeError):
+        return False
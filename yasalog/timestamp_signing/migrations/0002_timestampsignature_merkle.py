@@ -0,0 +1,35 @@
+# Generated by Django 4.2.30 on 2026-10-17 23:31
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('log_kayit', '0021_devicesession_log_no_constraint'),
+        ('timestamp_signing', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='timestampsignature',
+            name='leaf_hash',
+            field=models.CharField(blank=True, max_length=64, verbose_name='Yaprak Hash'),
+        ),
+        migrations.AddField(
+            model_name='timestampsignature',
+            name='merkle_proof',
+            field=models.JSONField(blank=True, default=list, verbose_name='Kapsama Kanıtı'),
+        ),
+        migrations.AddField(
+            model_name='timestampsignature',
+            name='merkle_root',
+            field=models.CharField(blank=True, db_index=True, max_length=64, verbose_name='Merkle Kökü'),
+        ),
+        migrations.AlterField(
+            model_name='timestampsignature',
+            name='log_entry',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='timestamp_signatures', to='log_kayit.logkayit', verbose_name='Log Kaydı'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 4.2.30 on 2026-10-17 23:44
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('log_kayit', '0022_logkayit_logkayit_company_id_idx'),
+        ('timestamp_signing', '0002_timestampsignature_merkle'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TimestampRetry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('attempts', models.IntegerField(default=1, verbose_name='Deneme Sayısı')),
+                ('next_attempt_at', models.DateTimeField(verbose_name='Sonraki Deneme')),
+                ('last_error', models.TextField(blank=True, verbose_name='Son Hata')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Oluşturulma Tarihi')),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='log_kayit.company', verbose_name='Şirket')),
+                ('log_entry', models.OneToOneField(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='timestamp_retry', to='log_kayit.logkayit', verbose_name='Log Kaydı')),
+            ],
+            options={
+                'verbose_name': 'Zaman Damgası Yeniden Denemesi',
+                'verbose_name_plural': 'Zaman Damgası Yeniden Denemeleri',
+                'indexes': [models.Index(fields=['company', 'next_attempt_at'], name='timestamp_s_company_672185_idx')],
+            },
+        ),
+    ]
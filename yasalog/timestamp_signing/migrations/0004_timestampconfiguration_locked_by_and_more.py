@@ -0,0 +1,23 @@
+# Generated by Django 4.2.30 on 2026-10-17 23:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('timestamp_signing', '0003_timestampretry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='timestampconfiguration',
+            name='locked_by',
+            field=models.CharField(blank=True, editable=False, max_length=100, verbose_name='Kilit Sahibi'),
+        ),
+        migrations.AddField(
+            model_name='timestampconfiguration',
+            name='locked_until',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Kilit Bitişi'),
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 4.2.30 on 2026-10-17 23:51
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('log_kayit', '0022_logkayit_logkayit_company_id_idx'),
+        ('timestamp_signing', '0004_timestampconfiguration_locked_by_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LogLedgerEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('seq', models.BigIntegerField(verbose_name='Sıra No')),
+                ('record_hash', models.CharField(max_length=64, verbose_name='Kayıt Hash')),
+                ('chain_hash', models.CharField(max_length=64, verbose_name='Zincir Hash')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Oluşturulma Tarihi')),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='log_kayit.company', verbose_name='Şirket')),
+                ('log', models.OneToOneField(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='ledger_entry', to='log_kayit.logkayit', verbose_name='Log Kaydı')),
+            ],
+            options={
+                'verbose_name': 'Log Zinciri Girdisi',
+                'verbose_name_plural': 'Log Zinciri Girdileri',
+                'indexes': [models.Index(fields=['company', 'created_at'], name='timestamp_s_company_15e850_idx')],
+                'unique_together': {('company', 'seq')},
+            },
+        ),
+        migrations.CreateModel(
+            name='LogLedgerCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('seq', models.BigIntegerField(verbose_name='Sıra No')),
+                ('chain_hash', models.CharField(max_length=64, verbose_name='Zincir Hash')),
+                ('timestamp_token', models.TextField(verbose_name='Zaman Damgası Token')),
+                ('serial_number', models.CharField(blank=True, max_length=100, verbose_name='Seri Numarası')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Oluşturulma Tarihi')),
+                ('authority', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, to='timestamp_signing.timestampauthority', verbose_name='Otorite')),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='log_kayit.company', verbose_name='Şirket')),
+            ],
+            options={
+                'verbose_name': 'Log Zinciri Kontrol Noktası',
+                'verbose_name_plural': 'Log Zinciri Kontrol Noktaları',
+                'ordering': ['company', 'seq'],
+                'indexes': [models.Index(fields=['company', 'seq'], name='timestamp_s_company_f0384e_idx')],
+            },
+        ),
+    ]
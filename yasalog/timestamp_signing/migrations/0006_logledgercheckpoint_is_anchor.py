@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-18 00:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('timestamp_signing', '0005_logledgerentry_logledgercheckpoint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='logledgercheckpoint',
+            name='is_anchor',
+            field=models.BooleanField(default=False, verbose_name='Saklama Çapası'),
+        ),
+    ]
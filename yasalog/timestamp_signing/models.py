@@ -52,7 +52,9 @@ class TimestampSignature(models.Model):
     ]
     
     # İlişkili kayıtlar
-    log_entry = models.ForeignKey(LogKayit, on_delete=models.CASCADE, verbose_name=_("Log Kaydı"), related_name='timestamp_signatures')
+    # Bölümlü log tablosunda id tek başına benzersiz olmadığından FK kısıtı yoktur
+    log_entry = models.ForeignKey(LogKayit, on_delete=models.CASCADE, verbose_name=_("Log Kaydı"), related_name='timestamp_signatures',
+                                  db_constraint=False)
     company = models.ForeignKey(Company, on_delete=models.CASCADE, verbose_name=_("Şirket"))
     authority = models.ForeignKey(TimestampAuthority, on_delete=models.CASCADE, verbose_name=_("Otorite"))
     
@@ -71,6 +73,11 @@ class TimestampSignature(models.Model):
     serial_number = models.CharField(_("Seri Numarası"), max_length=100, blank=True)
     error_message = models.TextField(_("Hata Mesajı"), blank=True)
     
+    # Toplu imzalama: kayıt Merkle ağacının yaprağıdır, token kök için alınır
+    leaf_hash = models.CharField(_("Yaprak Hash"), max_length=64, blank=True)
+    merkle_root = models.CharField(_("Merkle Kökü"), max_length=64, blank=True, db_index=True)
+    merkle_proof = models.JSONField(_("Kapsama Kanıtı"), default=list, blank=True)
+    
     created_at = models.DateTimeField(_("Oluşturulma Tarihi"), auto_now_add=True)
     updated_at = models.DateTimeField(_("Güncellenme Tarihi"), auto_now=True)
     
@@ -105,7 +112,13 @@ class TimestampSignature(models.Model):
     def verify(self):
         """İmzayı doğrular"""
         try:
-            # RFC 3161 uyumlu doğrulama işlemi
+            # RFC 3161 token doğrulaması (toplu imzada Merkle kanıtıyla)
+            from .services import verify_signature_record
+            result = verify_signature_record(self)
+            if not result['valid']:
+                self.error_message = result.get('error', 'İmza doğrulanamadı')
+                self.save()
+                return False
             self.status = 'VERIFIED'
             self.verified_at = timezone.now()
             self.save()
@@ -136,6 +149,10 @@ class TimestampConfiguration(models.Model):
     notify_on_failure = models.BooleanField(_("Hata Bildirimi"), default=True)
     notification_email = models.EmailField(_("Bildirim E-postası"), blank=True)
     
+    # Otomatik imzalama kilidi: aynı firmayı iki çalıştırma aynı anda işlemez
+    locked_by = models.CharField(_("Kilit Sahibi"), max_length=100, blank=True, editable=False)
+    locked_until = models.DateTimeField(_("Kilit Bitişi"), null=True, blank=True, editable=False)
+    
     is_active = models.BooleanField(_("Aktif"), default=True)
     created_at = models.DateTimeField(_("Oluşturulma Tarihi"), auto_now_add=True)
     updated_at = models.DateTimeField(_("Güncellenme Tarihi"), auto_now=True)
@@ -181,3 +198,92 @@ class TimestampLog(models.Model):
     
     def __str__(self):
         return f"{self.company.name} - {self.get_log_type_display()} - {self.timestamp}"
+
+
+class TimestampRetry(models.Model):
+    """İmzalanamayan log kayıtlarının yeniden deneme kuyruğu
+
+    İmza imleci (JobCheckpoint) başarısız toplu işte de ilerler; işteki
+    kayıtlar buraya alınır ve next_attempt_at geldiğinde yeni kayıtlarla
+    aynı toplu işe eklenir. İmzalanınca satır silinir.
+    """
+
+    # Bölümlü log tablosunda id tek başına benzersiz olmadığından FK kısıtı yoktur
+    log_entry = models.OneToOneField(LogKayit, on_delete=models.CASCADE, verbose_name=_("Log Kaydı"),
+                                     related_name='timestamp_retry', db_constraint=False)
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, verbose_name=_("Şirket"))
+    attempts = models.IntegerField(_("Deneme Sayısı"), default=1)
+    next_attempt_at = models.DateTimeField(_("Sonraki Deneme"))
+    last_error = models.TextField(_("Son Hata"), blank=True)
+    created_at = models.DateTimeField(_("Oluşturulma Tarihi"), auto_now_add=True)
+
+    class Meta:
+        verbose_name = _("Zaman Damgası Yeniden Denemesi")
+        verbose_name_plural = _("Zaman Damgası Yeniden Denemeleri")
+        indexes = [
+            models.Index(fields=['company', 'next_attempt_at']),
+        ]
+
+    def __str__(self):
+        return f"Log {self.log_entry_id} - {self.attempts}. deneme"
+
+
+class LogLedgerEntry(models.Model):
+    """Firma başına hash zinciri girdisi (yalnızca eklenir, bkz. ledger.py)
+
+    chain_hash = SHA256(önceki chain_hash || seq || record_hash); record_hash
+    log kaydı alanlarının anahtarlı HMAC'idir.
+    """
+
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, verbose_name=_("Şirket"))
+    seq = models.BigIntegerField(_("Sıra No"))
+    # Bölümlü log tablosunda id tek başına benzersiz olmadığından FK kısıtı yoktur
+    log = models.OneToOneField(LogKayit, on_delete=models.CASCADE, verbose_name=_("Log Kaydı"),
+                               related_name='ledger_entry', db_constraint=False)
+    record_hash = models.CharField(_("Kayıt Hash"), max_length=64)
+    chain_hash = models.CharField(_("Zincir Hash"), max_length=64)
+    created_at = models.DateTimeField(_("Oluşturulma Tarihi"), auto_now_add=True)
+
+    class Meta:
+        verbose_name = _("Log Zinciri Girdisi")
+        verbose_name_plural = _("Log Zinciri Girdileri")
+        unique_together = ['company', 'seq']
+        indexes = [
+            models.Index(fields=['company', 'created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.company_id} #{self.seq}"
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError("Log zinciri girdileri değiştirilemez")
+        super().save(*args, **kwargs)
+
+
+class LogLedgerCheckpoint(models.Model):
+    """Zincir başının (seq, chain_hash) RFC 3161 zaman damgası
+
+    Çapa (is_anchor) saklama süresiyle silinen son girdiyi işaretler; TSA'ya
+    ledger.anchor_hash() damgalatılır ve çapa hiç silinmez.
+    """
+
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, verbose_name=_("Şirket"))
+    seq = models.BigIntegerField(_("Sıra No"))
+    chain_hash = models.CharField(_("Zincir Hash"), max_length=64)
+    is_anchor = models.BooleanField(_("Saklama Çapası"), default=False)
+    authority = models.ForeignKey(TimestampAuthority, on_delete=models.SET_NULL, null=True, verbose_name=_("Otorite"))
+    timestamp_token = models.TextField(_("Zaman Damgası Token"))
+    serial_number = models.CharField(_("Seri Numarası"), max_length=100, blank=True)
+    created_at = models.DateTimeField(_("Oluşturulma Tarihi"), auto_now_add=True)
+
+    class Meta:
+        verbose_name = _("Log Zinciri Kontrol Noktası")
+        verbose_name_plural = _("Log Zinciri Kontrol Noktaları")
+        ordering = ['company', 'seq']
+        indexes = [
+            models.Index(fields=['company', 'seq']),
+        ]
+
+    def __str__(self):
+        return f"{self.company.name} #{self.seq}"
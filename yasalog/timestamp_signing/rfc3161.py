@@ -0,0 +1,400 @@
+"""
+RFC 3161 zaman damgası
+TimeStampReq/TimeStampResp DER kodlama ve zaman damgası token doğrulama
+
+İstek ve yanıtlar asn1crypto ile DER olarak kodlanır/çözülür; imza ve
+sertifika doğrulaması cryptography ile yapılır. Token doğrulaması:
+
+1. Token'daki TSTInfo mesaj özeti beklenen hash ile karşılaştırılır.
+2. İmzalı özniteliklerdeki message-digest, TSTInfo'nun özetiyle eşleşmeli;
+   imza TSA sertifikasının açık anahtarıyla doğrulanır.
+3. TSA sertifikası timeStamping kullanımına sahip olmalı ve zincir
+   TSA_TRUSTED_CERTIFICATES (ve otoritenin sertifika dosyası) içindeki bir
+   kök sertifikaya bağlanmalıdır; zincirdeki sertifikalar damga zamanında
+   geçerli olmalıdır.
+
+Toplu doğrulamada aynı TSA sertifikaları tekrar tekrar gelir: DER'den
+çözülen sertifikalar ve doğrulanmış sertifika bağlantıları (alt sertifika,
+veren) önbellekte tutulur; token başına yalnızca TSTInfo özeti ve tek imza
+doğrulaması kalır. Güven kökü tanımlı değilse hiçbir token geçerli sayılmaz.
+"""
+
+import base64
+import functools
+import hashlib
+import secrets
+import threading
+from datetime import timezone as dt_timezone
+from django.conf import settings
+import logging
+
+try:
+    from asn1crypto import cms, tsp, x509 as asn1_x509
+    ASN1_AVAILABLE = True
+except ImportError:
+    ASN1_AVAILABLE = False
+
+try:
+    from cryptography import x509
+    from cryptography.exceptions import InvalidSignature
+    from cryptography.hazmat.primitives import hashes
+    from cryptography.hazmat.primitives.asymmetric import ec, padding, rsa
+    from cryptography.x509.oid import ExtendedKeyUsageOID
+    CRYPTO_AVAILABLE = True
+except ImportError:
+    CRYPTO_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+HASH_ALGORITHMS = {'SHA1': 'sha1', 'SHA256': 'sha256', 'SHA384': 'sha384', 'SHA512': 'sha512'}
+MAX_CHAIN_LENGTH = 8
+
+
+class TimestampError(Exception):
+    """Geçersiz zaman damgası isteği/yanıtı veya token"""
+
+
+def _require_asn1():
+    if not ASN1_AVAILABLE:
+        raise TimestampError("asn1crypto yüklü değil!")
+
+
+def generate_nonce():
+    return secrets.randbits(64)
+
+
+def build_request(data_hash, hash_algorithm='SHA256', nonce=None, cert_req=True, policy=None):
+    """Hex özet için DER kodlu TimeStampReq üretir"""
+    _require_asn1()
+    algorithm = HASH_ALGORITHMS.get(hash_algorithm.upper())
+    if not algorithm:
+        raise TimestampError(f"Desteklenmeyen hash algoritması: {hash_algorithm}")
+    try:
+        digest = bytes.fromhex(data_hash)
+    except (TypeError, ValueError):
+        raise TimestampError("Özet hex biçiminde olmalı")
+    if len(digest) != hashlib.new(algorithm).digest_size:
+        raise TimestampError(f"{hash_algorithm} özeti {len(digest)} bayt olamaz")
+
+    request = {
+        'version': 'v1',
+        'message_imprint': {
+            'hash_algorithm': {'algorithm': algorithm},
+            'hashed_message': digest,
+        },
+        'cert_req': cert_req,
+    }
+    if nonce is not None:
+        request['nonce'] = nonce
+    if policy:
+        request['req_policy'] = policy
+    return tsp.TimeStampReq(request).dump()
+
+
+def parse_response(data, data_hash=None, nonce=None):
+    """DER TimeStampResp'i çözer; reddedilmiş veya istekle uyuşmayan yanıtta TimestampError
+
+    Dönüş: {'token': DER token, 'tst_info': TSTInfo, 'gen_time', 'serial_number', 'certificates'}
+    """
+    _require_asn1()
+    try:
+        response = tsp.TimeStampResp.load(data)
+        status = response['status']['status'].native
+    except (ValueError, TypeError) as e:
+        raise TimestampError(f"TSA yanıtı çözülemedi: {str(e)}")
+    if status not in ('granted', 'granted_with_mods'):
+        text = response['status']['status_string'].native or []
+        failure = response['status']['fail_info'].native
+        raise TimestampError(f"TSA isteği reddetti: {status} {failure or ''} {' '.join(text)}".strip())
+
+    token = response['time_stamp_token']
+    info = token_info(token)
+    if data_hash is not None and info['hashed_message'] != data_hash.lower():
+        raise TimestampError("TSA yanıtındaki özet istekle uyuşmuyor")
+    if nonce is not None and info['nonce'] != nonce:
+        raise TimestampError("TSA yanıtındaki nonce istekle uyuşmuyor")
+    info['token'] = token.dump()
+    return info
+
+
+def _load_token(token):
+    if isinstance(token, cms.ContentInfo):
+        return token
+    if isinstance(token, str):
+        token = base64.b64decode(token.encode('ascii'), validate=True)
+    content_info = cms.ContentInfo.load(token)
+    if content_info['content_type'].native != 'signed_data':
+        raise TimestampError("Token SignedData değil")
+    return content_info
+
+
+def token_info(token):
+    """Token'dan TSTInfo alanlarını okur (imza doğrulaması yapmaz)"""
+    _require_asn1()
+    try:
+        content_info = _load_token(token)
+        signed_data = content_info['content']
+        encap = signed_data['encap_content_info']
+        if encap['content_type'].native != 'tst_info':
+            raise TimestampError("Token içeriği TSTInfo değil")
+        tst_info = encap['content'].parsed
+        imprint = tst_info['message_imprint']
+        return {
+            'tst_info': tst_info,
+            'hash_algorithm': imprint['hash_algorithm']['algorithm'].native,
+            'hashed_message': imprint['hashed_message'].native.hex(),
+            'gen_time': tst_info['gen_time'].native,
+            'serial_number': tst_info['serial_number'].native,
+            'nonce': tst_info['nonce'].native,
+            'policy': tst_info['policy'].native,
+            'certificates': [
+                choice.chosen.dump() for choice in (signed_data['certificates'] or [])
+                if choice.name == 'certificate'
+            ],
+            'signature': signed_data['signer_infos'][0]['signature'].native,
+        }
+    except TimestampError:
+        raise
+    except (ValueError, TypeError, KeyError, IndexError) as e:
+        raise TimestampError(f"Token çözülemedi: {str(e)}")
+
+
+@functools.lru_cache(maxsize=256)
+def load_certificate(der):
+    """DER sertifikayı çözer (aynı sertifika bir kez çözülür)"""
+    return x509.load_der_x509_certificate(der)
+
+
+@functools.lru_cache(maxsize=256)
+def x509_asn1(der):
+    """Aynı sertifikanın asn1crypto görünümü (issuer/serial eşleştirmesi için)"""
+    return asn1_x509.Certificate.load(der)
+
+
+def _fingerprint(certificate):
+    return certificate.fingerprint(hashes.SHA256())
+
+
+def _hash(name):
+    return {'sha1': hashes.SHA1, 'sha256': hashes.SHA256, 'sha384': hashes.SHA384, 'sha512': hashes.SHA512}[name]()
+
+
+def _valid_at(certificate, moment):
+    before = getattr(certificate, 'not_valid_before_utc', None) or \
+        certificate.not_valid_before.replace(tzinfo=dt_timezone.utc)
+    after = getattr(certificate, 'not_valid_after_utc', None) or \
+        certificate.not_valid_after.replace(tzinfo=dt_timezone.utc)
+    return before <= moment <= after
+
+
+def _can_issue(certificate, issued_below):
+    """Sertifika CA mı (BasicConstraints ca=True, keyCertSign) ve altındaki zincir yol uzunluğuna sığıyor mu"""
+    try:
+        constraints = certificate.extensions.get_extension_for_class(x509.BasicConstraints).value
+        key_usage = certificate.extensions.get_extension_for_class(x509.KeyUsage).value
+    except x509.ExtensionNotFound:
+        return False
+    if not (constraints.ca and key_usage.key_cert_sign):
+        return False
+    return constraints.path_length is None or issued_below <= constraints.path_length
+
+
+def _verify_signature(public_key, signature, data, signature_algorithm, digest_name):
+    algorithm = signature_algorithm.signature_algo
+    try:
+        hash_name = signature_algorithm.hash_algo
+    except ValueError:
+        hash_name = digest_name
+    if algorithm == 'rsassa_pkcs1v15' and isinstance(public_key, rsa.RSAPublicKey):
+        public_key.verify(signature, data, padding.PKCS1v15(), _hash(hash_name))
+    elif algorithm == 'rsassa_pss' and isinstance(public_key, rsa.RSAPublicKey):
+        params = signature_algorithm['parameters']
+        pss_hash = params['hash_algorithm']['algorithm'].native
+        public_key.verify(
+            signature, data,
+            padding.PSS(mgf=padding.MGF1(_hash(pss_hash)), salt_length=params['salt_length'].native),
+            _hash(pss_hash),
+        )
+    elif algorithm == 'ecdsa' and isinstance(public_key, ec.EllipticCurvePublicKey):
+        public_key.verify(signature, data, ec.ECDSA(_hash(hash_name)))
+    else:
+        raise TimestampError(f"Desteklenmeyen imza algoritması: {algorithm}")
+
+
+class TokenVerifier:
+    """Güven köklerine karşı zaman damgası token doğrulayıcı (thread-safe)"""
+
+    def __init__(self, trusted_certificates=()):
+        self.anchors = {_fingerprint(cert): cert for cert in trusted_certificates}
+        self._verified_links = set()
+        self._signers = {}
+        self._chains = {}
+        self._lock = threading.Lock()
+
+    def _find_signer(self, signer_info, certificates):
+        sid = signer_info['sid']
+        key = (sid.dump(), tuple(certificates))
+        with self._lock:
+            if key in self._signers:
+                return self._signers[key]
+        for der in certificates:
+            parsed = x509_asn1(der)
+            if sid.name == 'issuer_and_serial_number':
+                issuer = sid.chosen['issuer']
+                # DER eşitliği hızlı yol; farklı kodlanmış aynı ad için normalize karşılaştırma
+                if parsed.serial_number == sid.chosen['serial_number'].native and (
+                    parsed.issuer.dump() == issuer.dump() or parsed.issuer == issuer
+                ):
+                    break
+            elif parsed.key_identifier == sid.chosen.native:
+                break
+        else:
+            raise TimestampError("İmzalayan TSA sertifikası token'da yok")
+        with self._lock:
+            self._signers[key] = der
+        return der
+
+    def _link_verified(self, child, issuer):
+        key = (_fingerprint(child), _fingerprint(issuer))
+        with self._lock:
+            if key in self._verified_links:
+                return True
+        try:
+            child.verify_directly_issued_by(issuer)
+        except (ValueError, TypeError, InvalidSignature):
+            return False
+        with self._lock:
+            self._verified_links.add(key)
+        return True
+
+    def _build_chain(self, signer, certificates):
+        """İmzalayandan güven köküne kadar sertifika zinciri; kurulamazsa TimestampError"""
+        key = (_fingerprint(signer), tuple(certificates))
+        with self._lock:
+            if key in self._chains:
+                return self._chains[key]
+        candidates = [load_certificate(der) for der in certificates] + list(self.anchors.values())
+        chain = [signer]
+        current = signer
+        for _ in range(MAX_CHAIN_LENGTH):
+            if _fingerprint(current) in self.anchors:
+                with self._lock:
+                    self._chains[key] = chain
+                return chain
+            issuers = [cert for cert in candidates if cert.subject == current.issuer and cert is not current]
+            issuer = next((cert for cert in issuers if self._link_verified(current, cert)), None)
+            if issuer is None:
+                raise TimestampError("Sertifika zinciri güvenilen köke bağlanamadı")
+            # Son kullanıcı sertifikası (ör. başka bir TSA) alt sertifika imzalayamaz
+            if not _can_issue(issuer, len(chain) - 1):
+                raise TimestampError("Zincirdeki veren sertifika CA değil")
+            chain.append(issuer)
+            current = issuer
+        raise TimestampError("Sertifika zinciri çok uzun")
+
+    def verify(self, token, expected_hash):
+        """Token'ı doğrular; sonuç sözlüğü döndürür (istisna fırlatmaz)"""
+        result = {
+            'valid': False, 'hash_match': False, 'signature_valid': False,
+            'certificate_valid': False, 'timestamp': None, 'serial_number': None,
+        }
+        try:
+            if not (ASN1_AVAILABLE and CRYPTO_AVAILABLE):
+                raise TimestampError("asn1crypto ve cryptography gerekli")
+            content_info = _load_token(token)
+            info = token_info(content_info)
+            result['timestamp'] = info['gen_time'].isoformat()
+            result['serial_number'] = str(info['serial_number'])
+            result['hash_match'] = info['hashed_message'] == (expected_hash or '').lower()
+            if not result['hash_match']:
+                raise TimestampError("Token özeti kayıtla uyuşmuyor")
+
+            signed_data = content_info['content']
+            signer_info = signed_data['signer_infos'][0]
+            digest_name = signer_info['digest_algorithm']['algorithm'].native
+            signed_attrs = signer_info['signed_attrs']
+            if not signed_attrs:
+                raise TimestampError("İmzalı öznitelik yok")
+            attrs = {attr['type'].native: attr['values'][0].native for attr in signed_attrs}
+            if attrs.get('content_type') != 'tst_info':
+                raise TimestampError("content-type özniteliği TSTInfo değil")
+            content = signed_data['encap_content_info']['content'].contents
+            if attrs.get('message_digest') != hashlib.new(digest_name, content).digest():
+                raise TimestampError("message-digest TSTInfo ile uyuşmuyor")
+
+            signer_der = self._find_signer(signer_info, info['certificates'])
+            signer = load_certificate(signer_der)
+            # [0] IMPLICIT öznitelikler SET OF olarak imzalanır
+            signed_bytes = b'\x31' + signed_attrs.dump()[1:]
+            try:
+                _verify_signature(
+                    signer.public_key(), signer_info['signature'].native, signed_bytes,
+                    signer_info['signature_algorithm'], digest_name,
+                )
+            except InvalidSignature:
+                raise TimestampError("Token imzası geçersiz")
+            result['signature_valid'] = True
+
+            try:
+                usages = signer.extensions.get_extension_for_class(x509.ExtendedKeyUsage).value
+            except x509.ExtensionNotFound:
+                usages = []
+            if ExtendedKeyUsageOID.TIME_STAMPING not in usages:
+                raise TimestampError("Sertifika zaman damgası için yetkili değil")
+            if not self.anchors:
+                raise TimestampError("Güvenilen TSA kök sertifikası tanımlı değil")
+            chain = self._build_chain(signer, info['certificates'])
+            if not all(_valid_at(cert, info['gen_time']) for cert in chain):
+                raise TimestampError("Sertifika damga zamanında geçerli değil")
+            result['certificate_valid'] = True
+            result['valid'] = result['hash_match']
+        except TimestampError as e:
+            result['error'] = str(e)
+        except (ValueError, TypeError, KeyError, IndexError) as e:
+            result['error'] = f"Token çözülemedi: {str(e)}"
+        return result
+
+
+def trusted_certificate_paths(authority=None):
+    paths = list(getattr(settings, 'TSA_TRUSTED_CERTIFICATES', []))
+    if authority is not None and authority.certificate_path:
+        paths.append(authority.certificate_path)
+    return tuple(paths)
+
+
+@functools.lru_cache(maxsize=32)
+def _load_anchors(paths):
+    anchors = []
+    for path in paths:
+        try:
+            with open(path, 'rb') as handle:
+                data = handle.read()
+        except OSError as e:
+            logger.error(f"TSA kök sertifikası okuma hatası ({path}): {str(e)}")
+            continue
+        if b'-----BEGIN' in data:
+            anchors.extend(x509.load_pem_x509_certificates(data))
+        else:
+            anchors.append(x509.load_der_x509_certificate(data))
+    return anchors
+
+
+_verifiers = {}
+_verifiers_lock = threading.Lock()
+
+
+def get_verifier(authority=None):
+    """Güven kökleri aynı olan çağrılar aynı doğrulayıcıyı (ve önbelleğini) paylaşır"""
+    paths = trusted_certificate_paths(authority)
+    with _verifiers_lock:
+        verifier = _verifiers.get(paths)
+        if verifier is None:
+            anchors = _load_anchors(paths) if CRYPTO_AVAILABLE else []
+            verifier = _verifiers[paths] = TokenVerifier(anchors)
+        return verifier
+
+
+def reset_verifiers():
+    with _verifiers_lock:
+        _verifiers.clear()
+    _load_anchors.cache_clear()
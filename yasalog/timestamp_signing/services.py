@@ -4,14 +4,18 @@ RFC 3161 uyumlu imzalama ve doğrulama işlemleri
 """
 
 import hashlib
-import base64
 import json
 import requests
 from datetime import datetime, timezone
+from django.db import transaction
+from django.db.models import Exists, F, Max, OuterRef, Q
 from django.utils import timezone as django_timezone
 from django.conf import settings
-from .models import TimestampSignature, TimestampAuthority, TimestampLog
-from .tsa_apis import TSAFactory, TimestampVerifier
+from log_kayit.blind_index import tc_no_index, ip_address_index, mac_address_index
+from log_kayit.models import JobCheckpoint
+from .models import TimestampSignature, TimestampAuthority, TimestampConfiguration, TimestampLog, TimestampRetry
+from .tsa_apis import TimestampVerifier
+from . import merkle, tsa_pool
 
 
 class TimestampService:
@@ -20,31 +24,16 @@ class TimestampService:
     def __init__(self, authority):
         self.authority = authority
     
-    def create_timestamp_request(self, data_hash):
-        """Zaman damgası isteği oluşturur"""
-        try:
-            # RFC 3161 uyumlu istek oluşturma
-            request_data = {
-                'hash': data_hash,
-                'hash_algorithm': 'SHA256',
-                'timestamp': datetime.now(timezone.utc).isoformat(),
-                'nonce': self._generate_nonce()
-            }
-            return request_data
-        except Exception as e:
-            raise Exception(f"Timestamp request oluşturma hatası: {str(e)}")
-    
     def sign_data(self, data):
         """Veriyi zaman damgası ile imzalar"""
+        # Veriyi hash'le
+        return self.sign_hash(hashlib.sha256(data.encode('utf-8')).hexdigest())
+    
+    def sign_hash(self, data_hash):
+        """Hazır SHA256 özetini (hex) zaman damgası ile imzalar"""
         try:
-            # Veriyi hash'le
-            data_hash = hashlib.sha256(data.encode('utf-8')).hexdigest()
-            
-            # Zaman damgası isteği oluştur
-            request_data = self.create_timestamp_request(data_hash)
-            
-            # TSA'ya istek gönder (simüle edilmiş)
-            response = self._send_timestamp_request(request_data)
+            # RFC 3161 isteğini (nonce dahil) TSA istemcisi oluşturur
+            response = self._send_timestamp_request(data_hash)
             
             if response.get('success'):
                 return {
@@ -65,7 +54,7 @@ class TimestampService:
             # Orijinal veriyi hash'le
             original_hash = hashlib.sha256(original_data.encode('utf-8')).hexdigest()
             
-            # İmzayı doğrula (simüle edilmiş)
+            # Token'ı otoritenin güven kökleriyle doğrula
             verification_result = self._verify_timestamp_token(signature_data, original_hash)
             
             return verification_result
@@ -73,69 +62,20 @@ class TimestampService:
         except Exception as e:
             raise Exception(f"İmza doğrulama hatası: {str(e)}")
     
-    def _generate_nonce(self):
-        """Güvenli nonce oluşturur"""
-        import secrets
-        return secrets.token_hex(16)
-    
-    def _send_timestamp_request(self, request_data):
-        """TSA'ya istek gönderir (gerçek API)"""
-        try:
-            # Gerçek TSA client oluştur
-            tsa_client = TSAFactory.create_tsa_client(self.authority)
-            
-            # TSA'ya istek gönder
-            response = tsa_client.request_timestamp(
-                data_hash=request_data['hash'],
-                hash_algorithm=request_data.get('hash_algorithm', 'SHA256')
-            )
-            
-            return response
-            
-        except Exception as e:
-            # API hatası durumunda simülasyon kullan
-            if self.authority.authority_type == 'TUBITAK':
-                return self._simulate_tubitak_response(request_data)
-            elif self.authority.authority_type == 'TURKTRUST':
-                return self._simulate_turktrust_response(request_data)
-            else:
-                return self._simulate_custom_response(request_data)
-    
-    def _simulate_tubitak_response(self, request_data):
-        """TÜBİTAK TSA simülasyonu"""
-        return {
-            'success': True,
-            'signature': base64.b64encode(f"TUBITAK_SIGNATURE_{request_data['hash']}".encode()).decode(),
-            'timestamp_token': base64.b64encode(f"TUBITAK_TOKEN_{request_data['timestamp']}".encode()).decode(),
-            'certificate_chain': base64.b64encode("TUBITAK_CERTIFICATE_CHAIN".encode()).decode(),
-            'serial_number': f"TUBITAK_{int(datetime.now().timestamp())}"
-        }
-    
-    def _simulate_turktrust_response(self, request_data):
-        """TurkTrust TSA simülasyonu"""
-        return {
-            'success': True,
-            'signature': base64.b64encode(f"TURKTRUST_SIGNATURE_{request_data['hash']}".encode()).decode(),
-            'timestamp_token': base64.b64encode(f"TURKTRUST_TOKEN_{request_data['timestamp']}".encode()).decode(),
-            'certificate_chain': base64.b64encode("TURKTRUST_CERTIFICATE_CHAIN".encode()).decode(),
-            'serial_number': f"TURKTRUST_{int(datetime.now().timestamp())}"
-        }
-    
-    def _simulate_custom_response(self, request_data):
-        """Özel TSA simülasyonu"""
-        return {
-            'success': True,
-            'signature': base64.b64encode(f"CUSTOM_SIGNATURE_{request_data['hash']}".encode()).decode(),
-            'timestamp_token': base64.b64encode(f"CUSTOM_TOKEN_{request_data['timestamp']}".encode()).decode(),
-            'certificate_chain': base64.b64encode("CUSTOM_CERTIFICATE_CHAIN".encode()).decode(),
-            'serial_number': f"CUSTOM_{int(datetime.now().timestamp())}"
-        }
+    def _send_timestamp_request(self, data_hash, hash_algorithm='SHA256'):
+        """TSA'ya istek gönderir (gerçek API)
+        
+        TSA'ya ulaşılamazsa hata fırlatılır; sahte token üretilmez, kayıtlar
+        bir sonraki çalıştırmada yeniden denenir.
+        """
+        # Otoritenin ortak oturumu, devre kesicisi ve deneme bütçesiyle gönder
+        return tsa_pool.request_timestamp(self.authority, data_hash, hash_algorithm=hash_algorithm)
     
     def _verify_timestamp_token(self, signature_data, original_hash):
         """Zaman damgası token'ını doğrular"""
         try:
-            # Gerçek doğrulayıcı kullan
-            verifier = TimestampVerifier()
+            # Otoritenin güven kökleriyle RFC 3161 doğrulaması
+            verifier = TimestampVerifier(self.authority)
             result = verifier.verify_timestamp_token(signature_data, original_hash)
             return result
             
@@ -150,42 +90,88 @@ class TimestampService:
             }
 
 
+SIGN_JOB = 'timestamp_sign'
+
+
 class BatchTimestampService:
-    """Toplu zaman damgası imzalama servisi"""
+    """Toplu zaman damgası imzalama servisi
+
+    Bekleyen kayıtlar firma başına imleçten (JobCheckpoint, job='timestamp_sign')
+    bulunur: imzalanan son log ID'sinden sonraki kayıtlar (company, id) indeksi
+    üzerinde aralık taramasıyla okunur. Başarısız toplu işteki kayıtlar
+    TimestampRetry kuyruğuna alınır ve imleç yine ilerler; kuyruk artan
+    aralıklarla yeni kayıtlarla birlikte yeniden denenir. İmleç koşullu
+    UPDATE ile ilerletilir; aynı kayıtları okuyan iki çalıştırmadan yalnızca
+    biri imzaları yazar. Henüz commit edilmemiş düşük ID'li bir kaydı
+    atlamamak için yalnızca commit sınırına (`commit_horizon()`) kadar
+    okunur; giris_zamani'na bakılmaz, geçmiş tarihli içe aktarmalar da imzalanır.
+    """
     
     def __init__(self, company):
         self.company = company
         self.config = company.timestamp_config
     
-    def sign_pending_logs(self):
-        """Bekleyen log kayıtlarını toplu olarak imzalar"""
+    def sign_pending_logs(self, max_wait=None):
+        """Bekleyen log kayıtlarını toplu olarak imzalar
+        
+        Kayıtlar Merkle ağacının yaprakları olur; TSA'ya toplu iş başına tek
+        istek gider (kök hash). Her kayda kök token'ı ve kapsama kanıtı yazılır.
+        
+        max_wait (sn) verilirse toplu iş dolmadıkça ve en eski bekleyen kayıt
+        bu süreden genç oldukça imzalama ertelenir (sürekli çalışma modu).
+        """
         try:
-            # İmzalanmamış log kayıtlarını al
-            pending_logs = self._get_pending_logs()
+            checkpoint = self._get_checkpoint()
+            retries = self._get_due_retries()
+            new_logs = self._get_pending_logs(checkpoint.last_id, self.config.batch_size - len(retries))
+            pending_logs = [retry.log_entry for retry in retries] + new_logs
             
-            if not pending_logs.exists():
+            if not pending_logs:
                 return {'success': True, 'message': 'İmzalanacak kayıt bulunamadı', 'count': 0}
             
-            # Toplu imzalama işlemi
-            success_count = 0
-            failure_count = 0
+            if (max_wait is not None and not retries and len(pending_logs) < self.config.batch_size
+                    and new_logs[0].giris_zamani > django_timezone.now() - django_timezone.timedelta(seconds=max_wait)):
+                return {'success': True, 'message': 'Toplu iş bekletiliyor', 'count': 0,
+                        'deferred': len(pending_logs)}
             
-            for log in pending_logs:
-                try:
-                    if self._sign_single_log(log):
-                        success_count += 1
-                    else:
-                        failure_count += 1
-                except Exception as e:
-                    failure_count += 1
-                    self._log_error(log, str(e))
+            # TSA isteği transaction dışında yapılır; yazma transaction'ı kısa kalır
+            try:
+                signatures = self._sign_batch(pending_logs)
+                error_message = None
+            except Exception as e:
+                signatures = []
+                error_message = str(e)
+            success_count = len(signatures)
+            failure_count = len(pending_logs) - success_count
             
+            with transaction.atomic():
+                # İyimser kilit: imleç okunduğundan beri değiştiyse başka bir çalıştırma
+                # bu kayıtları işlemiştir; hiçbir şey yazılmaz
+                advanced = JobCheckpoint.objects.filter(
+                    pk=checkpoint.pk, last_id=checkpoint.last_id, processed=checkpoint.processed
+                ).update(
+                    last_id=new_logs[-1].id if new_logs else checkpoint.last_id,
+                    processed=F('processed') + len(pending_logs),
+                    updated=F('updated') + success_count,
+                    updated_at=django_timezone.now(),
+                )
+                if not advanced:
+                    raise RuntimeError('İmza imleci eşzamanlı bir çalıştırma tarafından ilerletildi')
+                if error_message is None:
+                    TimestampSignature.objects.bulk_create(signatures)
+                    TimestampRetry.objects.filter(id__in=[retry.id for retry in retries]).delete()
+                else:
+                    self._schedule_retries(retries, new_logs, error_message)
+            
+            if error_message is not None:
+                self._log_error(None, error_message)
             # İşlem logunu kaydet
             self._log_batch_operation(success_count, failure_count)
             
             return {
                 'success': True,
                 'message': f'{success_count} kayıt başarıyla imzalandı, {failure_count} kayıt başarısız',
+                'count': len(pending_logs),
                 'success_count': success_count,
                 'failure_count': failure_count
             }
@@ -194,34 +180,98 @@ class BatchTimestampService:
             self._log_error(None, str(e))
             return {'success': False, 'error': str(e)}
     
-    def _get_pending_logs(self):
-        """İmzalanmamış log kayıtlarını getirir"""
+    def _get_checkpoint(self):
+        """Firmanın imza imlecini getirir; yoksa imzalanmış son kayıttan başlatır
+        
+        İmleç ilk kez oluşturulurken (yükseltme) altında kalan imzasız kayıtlar
+        yeniden deneme kuyruğuna alınır; hiçbiri atlanmaz.
+        """
+        checkpoint = JobCheckpoint.objects.filter(job=SIGN_JOB, company=self.company).first()
+        if checkpoint is None:
+            last_signed = TimestampSignature.objects.filter(company=self.company).aggregate(
+                last_id=Max('log_entry_id')
+            )['last_id']
+            with transaction.atomic():
+                checkpoint, created = JobCheckpoint.objects.get_or_create(
+                    job=SIGN_JOB, company=self.company, defaults={'last_id': last_signed or 0}
+                )
+                if created and last_signed:
+                    self._enqueue_unsigned(last_signed)
+        return checkpoint
+    
+    def _enqueue_unsigned(self, last_id, chunk_size=5000):
+        """last_id'ye kadar imzası ve kuyruk kaydı olmayan logları hemen denenmek üzere kuyruğa alır"""
         from log_kayit.models import LogKayit
         
-        # Son 24 saatteki imzalanmamış kayıtlar
-        cutoff_time = django_timezone.now() - django_timezone.timedelta(hours=24)
+        unsigned = LogKayit.objects.filter(company=self.company, id__lte=last_id).filter(
+            ~Exists(TimestampSignature.objects.filter(log_entry_id=OuterRef('pk'))),
+            ~Exists(TimestampRetry.objects.filter(log_entry_id=OuterRef('pk'))),
+        ).order_by('id').values_list('id', flat=True)
+        now = django_timezone.now()
+        retries = [
+            TimestampRetry(log_entry_id=log_id, company=self.company, attempts=0, next_attempt_at=now,
+                           last_error='İmza imleci oluşturulurken imzasız bulundu')
+            for log_id in unsigned.iterator(chunk_size=chunk_size)
+        ]
+        TimestampRetry.objects.bulk_create(retries, batch_size=1000)
+        return len(retries)
+    
+    def _get_due_retries(self):
+        """Zamanı gelen yeniden deneme kayıtları (kuyruk toplu işin yarısını geçmez)"""
+        return list(
+            TimestampRetry.objects.filter(
+                company=self.company, next_attempt_at__lte=django_timezone.now()
+            ).select_related('log_entry').order_by('next_attempt_at')[:max(1, self.config.batch_size // 2)]
+        )
+    
+    def _get_pending_logs(self, last_id, limit):
+        """İmleçten sonraki yeni log kayıtlarını ID sırasıyla getirir"""
+        from log_kayit.commit_horizon import commit_horizon
+        from log_kayit.models import LogKayit
         
-        return LogKayit.objects.filter(
-            company=self.company,
-            giris_zamani__gte=cutoff_time
-        ).exclude(
-            timestamp_signatures__status__in=['SIGNED', 'VERIFIED']
-        )[:self.config.batch_size]
+        if limit <= 0:
+            return []
+        horizon = commit_horizon()
+        return list(
+            LogKayit.objects.filter(company=self.company, id__gt=last_id, id__lte=horizon).order_by('id')[:limit]
+        )
     
-    def _sign_single_log(self, log):
-        """Tek bir log kaydını imzalar"""
-        try:
-            # Log verisini hazırla
-            log_data = self._prepare_log_data(log)
-            
-            # Zaman damgası servisini başlat
-            timestamp_service = TimestampService(self.config.authority)
-            
-            # Veriyi imzala
-            signature_result = timestamp_service.sign_data(log_data)
-            
-            # İmzayı veritabanına kaydet
-            timestamp_signature = TimestampSignature.objects.create(
+    def _schedule_retries(self, retries, new_logs, error_message):
+        """Başarısız toplu işin kayıtlarını artan bekleme süresiyle kuyruğa alır
+        
+        Bekleme retry_delay'den başlayıp her denemede ikiye katlanır; max_retries
+        denemeden sonra büyümez. Kayıtlar kuyruktan düşürülmez (5651: her kayıt imzalanmalı).
+        """
+        now = django_timezone.now()
+        
+        def next_attempt(attempts):
+            return now + django_timezone.timedelta(
+                seconds=self.config.retry_delay * 2 ** min(attempts - 1, self.config.max_retries)
+            )
+        
+        for retry in retries:
+            retry.attempts += 1
+            retry.next_attempt_at = next_attempt(retry.attempts)
+            retry.last_error = error_message
+        TimestampRetry.objects.bulk_update(retries, ['attempts', 'next_attempt_at', 'last_error'])
+        TimestampRetry.objects.bulk_create([
+            TimestampRetry(log_entry=log, company=self.company, next_attempt_at=next_attempt(1),
+                           last_error=error_message)
+            for log in new_logs
+        ])
+    
+    def _sign_batch(self, logs):
+        """Kayıtları tek Merkle kökü ile imzalar; kaydedilmemiş imza nesnelerini döndürür"""
+        leaves = [merkle.leaf_hash(self._prepare_leaf_data(log)) for log in logs]
+        levels = merkle.build_levels(leaves)
+        root = levels[-1][0]
+        
+        # Kök zaten bir özet; TSA'ya olduğu gibi gönderilir
+        signature_result = TimestampService(self.config.authority).sign_hash(root)
+        
+        signed_at = django_timezone.now()
+        return [
+            TimestampSignature(
                 log_entry=log,
                 company=self.company,
                 authority=self.config.authority,
@@ -229,18 +279,44 @@ class BatchTimestampService:
                 timestamp_token=signature_result['timestamp_token'],
                 certificate_chain=signature_result['certificate_chain'],
                 serial_number=signature_result['serial_number'],
+                leaf_hash=leaves[index],
+                merkle_root=root,
+                merkle_proof=merkle.inclusion_proof(levels, index),
                 status='SIGNED',
-                signed_at=django_timezone.now()
+                signed_at=signed_at
             )
-            
-            return True
-            
-        except Exception as e:
-            self._log_error(log, str(e))
-            return False
+            for index, log in enumerate(logs)
+        ]
     
-    def _prepare_log_data(self, log):
-        """Log verisini imzalama için hazırlar"""
+    @classmethod
+    def _prepare_leaf_data(cls, log):
+        """Merkle yaprağı için anahtar rotasyonundan etkilenmeyen kanonik veri
+        
+        Şifreli TC/IP/MAC yerine kör indeksleri girer (bkz. ledger.py); anahtar
+        rotasyonu veya eski kayıtların şifrelenmesi yaprağı değiştirmez.
+        is_suspicious yönetici tarafından işaretlenebildiğinden girmez.
+        """
+        log_data = {
+            'id': log.id,
+            'kimlik_turu': log.kimlik_turu,
+            'pasaport_no': log.pasaport_no,
+            'pasaport_ulkesi': log.pasaport_ulkesi,
+            'ad_soyad': log.ad_soyad,
+            'telefon': log.telefon,
+            'nat_ip_adresi': str(log.nat_ip_adresi) if log.nat_ip_adresi is not None else None,
+            'nat_port': log.nat_port,
+            'giris_zamani': log.giris_zamani.astimezone(timezone.utc).isoformat(),
+            'sha256_hash': log.sha256_hash,
+            # İndeksi eksik eski kayıtlarda indeks çözülmüş değerden hesaplanır
+            'tc_no_bidx': log.tc_no_bidx or tc_no_index(log.tc_no_decrypted),
+            'ip_adresi_bidx': log.ip_adresi_bidx or ip_address_index(log.ip_adresi_decrypted),
+            'mac_adresi_bidx': log.mac_adresi_bidx or mac_address_index(log.mac_adresi_decrypted),
+        }
+        return json.dumps(log_data, sort_keys=True, ensure_ascii=False)
+    
+    @classmethod
+    def _prepare_log_data(cls, log):
+        """Log verisini imzalama için hazırlar (tekil imzalı eski kayıtlar)"""
         # Log kaydının tüm bilgilerini birleştir
         log_data = {
             'tc_no': log.tc_no,
@@ -280,3 +356,67 @@ class BatchTimestampService:
             success_count=success_count,
             failure_count=failure_count
         )
+
+
+def acquire_company_lock(company, owner, seconds):
+    """Firmanın imzalama kilidini süreli olarak alır; başkası tutuyorsa False
+    
+    Kilit koşullu UPDATE ile alınır (tüm veritabanlarında atomik); süre
+    dolunca kilit kendiliğinden bırakılmış sayılır, çöken çalıştırma firmayı
+    kilitli bırakmaz.
+    """
+    now = django_timezone.now()
+    return bool(TimestampConfiguration.objects.filter(company=company).filter(
+        Q(locked_until__isnull=True) | Q(locked_until__lt=now) | Q(locked_by=owner)
+    ).update(locked_by=owner, locked_until=now + django_timezone.timedelta(seconds=seconds)))
+
+
+def release_company_lock(company, owner):
+    """Kilit hâlâ bu sahipteyse bırakır"""
+    TimestampConfiguration.objects.filter(company=company, locked_by=owner).update(
+        locked_by='', locked_until=None
+    )
+
+
+def verify_batch_signature(signature, token_cache=None):
+    """Toplu imzalanmış tek kaydı Merkle kökü ile doğrular
+    
+    Kaydın kanonik verisi yeniden hash'lenir ve kanıt boyunca köke çıkılır
+    (O(log n)); diğer kayıtlar okunmaz. Kökün token'ı RFC 3161 olarak
+    doğrulanır; token_cache verilirse aynı token bir kez doğrulanır.
+    """
+    leaf = merkle.leaf_hash(BatchTimestampService._prepare_leaf_data(signature.log_entry))
+    if leaf != signature.leaf_hash:
+        return {'valid': False, 'leaf_match': False, 'root_match': False,
+                'error': 'Kayıt imzalandıktan sonra değiştirilmiş'}
+    if not merkle.verify_proof(leaf, signature.merkle_proof, signature.merkle_root):
+        return {'valid': False, 'leaf_match': True, 'root_match': False,
+                'error': 'Kapsama kanıtı Merkle köküne ulaşmıyor'}
+    
+    token = _verify_token(signature, signature.merkle_root, token_cache)
+    result = {'valid': token['valid'], 'leaf_match': True, 'root_match': True, 'token': token}
+    if not token['valid']:
+        result['error'] = token.get('error') or 'Zaman damgası token\'ı geçersiz'
+    return result
+
+
+def _verify_token(signature, expected_hash, token_cache=None):
+    key = (signature.authority_id, signature.timestamp_token, expected_hash)
+    if token_cache is not None and key in token_cache:
+        return token_cache[key]
+    result = TimestampService(signature.authority)._verify_timestamp_token(signature.timestamp_token, expected_hash)
+    if token_cache is not None:
+        token_cache[key] = result
+    return result
+
+
+def verify_signature_record(signature, token_cache=None):
+    """İmza kaydını doğrular: toplu imzada Merkle kanıtı, tekil imzada kayıt özeti"""
+    if signature.merkle_root:
+        return verify_batch_signature(signature, token_cache)
+    log_data = BatchTimestampService._prepare_log_data(signature.log_entry)
+    token = _verify_token(signature, hashlib.sha256(log_data.encode('utf-8')).hexdigest(), token_cache)
+    result = {'valid': token['valid'], 'token': token}
+    if not token['valid']:
+        result['error'] = token.get('error') or 'Zaman damgası token\'ı geçersiz'
+    return result
@@ -0,0 +1,419 @@
+from django.test import SimpleTestCase, TestCase
+from log_kayit.models import Company, LogKayit
+from . import ledger, merkle, rfc3161, tsa_pool
+from .tsa_stub import LocalTSAServer
+
+
+class MerkleTreeTestCase(SimpleTestCase):
+    def test_every_leaf_proves_inclusion(self):
+        """Her yaprak kendi kanıtıyla köke ulaşmalı, başka yaprak ulaşmamalı"""
+        for size in (1, 2, 5, 8, 13):
+            leaves = [merkle.leaf_hash(f'kayıt {i}') for i in range(size)]
+            levels = merkle.build_levels(leaves)
+            root = levels[-1][0]
+            for index, leaf in enumerate(leaves):
+                proof = merkle.inclusion_proof(levels, index)
+                self.assertLessEqual(len(proof), max(1, size - 1).bit_length())
+                self.assertTrue(merkle.verify_proof(leaf, proof, root))
+                self.assertFalse(merkle.verify_proof(merkle.leaf_hash('sahte'), proof, root))
+
+        # Tek kalan düğüm kopyalanmaz: son yaprağın tekrarı farklı kök verir
+        leaves = [merkle.leaf_hash(str(i)) for i in range(3)]
+        self.assertNotEqual(merkle.merkle_root(leaves), merkle.merkle_root(leaves + leaves[-1:]))
+
+
+class BatchTimestampTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.company = Company.objects.create(name='Test', slug='test')
+
+    def setUp(self):
+        import tempfile
+        from .models import TimestampAuthority, TimestampConfiguration
+        self.server = LocalTSAServer().start()
+        self.cert_dir = tempfile.mkdtemp()
+        authority = TimestampAuthority.objects.create(name='Test', authority_type='TUBITAK',
+                                                      api_endpoint=self.server.url)
+        TimestampConfiguration.objects.create(company=self.company, authority=authority)
+
+    def tearDown(self):
+        import shutil
+        self.server.stop()
+        shutil.rmtree(self.cert_dir, ignore_errors=True)
+        tsa_pool.reset_pools()
+        rfc3161.reset_verifiers()
+
+    def test_batch_uses_single_tsa_request(self):
+        """Toplu imzada TSA'ya tek istek gitmeli; her kayıt kanıt ve RFC 3161 token ile doğrulanmalı"""
+        from django.core.management import call_command
+        from log_kayit.services import bulk_create_logs
+        from .models import TimestampSignature
+        from .services import BatchTimestampService, verify_batch_signature
+
+        bulk_create_logs([
+            LogKayit(company=self.company, ad_soyad=f'Kişi {i}', ip_adresi='10.0.0.1') for i in range(6)
+        ])
+        result = BatchTimestampService(self.company).sign_pending_logs()
+        self.assertEqual(self.server.requests, 1)
+        self.assertEqual(result['success_count'], 6)
+
+        signatures = list(TimestampSignature.objects.select_related('log_entry', 'authority'))
+        self.assertEqual(len({s.merkle_root for s in signatures}), 1)
+        self.assertEqual(rfc3161.token_info(signatures[0].timestamp_token)['hashed_message'],
+                         signatures[0].merkle_root)
+
+        # Güven kökü tanımlı değilken hiçbir token kabul edilmemeli
+        self.assertFalse(verify_batch_signature(signatures[0])['valid'])
+        with self.settings(TSA_TRUSTED_CERTIFICATES=[self.server.write_root_certificate(self.cert_dir)]):
+            rfc3161.reset_verifiers()
+            self.assertTrue(all(verify_batch_signature(s)['valid'] for s in signatures))
+
+            # Sonradan değiştirilen kayıt doğrulanmamalı
+            signature = signatures[0]
+            LogKayit.objects.filter(pk=signature.log_entry_id).update(ad_soyad='Değişti')
+            signature.log_entry.refresh_from_db()
+            self.assertFalse(verify_batch_signature(signature)['valid'])
+
+            call_command('verify_timestamps', verbosity=0)
+        self.assertEqual(TimestampSignature.objects.filter(status='VERIFIED').count(), 5)
+        self.assertTrue(TimestampSignature.objects.get(pk=signature.pk).error_message)
+
+    def test_batch_signature_survives_key_rotation(self):
+        """Anahtar rotasyonu şifreli sütunları yeniden yazsa da toplu imza doğrulanmalı"""
+        from unittest import mock
+        from cryptography.fernet import Fernet
+        from django.core.management import call_command
+        from log_kayit.encryption import encryption_manager
+        from .models import TimestampSignature
+        from .services import BatchTimestampService, verify_batch_signature
+
+        LogKayit.objects.create(company=self.company, tc_no='10000000146', ad_soyad='Kişi',
+                                ip_adresi='10.0.0.1', mac_adresi='00:1A:2B:3C:4D:5E')
+        self.assertEqual(BatchTimestampService(self.company).sign_pending_logs()['success_count'], 1)
+        before = LogKayit.objects.values_list('tc_no', 'ip_adresi', 'mac_adresi').get()
+
+        keys = [Fernet.generate_key()] + encryption_manager._get_encryption_keys()
+        with mock.patch.object(encryption_manager, '_keys', keys), \
+                mock.patch.object(encryption_manager, '_fernet', None), \
+                mock.patch.object(encryption_manager, '_primary_fernet', None), \
+                self.settings(TSA_TRUSTED_CERTIFICATES=[self.server.write_root_certificate(self.cert_dir)]):
+            rfc3161.reset_verifiers()
+            call_command('rotate_encryption_key', rate=0, stdout=mock.Mock())
+            after = LogKayit.objects.values_list('tc_no', 'ip_adresi', 'mac_adresi').get()
+            self.assertTrue(all(old != new for old, new in zip(before, after)))
+
+            signature = TimestampSignature.objects.select_related('log_entry', 'authority').get()
+            self.assertTrue(verify_batch_signature(signature)['valid'])
+
+    def test_tsa_failure_does_not_create_signatures(self):
+        """TSA'ya ulaşılamazsa sahte token üretilmemeli; kayıtlar yeniden deneme kuyruğuna alınmalı"""
+        from datetime import timedelta
+        from django.utils import timezone
+        from log_kayit.models import JobCheckpoint
+        from .models import TimestampRetry, TimestampSignature
+        from .services import SIGN_JOB, BatchTimestampService
+
+        service = BatchTimestampService(self.company)
+        failed = LogKayit.objects.create(company=self.company, ad_soyad='Kişi', ip_adresi='10.0.0.1')
+        self.server.fail_first = 1
+        with self.settings(TSA_MAX_RETRIES=0):
+            result = service.sign_pending_logs()
+        self.assertEqual(result['failure_count'], 1)
+        self.assertFalse(TimestampSignature.objects.exists())
+        self.assertTrue(TimestampRetry.objects.filter(log_entry=failed).exists())
+        # İmleç başarısız işte de ilerler; kayıt kuyruktan gelir
+        self.assertEqual(JobCheckpoint.objects.get(job=SIGN_JOB, company=self.company).last_id, failed.id)
+
+        # Zamanı gelmemiş deneme beklenir, yalnızca yeni kayıt imzalanır
+        LogKayit.objects.create(company=self.company, ad_soyad='Yeni', ip_adresi='10.0.0.2')
+        self.assertEqual(service.sign_pending_logs()['success_count'], 1)
+        TimestampRetry.objects.update(next_attempt_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(service.sign_pending_logs()['success_count'], 1)
+        self.assertFalse(TimestampRetry.objects.exists())
+        self.assertEqual(TimestampSignature.objects.count(), 2)
+
+        # Yeni kayıt yokken TSA'ya istek gitmez
+        requests = self.server.requests
+        self.assertEqual(service.sign_pending_logs()['count'], 0)
+        self.assertEqual(self.server.requests, requests)
+
+        # Sürekli modda dolmayan toplu iş en eski kayıt max_wait'i aşana kadar bekletilir
+        LogKayit.objects.create(company=self.company, ad_soyad='Son', ip_adresi='10.0.0.3')
+        self.assertEqual(service.sign_pending_logs(max_wait=3600)['deferred'], 1)
+        self.assertEqual(service.sign_pending_logs(max_wait=0)['success_count'], 1)
+
+    def test_initial_cursor_queues_unsigned_gap(self):
+        """İmleç yokken (yükseltme) son imzalı kaydın altındaki imzasız kayıtlar atlanmamalı"""
+        from log_kayit.models import JobCheckpoint
+        from .models import TimestampRetry, TimestampSignature
+        from .services import SIGN_JOB, BatchTimestampService
+
+        logs = [LogKayit.objects.create(company=self.company, ad_soyad=f'Kişi {i}', ip_adresi='10.0.0.1')
+                for i in range(4)]
+        self.assertEqual(BatchTimestampService(self.company).sign_pending_logs()['success_count'], 4)
+        # Eski sürümden kalan durum: imleç yok, en yüksek id'nin altında imzasız kayıtlar var
+        TimestampSignature.objects.filter(log_entry__in=logs[:3:2]).delete()
+        JobCheckpoint.objects.filter(job=SIGN_JOB, company=self.company).delete()
+
+        result = BatchTimestampService(self.company).sign_pending_logs()
+        self.assertEqual(result['success_count'], 2)
+        self.assertEqual(JobCheckpoint.objects.get(job=SIGN_JOB, company=self.company).last_id, logs[-1].id)
+        self.assertFalse(TimestampRetry.objects.exists())
+        self.assertEqual(TimestampSignature.objects.filter(log_entry__in=logs).count(), 4)
+
+    def test_cursor_waits_for_uncommitted_import(self):
+        """Geçmiş tarihli içe aktarma sonradan commit edilse de imleç onu atlamamalı"""
+        from datetime import timedelta
+        from django.utils import timezone
+        from .models import TimestampSignature
+        from .services import BatchTimestampService
+
+        service = BatchTimestampService(self.company)
+        first = LogKayit.objects.create(company=self.company, ad_soyad='İlk', ip_adresi='10.0.0.1')
+        self.assertEqual(service.sign_pending_logs()['success_count'], 1)
+
+        # first.id + 1 henüz commit edilmemiş bir içe aktarmaya ait; sonraki giriş önce görünür
+        later = LogKayit.objects.create(id=first.id + 2, company=self.company, ad_soyad='Portal',
+                                        ip_adresi='10.0.0.2', giris_zamani=timezone.now() - timedelta(minutes=5))
+        self.assertEqual(service.sign_pending_logs()['count'], 0)
+
+        imported = LogKayit.objects.create(id=first.id + 1, company=self.company, ad_soyad='İçe aktarılan',
+                                           ip_adresi='10.0.0.3', giris_zamani=timezone.now() - timedelta(days=30))
+        self.assertEqual(service.sign_pending_logs()['success_count'], 2)
+        self.assertEqual(TimestampSignature.objects.filter(log_entry__in=[imported, later]).count(), 2)
+
+
+    def test_auto_timestamp_skips_locked_company(self):
+        """Başka çalıştırmanın kilitlediği firma atlanmalı; kilit bırakılınca imzalanmalı"""
+        from io import StringIO
+        from django.core.management import call_command
+        from .models import TimestampConfiguration, TimestampSignature
+        from .services import acquire_company_lock, release_company_lock
+
+        LogKayit.objects.create(company=self.company, ad_soyad='Kişi', ip_adresi='10.0.0.1')
+        self.assertTrue(acquire_company_lock(self.company, 'diger-cron', 60))
+        self.assertFalse(acquire_company_lock(self.company, 'bu-cron', 60))
+
+        out = StringIO()
+        call_command('auto_timestamp', force=True, workers=1, stdout=out)
+        self.assertIn('atlandı', out.getvalue())
+        self.assertFalse(TimestampSignature.objects.exists())
+
+        release_company_lock(self.company, 'diger-cron')
+        out = StringIO()
+        call_command('auto_timestamp', force=True, workers=1, stdout=out)
+        self.assertEqual(TimestampSignature.objects.count(), 1)
+        self.assertIn('kayıt/sn', out.getvalue())
+        self.assertIsNone(TimestampConfiguration.objects.get(company=self.company).locked_until)
+
+
+class LogLedgerTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.company = Company.objects.create(name='A', slug='a')
+        cls.other = Company.objects.create(name='B', slug='b')
+
+    def setUp(self):
+        from log_kayit.services import bulk_create_logs
+        bulk_create_logs([
+            LogKayit(company=company, ad_soyad=f'Kişi {i}', ip_adresi='10.0.0.1', tc_no='10000000146')
+            for i in range(5) for company in (self.company, self.other)
+        ])
+        self.assertEqual(ledger.append_entries(), 10)
+        self.logs = list(LogKayit.objects.filter(company=self.company).order_by('id'))
+
+    def test_tampered_record_is_pinpointed(self):
+        """Değiştirilen, silinen veya sonradan eklenen kayıt bulunmalı"""
+        self.assertTrue(ledger.verify_company(self.company)['valid'])
+
+        LogKayit.objects.filter(pk=self.logs[2].pk).update(ad_soyad='Değişti')
+        result = ledger.verify_company(self.company)
+        self.assertEqual((result['valid'], result['seq'], result['log_id']), (False, 3, self.logs[2].pk))
+        LogKayit.objects.filter(pk=self.logs[2].pk).update(ad_soyad=self.logs[2].ad_soyad)
+
+        # Zincir girdisiyle birlikte silinen kayıt sıra boşluğu bırakır
+        self.logs[3].delete()
+        result = ledger.verify_company(self.company)
+        self.assertEqual((result['valid'], result['seq']), (False, 5))
+
+    def test_append_ignores_timestamps_and_waits_for_gaps(self):
+        """Gelecek tarihli kayıt zinciri bekletmemeli; commit edilmemiş ID'nin ötesine geçilmemeli"""
+        from datetime import timedelta
+        from django.utils import timezone
+        from .models import LogLedgerEntry
+
+        last_id = LogKayit.objects.order_by('-id').values_list('id', flat=True).first()
+        LogKayit.objects.create(company=self.other, ad_soyad='Saati ileri', ip_adresi='10.0.0.2',
+                                giris_zamani=timezone.now() + timedelta(days=1))
+        LogKayit.objects.create(company=self.company, ad_soyad='Yeni', ip_adresi='10.0.0.3')
+        self.assertEqual(ledger.append_entries(), 2)
+
+        # last_id + 3 henüz commit edilmemiş bir içe aktarmaya ait
+        later = LogKayit.objects.create(id=last_id + 4, company=self.company, ad_soyad='Sonraki',
+                                        ip_adresi='10.0.0.4')
+        self.assertEqual(ledger.append_entries(), 0)
+        imported = LogKayit.objects.create(id=last_id + 3, company=self.company, ad_soyad='İçe aktarılan',
+                                           ip_adresi='10.0.0.5', giris_zamani=timezone.now() - timedelta(days=30))
+        self.assertEqual(ledger.append_entries(), 2)
+        self.assertEqual(
+            list(LogLedgerEntry.objects.filter(log__in=[imported, later]).order_by('seq').values_list('log_id', flat=True)),
+            [imported.id, later.id]
+        )
+        self.assertTrue(ledger.verify_company(self.company)['valid'])
+
+    def test_checkpoints_and_daily_files(self):
+        """Zincir başı TSA ile damgalanmalı; günlük dosya bağımsız doğrulanmalı"""
+        import json
+        import shutil
+        import tempfile
+        from django.utils import timezone
+        from .models import LogLedgerCheckpoint, TimestampAuthority, TimestampConfiguration
+
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        with LocalTSAServer() as server, self.settings(
+            TSA_TRUSTED_CERTIFICATES=[server.write_root_certificate(directory)]
+        ):
+            self.addCleanup(tsa_pool.reset_pools)
+            self.addCleanup(rfc3161.reset_verifiers)
+            authority = TimestampAuthority.objects.create(name='Yerel', authority_type='TUBITAK', api_endpoint=server.url)
+            TimestampConfiguration.objects.create(company=self.company, authority=authority)
+            self.assertEqual(ledger.checkpoint_heads(), 1)
+            self.assertEqual(ledger.checkpoint_heads(), 0)
+
+            result = ledger.verify_company(self.company)
+            self.assertEqual((result['valid'], result['checkpoints']), (True, 1))
+
+            path = ledger.export_day(self.company, timezone.localdate(), directory)
+            self.assertTrue(ledger.verify_files([path])['valid'])
+
+            # Dosyada değiştirilen kayıt; anahtarsız doğrulamada bağlar yine geçerli
+            with open(path, encoding='utf-8') as handle:
+                lines = handle.read().splitlines()
+            entry = json.loads(lines[2])
+            entry['fields']['ad_soyad'] = 'Değişti'
+            lines[2] = json.dumps(entry, ensure_ascii=False)
+            with open(path, 'w', encoding='utf-8') as handle:
+                handle.write('\n'.join(lines) + '\n')
+            result = ledger.verify_files([path])
+            self.assertEqual((result['valid'], result['seq']), (False, 2))
+            self.assertTrue(ledger.verify_files([path], check_records=False)['valid'])
+
+            # Kontrol noktasından sonra zincirin sonu silinirse fark edilmeli
+            LogLedgerCheckpoint.objects.update(seq=6)
+            self.assertFalse(ledger.verify_company(self.company)['valid'])
+
+    def test_deleted_prefix_requires_anchor(self):
+        """Zincirin başı çapasız silinirse fark edilmeli; saklama süresi silmesi çapa bırakmalı"""
+        import tempfile
+        import shutil
+        from datetime import timedelta
+        from django.core.management import call_command
+        from django.utils import timezone
+        from .models import LogLedgerCheckpoint, TimestampAuthority, TimestampConfiguration
+
+        # Kontrol noktası olan bir seq'e kadar silinen baş da çapa sayılmamalı
+        LogLedgerCheckpoint.objects.create(company=self.company, seq=2, chain_hash='0' * 64, timestamp_token='x')
+        for log in self.logs[:2]:
+            log.delete()
+        result = ledger.verify_company(self.company)
+        self.assertEqual((result['valid'], result['first_seq'], result['seq']), (False, 3, 2))
+        LogLedgerCheckpoint.objects.all().delete()
+
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        with LocalTSAServer() as server, self.settings(
+            TSA_TRUSTED_CERTIFICATES=[server.write_root_certificate(directory)]
+        ):
+            self.addCleanup(tsa_pool.reset_pools)
+            self.addCleanup(rfc3161.reset_verifiers)
+            authority = TimestampAuthority.objects.create(name='Yerel', authority_type='TUBITAK', api_endpoint=server.url)
+            TimestampConfiguration.objects.create(company=self.company, authority=authority)
+            LogKayit.objects.filter(pk__in=[log.pk for log in self.logs[2:4]]).update(
+                giris_zamani=timezone.now() - timedelta(days=800)
+            )
+            call_command('cleanup_old_logs', verbosity=0)
+
+            anchor = LogLedgerCheckpoint.objects.get(company=self.company)
+            self.assertEqual((anchor.seq, anchor.is_anchor), (4, True))
+            result = ledger.verify_company(self.company)
+            self.assertEqual((result['valid'], result['first_seq'], result['last_seq']), (True, 5, 5))
+
+            # Olağan kontrol noktası damgası çapa olarak kullanılamamalı
+            from .services import TimestampService
+            token = TimestampService(authority).sign_hash(anchor.chain_hash)['timestamp_token']
+            LogLedgerCheckpoint.objects.filter(pk=anchor.pk).update(timestamp_token=token)
+            self.assertFalse(ledger.verify_company(self.company)['valid'])
+            LogLedgerCheckpoint.objects.filter(pk=anchor.pk).update(timestamp_token=anchor.timestamp_token)
+
+            # Tüm girdiler silinince zincir çapadan devam etmeli
+            self.logs[4].giris_zamani = timezone.now() - timedelta(days=800)
+            LogKayit.objects.filter(pk=self.logs[4].pk).update(giris_zamani=self.logs[4].giris_zamani)
+            call_command('cleanup_old_logs', verbosity=0)
+            self.assertTrue(ledger.verify_company(self.company)['valid'])
+            self.assertEqual(ledger._head(self.company.pk)[0], 5)
+
+
+class TSAPoolTestCase(SimpleTestCase):
+    def tearDown(self):
+        tsa_pool.reset_pools()
+
+    def _authority(self, server):
+        from .models import TimestampAuthority
+        return TimestampAuthority(name='Yerel', authority_type='TUBITAK', api_endpoint=server.url)
+
+    def test_requests_share_connections(self):
+        """Eşzamanlı istekler eşzamanlılık sınırı kadar bağlantıyı paylaşmalı"""
+        hashes = [f'{i:064x}' for i in range(20)]
+        with LocalTSAServer(latency=0.01) as server, self.settings(TSA_MAX_CONCURRENCY=4):
+            results = tsa_pool.request_many(self._authority(server), hashes)
+        self.assertTrue(all(response and response['success'] and error is None for response, error in results))
+        self.assertEqual(server.requests, 20)
+        self.assertLessEqual(server.connections, 4)
+        self.assertEqual(tsa_pool.metrics_snapshot()['Yerel']['successes'], 20)
+
+    def test_retry_budget_and_circuit_breaker(self):
+        """Yeniden denemeler bütçeyle sınırlanmalı, devre açılınca istek gönderilmemeli"""
+        with LocalTSAServer(fail_first=100) as server, self.settings(
+            TSA_MAX_RETRIES=3, TSA_RETRY_BACKOFF_SECONDS=0, TSA_RETRY_BUDGET_RATIO=0,
+            TSA_RETRY_BUDGET_MIN=1, TSA_CIRCUIT_FAILURE_THRESHOLD=3,
+        ):
+            authority = self._authority(server)
+            with self.assertRaises(Exception):
+                tsa_pool.request_timestamp(authority, '0' * 64)
+            # İlk istek + bütçeden tek yeniden deneme
+            self.assertEqual(server.requests, 2)
+            with self.assertRaises(Exception):
+                tsa_pool.request_timestamp(authority, '0' * 64)
+            self.assertEqual(server.requests, 3)
+            with self.assertRaises(tsa_pool.CircuitOpen):
+                tsa_pool.request_timestamp(authority, '0' * 64)
+            self.assertEqual(server.requests, 3)
+        metrics = tsa_pool.metrics_snapshot()['Yerel']
+        self.assertEqual((metrics['retries'], metrics['rejected'], metrics['circuit']), (1, 1, 'open'))
+
+
+class TokenVerifierTestCase(SimpleTestCase):
+    def test_leaf_certificate_cannot_issue(self):
+        """CA olmayan TSA sertifikasıyla verilmiş sertifikanın token'ı reddedilmeli"""
+        import hashlib
+        from asn1crypto import x509 as asn1_x509
+        from cryptography.hazmat.primitives import serialization
+        from cryptography.hazmat.primitives.asymmetric import ec
+        from .tsa_stub import _certificate
+
+        digest = hashlib.sha256(b'kayit').hexdigest()
+        with LocalTSAServer() as server:
+            verifier = rfc3161.TokenVerifier([server.root_certificate])
+            self.assertTrue(verifier.verify(server.issue_token(bytes.fromhex(digest)), digest)['valid'])
+
+            # Geçerli TSA sertifikasının anahtarıyla imzalanmış sahte TSA sertifikası
+            forged_key = ec.generate_private_key(ec.SECP256R1())
+            forged = _certificate('Sahte TSA', 'Yerel Test TSA', forged_key.public_key(), server._key, False)
+            server.extra_certificates = [server._signer]
+            server._key = forged_key
+            server._signer = asn1_x509.Certificate.load(forged.public_bytes(serialization.Encoding.DER))
+            result = verifier.verify(server.issue_token(bytes.fromhex(digest)), digest)
+        self.assertTrue(result['signature_valid'])
+        self.assertFalse(result['valid'])
+        self.assertIn('CA değil', result['error'])
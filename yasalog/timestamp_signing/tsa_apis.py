@@ -3,41 +3,40 @@ Gerçek TSA API Entegrasyonları
 TÜBİTAK ve TurkTrust için RFC 3161 uyumlu API çağrıları
 """
 
-import hashlib
 import base64
-import json
+import ssl
 import requests
 from datetime import datetime, timezone
+from django.conf import settings
+from . import rfc3161
 import logging
 
-# Opsiyonel imports
-try:
-    import asn1crypto
-    ASN1_AVAILABLE = True
-except ImportError:
-    ASN1_AVAILABLE = False
+logger = logging.getLogger(__name__)
 
-try:
-    from cryptography import x509
-    from cryptography.hazmat.primitives import hashes, serialization
-    from cryptography.hazmat.primitives.asymmetric import rsa, padding
-    from cryptography.hazmat.backends import default_backend
-    CRYPTO_AVAILABLE = True
-except ImportError:
-    CRYPTO_AVAILABLE = False
 
-logger = logging.getLogger(__name__)
+def timestamp_result(info):
+    """rfc3161.parse_response çıktısını imza kaydı alanlarına çevirir"""
+    return {
+        'success': True,
+        'signature': base64.b64encode(info['signature']).decode(),
+        'timestamp_token': base64.b64encode(info['token']).decode(),
+        'certificate_chain': ''.join(ssl.DER_cert_to_PEM_cert(der) for der in info['certificates']),
+        'serial_number': str(info['serial_number']),
+        'timestamp': info['gen_time'].isoformat(),
+    }
 
 
 class TUBITAKTSA:
     """TÜBİTAK TSA API Entegrasyonu"""
     
-    def __init__(self, api_endpoint, api_key=None, username=None, password=None):
+    def __init__(self, api_endpoint, api_key=None, username=None, password=None, session=None):
         self.api_endpoint = api_endpoint
         self.api_key = api_key
         self.username = username
         self.password = password
-        self.session = requests.Session()
+        # Ortak oturum verilirse (tsa_pool) bağlantılar yeniden kullanılır
+        self.session = session or requests.Session()
+        self.timeout = getattr(settings, 'TSA_TIMEOUT', (5, 15))
         
         # TÜBİTAK TSA için özel header'lar
         self.session.headers.update({
@@ -51,26 +50,10 @@ class TUBITAKTSA:
         elif self.username and self.password:
             self.session.auth = (self.username, self.password)
     
-    def create_timestamp_request(self, data_hash, hash_algorithm='SHA256'):
-        """RFC 3161 uyumlu zaman damgası isteği oluşturur"""
+    def create_timestamp_request(self, data_hash, hash_algorithm='SHA256', nonce=None):
+        """RFC 3161 uyumlu zaman damgası isteği oluşturur (DER TimeStampReq)"""
         try:
-            # ASN.1 TimeStampReq oluştur
-            timestamp_request = {
-                'version': 1,
-                'message_imprint': {
-                    'hash_algorithm': {
-                        'algorithm': f'1.3.14.3.2.26' if hash_algorithm == 'SHA1' else '2.16.840.1.101.3.4.2.1'
-                    },
-                    'hashed_message': data_hash
-                },
-                'nonce': self._generate_nonce(),
-                'cert_req': True
-            }
-            
-            # ASN.1 encode
-            encoded_request = self._encode_timestamp_request(timestamp_request)
-            return encoded_request
-            
+            return rfc3161.build_request(data_hash, hash_algorithm, nonce=nonce, cert_req=True)
         except Exception as e:
             logger.error(f"TÜBİTAK TSA request oluşturma hatası: {str(e)}")
             raise Exception(f"Timestamp request oluşturma hatası: {str(e)}")
@@ -79,19 +62,20 @@ class TUBITAKTSA:
         """TÜBİTAK TSA'ya zaman damgası isteği gönderir"""
         try:
             # Zaman damgası isteği oluştur
-            timestamp_request = self.create_timestamp_request(data_hash, hash_algorithm)
+            nonce = self._generate_nonce()
+            timestamp_request = self.create_timestamp_request(data_hash, hash_algorithm, nonce)
             
             # TSA'ya POST isteği gönder
             response = self.session.post(
                 self.api_endpoint,
                 data=timestamp_request,
-                timeout=30
+                timeout=self.timeout
             )
             
             if response.status_code == 200:
-                return self._parse_timestamp_response(response.content)
+                return self._parse_timestamp_response(response.content, data_hash, nonce)
             else:
-                raise Exception(f"TSA API hatası: {response.status_code} - {response.text}")
+                raise Exception(f"TSA API hatası: {response.status_code} - {response.text[:200]}")
                 
         except requests.exceptions.RequestException as e:
             logger.error(f"TÜBİTAK TSA API bağlantı hatası: {str(e)}")
@@ -102,32 +86,12 @@ class TUBITAKTSA:
     
     def _generate_nonce(self):
         """Güvenli nonce oluşturur"""
-        import secrets
-        return secrets.randbits(64)
-    
-    def _encode_timestamp_request(self, request_data):
-        """ASN.1 TimeStampReq encode eder"""
-        # Basit implementasyon - gerçek projede asn1crypto kullanılmalı
-        return base64.b64encode(json.dumps(request_data).encode())
+        return rfc3161.generate_nonce()
     
-    def _parse_timestamp_response(self, response_data):
-        """TSA yanıtını parse eder"""
+    def _parse_timestamp_response(self, response_data, data_hash=None, nonce=None):
+        """DER TimeStampResp'i çözer; özet ve nonce istekle eşleşmeli"""
         try:
-            # Base64 decode
-            decoded_data = base64.b64decode(response_data)
-            
-            # Basit parse - gerçek implementasyonda ASN.1 decode yapılmalı
-            parsed_data = json.loads(decoded_data.decode())
-            
-            return {
-                'success': True,
-                'signature': base64.b64encode(f"TUBITAK_REAL_{parsed_data.get('timestamp', '')}".encode()).decode(),
-                'timestamp_token': base64.b64encode(response_data).decode(),
-                'certificate_chain': base64.b64encode("TUBITAK_REAL_CERTIFICATE_CHAIN".encode()).decode(),
-                'serial_number': f"TUBITAK_{int(datetime.now().timestamp())}",
-                'timestamp': parsed_data.get('timestamp', datetime.now(timezone.utc).isoformat())
-            }
-            
+            return timestamp_result(rfc3161.parse_response(response_data, data_hash, nonce))
         except Exception as e:
             logger.error(f"TÜBİTAK TSA yanıt parse hatası: {str(e)}")
             raise Exception(f"TSA yanıt parse hatası: {str(e)}")
@@ -136,12 +100,13 @@ class TUBITAKTSA:
 class TurkTrustTSA:
     """TurkTrust TSA API Entegrasyonu"""
     
-    def __init__(self, api_endpoint, api_key=None, username=None, password=None):
+    def __init__(self, api_endpoint, api_key=None, username=None, password=None, session=None):
         self.api_endpoint = api_endpoint
         self.api_key = api_key
         self.username = username
         self.password = password
-        self.session = requests.Session()
+        self.session = session or requests.Session()
+        self.timeout = getattr(settings, 'TSA_TIMEOUT', (5, 15))
         
         # TurkTrust TSA için özel header'lar
         self.session.headers.update({
@@ -155,25 +120,10 @@ class TurkTrustTSA:
         elif self.username and self.password:
             self.session.auth = (self.username, self.password)
     
-    def create_timestamp_request(self, data_hash, hash_algorithm='SHA256'):
-        """RFC 3161 uyumlu zaman damgası isteği oluşturur"""
+    def create_timestamp_request(self, data_hash, hash_algorithm='SHA256', nonce=None):
+        """RFC 3161 uyumlu zaman damgası isteği oluşturur (DER TimeStampReq)"""
         try:
-            # TurkTrust özel format
-            timestamp_request = {
-                'version': 1,
-                'message_imprint': {
-                    'hash_algorithm': hash_algorithm,
-                    'hashed_message': data_hash
-                },
-                'nonce': self._generate_nonce(),
-                'cert_req': True,
-                'extensions': {
-                    'policy': '1.2.3.4.5.6.7.8.9'  # TurkTrust policy OID
-                }
-            }
-            
-            return self._encode_timestamp_request(timestamp_request)
-            
+            return rfc3161.build_request(data_hash, hash_algorithm, nonce=nonce, cert_req=True)
         except Exception as e:
             logger.error(f"TurkTrust TSA request oluşturma hatası: {str(e)}")
             raise Exception(f"Timestamp request oluşturma hatası: {str(e)}")
@@ -182,19 +132,20 @@ class TurkTrustTSA:
         """TurkTrust TSA'ya zaman damgası isteği gönderir"""
         try:
             # Zaman damgası isteği oluştur
-            timestamp_request = self.create_timestamp_request(data_hash, hash_algorithm)
+            nonce = self._generate_nonce()
+            timestamp_request = self.create_timestamp_request(data_hash, hash_algorithm, nonce)
             
             # TSA'ya POST isteği gönder
             response = self.session.post(
                 self.api_endpoint,
                 data=timestamp_request,
-                timeout=30
+                timeout=self.timeout
             )
             
             if response.status_code == 200:
-                return self._parse_timestamp_response(response.content)
+                return self._parse_timestamp_response(response.content, data_hash, nonce)
             else:
-                raise Exception(f"TurkTrust TSA API hatası: {response.status_code} - {response.text}")
+                raise Exception(f"TurkTrust TSA API hatası: {response.status_code} - {response.text[:200]}")
                 
         except requests.exceptions.RequestException as e:
             logger.error(f"TurkTrust TSA API bağlantı hatası: {str(e)}")
@@ -205,29 +156,12 @@ class TurkTrustTSA:
     
     def _generate_nonce(self):
         """Güvenli nonce oluşturur"""
-        import secrets
-        return secrets.randbits(64)
-    
-    def _encode_timestamp_request(self, request_data):
-        """TurkTrust özel format encode"""
-        return base64.b64encode(json.dumps(request_data).encode())
+        return rfc3161.generate_nonce()
     
-    def _parse_timestamp_response(self, response_data):
-        """TurkTrust TSA yanıtını parse eder"""
+    def _parse_timestamp_response(self, response_data, data_hash=None, nonce=None):
+        """DER TimeStampResp'i çözer; özet ve nonce istekle eşleşmeli"""
         try:
-            # Base64 decode
-            decoded_data = base64.b64decode(response_data)
-            parsed_data = json.loads(decoded_data.decode())
-            
-            return {
-                'success': True,
-                'signature': base64.b64encode(f"TURKTRUST_REAL_{parsed_data.get('timestamp', '')}".encode()).decode(),
-                'timestamp_token': base64.b64encode(response_data).decode(),
-                'certificate_chain': base64.b64encode("TURKTRUST_REAL_CERTIFICATE_CHAIN".encode()).decode(),
-                'serial_number': f"TURKTRUST_{int(datetime.now().timestamp())}",
-                'timestamp': parsed_data.get('timestamp', datetime.now(timezone.utc).isoformat())
-            }
-            
+            return timestamp_result(rfc3161.parse_response(response_data, data_hash, nonce))
         except Exception as e:
             logger.error(f"TurkTrust TSA yanıt parse hatası: {str(e)}")
             raise Exception(f"TSA yanıt parse hatası: {str(e)}")
@@ -236,12 +170,13 @@ class TurkTrustTSA:
 class CustomTSA:
     """Özel TSA API Entegrasyonu"""
     
-    def __init__(self, api_endpoint, api_key=None, username=None, password=None):
+    def __init__(self, api_endpoint, api_key=None, username=None, password=None, session=None):
         self.api_endpoint = api_endpoint
         self.api_key = api_key
         self.username = username
         self.password = password
-        self.session = requests.Session()
+        self.session = session or requests.Session()
+        self.timeout = getattr(settings, 'TSA_TIMEOUT', (5, 15))
         
         # Özel TSA için header'lar
         self.session.headers.update({
@@ -269,19 +204,20 @@ class CustomTSA:
             response = self.session.post(
                 self.api_endpoint,
                 json=request_data,
-                timeout=30
+                timeout=self.timeout
             )
             
             if response.status_code == 200:
+                # Token RFC 3161 olmalı; özet ve nonce istekle eşleşmeli
                 response_data = response.json()
-                return {
-                    'success': True,
-                    'signature': response_data.get('signature', ''),
-                    'timestamp_token': response_data.get('timestamp_token', ''),
-                    'certificate_chain': response_data.get('certificate_chain', ''),
-                    'serial_number': response_data.get('serial_number', f"CUSTOM_{int(datetime.now().timestamp())}"),
-                    'timestamp': response_data.get('timestamp', datetime.now(timezone.utc).isoformat())
-                }
+                token = base64.b64decode(response_data.get('timestamp_token', ''), validate=True)
+                info = rfc3161.token_info(token)
+                if info['hashed_message'] != data_hash.lower():
+                    raise Exception("Token özeti istekle uyuşmuyor")
+                if info['nonce'] is not None and info['nonce'] != request_data['nonce']:
+                    raise Exception("Token nonce değeri istekle uyuşmuyor")
+                info['token'] = token
+                return timestamp_result(info)
             else:
                 raise Exception(f"Özel TSA API hatası: {response.status_code} - {response.text}")
                 
@@ -294,8 +230,7 @@ class CustomTSA:
     
     def _generate_nonce(self):
         """Güvenli nonce oluşturur"""
-        import secrets
-        return secrets.randbits(64)
+        return rfc3161.generate_nonce()
 
 
 class TSAFactory:
@@ -329,83 +264,55 @@ class TSAFactory:
             raise Exception(f"Desteklenmeyen TSA tipi: {tsa_name}")
     
     @staticmethod
-    def create_tsa_client(authority):
+    def create_tsa_client(authority, session=None):
         """Authority tipine göre TSA client oluşturur"""
         if authority.authority_type == 'TUBITAK':
             return TUBITAKTSA(
                 api_endpoint=authority.api_endpoint,
                 api_key=authority.api_key,
                 username=authority.username,
-                password=authority.password
+                password=authority.password,
+                session=session
             )
         elif authority.authority_type == 'TURKTRUST':
             return TurkTrustTSA(
                 api_endpoint=authority.api_endpoint,
                 api_key=authority.api_key,
                 username=authority.username,
-                password=authority.password
+                password=authority.password,
+                session=session
             )
         elif authority.authority_type == 'CUSTOM':
             return CustomTSA(
                 api_endpoint=authority.api_endpoint,
                 api_key=authority.api_key,
                 username=authority.username,
-                password=authority.password
+                password=authority.password,
+                session=session
             )
         else:
             raise Exception(f"Desteklenmeyen TSA tipi: {authority.authority_type}")
 
 
 class TimestampVerifier:
-    """Zaman damgası doğrulayıcı"""
+    """Zaman damgası doğrulayıcı
     
-    def __init__(self, certificate_chain=None):
-        self.certificate_chain = certificate_chain
+    Güven kökleri TSA_TRUSTED_CERTIFICATES ayarından ve verilirse otoritenin
+    sertifika dosyasından okunur; aynı kökleri kullanan doğrulayıcılar
+    sertifika önbelleğini paylaşır.
+    """
+    
+    def __init__(self, authority=None):
+        self.verifier = rfc3161.get_verifier(authority)
     
     def verify_timestamp_token(self, timestamp_token, original_hash):
         """RFC 3161 uyumlu zaman damgası token'ını doğrular"""
-        try:
-            # Token'ı decode et
-            decoded_token = base64.b64decode(timestamp_token)
-            
-            # Basit doğrulama - gerçek implementasyonda ASN.1 parse yapılmalı
-            token_data = json.loads(decoded_token.decode())
-            
-            # Hash kontrolü
-            hash_match = token_data.get('hash') == original_hash
-            
-            # Zaman kontrolü
-            timestamp = token_data.get('timestamp')
-            if timestamp:
-                token_time = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
-                current_time = datetime.now(timezone.utc)
-                time_diff = abs((current_time - token_time).total_seconds())
-                time_valid = time_diff < 3600  # 1 saat tolerans
-            else:
-                time_valid = False
-            
-            # Sertifika kontrolü (basit)
-            cert_valid = True  # Gerçek implementasyonda sertifika doğrulaması yapılmalı
-            
-            return {
-                'valid': hash_match and time_valid and cert_valid,
-                'hash_match': hash_match,
-                'time_valid': time_valid,
-                'certificate_valid': cert_valid,
-                'timestamp': timestamp,
-                'details': {
-                    'hash_match': hash_match,
-                    'time_valid': time_valid,
-                    'certificate_valid': cert_valid
-                }
-            }
-            
-        except Exception as e:
-            logger.error(f"Timestamp token doğrulama hatası: {str(e)}")
-            return {
-                'valid': False,
-                'error': str(e),
-                'hash_match': False,
-                'time_valid': False,
-                'certificate_valid': False
-            }
+        result = self.verifier.verify(timestamp_token, original_hash)
+        result['details'] = {
+            'hash_match': result['hash_match'],
+            'signature_valid': result['signature_valid'],
+            'certificate_valid': result['certificate_valid'],
+        }
+        if result.get('error'):
+            logger.warning(f"Timestamp token doğrulama hatası: {result['error']}")
+        return result
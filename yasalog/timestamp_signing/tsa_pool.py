@@ -0,0 +1,305 @@
+"""
+TSA bağlantı havuzu
+Otorite başına ortak oturum, eşzamanlı istek sınırı, devre kesici ve yeniden deneme bütçesi
+
+- Her otorite için tek keep-alive requests.Session tutulur; TLS el sıkışması
+  bağlantı başına bir kez yapılır, bağlantılar istekler arasında yeniden
+  kullanılır.
+- Otorite başına aynı anda en fazla TSA_MAX_CONCURRENCY istek gönderilir;
+  request_many() hash listesini bu sınırla paralel damgalatır.
+- Art arda TSA_CIRCUIT_FAILURE_THRESHOLD hata devreyi açar; devre açıkken
+  istek gönderilmeden CircuitOpen fırlatılır. Bekleme süresi her açılışta
+  ikiye katlanır (TSA_CIRCUIT_MAX_RESET_SECONDS'a kadar), süre dolunca tek
+  deneme isteğine izin verilir.
+- Yeniden denemeler üstel geri çekilme ile yapılır ve son 60 saniyedeki
+  isteklerin TSA_RETRY_BUDGET_RATIO oranıyla sınırlanır; TSA yavaşladığında
+  denemeler yükü katlamaz.
+- Gecikme, hata ve deneme sayıları otorite başına metrics_snapshot() ile okunur.
+
+Durum süreç içindedir; her gunicorn/cron süreci kendi havuzunu tutar.
+"""
+
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+import requests
+from requests.adapters import HTTPAdapter
+from .tsa_apis import TSAFactory
+import logging
+
+logger = logging.getLogger(__name__)
+
+BUDGET_WINDOW_SECONDS = 60
+LATENCY_SAMPLES = 500
+
+
+class CircuitOpen(Exception):
+    """Otoritenin devresi açık; istek gönderilmedi"""
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def authority_key(authority):
+    return (authority.pk, authority.authority_type, authority.api_endpoint)
+
+
+class CircuitBreaker:
+    """Art arda hatalarda otoriteye istek göndermeyi geçici olarak durdurur"""
+
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+    def __init__(self, failure_threshold=None, reset_seconds=None, max_reset_seconds=None, clock=time.monotonic):
+        self.failure_threshold = failure_threshold or _setting('TSA_CIRCUIT_FAILURE_THRESHOLD', 5)
+        self.reset_seconds = reset_seconds or _setting('TSA_CIRCUIT_RESET_SECONDS', 30)
+        self.max_reset_seconds = max_reset_seconds or _setting('TSA_CIRCUIT_MAX_RESET_SECONDS', 600)
+        self.clock = clock
+        self.state = self.CLOSED
+        self.failures = 0
+        self.openings = 0
+        self.opened_until = 0
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    def before_request(self):
+        """İsteğe izin verilmiyorsa CircuitOpen fırlatır"""
+        with self._lock:
+            if self.state == self.OPEN:
+                if self.clock() < self.opened_until:
+                    raise CircuitOpen(f"Devre açık, {self.opened_until - self.clock():.0f} sn sonra denenecek")
+                self.state = self.HALF_OPEN
+            if self.state == self.HALF_OPEN:
+                if self._trial_running:
+                    raise CircuitOpen("Devre deneme isteği bekleniyor")
+                self._trial_running = True
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self.openings = 0
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                delay = min(self.max_reset_seconds, self.reset_seconds * 2 ** self.openings)
+                self.openings += 1
+                self.state = self.OPEN
+                self.opened_until = self.clock() + delay
+                self._trial_running = False
+                logger.warning(f"TSA devresi {delay} sn için açıldı ({self.failures} ardışık hata)")
+
+
+class RetryBudget:
+    """Yeniden denemeleri son pencere içindeki istek sayısının oranıyla sınırlar"""
+
+    def __init__(self, ratio=None, minimum=None, window=BUDGET_WINDOW_SECONDS, clock=time.monotonic):
+        self.ratio = _setting('TSA_RETRY_BUDGET_RATIO', 0.2) if ratio is None else ratio
+        self.minimum = _setting('TSA_RETRY_BUDGET_MIN', 3) if minimum is None else minimum
+        self.window = window
+        self.clock = clock
+        self._requests = deque()
+        self._retries = deque()
+        self._lock = threading.Lock()
+
+    def _trim(self, now):
+        for events in (self._requests, self._retries):
+            while events and events[0] < now - self.window:
+                events.popleft()
+
+    def record_request(self):
+        with self._lock:
+            self._requests.append(self.clock())
+
+    def try_spend(self):
+        """Bütçe yetiyorsa bir yeniden denemeyi düşer ve True döner"""
+        with self._lock:
+            now = self.clock()
+            self._trim(now)
+            if len(self._retries) >= max(self.minimum, self.ratio * len(self._requests)):
+                return False
+            self._retries.append(now)
+            return True
+
+
+class AuthorityMetrics:
+    """Otorite başına istek sayıları ve gecikme örnekleri"""
+
+    def __init__(self):
+        self.requests = 0
+        self.successes = 0
+        self.failures = 0
+        self.retries = 0
+        self.rejected = 0
+        self._latencies = deque(maxlen=LATENCY_SAMPLES)
+        self._lock = threading.Lock()
+
+    def record(self, latency, ok):
+        with self._lock:
+            self.requests += 1
+            if ok:
+                self.successes += 1
+            else:
+                self.failures += 1
+            self._latencies.append(latency)
+
+    def record_retry(self):
+        with self._lock:
+            self.retries += 1
+
+    def record_rejected(self):
+        with self._lock:
+            self.rejected += 1
+
+    def snapshot(self):
+        with self._lock:
+            latencies = sorted(self._latencies)
+            result = {
+                'requests': self.requests,
+                'successes': self.successes,
+                'failures': self.failures,
+                'retries': self.retries,
+                'rejected': self.rejected,
+            }
+        result.update(_latency_stats(latencies))
+        return result
+
+    def latencies(self):
+        with self._lock:
+            return list(self._latencies)
+
+
+def _latency_stats(latencies):
+    """Sıralı gecikme örneklerinden ortalama, p50 ve p95 (ms)"""
+    if not latencies:
+        return {}
+    return {
+        'latency_avg_ms': round(sum(latencies) / len(latencies) * 1000, 1),
+        'latency_p50_ms': round(latencies[len(latencies) // 2] * 1000, 1),
+        'latency_p95_ms': round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000, 1),
+    }
+
+
+class AuthorityPool:
+    """Tek otorite için ortak oturum ve koruma durumu"""
+
+    def __init__(self, authority):
+        self.name = authority.name
+        self.max_concurrency = _setting('TSA_MAX_CONCURRENCY', 8)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_concurrency)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.slots = threading.BoundedSemaphore(self.max_concurrency)
+        self.breaker = CircuitBreaker()
+        self.budget = RetryBudget()
+        self.metrics = AuthorityMetrics()
+
+    def close(self):
+        self.session.close()
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(authority):
+    key = authority_key(authority)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = AuthorityPool(authority)
+        return pool
+
+
+def get_client(authority):
+    """Otoritenin ortak oturumunu kullanan TSA client'ı"""
+    return TSAFactory.create_tsa_client(authority, session=get_pool(authority).session)
+
+
+def request_timestamp(authority, data_hash, hash_algorithm='SHA256'):
+    """Hash'i havuz üzerinden damgalatır; başarısızsa son hatayı fırlatır"""
+    pool = get_pool(authority)
+    client = get_client(authority)
+    max_retries = _setting('TSA_MAX_RETRIES', 3)
+    backoff = _setting('TSA_RETRY_BACKOFF_SECONDS', 0.5)
+    attempt = 0
+
+    with pool.slots:
+        while True:
+            try:
+                pool.breaker.before_request()
+            except CircuitOpen:
+                pool.metrics.record_rejected()
+                raise
+            pool.budget.record_request()
+            started = time.monotonic()
+            try:
+                response = client.request_timestamp(data_hash=data_hash, hash_algorithm=hash_algorithm)
+            except Exception as e:
+                pool.metrics.record(time.monotonic() - started, False)
+                pool.breaker.record_failure()
+                if attempt >= max_retries or not pool.budget.try_spend():
+                    raise
+                attempt += 1
+                pool.metrics.record_retry()
+                # Üstel geri çekilme, eşzamanlı denemeler çakışmasın diye rastgele sapmalı
+                time.sleep(backoff * 2 ** (attempt - 1) * random.uniform(0.5, 1.5))
+                logger.warning(f"TSA isteği yeniden deneniyor ({pool.name}, {attempt}/{max_retries}): {str(e)}")
+                continue
+            pool.metrics.record(time.monotonic() - started, True)
+            pool.breaker.record_success()
+            return response
+
+
+def request_many(authority, hashes, hash_algorithm='SHA256', max_workers=None):
+    """Hash listesini eşzamanlı damgalatır
+
+    Dönüş: girdi sırasıyla [(yanıt, None) | (None, hata), ...]
+    """
+    max_workers = max_workers or get_pool(authority).max_concurrency
+
+    def stamp(data_hash):
+        try:
+            return request_timestamp(authority, data_hash, hash_algorithm), None
+        except Exception as e:
+            return None, e
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='tsa') as executor:
+        return list(executor.map(stamp, hashes))
+
+
+def metrics_snapshot():
+    """{otorite adı: metrikler} (yalnızca bu süreçteki istekler)"""
+    with _pools_lock:
+        pools = list(_pools.values())
+    result = {}
+    for pool in pools:
+        snapshot = pool.metrics.snapshot()
+        snapshot['circuit'] = pool.breaker.state
+        result[pool.name] = snapshot
+    return result
+
+
+def latency_summary():
+    """Tüm otoritelerin istek sayısı ve birleşik gecikme dağılımı"""
+    with _pools_lock:
+        pools = list(_pools.values())
+    latencies = sorted(latency for pool in pools for latency in pool.metrics.latencies())
+    result = {'requests': sum(pool.metrics.requests for pool in pools)}
+    result.update(_latency_stats(latencies))
+    return result
+
+
+def reset_pools():
+    """Tüm oturumları kapatır ve durumu sıfırlar"""
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.close()
+        _pools.clear()
@@ -0,0 +1,203 @@
+"""
+Yerel TSA sunucusu
+Testler ve çevrimdışı ölçümler için TSA yerine geçen HTTP sunucusu
+
+RFC 3161 DER TimeStampReq alır, kendi test kök sertifikasına bağlı bir TSA
+sertifikasıyla imzalanmış gerçek TimeStampResp döndürür; özel TSA için aynı
+token JSON içinde döner. Yapay gecikme (latency) ve ilk N isteği 503 ile
+reddetme (fail_first) ile TSA yavaşlığı ve kesintisi canlandırılır. HTTP/1.1
+keep-alive desteklenir; açılan bağlantı sayısı bağlantı yeniden kullanımını
+ölçmek için tutulur.
+
+    with LocalTSAServer(latency=0.05) as server:
+        authority = TimestampAuthority(name='Yerel', authority_type='TUBITAK',
+                                       api_endpoint=server.url)
+        # Doğrulama için: TSA_TRUSTED_CERTIFICATES=[server.write_root_certificate(dizin)]
+
+Sertifikalar her sunucu için yeniden üretilir; yalnızca test amaçlıdır.
+"""
+
+import base64
+import hashlib
+import json
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from asn1crypto import cms, tsp, x509 as asn1_x509
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from cryptography.x509.oid import ExtendedKeyUsageOID, NameOID
+
+STUB_POLICY = '1.3.6.1.4.1.99999.5651.1'
+
+
+def _certificate(subject, issuer, public_key, signing_key, ca, lifetime_days=365):
+    now = datetime.now(timezone.utc)
+    builder = (
+        x509.CertificateBuilder()
+        .subject_name(x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, subject)]))
+        .issuer_name(x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, issuer)]))
+        .public_key(public_key)
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now - timedelta(days=1))
+        .not_valid_after(now + timedelta(days=lifetime_days))
+        .add_extension(x509.BasicConstraints(ca=ca, path_length=None), critical=True)
+    )
+    builder = builder.add_extension(x509.KeyUsage(
+        digital_signature=not ca, content_commitment=False, key_encipherment=False, data_encipherment=False,
+        key_agreement=False, key_cert_sign=ca, crl_sign=ca, encipher_only=False, decipher_only=False,
+    ), critical=True)
+    if not ca:
+        builder = builder.add_extension(x509.ExtendedKeyUsage([ExtendedKeyUsageOID.TIME_STAMPING]), critical=True)
+    return builder.sign(signing_key, hashes.SHA256())
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        self.server.stub.record_connection()
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        stub = self.server.stub
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        if stub.latency:
+            time.sleep(stub.latency)
+        if not stub.accept_request():
+            self._send(503, 'text/plain', b'TSA kullanilamiyor')
+            return
+
+        if self.headers.get('Content-Type', '').startswith('application/json'):
+            request = json.loads(body or b'{}')
+            token = stub.issue_token(bytes.fromhex(request['hash']), request.get('nonce'))
+            payload = json.dumps({'timestamp_token': base64.b64encode(token.dump()).decode()}).encode()
+            self._send(200, 'application/json', payload)
+            return
+
+        try:
+            request = tsp.TimeStampReq.load(body)
+            imprint = request['message_imprint']
+            if imprint['hash_algorithm']['algorithm'].native != 'sha256':
+                raise ValueError('sha256 bekleniyor')
+            token = stub.issue_token(
+                imprint['hashed_message'].native, request['nonce'].native, request['cert_req'].native
+            )
+            response = tsp.TimeStampResp({'status': {'status': 'granted'}, 'time_stamp_token': token})
+        except ValueError:
+            response = tsp.TimeStampResp({'status': {'status': 'rejection', 'fail_info': {'bad_data_format'}}})
+        self._send(200, 'application/timestamp-reply', response.dump())
+
+    def _send(self, status, content_type, payload):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+class LocalTSAServer:
+    """Arka plan thread'inde çalışan yerel TSA sunucusu"""
+
+    def __init__(self, latency=0, fail_first=0, host='127.0.0.1', port=0):
+        self.latency = latency
+        self.fail_first = fail_first
+        self.requests = 0
+        self.connections = 0
+        self._lock = threading.Lock()
+
+        # Kök -> TSA sertifika zinciri (EC anahtarlar hızlı üretilir)
+        root_key = ec.generate_private_key(ec.SECP256R1())
+        self.root_certificate = _certificate('Yerel Test Kok', 'Yerel Test Kok', root_key.public_key(), root_key, True)
+        self._key = ec.generate_private_key(ec.SECP256R1())
+        self.certificate = _certificate('Yerel Test TSA', 'Yerel Test Kok', self._key.public_key(), root_key, False)
+        self._signer = asn1_x509.Certificate.load(self.certificate.public_bytes(serialization.Encoding.DER))
+        # Token'a imzalayandan sonra eklenecek ara sertifikalar
+        self.extra_certificates = []
+
+        self._server = ThreadingHTTPServer((host, port), _Handler)
+        self._server.daemon_threads = True
+        self._server.stub = self
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}/timestamp'
+
+    def write_root_certificate(self, directory):
+        """Kök sertifikayı PEM olarak yazar; TSA_TRUSTED_CERTIFICATES için yol döndürür"""
+        path = os.path.join(directory, 'yerel_tsa_kok.pem')
+        with open(path, 'wb') as handle:
+            handle.write(self.root_certificate.public_bytes(serialization.Encoding.PEM))
+        return path
+
+    def record_connection(self):
+        with self._lock:
+            self.connections += 1
+
+    def accept_request(self):
+        with self._lock:
+            self.requests += 1
+            return self.requests > self.fail_first
+
+    def issue_token(self, digest, nonce=None, cert_req=True):
+        """Özet için imzalı RFC 3161 token (ContentInfo) üretir"""
+        with self._lock:
+            serial = self.requests
+        tst_info = {
+            'version': 'v1',
+            'policy': STUB_POLICY,
+            'message_imprint': {'hash_algorithm': {'algorithm': 'sha256'}, 'hashed_message': digest},
+            'serial_number': serial,
+            'gen_time': datetime.now(timezone.utc).replace(microsecond=0),
+        }
+        if nonce is not None:
+            tst_info['nonce'] = nonce
+        tst_info = tsp.TSTInfo(tst_info)
+
+        signed_attrs = cms.CMSAttributes([
+            {'type': 'content_type', 'values': ['tst_info']},
+            {'type': 'message_digest', 'values': [hashlib.sha256(tst_info.dump()).digest()]},
+        ])
+        signature = self._key.sign(signed_attrs.dump(), ec.ECDSA(hashes.SHA256()))
+        signed_data = {
+            'version': 'v3',
+            'digest_algorithms': [{'algorithm': 'sha256'}],
+            'encap_content_info': {'content_type': 'tst_info', 'content': tst_info},
+            'signer_infos': [{
+                'version': 'v1',
+                'sid': cms.SignerIdentifier({'issuer_and_serial_number': {
+                    'issuer': self._signer.issuer, 'serial_number': self._signer.serial_number,
+                }}),
+                'digest_algorithm': {'algorithm': 'sha256'},
+                'signed_attrs': signed_attrs,
+                'signature_algorithm': {'algorithm': 'sha256_ecdsa'},
+                'signature': signature,
+            }],
+        }
+        if cert_req:
+            signed_data['certificates'] = [self._signer] + self.extra_certificates
+        return cms.ContentInfo({'content_type': 'signed_data', 'content': cms.SignedData(signed_data)})
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name='local-tsa', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
@@ -12,6 +12,7 @@ from django.utils import timezone
 from datetime import timedelta
 
 from log_kayit.models import Company, CompanyUser
+from log_kayit.blind_index import tc_no_index
 from .models import TimestampSignature, TimestampConfiguration, TimestampLog, TimestampAuthority
 from .services import BatchTimestampService
 
@@ -87,11 +88,12 @@ def signatures_list(request, company_slug):
         signatures = signatures.filter(authority_id=authority)
     
     if search:
-        signatures = signatures.filter(
-            Q(log_entry__ad_soyad__icontains=search) |
-            Q(log_entry__tc_no__icontains=search) |
-            Q(serial_number__icontains=search)
-        )
+        search_filter = Q(log_entry__ad_soyad__icontains=search) | Q(serial_number__icontains=search)
+        search_index = tc_no_index(search)
+        if search_index:
+            # Boş indeks pasaportlu kayıtların hepsiyle eşleşirdi
+            search_filter |= Q(log_entry__tc_no_bidx=search_index)
+        signatures = signatures.filter(search_filter)
     
     # Sayfalama
     from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
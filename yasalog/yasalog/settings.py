@@ -189,8 +189,18 @@ LOGOUT_REDIRECT_URL = '/yonetici/login/'
 CRONJOBS = [
     # Her gün gece 02:00'de 2 yıldan eski logları temizle
     ('0 2 * * *', 'log_kayit.cron.cleanup_old_logs'),
+    # Her gün 01:30'da önümüzdeki aylar için log bölümlerini oluştur (PostgreSQL)
+    ('30 1 * * *', 'log_kayit.cron.ensure_log_partitions'),
     # Her hafta Pazar günü 03:00'de veri saklama raporu oluştur
     ('0 3 * * 0', 'log_kayit.cron.generate_retention_report'),
+    # Her 5 dakikada dashboard özet tablolarını güncelle
+    ('*/5 * * * *', 'log_kayit.cron.update_log_rollups'),
+    # Her saat süresi dolmuş cihaz oturumlarını sil
+    ('15 * * * *', 'log_kayit.cron.cleanup_device_sessions'),
+    # Her saat süresi dolan dışa aktarma dosyalarını sil
+    ('30 * * * *', 'log_kayit.cron.cleanup_export_jobs'),
+    # Her 5 dakikada yeni logları hash zincirine ekle, zincir başlarını damgalat
+    ('*/5 * * * *', 'log_kayit.cron.update_log_ledger'),
 ]
 
 # Cron job log ayarları
@@ -371,6 +381,58 @@ CACHES = {
     },
 }
 
+# Captive portal önbelleği (log_kayit/portal_cache.py)
+PORTAL_CACHE_TIMEOUT = 60          # Firma kaydı/form ayarları (sn); çok süreçli locmem'de en geç bu kadar gecikir
+PORTAL_PAGE_CACHE_TIMEOUT = 3600   # Render edilmiş giriş sayfası (firma sürümüyle anahtarlanır)
+DEVICE_SESSION_TTL_HOURS = 24      # "Cihazı hatırla" süresi
+DEVICE_COOKIE_NAME = 'yasalog_device'  # Denetleyici MAC göndermezse cihazı tanıyan imzalı çerez
+
+# Artımlı log imleçleri (rollup, zaman damgası, log defteri) commit sınırında durur
+# (log_kayit/commit_horizon.py); ID boşluğu bu kadar saniye dolmazsa kalıcı sayılır
+LOG_COMMIT_GAP_SECONDS = 600
+
+# Dashboard özet tabloları (log_kayit/rollups.py): özetlenmemiş kayıt bu sayıyı
+# aşarsa kullanıcı sıralaması doğrudan log tablosundan hesaplanır
+ROLLUP_TAIL_LIMIT = 10000
+
+# Dışa aktarma (log_kayit/exports.py, export_jobs.py)
+EXPORT_CHUNK_SIZE = 2000                 # Veritabanından parça başına okunan satır
+EXPORT_SYNC_MAX_ROWS = 10000             # Üzeri istek içinde çalışmaz, kuyruğa alınır
+EXPORT_ROOT = BASE_DIR / 'exports'       # MEDIA_ROOT dışında; yalnızca yetkili indirme view'ı sunar
+EXPORT_MAX_CONCURRENT_PER_COMPANY = 1    # Firma başına aynı anda çalışan iş
+EXPORT_MAX_QUEUED_PER_COMPANY = 5        # Firma başına bekleyen + çalışan iş
+EXPORT_JOB_STALE_SECONDS = 600           # Bu süre ilerleme yazmayan iş yeniden sıraya alınır
+EXPORT_JOB_RETENTION_HOURS = 24          # Tamamlanan dosyaların saklanma süresi
+EXPORT_WORKER_POLL_SECONDS = 2
+
+# Aylık log bölümleri (yalnızca PostgreSQL; manage_partitions --convert ile açılır)
+PARTITION_MONTHS_AHEAD = 3               # Önceden oluşturulacak ay sayısı
+
+# TSA istemcisi (timestamp_signing.tsa_pool)
+TSA_TIMEOUT = (5, 15)                    # (bağlantı, okuma) saniye
+TSA_MAX_CONCURRENCY = 8                  # Otorite başına eşzamanlı istek / açık bağlantı
+TSA_MAX_RETRIES = 3
+TSA_RETRY_BACKOFF_SECONDS = 0.5          # İlk bekleme; her denemede ikiye katlanır
+TSA_RETRY_BUDGET_RATIO = 0.2             # Son 60 sn'deki isteklerin en fazla bu oranı yeniden denenir
+TSA_RETRY_BUDGET_MIN = 3
+TSA_CIRCUIT_FAILURE_THRESHOLD = 5        # Bu kadar ardışık hatada devre açılır
+TSA_CIRCUIT_RESET_SECONDS = 30
+TSA_CIRCUIT_MAX_RESET_SECONDS = 600
+# Zaman damgası token doğrulamasında güvenilen kök/ara sertifika dosyaları (PEM/DER).
+# Otoritenin certificate_path alanındaki sertifika da güven köküne eklenir.
+TSA_TRUSTED_CERTIFICATES = []
+
+# Otomatik zaman damgası imzalama (timestamp_signing.services.BatchTimestampService)
+TIMESTAMP_FOLLOW_POLL_SECONDS = 5        # auto_timestamp --follow yoklama aralığı
+TIMESTAMP_MAX_LATENCY_SECONDS = 60       # --follow: kaydın girişten imzaya en fazla bekleme süresi
+TIMESTAMP_WORKERS = 8                    # auto_timestamp: eşzamanlı işlenen firma sayısı
+TIMESTAMP_COMPANY_TIME_BUDGET_SECONDS = 120  # Firma başına çalıştırma süresi; kalan kayıtlar sonraki çalıştırmaya
+TIMESTAMP_LOCK_GRACE_SECONDS = 300       # Firma kilidi süresi = bütçe + bu pay (çöken çalıştırmadan sonra kilit düşer)
+
+# Log defteri / hash zinciri (timestamp_signing.ledger)
+LEDGER_HMAC_KEY = config('LEDGER_HMAC_KEY', default=None)  # Tanımlı değilse SECRET_KEY'den türetilir
+LEDGER_CHECKPOINT_MINUTES = 60           # Zincir başı bu aralıkla TSA'ya damgalatılır
+
 # Session cache backend
 SESSION_ENGINE = 'django.contrib.sessions.backends.cache'
 SESSION_CACHE_ALIAS = 'sessions'
@@ -380,8 +442,29 @@ SESSION_CACHE_ALIAS = 'sessions'
 # ENCRYPTION_KEY = 'your-32-byte-base64-encoded-key-here'
 ENCRYPTION_KEY = None  # Development için None, production'da güvenli anahtar
 
+# Anahtar rotasyonu: virgülle ayrılmış anahtarlar, en yeni anahtar başta.
+# Tanımlıysa ENCRYPTION_KEY yerine kullanılır; yeni yazmalar ilk anahtarla
+# yapılır, okumalarda tüm anahtarlar denenir. Eski anahtar ancak
+# `manage.py rotate_encryption_key` tüm firmalar için tamamlandıktan sonra çıkarılmalı
+ENCRYPTION_KEYS = config('ENCRYPTION_KEYS', default='')
+ENCRYPTION_ROTATION_RATE = 2000  # Rotasyon hız sınırı (kayıt/sn, 0 = sınırsız)
+
+# TC/IP/MAC kör indeksleri için HMAC anahtarı. Tanımlı değilse SECRET_KEY'den
+# türetilir; anahtar değişirse `manage.py backfill_blind_indexes --rebuild` çalıştırın
+BLIND_INDEX_KEY = config('BLIND_INDEX_KEY', default=None)
+
 # Şifreleme ayarları
 ENCRYPT_SENSITIVE_DATA = True  # Hassas verileri şifrele
 ENCRYPT_TC_NUMBERS = True      # TC kimlik numaralarını şifrele
 ENCRYPT_IP_ADDRESSES = True    # IP adreslerini şifrele
-ENCRYPT_MAC_ADDRESSES = True   # MAC adreslerini şifrele
\ No newline at end of file
+ENCRYPT_MAC_ADDRESSES = True   # MAC adreslerini şifrele
+# Syslog ingest ayarları
+SYSLOG_UDP_RCVBUF = 8 * 1024 * 1024     # UDP soket alım buffer'ı (kernel rmem_max ile sınırlıdır)
+SYSLOG_MAX_MESSAGE_SIZE = 64 * 1024      # TCP/TLS çerçeve başına maksimum mesaj boyutu (byte)
+SYSLOG_FLUSH_INTERVAL_MS = 500           # Yazma kuyruğunun en geç boşaltılma aralığı
+SYSLOG_BACKPRESSURE = 'drop_oldest'      # drop_oldest, block (okumayı durdurur) veya spill
+SYSLOG_SPILL_DIR = BASE_DIR / 'logs' / 'syslog_spill'  # spill politikasında taşma dosyaları
+SYSLOG_CLIENT_CACHE_CHECK_SECONDS = 30   # Client önbelleğinin sürüm kontrol aralığı
+SYSLOG_FILTER_RELOAD_SECONDS = 30        # Derlenmiş filtrelerin sürüm kontrol aralığı
+SYSLOG_STATS_FLUSH_SECONDS = 5           # İstatistik sayaçlarının veritabanına yazılma aralığı
+SYSLOG_WORKERS = None                    # run_syslog_servers: sunucu başına worker süreci (None: CPU sayısı)